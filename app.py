@@ -6,7 +6,41 @@ import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
 from src.models.order import Order, OrderItem
+from src.utils.money import cents_array, format_cents, from_cents, line_total_cents
 from src.utils.helpers import format_currency, format_weight, validate_shipping_address, validate_contact_info, format_datetime, format_order_summary
+from src.services.order_service import AsyncOrderService, OrderService
+from src.services.user_service import AsyncUserService
+from src.repositories.order_repository import InMemoryOrderRepository
+from src.services.truck_service import AsyncTruckService, TruckService
+from src.services.truck_scheduler import TruckScheduler
+from src.services.checkout_service import CheckoutService, new_idempotency_key
+from src.services.payment_gateway import FakePaymentGateway
+from src.services.shared_shipping_service import SharedShippingService
+from src.repositories.unit_of_work import UnitOfWork
+from src.services.catalog_service import CatalogService
+from src.services.pricing_service import default_pricing_engine as pricing_engine
+from src.services.inventory_service import InventoryService, OutOfStockError
+from src.services.job_queue import JobQueue
+from src.worker import EMAIL_JOB_PRIORITY, FORECAST_MODELS, JobContext, Worker
+from src.services.analytics_service import (
+    get_order_analytics, get_user_analytics,
+    ORDER_ANALYTICS_FIELDS, SEGMENT_NAMES
+)
+from src.services.analytics_mirror import AnalyticsMirror
+from src.services.order_search import OrderSearch
+from src.services.order_archive import OrderArchive, merge_archived
+from src.services.export_service import EXPORT_FORMATS, MANIFEST_SCHEMA, ORDER_LINE_SCHEMA, export_to_file, iter_order_lines
+from src.utils.eta import estimate_for_orders
+from src.config import (
+    CATALOG_CURRENCY, DEFAULT_SHIPPING_PLANS, DEMO_MODE, JOB_WORKER_IN_APP, REPORTING_CURRENCY,
+    TRUCK_DEFAULT_DESTINATION, TRUCK_FILL_THRESHOLD, TRUCK_SCHEDULER_IN_APP
+)
+from src.database import get_async_database, get_client, get_database, pool_metrics
+from src.utils.aio import load_concurrently, run as run_async
+from src.utils.instrumentation import command_metrics, set_query_tag, tagged
+from src.utils.cache import reference_cache
+from src.utils.throttle import RateLimited, expensive_calls
+from src.utils.profiling import profiling_enabled, start_section, summarize as summarize_profile
 import bcrypt
 import jwt
 import smtplib
@@ -19,17 +53,15 @@ from typing import Optional
 import plotly.express as px
 import plotly.graph_objects as go
 from collections import Counter
-from statsmodels.tsa.holtwinters import ExponentialSmoothing
-from statsmodels.tsa.arima.model import ARIMA
-from statsmodels.tsa.statespace.sarimax import SARIMAX
-from sklearn.cluster import KMeans
-from sklearn.preprocessing import StandardScaler
-from scipy import stats
 import json
 import random
 from PIL import Image
 import base64
 from pathlib import Path
+import tempfile
+
+# Time the whole rerun when CROWDCARGO_PROFILE is set
+rerun_section = start_section("rerun", root=True)
 
 # Sample products data
 SAMPLE_PRODUCTS = [
@@ -64,24 +96,53 @@ SAMPLE_PRODUCTS = [
 ]
 
 def add_to_cart(product_id, quantity):
-    """Add a product to the cart with the specified quantity."""
-    product = next((p for p in SAMPLE_PRODUCTS if p['id'] == product_id), None)
+    """Add a product to the cart with the specified quantity, holding the stock; return whether it was added."""
+    product = catalog_service.get_product(product_id)
     if product:
+        hold = inventory_service.reserve(product['id'], quantity, str(st.session_state.user['_id']))
+        if hold is None:
+            return False
         cart_item = {
             'product_id': product['id'],
             'name': product['name'],
             'quantity': quantity,
             'price': product['price'],
-            'weight_kg': product['weight_kg']
+            'currency': product.get('currency', CATALOG_CURRENCY),
+            'weight_kg': product['weight_kg'],
+            'hold_id': str(hold['_id'])
         }
         if 'cart' not in st.session_state:
             st.session_state.cart = []
         st.session_state.cart.append(cart_item)
+        # A changed cart is a new checkout submission
+        st.session_state.pop('checkout_key', None)
+        st.session_state.pop('truck_join_key', None)
+        return True
+    return False
 
 def remove_from_cart(index):
-    """Remove an item from the cart at the specified index."""
+    """Remove an item from the cart at the specified index, releasing its stock."""
     if 'cart' in st.session_state and 0 <= index < len(st.session_state.cart):
-        st.session_state.cart.pop(index)
+        item = st.session_state.cart.pop(index)
+        if item.get('hold_id'):
+            inventory_service.release(item['hold_id'])
+        st.session_state.pop('checkout_key', None)
+        st.session_state.pop('truck_join_key', None)
+
+def cart_hold_ids():
+    """Return the stock hold ids of the items in the cart."""
+    return [item['hold_id'] for item in st.session_state.cart if item.get('hold_id')]
+
+def commit_cart_holds():
+    """Turn the cart's stock holds into sales; return the names of items that sold out meanwhile.
+
+    If anything sold out, the holds that did commit are put back on hold, so the cart keeps its stock.
+    """
+    holds = {item['hold_id']: item['name'] for item in st.session_state.cart if item.get('hold_id')}
+    sold_out = inventory_service.commit(list(holds))
+    if sold_out:
+        inventory_service.reopen([hold_id for hold_id in holds if hold_id not in sold_out])
+    return [holds[hold_id] for hold_id in sold_out]
 
 # Page configuration must be the first Streamlit command
 st.set_page_config(
@@ -438,12 +499,6 @@ load_dotenv()
 # JWT Secret Key
 JWT_SECRET = os.getenv("JWT_SECRET", "your-secret-key")
 
-# Email configuration
-SMTP_SERVER = os.getenv("SMTP_SERVER", "smtp.gmail.com")
-SMTP_PORT = int(os.getenv("SMTP_PORT", "587"))
-SMTP_USERNAME = os.getenv("SMTP_USERNAME")
-SMTP_PASSWORD = os.getenv("SMTP_PASSWORD")
-
 # Add this at the top with other constants
 SHIPPING_TRUCKS = [
     {
@@ -589,12 +644,12 @@ def init_mongodb():
     try:
         # Get MongoDB URI from environment
         mongo_uri = os.getenv("MONGO_URI")
-        if not mongo_uri:
+        if not mongo_uri and not DEMO_MODE:
             st.error("MONGO_URI not found in environment variables")
             return None
             
-        # Try to connect to MongoDB
-        client = pymongo.MongoClient(mongo_uri, serverSelectionTimeoutMS=5000)
+        # Shared per-process client with the configured connection pool
+        client = get_client()
         
         # Test the connection
         client.admin.command('ping')
@@ -612,29 +667,301 @@ def init_mongodb():
         st.error(f"Failed to connect to MongoDB: {str(e)}")
         return None
 
+@st.cache_resource
+def get_demo_order_repository():
+    return InMemoryOrderRepository()
+
+@st.cache_resource
+def get_analytics_mirror():
+    if DEMO_MODE:
+        # Demo orders only live in memory, so each demo starts with an empty mirror
+        return AnalyticsMirror(str(Path(tempfile.mkdtemp()) / "analytics.sqlite3"))
+    return AnalyticsMirror()
+
+@st.cache_resource
+def get_order_archive():
+    if DEMO_MODE:
+        return OrderArchive(tempfile.mkdtemp())
+    return OrderArchive()
+
+@st.cache_resource
+def get_payment_gateway():
+    return FakePaymentGateway()
+
+@st.cache_resource
+def get_unit_of_work(_client):
+    # Transaction support is detected once per process
+    return UnitOfWork(_client)
+
+@st.cache_resource
+def prepare_order_indexes(_order_repository):
+    # Once per process: the unique idempotency_key index is what makes checkout retries safe
+    _order_repository.ensure_indexes()
+    return True
+
+@st.cache_resource
+def prepare_inventory(_inventory_service):
+    # Once per process: stock counters for catalog products that have none yet
+    _inventory_service.ensure_indexes()
+    _inventory_service.seed_stock(SAMPLE_PRODUCTS)
+    return True
+
+@st.cache_resource
+def prepare_trucks(_truck_service):
+    # Once per process: truck and contribution indexes, then the sample trucks if there are none
+    _truck_service.ensure_indexes()
+    _truck_service.seed_trucks(SHIPPING_TRUCKS)
+    return True
+
+@st.cache_resource
+def prepare_job_queue(_job_queue):
+    # Once per process: lease, dedupe and retention indexes for background jobs
+    _job_queue.ensure_indexes()
+    return True
+
+@st.cache_resource
+def start_job_worker(_job_queue, _context):
+    # One worker pool per server process; deployments with several processes run python -m src.worker instead
+    worker = Worker(_job_queue, _context)
+    worker.start()
+    return worker
+
+@st.cache_resource
+def start_truck_scheduler(_truck_service, _order_repository):
+    # One scheduler thread per server process; deployments with several processes run the CLI instead
+    scheduler = TruckScheduler(_truck_service, _order_repository)
+    scheduler.start()
+    return scheduler
+
+@st.cache_resource
+def start_payment_recovery(_checkout_service):
+    # One recovery thread per server process; it asks the gateway that took the charges what happened
+    _checkout_service.start()
+    return True
+
+@st.cache_resource
+def start_order_search(_mirror, _order_repository, _archive):
+    # One refresh thread per server process keeps the search index current off the request path
+    search = OrderSearch(_mirror, _order_repository, _archive)
+    search.start()
+    return search
+
 # Initialize MongoDB connection
 client = init_mongodb()
 if client:
     try:
-        db = client.crowdcargo
+        db = get_database()
+        # Reads that can tolerate lag go to secondaries; order writes need a majority ack
+        analytics_db = get_database("analytics")
+        checkout_db = get_database("checkout")
         # Test database access
         db.command('ping')
         
         # Initialize collections
-        orders_collection = db.orders
         shipping_plans_collection = db.shipping_plans
         users_collection = db.users
         ab_tests_collection = db.ab_tests
         trucks_collection = db.trucks
         
-        # Initialize trucks collection if empty
-        if trucks_collection.count_documents({}) == 0:
-            trucks_collection.insert_many(SHIPPING_TRUCKS)
+        # Services backed by the process-wide reference data cache
+        # Demo mode keeps orders in one in-memory store shared by every session
+        order_repository = get_demo_order_repository() if DEMO_MODE else None
+        order_service = OrderService(db, repository=order_repository)
+        checkout_order_service = OrderService(checkout_db, repository=order_repository)
+        analytics_order_service = OrderService(analytics_db, repository=order_repository)
+        prepare_order_indexes(checkout_order_service.repository)
+        checkout_service = CheckoutService(checkout_order_service, get_payment_gateway())
+        start_payment_recovery(checkout_service)
+        truck_service = TruckService(db)
+        catalog_service = CatalogService(db, SAMPLE_PRODUCTS)
+        inventory_service = InventoryService(db)
+        shared_shipping_service = SharedShippingService(
+            checkout_order_service, truck_service, get_unit_of_work(client), inventory_service
+        )
+        
+        # Async variants for pages that load several independent queries at once
+        async_db = get_async_database()
+        async_analytics_db = get_async_database("analytics")
+        async_order_service = AsyncOrderService(async_db, repository=order_repository)
+        async_analytics_order_service = AsyncOrderService(async_analytics_db, repository=order_repository)
+        async_user_service = AsyncUserService(async_db)
+        async_analytics_user_service = AsyncUserService(async_analytics_db)
+        async_truck_service = AsyncTruckService(async_db)
+        
+        prepare_trucks(truck_service)
+        prepare_inventory(inventory_service)
+        if TRUCK_SCHEDULER_IN_APP or DEMO_MODE:
+            start_truck_scheduler(truck_service, order_service.repository)
+        
+        # Order search runs over the analytics mirror's full-text index
+        order_search = start_order_search(get_analytics_mirror(), analytics_order_service.repository, get_order_archive())
+        
+        # Emails and admin analytics run as background jobs
+        job_queue = JobQueue(db)
+        prepare_job_queue(job_queue)
+        if JOB_WORKER_IN_APP or DEMO_MODE:
+            start_job_worker(
+                job_queue, JobContext(analytics_order_service.repository, get_analytics_mirror(), get_order_archive())
+            )
         
     except Exception as e:
         st.error(f"Failed to initialize database collections: {str(e)}")
         client = None
 
+def loaded(result):
+    """Return a result from load_concurrently, raising the error if its query failed."""
+    if isinstance(result, Exception):
+        raise result
+    return result
+
+def run_analytics(label, fn, *args):
+    """Run an analytics function, showing an error instead of failing the page."""
+    try:
+        return fn(*args)
+    except RateLimited as e:
+        st.warning(f"Not {label} right now: {str(e)}")
+        return None
+    except Exception as e:
+        st.error(f"Error {label}: {str(e)}")
+        return None
+
+def expensive(operation, fn, key=()):
+    """Run an expensive call under the admin's rate limit, sharing its result with identical calls and recent reruns."""
+    result = expensive_calls.run(operation, fn, key=key, user_id=str(st.session_state.user['_id']))
+    age = expensive_calls.result_age(operation, key)
+    if age is not None and age >= expensive_calls.result_ttl_seconds:
+        st.caption(f"Showing results from {age:.0f}s ago; too many recalculations right now.")
+    return result
+
+def analytics_job(name: str, payload: Optional[dict] = None, key: str = ""):
+    """Return the latest result of a background analytics job, queueing a run if there is none yet."""
+    payload = payload or {}
+    dedupe_key = f"{name}:{json.dumps(payload, sort_keys=True)}"
+    job = job_queue.latest_result(name, payload)
+    col1, col2 = st.columns([4, 1])
+    with col2:
+        refresh = st.button("Refresh", key=f"refresh_{name}_{key}")
+    if refresh:
+        # Identical jobs are already deduplicated; the limit stops one admin queueing run after run
+        try:
+            expensive_calls.limiter.acquire(name, str(st.session_state.user['_id']))
+        except RateLimited as e:
+            st.warning(str(e))
+            refresh = False
+    if refresh or (job is None and not job_queue.is_pending(name, payload)):
+        job_queue.enqueue(name, payload, dedupe_key=dedupe_key)
+    with col1:
+        if job_queue.is_pending(name, payload):
+            st.info("Computing in the background; refresh the page in a moment.")
+        elif job is not None:
+            st.caption(f"Computed {format_datetime(job['finished_at'])}")
+    return job['result'] if job is not None else None
+
+def queue_order_confirmation(order: Order, email: str):
+    """Queue the order confirmation email for the background worker."""
+    job_queue.enqueue("email.order_confirmation", {"order": order.to_dict(), "email": email}, priority=EMAIL_JOB_PRIORITY)
+
+# Update the order placement to send confirmation email
+def place_order(order: Order):
+    try:
+        checkout_order_service.create_order(order)
+        queue_order_confirmation(order, st.session_state.user['email'])
+        st.success("Order placed successfully! A confirmation email has been sent.")
+        st.session_state.cart = []  # Clear cart
+    except Exception as e:
+        st.error(f"Failed to place order: {str(e)}")
+
+# Update the order status change to send notification
+def update_order_status(order_id: str, new_status: str):
+    try:
+        order_service.update_order_status(order_id, new_status)
+        order = order_service.get_order(order_id)
+        job_queue.enqueue(
+            "email.status_update", {"order": order.to_dict(), "email": order.contact_info['email']}, priority=EMAIL_JOB_PRIORITY
+        )
+        st.success("Status updated successfully!")
+        st.rerun()
+    except Exception as e:
+        st.error(f"Failed to update status: {str(e)}")
+
+# A/B testing and user activity functions
+def create_ab_test(test_name, variants, target_metric, duration_days):
+    try:
+        test = {
+            'test_id': f"TEST-{datetime.now().strftime('%Y%m%d%H%M%S')}",
+            'name': test_name,
+            'variants': variants,
+            'target_metric': target_metric,
+            'start_date': datetime.now(),
+            'end_date': datetime.now() + timedelta(days=duration_days),
+            'status': 'active',
+            'results': {}
+        }
+        
+        ab_tests_collection.insert_one(test)
+        return test
+    except Exception as e:
+        st.error(f"Error creating A/B test: {str(e)}")
+        return None
+
+def assign_variant(user_id, test_id):
+    try:
+        test = ab_tests_collection.find_one({'test_id': test_id})
+        if not test:
+            return None
+        
+        # Simple random assignment
+        variant = random.choice(test['variants'])
+        
+        # Record assignment
+        ab_tests_collection.update_one(
+            {'test_id': test_id},
+            {'$push': {'assignments': {'user_id': user_id, 'variant': variant}}}
+        )
+        
+        return variant
+    except Exception as e:
+        st.error(f"Error assigning variant: {str(e)}")
+        return None
+
+@tagged()
+def track_user_activity(user_id):
+    try:
+        # Get user's orders
+        user_orders = order_service.find_orders(user_id=user_id, newest_first=True)
+        
+        # Get user's login history
+        user_logins = list(users_collection.find_one({"_id": user_id}).get('login_history', []))
+        
+        # Calculate metrics
+        total_orders = len(user_orders)
+        # Spend in REPORTING_CURRENCY, whatever currency each order was paid in
+        total_spent = from_cents(int(pricing_engine.convert_totals(
+            cents_array([order['total_price'] for order in user_orders]),
+            [order.get('currency', CATALOG_CURRENCY) for order in user_orders], REPORTING_CURRENCY
+        ).sum()))
+        avg_order_value = total_spent / total_orders if total_orders > 0 else 0
+        
+        # Time between orders
+        if len(user_orders) > 1:
+            order_dates = [order['created_at'] for order in user_orders]
+            time_between_orders = np.diff(order_dates)
+            avg_time_between_orders = np.mean(time_between_orders)
+        else:
+            avg_time_between_orders = None
+        
+        return {
+            'total_orders': total_orders,
+            'total_spent': total_spent,
+            'avg_order_value': avg_order_value,
+            'avg_time_between_orders': avg_time_between_orders,
+            'login_history': user_logins,
+            'recent_orders': user_orders[:5]
+        }
+    except Exception as e:
+        st.error(f"Error tracking user activity: {str(e)}")
+        return None 
+
 # Authentication functions
 def hash_password(password):
     return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt())
@@ -687,6 +1014,11 @@ if 'cart' not in st.session_state:
     st.session_state.cart = []
 if 'selected_truck' not in st.session_state:
     st.session_state.selected_truck = None
+if 'currency' not in st.session_state:
+    st.session_state.currency = CATALOG_CURRENCY
+
+# Tag every MongoDB command issued during this rerun with the page that issued it
+set_query_tag("page:Login" if not st.session_state.user else f"page:{st.session_state.page}")
 
 # Show authentication UI if not logged in
 if not st.session_state.user:
@@ -749,10 +1081,10 @@ if not st.session_state.user:
                 
                 # Send verification email
                 verification_link = f"{os.getenv('APP_URL', 'http://localhost:8501')}/verify?token={user['verification_token']}"
-                send_email(
-                    email,
-                    "Verify your CrowdCargo account",
-                    f"""
+                job_queue.enqueue("email.send", {
+                    "to": email,
+                    "subject": "Verify your CrowdCargo account",
+                    "html": f"""
                     <html>
                         <body>
                             <h2>Welcome to CrowdCargo!</h2>
@@ -762,7 +1094,7 @@ if not st.session_state.user:
                         </body>
                     </html>
                     """
-                )
+                }, priority=EMAIL_JOB_PRIORITY)
                 st.success("Registration successful! Please check your email to verify your account.")
     st.stop()
 
@@ -784,6 +1116,10 @@ with col2:
     </div>
     """, unsafe_allow_html=True)
 
+with col3:
+    # Catalog prices are set in CATALOG_CURRENCY; carts and new orders are priced in the shopper's choice
+    st.selectbox("Currency", pricing_engine.currencies(), key="currency")
+
 # Add navigation button styles
 st.markdown("""
 <style>
@@ -839,6 +1175,7 @@ with col7:
 st.markdown("<br>", unsafe_allow_html=True)
 
 # Main content based on selected page
+page_section = start_section(f"page:{st.session_state.page}")
 if st.session_state.page == "Home":
     
     # Show welcome message and features for logged-in users
@@ -879,7 +1216,9 @@ elif st.session_state.page == "Place Order":
     # Product Selection in 4x4 grid
     st.markdown("### Available Products")
     products_per_row = 4
-    rows = [SAMPLE_PRODUCTS[i:i + products_per_row] for i in range(0, len(SAMPLE_PRODUCTS), products_per_row)]
+    products = pricing_engine.localize_products(catalog_service.list_products(), st.session_state.currency)
+    stock_levels = inventory_service.stock_levels([product['id'] for product in products])
+    rows = [products[i:i + products_per_row] for i in range(0, len(products), products_per_row)]
     
     for row in rows:
         cols = st.columns(products_per_row)
@@ -891,27 +1230,32 @@ elif st.session_state.page == "Place Order":
                         <img src='data:image/png;base64,{get_image_base64(ICONS["product"])}' style='width: 80px; height: 80px; object-fit: contain;'/>
                         <h4>{product['name']}</h4>
                         <p>📦 {format_weight(product['weight_kg'])}</p>
-                        <p>💰 {format_currency(product['price'])}</p>
+                        <p>💰 {format_currency(product['price'], product['currency'])}</p>
                     </div>
                 </div>
                 """, unsafe_allow_html=True)
                 
                 # Use Streamlit's native components for quantity and add button
+                # Stock is enforced by the reservation; the input only reflects what is left
+                in_stock = stock_levels.get(product['id'])
+                if in_stock is not None:
+                    st.caption(f"{in_stock} in stock" if in_stock else "Sold out")
                 quantity = st.number_input(
                     "Quantity",
                     min_value=0,
-                    max_value=10,
+                    max_value=in_stock,
                     key=f"qty_{product['id']}",
                     step=1
                 )
                 
                 if st.button("Add to Cart", key=f"add_{product['id']}"):
                     with show_loading_spinner("Adding to cart..."):
-                        if quantity > 0:
-                            add_to_cart(product['id'], quantity)
+                        if quantity <= 0:
+                            st.warning("Please select a quantity greater than 0")
+                        elif add_to_cart(product['id'], quantity):
                             st.success(f"Added {quantity} {product['name']} to cart!")
                         else:
-                            st.warning("Please select a quantity greater than 0")
+                            st.error(f"Sorry, there is not enough {product['name']} left in stock.")
 
 elif st.session_state.page == "My Cart":
     st.title("My Cart")
@@ -920,9 +1264,10 @@ elif st.session_state.page == "My Cart":
         st.info("Your cart is empty. Add some products!")
     else:
         total_weight = sum(item['weight_kg'] * item['quantity'] for item in st.session_state.cart)
-        total_price = sum(item['price'] * item['quantity'] for item in st.session_state.cart)
+        priced_cart, cart_cents = pricing_engine.reprice_cart(st.session_state.cart, st.session_state.currency)
+        total_price = from_cents(cart_cents)
         
-        for i, item in enumerate(st.session_state.cart):
+        for i, item in enumerate(priced_cart):
             with st.container():
                 col1, col2, col3 = st.columns([2, 1, 1])
                 with col1:
@@ -935,7 +1280,7 @@ elif st.session_state.page == "My Cart":
                     </div>
                     """, unsafe_allow_html=True)
                 with col2:
-                    st.markdown(f"<p style='text-align: right;'>{format_currency(item['price'] * item['quantity'])}</p>", unsafe_allow_html=True)
+                    st.markdown(f"<p style='text-align: right;'>{format_cents(line_total_cents(item['price'], item['quantity']), item['currency'])}</p>", unsafe_allow_html=True)
                 with col3:
                     if st.button("❌ Remove", key=f"remove_{i}"):
                         with show_loading_spinner("Removing item..."):
@@ -946,7 +1291,7 @@ elif st.session_state.page == "My Cart":
         <div class='summary-card'>
             <h4>Order Summary</h4>
             <p>Total Weight: {format_weight(total_weight)}</p>
-            <p>Total Price: {format_currency(total_price)}</p>
+            <p>Total Price: {format_currency(total_price, st.session_state.currency)}</p>
         </div>
         """, unsafe_allow_html=True)
         
@@ -972,11 +1317,12 @@ elif st.session_state.page == "Share Shipping":
     
     # If a truck is selected, show its details
     if st.session_state.selected_truck:
-        truck = trucks_collection.find_one({"truck_id": st.session_state.selected_truck})
+        truck = truck_service.get_truck(st.session_state.selected_truck)
         if truck:
             # Back button at the top
             if st.button("← Back to Truck List"):
                 st.session_state.selected_truck = None
+                st.session_state.pop('manifest_page', None)
                 st.rerun()
             
             st.markdown(f"""
@@ -986,7 +1332,7 @@ elif st.session_state.page == "Share Shipping":
                     <div style='flex: 2;'>
                         <p><strong>Status:</strong> {truck['status'].title()}</p>
                         <p><strong>Location:</strong> {truck['location']}</p>
-                        <p><strong>Destination:</strong> {truck.get('destination', 'New York, USA')}</p>
+                        <p><strong>Destination:</strong> {truck.get('destination', TRUCK_DEFAULT_DESTINATION)}</p>
                         <p><strong>Departure:</strong> {format_datetime(truck['departure_date'])}</p>
                         <p><strong>Arrival:</strong> {format_datetime(truck['arrival_date'])}</p>
                     </div>
@@ -1002,61 +1348,51 @@ elif st.session_state.page == "Share Shipping":
             </div>
             """, unsafe_allow_html=True)
             
-            # Items table
+            # Manifest, aggregated by product and paginated
             st.markdown("#### Items in Truck")
-            items_df = pd.DataFrame(truck['items'])
-            st.dataframe(items_df, hide_index=True)
+            st.caption(f"{truck.get('item_count', 0)} items from {truck.get('contribution_count', 0)} contributions")
+            manifest_page_size = 20
+            manifest_page = st.session_state.get('manifest_page', 1)
+            manifest, product_count = run_async(
+                async_truck_service.get_manifest_page(truck['truck_id'], manifest_page - 1, manifest_page_size)
+            )
+            if product_count:
+                st.dataframe(pd.DataFrame(manifest, columns=["name", "quantity", "weight_kg", "contributions"]), hide_index=True)
+                page_count = -(-product_count // manifest_page_size)
+                if page_count > 1:
+                    st.number_input(f"Page (of {page_count})", min_value=1, max_value=page_count, step=1, key="manifest_page")
+            else:
+                st.info("No items in this truck yet.")
             
             # Add to truck button if there's enough space and user has items in cart
             if st.session_state.cart:
                 total_weight = sum(item['weight_kg'] * item['quantity'] for item in st.session_state.cart)
                 if truck['max_weight'] - truck['current_weight'] >= total_weight:
+                    # One idempotency key per cart, kept until the order is stored, so a double click joins once
+                    if 'truck_join_key' not in st.session_state:
+                        st.session_state.truck_join_key = new_idempotency_key()
                     if st.button(f"Add Your Items to Truck {truck['truck_id']}"):
                         with show_loading_spinner("Adding to truck..."):
                             try:
-                                # Create new items list with cart items
-                                new_items = truck['items'].copy()
-                                cart_items = []
-                                total_price = 0
-                                
-                                for item in st.session_state.cart:
-                                    new_items.append({
-                                        "name": item['name'],
-                                        "quantity": item['quantity'],
-                                        "weight": item['weight_kg'] * item['quantity']
-                                    })
-                                    cart_items.append({
-                                        "product_id": item['product_id'],
-                                        "name": item['name'],
-                                        "quantity": item['quantity'],
-                                        "price": item['price'],
-                                        "weight_kg": item['weight_kg']
-                                    })
-                                    total_price += item['price'] * item['quantity']
-                                
-                                # Update the truck in MongoDB
-                                trucks_collection.update_one(
-                                    {"truck_id": truck['truck_id']},
-                                    {
-                                        "$set": {
-                                            "items": new_items,
-                                            "current_weight": truck['current_weight'] + total_weight
-                                        }
-                                    }
+                                cart_items, cart_cents = pricing_engine.reprice_cart(
+                                    st.session_state.cart, st.session_state.currency
                                 )
                                 
                                 # Create a pending order for shared shipping
                                 order = Order(
-                                    order_id=f"ORD-{datetime.now().strftime('%Y%m%d%H%M%S')}",
+                                    order_id=f"ORD-{st.session_state.truck_join_key}",
+                                    idempotency_key=st.session_state.truck_join_key,
                                     user_id=str(st.session_state.user['_id']),  # Convert ObjectId to string
                                     items=[OrderItem(
                                         product_id=item['product_id'],
                                         name=item['name'],
                                         quantity=item['quantity'],
                                         price=item['price'],
-                                        weight_kg=item['weight_kg']
+                                        weight_kg=item['weight_kg'],
+                                        currency=item['currency']
                                     ) for item in cart_items],
-                                    total_price=total_price,
+                                    total_price=from_cents(cart_cents),
+                                    currency=st.session_state.currency,
                                     total_weight_kg=total_weight,
                                     status="pending",
                                     contact_info={
@@ -1076,25 +1412,31 @@ elif st.session_state.page == "Share Shipping":
                                     truck_id=truck['truck_id']
                                 )
                                 
-                                # Save order to database
-                                orders_collection.insert_one(order.to_dict())
-                                
-                                st.success("Added to truck successfully! Please proceed to checkout to complete your shared shipping payment.")
-                                st.session_state.cart = []  # Clear cart
-                                st.rerun()
+                                # Reserve truck capacity and save the order together
+                                hold_ids = [item['hold_id'] for item in st.session_state.cart if item.get('hold_id')]
+                                if shared_shipping_service.join_truck(order, hold_ids):
+                                    st.success("Added to truck successfully! Please proceed to checkout to complete your shared shipping payment.")
+                                    st.session_state.cart = []  # Clear cart
+                                    del st.session_state.truck_join_key
+                                    st.rerun()
+                                else:
+                                    st.error("This truck no longer has room for your items. Please choose another truck.")
+                            except OutOfStockError as e:
+                                sold_out = [item['name'] for item in st.session_state.cart if item.get('hold_id') in e.hold_ids]
+                                st.error(f"Sold out while in your cart: {', '.join(sold_out)}. Please remove these items.")
                             except Exception as e:
                                 st.error(f"Failed to add to truck: {str(e)}")
                 else:
                     st.warning(f"Not enough space in this truck. Available space: {format_weight(truck['max_weight'] - truck['current_weight'])}")
             
             # Admin approval section
-            if st.session_state.user.get('role') == 'admin':
+            if truck['status'] == 'approved':
+                st.success(f"Approved for departure ({truck.get('approval_reason', 'manual')})")
+            elif st.session_state.user.get('role') == 'admin':
+                st.caption(f"Departs automatically at {TRUCK_FILL_THRESHOLD:.0%} full or on its departure date.")
                 if truck['current_weight'] >= truck['max_weight']:
                     if st.button(f"Approve Truck {truck['truck_id']} for Shipping"):
-                        trucks_collection.update_one(
-                            {"truck_id": truck['truck_id']},
-                            {"$set": {"status": "approved"}}
-                        )
+                        truck_service.approve_truck(truck['truck_id'])
                         st.success(f"Truck {truck['truck_id']} approved for shipping!")
                 else:
                     st.info(f"Truck needs {format_weight(truck['max_weight'] - truck['current_weight'])} more to be ready for shipping")
@@ -1107,7 +1449,7 @@ elif st.session_state.page == "Share Shipping":
         cols = st.columns(4)
         
         # Get all trucks from MongoDB
-        trucks = list(trucks_collection.find())
+        trucks = truck_service.list_trucks()
         
         for i, truck in enumerate(trucks):
             # Calculate remaining capacity and progress
@@ -1128,7 +1470,7 @@ elif st.session_state.page == "Share Shipping":
                             <h4>Truck {truck['truck_id']}</h4>
                             <p class='truck-status'><strong>Status:</strong> {truck['status'].title()}</p>
                             <p class='truck-status'><strong>From:</strong> {truck['location']}</p>
-                            <p class='truck-status'><strong>To:</strong> {truck.get('destination', 'New York, USA')}</p>
+                            <p class='truck-status'><strong>To:</strong> {truck.get('destination', TRUCK_DEFAULT_DESTINATION)}</p>
                             <div class='progress-bar'>
                                 <div class='progress-fill' style='width: {progress_percent}%'></div>
                             </div>
@@ -1140,16 +1482,17 @@ elif st.session_state.page == "Share Shipping":
                     # Add a button for click handling
                     if st.button("View Details", key=f"select_{truck['truck_id']}"):
                         st.session_state.selected_truck = truck['truck_id']
+                        st.session_state.pop('manifest_page', None)
                         st.rerun()
 
 elif st.session_state.page == "Checkout":
     st.title("Checkout")
     
     # Get all pending orders for the user
-    pending_orders = list(orders_collection.find({
-        "user_id": str(st.session_state.user['_id']),  # Convert ObjectId to string for query
-        "status": "pending"
-    }))
+    pending_orders = order_service.find_orders(
+        user_id=str(st.session_state.user['_id']),  # Convert ObjectId to string for query
+        status="pending"
+    )
     
     if not pending_orders and not st.session_state.cart:
         st.warning("You have no items to checkout. Please add items to your cart or join a shared shipping.")
@@ -1165,7 +1508,7 @@ elif st.session_state.page == "Checkout":
                 <h3>Order Details</h3>
                 <p><strong>Status:</strong> {order['status'].title()}</p>
                 <p><strong>Total Weight:</strong> {format_weight(order['total_weight_kg'])}</p>
-                <p><strong>Total Price:</strong> {format_currency(order['total_price'])}</p>
+                <p><strong>Total Price:</strong> {format_currency(order['total_price'], order.get('currency', CATALOG_CURRENCY))}</p>
                 <p><strong>Shipping Method:</strong> Shared Shipping (Truck {order.get('truck_id', 'N/A')})</p>
             </div>
             """, unsafe_allow_html=True)
@@ -1176,24 +1519,24 @@ elif st.session_state.page == "Checkout":
                 {
                     "Name": item['name'],
                     "Quantity": item['quantity'],
-                    "Price": format_currency(item['price']),
-                    "Total": format_currency(item['price'] * item['quantity'])
+                    "Price": format_currency(item['price'], item.get('currency', CATALOG_CURRENCY)),
+                    "Total": format_cents(line_total_cents(item['price'], item['quantity']), item.get('currency', CATALOG_CURRENCY))
                 }
                 for item in order['items']
             ])
             st.dataframe(items_df, hide_index=True)
             
             # Payment button for shared shipping
-            if st.button(f"Pay for Shared Shipping - {format_currency(order['total_price'])}", key=f"pay_{order['order_id']}"):
+            if st.button(f"Pay for Shared Shipping - {format_currency(order['total_price'], order.get('currency', CATALOG_CURRENCY))}", key=f"pay_{order['order_id']}"):
                 with show_loading_spinner("Processing payment..."):
                     try:
-                        # Update order status
-                        orders_collection.update_one(
-                            {"order_id": order['order_id']},
-                            {"$set": {"status": "paid"}}
-                        )
-                        st.success("Payment successful! Your items will be shipped with the shared truck.")
-                        st.rerun()
+                        # Only a pending order moves to paid, so a second click cannot charge or write twice
+                        result = checkout_service.pay(order['order_id'])
+                        if result.paid:
+                            st.success("Payment successful! Your items will be shipped with the shared truck.")
+                            st.rerun()
+                        else:
+                            st.error(f"Payment failed: {result.error}")
                     except Exception as e:
                         st.error(f"Payment failed: {str(e)}")
     
@@ -1201,9 +1544,10 @@ elif st.session_state.page == "Checkout":
     if st.session_state.cart:
         st.markdown("### Your Cart Items")
         total_weight = sum(item['weight_kg'] * item['quantity'] for item in st.session_state.cart)
-        total_price = sum(item['price'] * item['quantity'] for item in st.session_state.cart)
+        priced_cart, cart_cents = pricing_engine.reprice_cart(st.session_state.cart, st.session_state.currency)
+        total_price = from_cents(cart_cents)
         
-        for i, item in enumerate(st.session_state.cart):
+        for i, item in enumerate(priced_cart):
             with st.container():
                 col1, col2, col3 = st.columns([2, 1, 1])
                 with col1:
@@ -1216,7 +1560,7 @@ elif st.session_state.page == "Checkout":
                     </div>
                     """, unsafe_allow_html=True)
                 with col2:
-                    st.markdown(f"<p style='text-align: right;'>{format_currency(item['price'] * item['quantity'])}</p>", unsafe_allow_html=True)
+                    st.markdown(f"<p style='text-align: right;'>{format_cents(line_total_cents(item['price'], item['quantity']), item['currency'])}</p>", unsafe_allow_html=True)
                 with col3:
                     if st.button("❌ Remove", key=f"remove_{i}"):
                         with show_loading_spinner("Removing item..."):
@@ -1227,11 +1571,14 @@ elif st.session_state.page == "Checkout":
         <div class='summary-card'>
             <h4>Order Summary</h4>
             <p>Total Weight: {format_weight(total_weight)}</p>
-            <p>Total Price: {format_currency(total_price)}</p>
+            <p>Total Price: {format_currency(total_price, st.session_state.currency)}</p>
         </div>
         """, unsafe_allow_html=True)
         
         # Payment form for regular cart items
+        # One idempotency key per cart submission, kept until the order is placed
+        if 'checkout_key' not in st.session_state:
+            st.session_state.checkout_key = new_idempotency_key()
         with st.form("checkout_form"):
             st.markdown("#### Payment Information")
             payment_method = st.selectbox(
@@ -1244,18 +1591,18 @@ elif st.session_state.page == "Checkout":
                     try:
                         # Create order object
                         order = Order(
-                            order_id=f"ORD-{datetime.now().strftime('%Y%m%d%H%M%S')}",
                             user_id=str(st.session_state.user['_id']),
                             items=[OrderItem(
                                 product_id=item['product_id'],
                                 name=item['name'],
                                 quantity=item['quantity'],
                                 price=item['price'],
-                                weight_kg=item['weight_kg']
-                            ) for item in st.session_state.cart],
+                                weight_kg=item['weight_kg'],
+                                currency=item['currency']
+                            ) for item in priced_cart],
                             total_price=total_price,
+                            currency=st.session_state.currency,
                             total_weight_kg=total_weight,
-                            status="paid",
                             contact_info={
                                 "name": st.session_state.user['name'],
                                 "email": st.session_state.user['email'],
@@ -1272,12 +1619,28 @@ elif st.session_state.page == "Checkout":
                             created_at=datetime.now()
                         )
                         
-                        # Save order to database
-                        orders_collection.insert_one(order.to_dict())
-                        send_order_confirmation(order, st.session_state.user['email'])
-                        st.success("Order placed successfully! A confirmation email has been sent.")
-                        st.session_state.cart = []  # Clear cart
-                        st.rerun()
+                        # Save and pay; a repeated submission finds the same order and payment
+                        # Held stock becomes sold first; committing again on a retry is a no-op
+                        sold_out = commit_cart_holds()
+                        if sold_out:
+                            st.error(f"Sold out while in your cart: {', '.join(sold_out)}. Please remove these items.")
+                        else:
+                            try:
+                                result = checkout_service.place_order(order, st.session_state.checkout_key)
+                            except Exception:
+                                inventory_service.reopen(cart_hold_ids())
+                                raise
+                            if result.paid:
+                                if result.paid_now:
+                                    queue_order_confirmation(order, st.session_state.user['email'])
+                                st.success("Order placed successfully! A confirmation email has been sent.")
+                                st.session_state.cart = []  # Clear cart
+                                del st.session_state.checkout_key
+                                st.rerun()
+                            else:
+                                # Unpaid, so the stock goes back on hold: removing an item releases it, a retry commits it again
+                                inventory_service.reopen(cart_hold_ids())
+                                st.error(f"Failed to place order: {result.error}")
                     except Exception as e:
                         st.error(f"Failed to place order: {str(e)}")
 
@@ -1285,12 +1648,33 @@ elif st.session_state.page == "Track Orders":
     st.title("Track Your Orders")
     
     # Search section with tracking icon
-    st.markdown("### Search Order")
-    search_id = st.text_input("Enter Order ID")
+    st.markdown("### Search Orders")
+    search_id = st.text_input("Order ID, product or city", key="track_search", help="The last word may be cut short, e.g. \"tea dub\"")
+    
+    # Delivery windows are parsed once per plan; stored plans override the defaults
+    delivery_plans = DEFAULT_SHIPPING_PLANS + order_service.get_quote_engine().plans
+    # Trucks, the user's orders and the searched order are loaded at the same time
+    track_queries = {
+        "trucks": async_truck_service.list_trucks(),
+        "user_orders": async_order_service.find_orders(user_id=str(st.session_state.user['_id']), newest_first=True)
+    }
+    if search_id:
+        track_queries["order"] = async_order_service.get_order_document(search_id)
+    tracked = load_concurrently(track_queries)
+    truck_arrivals = {truck['truck_id']: truck['arrival_date'] for truck in loaded(tracked['trucks'])}
+    
+    def estimated_delivery(orders):
+        """Estimate delivery for a batch of orders, using the truck arrival for shared shipping."""
+        estimates = estimate_for_orders(orders, delivery_plans)
+        return [
+            truck_arrivals.get(order.get('truck_id')) or estimates.expected_datetime(i)
+            for i, order in enumerate(orders)
+        ]
     
     if search_id:
         try:
-            order_data = orders_collection.find_one({"order_id": search_id})
+            # Old delivered orders have been moved to the Parquet archive
+            order_data = loaded(tracked['order']) or get_order_archive().get_order(search_id)
             if order_data:
                 order = Order.from_dict(order_data)
                 with st.container():
@@ -1299,13 +1683,50 @@ elif st.session_state.page == "Track Orders":
                         <h3>Order Details</h3>
                         <p><strong>Status:</strong> {order.status.title()}</p>
                         <p><strong>Created:</strong> {format_datetime(order.created_at)}</p>
-                        <p><strong>Total:</strong> {format_currency(order.total_price)}</p>
+                        <p><strong>Total:</strong> {format_currency(order.total_price, order.currency)}</p>
+                        <p><strong>Estimated Delivery:</strong> {format_datetime(estimated_delivery([order_data])[0])}</p>
                     </div>
                     """, unsafe_allow_html=True)
             else:
-                st.warning("Order not found. Please check the Order ID.")
+                # Not an exact order ID: prefix search over the user's own orders
+                matches = order_search.search(search_id, user_id=str(st.session_state.user['_id']))
+                if matches['orders']:
+                    st.dataframe(pd.DataFrame([
+                        {
+                            "Order ID": order['order_id'],
+                            "Status": order['status'].title(),
+                            "Products": order['products'],
+                            "Total": format_currency(order['total_price'], order['currency']),
+                            "Created": format_datetime(datetime.fromisoformat(order['created_at']))
+                        }
+                        for order in matches['orders']
+                    ]), hide_index=True)
+                    if matches['has_more']:
+                        st.caption(f"Showing the first {matches['page_size']} matches; add words to narrow the search.")
+                else:
+                    st.warning("No orders match your search. Please check the Order ID.")
         except Exception as e:
             st.error(f"Error retrieving order: {str(e)}")
+    
+    # All of the user's orders with delivery estimates computed in one batch
+    st.markdown("### Your Orders")
+    try:
+        user_orders = loaded(tracked['user_orders'])
+        if user_orders:
+            deliveries = estimated_delivery(user_orders)
+            st.dataframe(pd.DataFrame([
+                {
+                    "Order ID": order['order_id'],
+                    "Status": order['status'].title(),
+                    "Created": format_datetime(order['created_at']),
+                    "Estimated Delivery": format_datetime(delivery)
+                }
+                for order, delivery in zip(user_orders, deliveries)
+            ]), hide_index=True)
+        else:
+            st.info("You have no orders yet.")
+    except Exception as e:
+        st.error(f"Error retrieving orders: {str(e)}")
 
 elif st.session_state.page == "Shipping Status":
     st.title("Shipping Status")
@@ -1313,9 +1734,7 @@ elif st.session_state.page == "Shipping Status":
     # Active Shipping Plans with cards
     st.markdown("### Active Shipping Plans")
     try:
-        active_plans = list(shipping_plans_collection.find({
-            "status": {"$in": ["pending", "processing", "in_transit"]}
-        }).sort("departure_date", 1))
+        active_plans = order_service.get_active_shipping_plans()
         
         if active_plans:
             for plan in active_plans:
@@ -1341,23 +1760,39 @@ elif st.session_state.page == "Admin Dashboard":
     st.header("Admin Dashboard")
     
     # Analytics Tabs
-    tab1, tab2, tab3, tab4, tab5, tab6 = st.tabs(["Overview", "Advanced Analytics", "Forecasting", "User Activity", "A/B Testing", "Customer Segmentation"])
+    # Advanced analytics, forecasting and segmentation run as background jobs over the local mirror
+    order_archive = get_order_archive()
+    
+    tab1, tab2, tab3, tab4, tab5, tab6, tab7, tab8 = st.tabs(["Overview", "Advanced Analytics", "Forecasting", "User Activity", "A/B Testing", "Customer Segmentation", "Performance", "Exports"])
     
     with tab1:
         # Analytics Overview
         st.subheader("Analytics Overview")
         
+        # The overview's three page queries are independent, so they run at the same time
+        overview = load_concurrently({
+            "users": async_analytics_user_service.list_users(fields=["role", "created_at", "email_verified"]),
+            "recent_orders": async_analytics_order_service.find_orders(newest_first=True, limit=10),
+            "user_list": async_user_service.list_users(newest_first=True)
+        })
+        
         # Order Analytics
-        order_analytics = get_order_analytics()
+        # The full order scan is shared by admins loading the overview at once, and rate limited
+        order_analytics = run_analytics(
+            "calculating analytics",
+            lambda: expensive("analytics.overview", lambda: get_order_analytics(merge_archived(
+                run_async(async_analytics_order_service.list_orders(ORDER_ANALYTICS_FIELDS)), order_archive
+            )))
+        )
         if order_analytics:
             col1, col2, col3, col4 = st.columns(4)
             
             with col1:
                 st.metric("Total Orders", order_analytics['total_orders'])
             with col2:
-                st.metric("Total Revenue", format_currency(order_analytics['total_revenue']))
+                st.metric("Total Revenue", format_currency(order_analytics['total_revenue'], REPORTING_CURRENCY))
             with col3:
-                st.metric("Average Order Value", format_currency(order_analytics['avg_order_value']))
+                st.metric("Average Order Value", format_currency(order_analytics['avg_order_value'], REPORTING_CURRENCY))
             with col4:
                 st.metric("Total Weight Shipped", format_weight(order_analytics['total_weight']))
             
@@ -1392,7 +1827,7 @@ elif st.session_state.page == "Admin Dashboard":
             st.plotly_chart(fig)
         
         # User Analytics
-        user_analytics = get_user_analytics()
+        user_analytics = run_analytics("calculating user analytics", lambda: get_user_analytics(loaded(overview['users'])))
         if user_analytics:
             st.subheader("User Analytics")
             col1, col2, col3 = st.columns(3)
@@ -1416,14 +1851,14 @@ elif st.session_state.page == "Admin Dashboard":
         # Recent Orders Table
         st.subheader("Recent Orders")
         try:
-            recent_orders = list(orders_collection.find().sort("created_at", -1).limit(10))
+            recent_orders = loaded(overview['recent_orders'])
             if recent_orders:
                 orders_df = pd.DataFrame([
                     {
                         "Order ID": order['order_id'],
                         "User": order['contact_info']['name'],
                         "Status": order['status'],
-                        "Total": format_currency(order['total_price']),
+                        "Total": format_currency(order['total_price'], order.get('currency', CATALOG_CURRENCY)),
                         "Created": format_datetime(order['created_at'])
                     }
                     for order in recent_orders
@@ -1434,10 +1869,46 @@ elif st.session_state.page == "Admin Dashboard":
         except Exception as e:
             st.error(f"Error retrieving orders: {str(e)}")
         
+        # Every order, live or archived, by id, customer, email, city or product prefix
+        st.subheader("Search Orders")
+        col1, col2, col3, col4 = st.columns([3, 1, 1, 1])
+        with col1:
+            admin_search = st.text_input("Search", placeholder="Order ID, customer, email, city or product", key="admin_search")
+        with col2:
+            admin_search_status = st.selectbox("Status", ["All", "pending", "paid", "processing", "shipped", "delivered"], key="admin_search_status")
+        with col3:
+            admin_search_from = st.date_input("Created from", value=None, key="admin_search_from")
+        with col4:
+            admin_search_to = st.date_input("Created until", value=None, key="admin_search_to")
+        if admin_search or admin_search_status != "All" or admin_search_from or admin_search_to:
+            admin_search_page = st.number_input("Page", min_value=1, step=1, key="admin_search_page")
+            search_results = run_analytics("searching orders", lambda: order_search.search(
+                admin_search, status=None if admin_search_status == "All" else admin_search_status,
+                start=admin_search_from, end=admin_search_to, page=int(admin_search_page)
+            ))
+            if search_results and search_results['orders']:
+                st.dataframe(pd.DataFrame([
+                    {
+                        "Order ID": order['order_id'],
+                        "Customer": order['customer'],
+                        "Email": order['email'],
+                        "City": order['city'],
+                        "Products": order['products'],
+                        "Status": order['status'],
+                        "Total": format_currency(order['total_price'], order['currency']),
+                        "Created": format_datetime(datetime.fromisoformat(order['created_at']))
+                    }
+                    for order in search_results['orders']
+                ]), hide_index=True)
+                if search_results['has_more']:
+                    st.caption(f"More matches on page {search_results['page'] + 1}.")
+            elif search_results:
+                st.info("No orders match your search.")
+        
         # User Management
         st.subheader("User Management")
         try:
-            users = list(users_collection.find().sort("created_at", -1))
+            users = loaded(overview['user_list'])
             if users:
                 users_df = pd.DataFrame([
                     {
@@ -1468,20 +1939,21 @@ elif st.session_state.page == "Admin Dashboard":
     
     with tab2:
         st.header("Advanced Analytics")
-        analytics = get_advanced_order_analytics()
+        analytics = analytics_job("analytics.rollup")
         
         if analytics:
+            analytics = {key: pd.DataFrame(records) for key, records in analytics.items()}
             # Daily Metrics
             st.subheader("Daily Order Metrics")
             fig = go.Figure()
             fig.add_trace(go.Scatter(
                 x=analytics['daily_metrics']['date'],
-                y=analytics['daily_metrics'][('total_price', 'sum')],
+                y=analytics['daily_metrics']['revenue'],
                 name="Daily Revenue"
             ))
             fig.add_trace(go.Scatter(
                 x=analytics['daily_metrics']['date'],
-                y=analytics['daily_metrics'][('total_price', 'mean')],
+                y=analytics['daily_metrics']['avg_order_value'],
                 name="Average Order Value"
             ))
             fig.update_layout(title="Daily Revenue and Average Order Value")
@@ -1492,7 +1964,7 @@ elif st.session_state.page == "Admin Dashboard":
             fig = px.bar(
                 analytics['hourly_metrics'],
                 x='hour',
-                y='order_id',
+                y='order_count',
                 title="Orders by Hour of Day"
             )
             st.plotly_chart(fig)
@@ -1502,7 +1974,7 @@ elif st.session_state.page == "Admin Dashboard":
             fig = px.bar(
                 analytics['weekday_metrics'],
                 x='day_of_week',
-                y='order_id',
+                y='order_count',
                 title="Orders by Day of Week"
             )
             st.plotly_chart(fig)
@@ -1519,101 +1991,87 @@ elif st.session_state.page == "Admin Dashboard":
     
     with tab3:
         st.header("Order Forecasting")
-        analytics = get_advanced_order_analytics()
+        # Model selection
+        model_type = st.selectbox(
+            "Select Forecasting Model",
+            list(FORECAST_MODELS)
+        )
+        forecast = analytics_job("analytics.forecast", {"model": model_type})
         
-        if analytics:
-            # Model selection
-            model_type = st.selectbox(
-                "Select Forecasting Model",
-                ["Holt-Winters", "ARIMA", "SARIMA"]
+        if forecast:
+            # Plot historical data and forecast
+            fig = go.Figure()
+            
+            # Historical data
+            fig.add_trace(go.Scatter(
+                x=pd.to_datetime(forecast['history_dates']),
+                y=forecast['history'],
+                name="Historical Orders"
+            ))
+            
+            # Forecast
+            forecast_dates = pd.to_datetime(forecast['dates'])
+            
+            fig.add_trace(go.Scatter(
+                x=forecast_dates,
+                y=forecast['forecast'],
+                name="Forecast",
+                line=dict(dash='dash')
+            ))
+            
+            # Confidence interval
+            fig.add_trace(go.Scatter(
+                x=forecast_dates,
+                y=forecast['upper_bound'],
+                name="Upper Bound",
+                line=dict(dash='dot'),
+                opacity=0.3
+            ))
+            
+            fig.add_trace(go.Scatter(
+                x=forecast_dates,
+                y=forecast['lower_bound'],
+                name="Lower Bound",
+                line=dict(dash='dot'),
+                opacity=0.3,
+                fill='tonexty'
+            ))
+            
+            fig.update_layout(
+                title="Order Forecast with 95% Confidence Interval",
+                xaxis_title="Date",
+                yaxis_title="Number of Orders"
             )
+            st.plotly_chart(fig)
             
-            if model_type == "Holt-Winters":
-                forecast = forecast_orders(analytics['orders_df'])
-            elif model_type == "ARIMA":
-                forecast = forecast_with_arima(analytics['orders_df'])
-            else:
-                forecast = forecast_with_sarima(analytics['orders_df'])
+            # Model comparison, from each model's latest background run
+            st.subheader("Model Comparison")
+            comparison_data = []
+            for model_name in FORECAST_MODELS:
+                model_job = job_queue.latest_result("analytics.forecast", {"model": model_name})
+                if model_job and model_job['result']:
+                    model_forecast = model_job['result']
+                    comparison_data.append({
+                        "Model": model_name,
+                        "Mean Forecast": np.mean(model_forecast['forecast']),
+                        "Confidence Range": f"{np.mean(model_forecast['lower_bound']):.1f} - {np.mean(model_forecast['upper_bound']):.1f}"
+                    })
             
-            if forecast:
-                # Plot historical data and forecast
-                fig = go.Figure()
-                
-                # Historical data
-                fig.add_trace(go.Scatter(
-                    x=analytics['orders_df']['date'].unique(),
-                    y=analytics['orders_df'].groupby('date').size(),
-                    name="Historical Orders"
-                ))
-                
-                # Forecast
-                forecast_dates = pd.date_range(
-                    start=forecast['last_date'] + timedelta(days=1),
-                    periods=len(forecast['forecast']),
-                    freq='D'
-                )
-                
-                fig.add_trace(go.Scatter(
-                    x=forecast_dates,
-                    y=forecast['forecast'],
-                    name="Forecast",
-                    line=dict(dash='dash')
-                ))
-                
-                # Confidence interval
-                fig.add_trace(go.Scatter(
-                    x=forecast_dates,
-                    y=forecast['upper_bound'],
-                    name="Upper Bound",
-                    line=dict(dash='dot'),
-                    opacity=0.3
-                ))
-                
-                fig.add_trace(go.Scatter(
-                    x=forecast_dates,
-                    y=forecast['lower_bound'],
-                    name="Lower Bound",
-                    line=dict(dash='dot'),
-                    opacity=0.3,
-                    fill='tonexty'
-                ))
-                
-                fig.update_layout(
-                    title="Order Forecast with 95% Confidence Interval",
-                    xaxis_title="Date",
-                    yaxis_title="Number of Orders"
-                )
-                st.plotly_chart(fig)
-                
-                # Model comparison
-                st.subheader("Model Comparison")
-                models = {
-                    "Holt-Winters": forecast_orders(analytics['orders_df']),
-                    "ARIMA": forecast_with_arima(analytics['orders_df']),
-                    "SARIMA": forecast_with_sarima(analytics['orders_df'])
-                }
-                
-                comparison_data = []
-                for model_name, model_forecast in models.items():
-                    if model_forecast:
-                        comparison_data.append({
-                            "Model": model_name,
-                            "Mean Forecast": model_forecast['forecast'].mean(),
-                            "Confidence Range": f"{model_forecast['lower_bound'].mean():.1f} - {model_forecast['upper_bound'].mean():.1f}"
-                        })
-                
-                if comparison_data:
-                    st.dataframe(pd.DataFrame(comparison_data))
+            if comparison_data:
+                st.dataframe(pd.DataFrame(comparison_data))
     
     with tab4:
         st.header("User Activity Tracking")
         
         # Select user
         users = list(users_collection.find())
-        selected_email = st.selectbox("Select User", [user['email'] for user in users])
+        selected_email = st.selectbox("Select User", [user['email'] for user in users], key="activity_user")
         selected_user = next(user for user in users if user['email'] == selected_email)
         
-        activity = track_user_activity(selected_user['_id'])
+        activity = run_analytics(
+            "tracking user activity",
+            lambda: expensive("analytics.user_activity", lambda: track_user_activity(selected_user['_id']), key=str(selected_user['_id']))
+        )
         
         if activity:
             # User metrics
@@ -1622,9 +2080,9 @@ elif st.session_state.page == "Admin Dashboard":
             with col1:
                 st.metric("Total Orders", activity['total_orders'])
             with col2:
-                st.metric("Total Spent", format_currency(activity['total_spent']))
+                st.metric("Total Spent", format_currency(activity['total_spent'], REPORTING_CURRENCY))
             with col3:
-                st.metric("Average Order Value", format_currency(activity['avg_order_value']))
+                st.metric("Average Order Value", format_currency(activity['avg_order_value'], REPORTING_CURRENCY))
             
             # Login history
             st.subheader("Login History")
@@ -1688,7 +2146,13 @@ elif st.session_state.page == "Admin Dashboard":
     with tab6:
         st.header("Customer Segmentation")
         
-        segments = segment_customers(analytics['orders_df'])
+        job = job_queue.latest_result("analytics.segments")
+        segment_records = analytics_job("analytics.segments")
+        segments = None
+        if segment_records:
+            segments = pd.DataFrame(segment_records)
+        elif job is not None:
+            st.info(f"Customer segmentation needs at least {len(SEGMENT_NAMES)} customers with orders.")
         if segments is not None:
             # Segment distribution
             st.subheader("Segment Distribution")
@@ -1716,8 +2180,8 @@ elif st.session_state.page == "Admin Dashboard":
                 segments['segment_name'].unique()
             )
             
-            segment_customers = segments[segments['segment_name'] == selected_segment]
-            st.dataframe(segment_customers)
+            selected_customers = segments[segments['segment_name'] == selected_segment]
+            st.dataframe(selected_customers)
             
             # Segment-specific recommendations
             st.subheader("Segment-Specific Recommendations")
@@ -1742,378 +2206,123 @@ elif st.session_state.page == "Admin Dashboard":
                 st.write("- Offer sign-up bonuses")
                 st.write("- Provide onboarding guidance")
 
-# Footer
-st.markdown("---")
-st.markdown("© 2024 CrowdCargo - Community-Powered Ordering & Shipping Platform")
-
-# Update the order placement to send confirmation email
-def place_order(order: Order):
-    try:
-        orders_collection.insert_one(order.to_dict())
-        send_order_confirmation(order, st.session_state.user['email'])
-        st.success("Order placed successfully! A confirmation email has been sent.")
-        st.session_state.cart = []  # Clear cart
-    except Exception as e:
-        st.error(f"Failed to place order: {str(e)}")
-
-# Update the order status change to send notification
-def update_order_status(order_id: str, new_status: str):
-    try:
-        orders_collection.update_one(
-            {"order_id": order_id},
-            {
-                "$set": {
-                    "status": new_status,
-                    "updated_at": datetime.now()
-                }
-            }
-        )
-        order = Order.from_dict(orders_collection.find_one({"order_id": order_id}))
-        send_status_update(order, order.contact_info['email'])
-        st.success("Status updated successfully!")
-        st.rerun()
-    except Exception as e:
-        st.error(f"Failed to update status: {str(e)}")
-
-# Analytics functions
-def get_order_analytics():
-    try:
-        # Get all orders
-        orders = list(orders_collection.find())
-        
-        # Convert to DataFrame for analysis
-        orders_df = pd.DataFrame([
-            {
-                'order_id': order['order_id'],
-                'status': order['status'],
-                'total_price': order['total_price'],
-                'total_weight': order['total_weight_kg'],
-                'created_at': order['created_at'],
-                'user_id': order['user_id']
-            }
-            for order in orders
-        ])
-        
-        # Calculate metrics
-        total_orders = len(orders_df)
-        total_revenue = orders_df['total_price'].sum()
-        avg_order_value = orders_df['total_price'].mean()
-        total_weight = orders_df['total_weight_kg'].sum()
-        
-        # Status distribution
-        status_counts = orders_df['status'].value_counts()
-        
-        # Time-based analysis
-        orders_df['date'] = pd.to_datetime(orders_df['created_at']).dt.date
-        daily_orders = orders_df.groupby('date').size()
-        daily_revenue = orders_df.groupby('date')['total_price'].sum()
-        
-        return {
-            'total_orders': total_orders,
-            'total_revenue': total_revenue,
-            'avg_order_value': avg_order_value,
-            'total_weight': total_weight,
-            'status_counts': status_counts,
-            'daily_orders': daily_orders,
-            'daily_revenue': daily_revenue
-        }
-    except Exception as e:
-        st.error(f"Error calculating analytics: {str(e)}")
-        return None
-
-def get_user_analytics():
-    try:
-        # Get all users
-        users = list(users_collection.find())
-        
-        # Convert to DataFrame
-        users_df = pd.DataFrame([
-            {
-                'user_id': str(user['_id']),
-                'name': user['name'],
-                'email': user['email'],
-                'role': user['role'],
-                'created_at': user['created_at'],
-                'email_verified': user.get('email_verified', False)
-            }
-            for user in users
-        ])
-        
-        # Calculate metrics
-        total_users = len(users_df)
-        verified_users = users_df['email_verified'].sum()
-        admin_users = (users_df['role'] == 'admin').sum()
-        
-        # Time-based analysis
-        users_df['date'] = pd.to_datetime(users_df['created_at']).dt.date
-        daily_signups = users_df.groupby('date').size()
-        
-        return {
-            'total_users': total_users,
-            'verified_users': verified_users,
-            'admin_users': admin_users,
-            'daily_signups': daily_signups
-        }
-    except Exception as e:
-        st.error(f"Error calculating user analytics: {str(e)}")
-        return None
-
-# Advanced Analytics functions
-def get_advanced_order_analytics():
-    try:
-        # Get all orders
-        orders = list(orders_collection.find())
-        
-        # Convert to DataFrame
-        orders_df = pd.DataFrame([
-            {
-                'order_id': order['order_id'],
-                'status': order['status'],
-                'total_price': order['total_price'],
-                'total_weight': order['total_weight_kg'],
-                'created_at': order['created_at'],
-                'user_id': order['user_id'],
-                'items': order['items']
-            }
-            for order in orders
-        ])
-        
-        # Time-based analysis
-        orders_df['date'] = pd.to_datetime(orders_df['created_at']).dt.date
-        orders_df['hour'] = pd.to_datetime(orders_df['created_at']).dt.hour
-        orders_df['day_of_week'] = pd.to_datetime(orders_df['created_at']).dt.day_name()
-        
-        # Product analysis
-        all_items = []
-        for items in orders_df['items']:
-            for item in items:
-                all_items.append({
-                    'name': item['name'],
-                    'quantity': item['quantity'],
-                    'price': item['price']
-                })
-        items_df = pd.DataFrame(all_items)
-        
-        # Calculate metrics
-        daily_metrics = orders_df.groupby('date').agg({
-            'total_price': ['sum', 'mean', 'count'],
-            'total_weight': 'sum'
-        }).reset_index()
-        
-        hourly_metrics = orders_df.groupby('hour').agg({
-            'order_id': 'count',
-            'total_price': 'sum'
-        }).reset_index()
-        
-        weekday_metrics = orders_df.groupby('day_of_week').agg({
-            'order_id': 'count',
-            'total_price': 'sum'
-        }).reset_index()
-        
-        # Product popularity
-        product_popularity = items_df.groupby('name').agg({
-            'quantity': 'sum',
-            'price': 'mean'
-        }).reset_index()
-        
-        return {
-            'daily_metrics': daily_metrics,
-            'hourly_metrics': hourly_metrics,
-            'weekday_metrics': weekday_metrics,
-            'product_popularity': product_popularity,
-            'orders_df': orders_df
-        }
-    except Exception as e:
-        st.error(f"Error calculating advanced analytics: {str(e)}")
-        return None
-
-def forecast_orders(orders_df, days_to_forecast=30):
-    try:
-        # Prepare time series data
-        daily_orders = orders_df.groupby('date')['order_id'].count()
-        daily_orders = daily_orders.asfreq('D', fill_value=0)
-        
-        # Fit Holt-Winters model
-        model = ExponentialSmoothing(
-            daily_orders,
-            seasonal_periods=7,
-            trend='add',
-            seasonal='add'
-        ).fit()
-        
-        # Generate forecast
-        forecast = model.forecast(days_to_forecast)
-        
-        # Calculate confidence intervals
-        residuals = model.resid
-        std_resid = np.std(residuals)
-        z_score = stats.norm.ppf(0.975)  # 95% confidence interval
-        
-        lower_bound = forecast - z_score * std_resid
-        upper_bound = forecast + z_score * std_resid
-        
-        return {
-            'forecast': forecast,
-            'lower_bound': lower_bound,
-            'upper_bound': upper_bound,
-            'last_date': daily_orders.index[-1]
-        }
-    except Exception as e:
-        st.error(f"Error generating forecast: {str(e)}")
-        return None
-
-def forecast_with_arima(orders_df, days_to_forecast=30):
-    try:
-        daily_orders = orders_df.groupby('date')['order_id'].count()
-        daily_orders = daily_orders.asfreq('D', fill_value=0)
-        
-        # Fit ARIMA model
-        model = ARIMA(daily_orders, order=(1, 1, 1))
-        model_fit = model.fit()
-        
-        # Generate forecast
-        forecast = model_fit.forecast(days_to_forecast)
-        
-        # Calculate confidence intervals
-        conf_int = model_fit.get_forecast(days_to_forecast).conf_int()
-        
-        return {
-            'forecast': forecast,
-            'lower_bound': conf_int.iloc[:, 0],
-            'upper_bound': conf_int.iloc[:, 1],
-            'last_date': daily_orders.index[-1]
-        }
-    except Exception as e:
-        st.error(f"Error with ARIMA forecast: {str(e)}")
-        return None
-
-def forecast_with_sarima(orders_df, days_to_forecast=30):
-    try:
-        daily_orders = orders_df.groupby('date')['order_id'].count()
-        daily_orders = daily_orders.asfreq('D', fill_value=0)
-        
-        # Fit SARIMA model
-        model = SARIMAX(daily_orders, order=(1, 1, 1), seasonal_order=(1, 1, 1, 7))
-        model_fit = model.fit()
-        
-        # Generate forecast
-        forecast = model_fit.forecast(days_to_forecast)
-        
-        # Calculate confidence intervals
-        conf_int = model_fit.get_forecast(days_to_forecast).conf_int()
-        
-        return {
-            'forecast': forecast,
-            'lower_bound': conf_int.iloc[:, 0],
-            'upper_bound': conf_int.iloc[:, 1],
-            'last_date': daily_orders.index[-1]
-        }
-    except Exception as e:
-        st.error(f"Error with SARIMA forecast: {str(e)}")
-        return None
-
-def segment_customers(orders_df):
-    try:
-        # Prepare customer features
-        customer_features = orders_df.groupby('user_id').agg({
-            'total_price': ['sum', 'mean', 'count'],
-            'total_weight': 'sum'
-        }).reset_index()
+    with tab7:
+        st.header("Performance")
+        
+        # Per query shape latency, tagged with the page/function that issued it
+        st.subheader("MongoDB Query Latency")
+        query_summary = command_metrics.summary()
+        if query_summary:
+            st.dataframe(pd.DataFrame(query_summary).round(2), hide_index=True)
+        else:
+            st.info("No queries recorded yet.")
         
-        # Rename columns
-        customer_features.columns = ['user_id', 'total_spent', 'avg_order_value', 'order_count', 'total_weight']
+        st.subheader("Slow Queries")
+        if command_metrics.slow_queries:
+            slow_df = pd.DataFrame(list(command_metrics.slow_queries))
+            slow_df['at'] = pd.to_datetime(slow_df['at'], unit='s')
+            st.dataframe(slow_df.sort_values('at', ascending=False), hide_index=True)
+        else:
+            st.info(f"No queries slower than {command_metrics.slow_query_ms:.0f} ms.")
         
-        # Scale features
-        scaler = StandardScaler()
-        features_scaled = scaler.fit_transform(customer_features[['total_spent', 'avg_order_value', 'order_count']])
+        col1, col2 = st.columns(2)
+        with col1:
+            st.subheader("Connection Pool")
+            st.json(pool_metrics.snapshot())
+        with col2:
+            st.subheader("Reference Data Cache")
+            st.json(reference_cache.stats())
         
-        # Perform clustering
-        kmeans = KMeans(n_clusters=4, random_state=42)
-        customer_features['segment'] = kmeans.fit_predict(features_scaled)
+        # Expensive admin calls refused by the rate limits, or served by a run already in progress
+        st.subheader("Rate Limits")
+        st.json(expensive_calls.stats())
         
-        # Define segment names based on characteristics
-        segment_names = {
-            0: 'High-Value Frequent Buyers',
-            1: 'Medium-Value Regular Buyers',
-            2: 'Low-Value Occasional Buyers',
-            3: 'New/Inactive Customers'
-        }
+        # Background job backlog and latency per job name
+        st.subheader("Background Jobs")
+        job_metrics = job_queue.metrics()
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            st.metric("Ready", job_metrics['ready'])
+        with col2:
+            st.metric("Oldest Ready (s)", f"{job_metrics['oldest_ready_seconds']:.0f}")
+        with col3:
+            st.metric("Dead", job_metrics['depth']['dead'])
+        if job_metrics['latency']:
+            st.dataframe(pd.DataFrame(job_metrics['latency']).round(2), hide_index=True)
+        else:
+            st.info("No jobs finished recently.")
         
-        customer_features['segment_name'] = customer_features['segment'].map(segment_names)
+        st.download_button(
+            "Download Prometheus Metrics",
+            command_metrics.render_prometheus() + job_queue.render_prometheus() + expensive_calls.render_prometheus(),
+            file_name="crowdcargo_metrics.prom",
+            mime="text/plain"
+        )
         
-        return customer_features
-    except Exception as e:
-        st.error(f"Error in customer segmentation: {str(e)}")
-        return None
+        # Rerun timings written by the opt-in profiler
+        st.subheader("Rerun Profile")
+        if not profiling_enabled():
+            st.info("Set CROWDCARGO_PROFILE=timer (or cprofile / pyinstrument) to record rerun timings.")
+        else:
+            profile_summary = summarize_profile()
+            if profile_summary:
+                st.dataframe(pd.DataFrame(profile_summary).round(2), hide_index=True)
+            else:
+                st.info("No reruns recorded yet.")
+    
+    with tab8:
+        st.subheader("Exports")
+        # Rows are streamed from the database into a temporary file in batches, never held in memory at once
+        export_kind = st.radio("Export", ["Orders", "Truck Manifest"], horizontal=True, key="export_kind")
+        export_format = st.radio("Format", sorted(EXPORT_FORMATS), horizontal=True, key="export_format")
+        truck_ids = [truck['truck_id'] for truck in truck_service.list_trucks()]
+        export_truck = st.selectbox("Truck", ["All"] + truck_ids, key="export_truck")
+        truck_filter = None if export_truck == "All" else export_truck
+        
+        if export_kind == "Orders":
+            export_status = st.selectbox("Status", ["All", "pending", "paid", "processing", "shipped", "delivered"], key="export_status")
+            col1, col2 = st.columns(2)
+            with col1:
+                export_from = st.date_input("Created from", value=None, key="export_from")
+            with col2:
+                export_to = st.date_input("Created until", value=None, key="export_to")
+        
+        if st.button("Prepare Export"):
+            previous = st.session_state.get('export_file')
+            if previous:
+                Path(previous['path']).unlink(missing_ok=True)
+            file_name = f"{export_kind.lower().replace(' ', '_')}_{datetime.now():%Y%m%d_%H%M%S}.{export_format}"
+            path = str(Path(tempfile.mkdtemp()) / file_name)
+            if export_kind == "Orders":
+                rows = iter_order_lines(
+                    analytics_order_service.repository, truck_filter,
+                    None if export_status == "All" else export_status,
+                    datetime.combine(export_from, datetime.min.time()) if export_from else None,
+                    datetime.combine(export_to + timedelta(days=1), datetime.min.time()) if export_to else None
+                )
+                schema = ORDER_LINE_SCHEMA
+            else:
+                rows = truck_service.iter_manifest(truck_filter)
+                schema = MANIFEST_SCHEMA
+            row_count = run_analytics("preparing the export", export_to_file, rows, schema, path, export_format)
+            st.session_state.export_file = {'path': path, 'name': file_name, 'format': export_format, 'rows': row_count}
+        
+        export_file = st.session_state.get('export_file')
+        if export_file and export_file['rows'] is not None and Path(export_file['path']).exists():
+            with open(export_file['path'], "rb") as f:
+                st.download_button(
+                    f"Download {export_file['name']} ({export_file['rows']} rows)",
+                    f,
+                    file_name=export_file['name'],
+                    mime=EXPORT_FORMATS[export_file['format']]
+                )
 
-def create_ab_test(test_name, variants, target_metric, duration_days):
-    try:
-        test = {
-            'test_id': f"TEST-{datetime.now().strftime('%Y%m%d%H%M%S')}",
-            'name': test_name,
-            'variants': variants,
-            'target_metric': target_metric,
-            'start_date': datetime.now(),
-            'end_date': datetime.now() + timedelta(days=duration_days),
-            'status': 'active',
-            'results': {}
-        }
-        
-        ab_tests_collection.insert_one(test)
-        return test
-    except Exception as e:
-        st.error(f"Error creating A/B test: {str(e)}")
-        return None
+page_section.stop()
 
-def assign_variant(user_id, test_id):
-    try:
-        test = ab_tests_collection.find_one({'test_id': test_id})
-        if not test:
-            return None
-        
-        # Simple random assignment
-        variant = random.choice(test['variants'])
-        
-        # Record assignment
-        ab_tests_collection.update_one(
-            {'test_id': test_id},
-            {'$push': {'assignments': {'user_id': user_id, 'variant': variant}}}
-        )
-        
-        return variant
-    except Exception as e:
-        st.error(f"Error assigning variant: {str(e)}")
-        return None
+# Write the Prometheus metrics file if configured
+command_metrics.maybe_export()
 
-def track_user_activity(user_id):
-    try:
-        # Get user's orders
-        user_orders = list(orders_collection.find({"user_id": user_id}).sort("created_at", -1))
-        
-        # Get user's login history
-        user_logins = list(users_collection.find_one({"_id": user_id}).get('login_history', []))
-        
-        # Calculate metrics
-        total_orders = len(user_orders)
-        total_spent = sum(order['total_price'] for order in user_orders)
-        avg_order_value = total_spent / total_orders if total_orders > 0 else 0
-        
-        # Time between orders
-        if len(user_orders) > 1:
-            order_dates = [order['created_at'] for order in user_orders]
-            time_between_orders = np.diff(order_dates)
-            avg_time_between_orders = np.mean(time_between_orders)
-        else:
-            avg_time_between_orders = None
-        
-        return {
-            'total_orders': total_orders,
-            'total_spent': total_spent,
-            'avg_order_value': avg_order_value,
-            'avg_time_between_orders': avg_time_between_orders,
-            'login_history': user_logins,
-            'recent_orders': user_orders[:5]
-        }
-    except Exception as e:
-        st.error(f"Error tracking user activity: {str(e)}")
-        return None 
\ No newline at end of file
+# Footer
+st.markdown("---")
+st.markdown("© 2024 CrowdCargo - Community-Powered Ordering & Shipping Platform")
+rerun_section.stop()
@@ -0,0 +1,57 @@
+import json
+import platform
+import statistics
+import subprocess
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+RESULTS_DIR = Path(__file__).parent / "results"
+
+def time_call(fn: Callable[[], Any], repeat: int = 5, warmup: int = 1) -> Dict[str, float]:
+    """Time fn over several runs and return best/median/mean wall time in seconds."""
+    for _ in range(warmup):
+        fn()
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return {
+        "best": min(timings),
+        "median": statistics.median(timings),
+        "mean": statistics.mean(timings),
+        "runs": repeat
+    }
+
+def git_commit() -> Optional[str]:
+    """Return the current commit hash, if run inside a git checkout."""
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def write_results(suite: str, results: List[Dict[str, Any]], output: Optional[str] = None) -> Path:
+    """Write benchmark results as JSON, stamped with commit and machine info."""
+    commit = git_commit()
+    path = Path(output) if output else RESULTS_DIR / f"{suite}-{commit or 'nogit'}.json"
+    path.parent.mkdir(parents=True, exist_ok=True)
+    payload = {
+        "suite": suite,
+        "commit": commit,
+        "timestamp": datetime.now().isoformat(),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "results": results
+    }
+    path.write_text(json.dumps(payload, indent=2, default=str))
+    return path
+
+def print_results(results: List[Dict[str, Any]]) -> None:
+    """Print one line per benchmark."""
+    for result in results:
+        extra = f"  {result['throughput']:,.0f}/s" if result.get('throughput') else ""
+        print(f"{result['name']:<40} best {result['best'] * 1000:10.2f} ms  median {result['median'] * 1000:10.2f} ms{extra}")
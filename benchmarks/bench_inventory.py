@@ -0,0 +1,60 @@
+"""Measure reservations per second on a single hot product, by number of stock counters.
+
+Every thread reserves one unit at a time of the same SKU, as shoppers do
+during a promotion. With one counter every reservation updates the same
+document; with more, the writes spread over several. The stock is large
+enough that no reservation is refused, so only write contention is timed.
+mongomock serializes all writes behind one lock, so the sharding gain only
+shows against a real mongod.
+Run from the repository root:
+
+    python -m benchmarks.bench_inventory --reservations 2000 --threads 8
+    python -m benchmarks.bench_inventory --mongo-uri mongodb://localhost:27017/ --threads 32 --shards 1 4 16 64
+"""
+import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks._harness import print_results, write_results
+
+HOT_SKU = "P002"
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--reservations", type=int, default=2000, help="reservations per shard setting")
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--shards", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--mongo-uri", default="mongomock://localhost")
+    parser.add_argument("--db-name", default="crowdcargo_bench")
+    parser.add_argument("--output", help="path of the JSON results file")
+    args = parser.parse_args()
+
+    from src.database import create_client
+    from src.services.inventory_service import InventoryService
+    from src.utils.cache import TTLCache
+
+    client = create_client(args.mongo_uri)
+    client.drop_database(args.db_name)
+    inventory = InventoryService(client[args.db_name], TTLCache())
+    inventory.ensure_indexes()
+
+    results = []
+    for shards in args.shards:
+        inventory.holds.delete_many({})
+        inventory.set_stock(HOT_SKU, args.reservations, shards)
+        start = time.perf_counter()
+        with ThreadPoolExecutor(args.threads) as pool:
+            holds = list(pool.map(lambda i: inventory.reserve(HOT_SKU, 1, f"shopper-{i}"), range(args.reservations)))
+        elapsed = time.perf_counter() - start
+        results.append({
+            "name": f"reserve_hot_sku_{shards}_shards", "shards": shards, "threads": args.threads,
+            "reservations": args.reservations, "refused": sum(hold is None for hold in holds),
+            "throughput": args.reservations / elapsed, "best": elapsed, "median": elapsed, "mean": elapsed, "runs": 1
+        })
+    client.drop_database(args.db_name)
+
+    print_results(results)
+    print(f"results written to {write_results('inventory', results, args.output)}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""Compare order storage and read throughput in the original and version 2 layouts.
+
+Orders are loaded in the original layout, read back through
+MongoOrderRepository (whole documents, and the truck scheduler's
+projection), migrated with OrderMigration, then read again. Document sizes
+are measured as BSON; against a real server the collection's data and
+storage sizes from collStats are reported too, which include compression.
+mongomock keeps documents as Python objects, so its read timings mostly
+show decoding cost, and each of its updates scans the collection, so the
+migration rate it reports falls as --orders grows; the bytes saved show up
+as read throughput only on a real mongod, where every document crosses the
+network.
+Run from the repository root:
+
+    python -m benchmarks.bench_order_schema --orders 3000
+    python -m benchmarks.bench_order_schema --mongo-uri mongodb://localhost:27017/ --orders 1000000
+"""
+import argparse
+import time
+
+from benchmarks._harness import print_results, time_call, write_results
+from benchmarks.synthetic import generate_orders
+
+def collection_sizes(db, name: str) -> dict:
+    """Return collStats sizes in bytes, or nothing where the server has no collStats (mongomock)."""
+    try:
+        stats = db.command("collStats", name)
+    except Exception:
+        return {}
+    return {"data_bytes": stats["size"], "storage_bytes": stats["storageSize"]}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--orders", type=int, default=3000)
+    parser.add_argument("--batch-size", type=int, default=1000, help="migration batch size")
+    parser.add_argument("--mongo-uri", default="mongomock://localhost")
+    parser.add_argument("--db-name", default="crowdcargo_bench")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", help="path of the JSON results file")
+    args = parser.parse_args()
+
+    from src.repositories.order_repository import MongoOrderRepository
+    from src.services.order_migration import OrderMigration, size_report
+    from src.services.truck_scheduler import DEMAND_FIELDS
+    from src.database import create_client
+
+    client = create_client(args.mongo_uri)
+    client.drop_database(args.db_name)
+    db = client[args.db_name]
+    batch = []
+    for order in generate_orders(args.orders):
+        batch.append(order)
+        if len(batch) == 10_000:
+            db.orders.insert_many(batch)
+            batch = []
+    if batch:
+        db.orders.insert_many(batch)
+    repository = MongoOrderRepository(db.orders)
+    sizes = size_report(db.orders, sample=min(args.orders, 10_000))
+
+    def read_all():
+        return sum(1 for _ in repository.iter_all())
+
+    def read_projected():
+        return sum(1 for _ in repository.iter_projected({"status": "pending", "truck_id": None}, DEMAND_FIELDS))
+
+    results = []
+    for layout in ("v1", "v2"):
+        if layout == "v2":
+            start = time.perf_counter()
+            stats = OrderMigration(db, batch_size=args.batch_size).run()
+            seconds = time.perf_counter() - start
+            results.append({
+                "name": "migrate_v1_to_v2", "orders": args.orders, "best": seconds, "median": seconds,
+                "mean": seconds, "runs": 1, "throughput": stats["migrated"] / seconds
+            })
+        avg_bytes = sizes[f"avg_{layout}_bytes"]
+        for name, fn in [("read_all", read_all), ("read_projected", read_projected)]:
+            timing = time_call(fn, repeat=args.repeat)
+            results.append({
+                "name": f"{name}_{layout}", "orders": args.orders, "avg_document_bytes": avg_bytes,
+                **collection_sizes(db, "orders"), **timing,
+                "throughput": fn() / timing["median"]
+            })
+    client.drop_database(args.db_name)
+
+    print_results(results)
+    print(f"average order: {sizes['avg_v1_bytes']:,.0f} bytes in v1, {sizes['avg_v2_bytes']:,.0f} bytes in v2 "
+          f"({sizes['saved_percent']:.1f}% smaller)")
+    print(f"results written to {write_results('order_schema', results, args.output)}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""Time order search over the analytics mirror's full-text index.
+
+Synthetic orders are streamed straight into a fresh mirror, then typical
+Track Orders and admin searches are timed: words over order ids,
+customers, emails, cities and products (the last one a prefix), alone and
+with status, customer and date filters, and filter-only listings, each at
+the first page and a deep page. The target is under 50 ms per search at 1M orders.
+Run from the repository root:
+
+    python -m benchmarks.bench_order_search --orders 100000
+    python -m benchmarks.bench_order_search --orders 1000000
+"""
+import argparse
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+from benchmarks._harness import print_results, time_call, write_results
+from benchmarks.synthetic import generate_orders
+
+SEARCHES = [
+    ("order_id_prefix", {"text": "ORD-42-0000012"}),
+    ("customer", {"text": "customer 12"}),
+    ("email_prefix", {"text": "user-00001"}),
+    ("city_prefix", {"text": "dub"}),
+    ("product_two_words", {"text": "tata tea"}),
+    ("short_prefix", {"text": "ma"}),
+    ("long_prefix", {"text": "custom"}),
+    ("no_match", {"text": "zzzz"}),
+    ("text_and_status", {"text": "cork", "status": "pending"}),
+    ("text_and_dates", {"text": "berlin", "start": datetime(2024, 6, 1), "end": datetime(2024, 6, 15)}),
+    ("customer_orders", {"text": "ghee", "user_id": "user-0000003"}),
+    ("status_only", {"status": "shipped"}),
+    ("customer_only", {"user_id": "user-0000042"}),
+    ("rare_status_and_dates", {"status": "processing", "start": datetime(2024, 1, 5), "end": datetime(2024, 1, 6)})
+]
+
+class SyntheticOrders:
+    """Stands in for an order repository, streaming generated orders without keeping them."""
+
+    def __init__(self, count: int):
+        self.count = count
+
+    def iter_updated_since(self, since=None):
+        return generate_orders(self.count) if since is None else iter(())
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--orders", type=int, default=100_000)
+    parser.add_argument("--page-size", type=int, default=20)
+    parser.add_argument("--deep-page", type=int, default=50, help="page number timed besides the first")
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--output", help="path of the JSON results file")
+    args = parser.parse_args()
+
+    from src.services.analytics_mirror import AnalyticsMirror
+
+    with tempfile.TemporaryDirectory() as mirror_dir:
+        mirror = AnalyticsMirror(str(Path(mirror_dir) / "analytics.sqlite3"))
+        start = time.perf_counter()
+        mirror.sync(SyntheticOrders(args.orders))
+        sync_seconds = time.perf_counter() - start
+        results = [{
+            "name": "mirror_full_sync", "orders": args.orders, "best": sync_seconds, "median": sync_seconds,
+            "mean": sync_seconds, "runs": 1, "throughput": args.orders / sync_seconds
+        }]
+        for name, search in SEARCHES:
+            for page in (1, args.deep_page):
+                def run():
+                    return mirror.search_orders(limit=args.page_size, offset=(page - 1) * args.page_size, **search)
+                timing = time_call(run, repeat=args.repeat)
+                results.append({
+                    "name": f"search_{name}_page{page}", "orders": args.orders, "matches": len(run()),
+                    **timing, "throughput": 1 / timing["median"]
+                })
+
+    print_results(results)
+    slowest = max(results[1:], key=lambda row: row["median"])
+    print(f"slowest search: {slowest['name']} at {slowest['median'] * 1000:.1f} ms median")
+    print(f"results written to {write_results('order_search', results, args.output)}")
+
+if __name__ == "__main__":
+    main()
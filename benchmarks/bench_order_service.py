@@ -0,0 +1,137 @@
+"""Time OrderService queries, Order (de)serialization and the admin analytics.
+
+Orders come from the deterministic generator in benchmarks.synthetic and are
+bulk-loaded in batches. The default mongomock stand-in needs no server; pass
+--mongo-uri to benchmark a real mongod (the database is dropped first), or
+--backend memory for the in-memory order repository.
+Run from the repository root:
+
+    python -m benchmarks.bench_order_service --orders 10000
+    python -m benchmarks.bench_order_service --orders 1000000 --backend memory
+    python -m benchmarks.bench_order_service --orders 1000000 --mongo-uri mongodb://localhost:27017
+"""
+import argparse
+import itertools
+import tempfile
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Callable, List
+
+from benchmarks._harness import print_results, time_call, write_results
+from benchmarks.synthetic import generate_order_models, generate_orders
+
+INSERT_BATCH = 10_000
+# The model-level and pandas benchmarks run on a sample so large runs stay bounded
+SAMPLE_SIZE = 100_000
+DUBLIN_HUB = (-6.2603, 53.3498)
+
+def load_orders(insert_batch: Callable[[List[dict]], None], count: int, seed: int) -> float:
+    """Bulk-insert `count` synthetic orders and return the elapsed seconds."""
+    start = time.perf_counter()
+    documents = generate_orders(count, seed)
+    while True:
+        batch = list(itertools.islice(documents, INSERT_BATCH))
+        if not batch:
+            break
+        insert_batch(batch)
+    return time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--orders", type=int, default=10_000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--backend", choices=["mongo", "memory"], default="mongo")
+    parser.add_argument("--mongo-uri", default="mongomock://localhost")
+    parser.add_argument("--db-name", default="crowdcargo_bench")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--output", help="path of the JSON results file")
+    args = parser.parse_args()
+
+    from src.config import ORDERS_COLLECTION
+    from src.database import create_client
+    from src.models.order import Order
+    from src.repositories.order_repository import InMemoryOrderRepository
+    from src.services.analytics_mirror import AnalyticsMirror
+    from src.services.analytics_service import (
+        customer_features, daily_order_counts, forecast_orders, get_advanced_order_analytics,
+        get_order_analytics, segment_customers
+    )
+    from src.services.consolidation_service import ConsolidationService
+    from src.services.order_service import OrderService
+
+    client = create_client(args.mongo_uri)
+    client.drop_database(args.db_name)
+    db = client[args.db_name]
+    if args.backend == "memory":
+        repository = InMemoryOrderRepository()
+        insert_batch = lambda batch: [repository.insert(doc) for doc in batch]
+    else:
+        repository = None
+        insert_batch = lambda batch: db[ORDERS_COLLECTION].insert_many(batch, ordered=False)
+    service = OrderService(db, repository=repository)
+    if args.backend == "mongo" and not args.mongo_uri.startswith("mongomock://"):
+        # mongomock checks unique indexes with a scan per insert, so only index a real server
+        db[ORDERS_COLLECTION].create_index("order_id", unique=True)
+        db[ORDERS_COLLECTION].create_index("user_id")
+        db[ORDERS_COLLECTION].create_index("status")
+        db[ORDERS_COLLECTION].create_index([("shipping_location", "2dsphere")])
+
+    load_seconds = load_orders(insert_batch, args.orders, args.seed)
+    results = [{
+        "name": "bulk_load", "backend": args.backend, "orders": args.orders, "throughput": args.orders / load_seconds,
+        "best": load_seconds, "median": load_seconds, "mean": load_seconds, "runs": 1
+    }]
+
+    sample_size = min(args.orders, SAMPLE_SIZE)
+    sample = list(generate_orders(sample_size, args.seed))
+    models = generate_order_models(sample_size, args.seed)
+    busiest_user = Counter(doc["user_id"] for doc in sample).most_common(1)[0][0]
+    new_orders = iter(generate_order_models(args.repeat + 1, seed=args.seed + 1))
+    orders_df = get_advanced_order_analytics(sample)["orders_df"]
+    mirror_dir = tempfile.TemporaryDirectory()
+    mirror = AnalyticsMirror(str(Path(mirror_dir.name) / "analytics.sqlite3"))
+    mirror_seconds = time_call(lambda: mirror.sync(service.repository), repeat=1, warmup=0)["best"]
+    consolidation = ConsolidationService(service.repository)
+    geo_cases = [
+        ("pending_near_hub", lambda: consolidation.pending_near(*DUBLIN_HUB, radius_km=10), None),
+        ("cluster_pending", consolidation.cluster_pending, args.orders),
+    ]
+    if args.mongo_uri.startswith("mongomock://") and args.backend == "mongo":
+        # mongomock has no $geoNear
+        geo_cases = geo_cases[1:]
+
+    for name, fn, items in geo_cases + [
+        ("create_order", lambda: service.create_order(next(new_orders)), 1),
+        ("get_user_orders", lambda: service.get_user_orders(busiest_user), None),
+        ("get_pending_orders", service.get_pending_orders, None),
+        ("get_total_pending_weight", service.get_total_pending_weight, None),
+        ("order_to_dict", lambda: [order.to_dict() for order in models], sample_size),
+        ("order_from_dict", lambda: [Order.from_dict(doc) for doc in sample], sample_size),
+        ("get_order_analytics", lambda: get_order_analytics(sample), sample_size),
+        ("get_advanced_order_analytics", lambda: get_advanced_order_analytics(sample), sample_size),
+        ("forecast_orders", lambda: forecast_orders(daily_order_counts(orders_df)), sample_size),
+        ("segment_customers", lambda: segment_customers(customer_features(orders_df)), sample_size),
+        ("mirror_incremental_sync", lambda: mirror.sync(service.repository), None),
+        ("mirror_advanced_order_analytics", mirror.get_advanced_order_analytics, args.orders),
+        ("mirror_forecast_orders", lambda: forecast_orders(mirror.daily_order_counts()), args.orders),
+        ("mirror_segment_customers", lambda: segment_customers(mirror.customer_features()), args.orders),
+    ]:
+        # create_order consumes one fresh order per run, including the warmup
+        timing = time_call(fn, repeat=args.repeat)
+        result = {"name": name, "backend": args.backend, "orders": args.orders, **timing}
+        if items:
+            result["throughput"] = items / timing["best"]
+        results.append(result)
+
+    results.insert(1, {
+        "name": "mirror_full_sync", "backend": args.backend, "orders": args.orders,
+        "throughput": args.orders / mirror_seconds, "best": mirror_seconds, "median": mirror_seconds,
+        "mean": mirror_seconds, "runs": 1
+    })
+    mirror_dir.cleanup()
+    print_results(results)
+    print(f"results written to {write_results(f'order_service-{args.backend}', results, args.output)}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,181 @@
+"""Time loading a page's data with sequential pymongo queries versus concurrent async queries.
+
+Two pages are measured. Admin Overview runs four independent queries:
+orders and users for analytics, recent orders and the user list. Track
+Orders runs three: trucks, the user's orders and one order lookup. The
+sequential path pays every round trip in turn; the async path
+(AsyncOrderService, AsyncUserService and AsyncTruckService through
+load_concurrently) overlaps them, so the gain grows with network latency.
+
+Against a real server, a local TCP proxy adds --latency-ms per round trip
+and both clients connect through it (directConnection, so point it at a
+standalone mongod or one member). With the default mongomock stand-in,
+every query sleeps --latency-ms instead, and the async path runs on worker
+threads in place of Motor; mongomock's own query work holds the GIL,
+so with many orders it hides part of the overlap.
+Run from the repository root:
+
+    python -m benchmarks.bench_page_load --latency-ms 5
+    python -m benchmarks.bench_page_load --mongo-uri mongodb://localhost:27017/ --latency-ms 2 --orders 20000
+"""
+import argparse
+import time
+from datetime import datetime, timedelta
+
+from benchmarks._harness import print_results, time_call, write_results
+from benchmarks.latency_proxy import LatencyProxy, parse_host
+from benchmarks.synthetic import generate_orders
+
+class DelayedCursor:
+    """A mongomock cursor that sleeps once, when it is first read, as a round trip would."""
+
+    def __init__(self, cursor, delay: float):
+        self._cursor = cursor
+        self._delay = delay
+
+    def __getattr__(self, name):
+        method = getattr(self._cursor, name)
+        return lambda *args, **kwargs: DelayedCursor(method(*args, **kwargs), self._delay)
+
+    def __iter__(self):
+        time.sleep(self._delay)
+        return iter(self._cursor)
+
+class DelayedCollection:
+    """A mongomock collection whose reads each sleep for one round trip."""
+
+    def __init__(self, collection, delay: float):
+        self._collection = collection
+        self._delay = delay
+
+    def find(self, *args, **kwargs) -> DelayedCursor:
+        return DelayedCursor(self._collection.find(*args, **kwargs), self._delay)
+
+    def aggregate(self, *args, **kwargs) -> DelayedCursor:
+        return DelayedCursor(self._collection.aggregate(*args, **kwargs), self._delay)
+
+    def find_one(self, *args, **kwargs):
+        time.sleep(self._delay)
+        return self._collection.find_one(*args, **kwargs)
+
+    def count_documents(self, *args, **kwargs):
+        time.sleep(self._delay)
+        return self._collection.count_documents(*args, **kwargs)
+
+class DelayedDatabase:
+    def __init__(self, db, delay: float):
+        self._db = db
+        self._delay = delay
+
+    def __getitem__(self, name: str) -> DelayedCollection:
+        return DelayedCollection(self._db[name], self._delay)
+
+def seed(db, orders: int, users: int) -> None:
+    """Fill the orders, users and trucks collections."""
+    db.orders.insert_many(generate_orders(orders, users=users))
+    now = datetime.now()
+    db.users.insert_many([
+        {"name": f"User {i}", "email": f"user{i}@bench.crowdcargo.app", "role": "admin" if i % 50 == 0 else "user",
+         "created_at": now - timedelta(hours=i), "email_verified": i % 3 != 0}
+        for i in range(users)
+    ])
+    db.trucks.insert_many([
+        {"truck_id": f"TRUCK-{i:03d}", "status": "collecting", "current_weight": 0.0, "max_weight": 1000.0,
+         "arrival_date": now + timedelta(days=i)}
+        for i in range(20)
+    ])
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--orders", type=int, default=5000)
+    parser.add_argument("--users", type=int, default=500)
+    parser.add_argument("--latency-ms", type=float, default=5.0, help="added per round trip")
+    parser.add_argument("--mongo-uri", default="mongomock://localhost")
+    parser.add_argument("--db-name", default="crowdcargo_bench")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--output", help="path of the JSON results file")
+    args = parser.parse_args()
+
+    from src.database import create_async_client, create_client
+    from src.services.analytics_service import ORDER_ANALYTICS_FIELDS
+    from src.services.order_service import AsyncOrderService, OrderService
+    from src.services.truck_service import AsyncTruckService, TruckService
+    from src.services.user_service import AsyncUserService
+    from src.utils.aio import ThreadedDatabase, load_concurrently
+    from src.utils.cache import TTLCache
+
+    client = create_client(args.mongo_uri)
+    client.drop_database(args.db_name)
+    seed(client[args.db_name], args.orders, args.users)
+    proxy = None
+    if args.mongo_uri.startswith("mongomock://"):
+        sync_db = DelayedDatabase(client[args.db_name], args.latency_ms / 1000)
+        async_db = ThreadedDatabase(sync_db)
+    else:
+        proxy = LatencyProxy(*parse_host(args.mongo_uri), args.latency_ms).start()
+        proxy_uri = f"mongodb://127.0.0.1:{proxy.port}/"
+        sync_db = create_client(proxy_uri, directConnection=True)[args.db_name]
+        async_db = create_async_client(proxy_uri, directConnection=True)[args.db_name]
+
+    # A zero TTL keeps the reference cache from answering the truck reads
+    orders, trucks = OrderService(sync_db, TTLCache(ttl_seconds=0)), TruckService(sync_db, TTLCache(ttl_seconds=0))
+    async_orders, async_trucks = AsyncOrderService(async_db), AsyncTruckService(async_db, TTLCache(ttl_seconds=0))
+    async_users = AsyncUserService(async_db)
+    user_id = client[args.db_name].orders.find_one()["user_id"]
+
+    def overview_sequential():
+        return {
+            "orders": list(orders.repository.iter_projected({}, ORDER_ANALYTICS_FIELDS)),
+            "users": list(sync_db["users"].find({}, {"role": 1, "created_at": 1, "email_verified": 1})),
+            "recent_orders": orders.find_orders(newest_first=True, limit=10),
+            "user_list": list(sync_db["users"].find({}).sort("created_at", -1))
+        }
+
+    def overview_concurrent():
+        return load_concurrently({
+            "orders": async_orders.list_orders(ORDER_ANALYTICS_FIELDS),
+            "users": async_users.list_users(fields=["role", "created_at", "email_verified"]),
+            "recent_orders": async_orders.find_orders(newest_first=True, limit=10),
+            "user_list": async_users.list_users(newest_first=True)
+        })
+
+    def track_sequential():
+        return {
+            "trucks": trucks.list_trucks(),
+            "user_orders": orders.find_orders(user_id=user_id, newest_first=True),
+            "order": orders.get_order_document("missing")
+        }
+
+    def track_concurrent():
+        return load_concurrently({
+            "trucks": async_trucks.list_trucks(),
+            "user_orders": async_orders.find_orders(user_id=user_id, newest_first=True),
+            "order": async_orders.get_order_document("missing")
+        })
+
+    results = []
+    for page, sequential, concurrent in [
+        ("admin_overview", overview_sequential, overview_concurrent),
+        ("track_orders", track_sequential, track_concurrent)
+    ]:
+        loaded = concurrent()
+        errors = [name for name, value in loaded.items() if isinstance(value, Exception)]
+        if errors:
+            raise loaded[errors[0]]
+        expected = sequential()
+        assert {name: len(value) if isinstance(value, list) else value for name, value in loaded.items()} == \
+            {name: len(value) if isinstance(value, list) else value for name, value in expected.items()}
+        for mode, fn in [("sequential", sequential), ("concurrent", concurrent)]:
+            timing = time_call(fn, repeat=args.repeat)
+            results.append({
+                "name": f"{page}_{mode}", "latency_ms": args.latency_ms, "orders": args.orders, **timing
+            })
+    if proxy is not None:
+        proxy.stop()
+    client.drop_database(args.db_name)
+
+    print_results(results)
+    print(f"results written to {write_results('page_load', results, args.output)}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+"""Quote a large batch of synthetic carts against the default shipping plans.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_quote_engine --carts 1000000
+"""
+import argparse
+
+import numpy as np
+
+from src.config import DEFAULT_SHIPPING_PLANS
+from src.services.quote_engine import ShippingQuoteEngine
+from benchmarks._harness import print_results, time_call, write_results
+
+DESTINATIONS = ["Ireland", "Germany", "United Kingdom", "United States", "Canada"]
+
+def build_plans():
+    """Default plans plus a tiered, dim-weight plan with a destination restriction."""
+    return DEFAULT_SHIPPING_PLANS + [{
+        "name": "DHL Economy Tiered",
+        "min_weight": 0,
+        "max_weight": 70,
+        "rate_per_kg": 1.50,
+        "tiers": [{"up_to_kg": 5, "rate_per_kg": 4.00}, {"up_to_kg": 20, "rate_per_kg": 2.50}],
+        "dim_divisor": 5000,
+        "destinations": ["Ireland", "Germany"],
+        "delivery_time": "6-9 days",
+        "carrier": "DHL"
+    }]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--carts", type=int, default=1_000_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--output", help="path of the JSON results file")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(42)
+    weights = rng.gamma(shape=2.0, scale=6.0, size=args.carts)
+    volumes = weights * rng.uniform(2000, 9000, size=args.carts)
+    destinations = rng.choice(DESTINATIONS, size=args.carts)
+    engine = ShippingQuoteEngine(build_plans())
+
+    results = []
+    for name, fn in [
+        ("quote_weights", lambda: engine.quote(weights)),
+        ("quote_weights_destinations", lambda: engine.quote(weights, destinations)),
+        ("quote_full_with_cheapest", lambda: engine.quote(weights, destinations, volumes).cheapest()),
+    ]:
+        timing = time_call(fn, repeat=args.repeat)
+        results.append({"name": name, "carts": args.carts, "throughput": args.carts / timing["best"], **timing})
+
+    print_results(results)
+    print(f"results written to {write_results('quote_engine', results, args.output)}")
+
+if __name__ == "__main__":
+    main()
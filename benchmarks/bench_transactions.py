@@ -0,0 +1,108 @@
+"""Time joining a truck as two independent writes versus one unit-of-work transaction.
+
+Each run joins `--joins` synthetic orders to one truck, optionally from
+several threads at once so that transactions conflict on the truck document
+and get retried. Transactions need a replica set; against mongomock or a
+standalone mongod the unit of work falls back to writing without a session
+(with a compensating release on failure), which is reported in the results.
+Run from the repository root:
+
+    python -m benchmarks.bench_transactions --joins 200
+    python -m benchmarks.bench_transactions --mongo-uri "mongodb://localhost:27017/?replicaSet=rs0" --concurrency 8
+"""
+import argparse
+import itertools
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks._harness import print_results, time_call, write_results
+from benchmarks.synthetic import generate_order_models
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--joins", type=int, default=200, help="orders joined per timed run")
+    parser.add_argument("--concurrency", type=int, default=1)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--mongo-uri", default="mongomock://localhost")
+    parser.add_argument("--db-name", default="crowdcargo_bench")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--output", help="path of the JSON results file")
+    args = parser.parse_args()
+
+    from src.database import create_client
+    from src.repositories.unit_of_work import UnitOfWork
+    from src.services.order_service import OrderService
+    from src.services.shared_shipping_service import SharedShippingService
+    from src.services.truck_service import TruckService
+    from src.utils.cache import TTLCache
+
+    client = create_client(args.mongo_uri)
+    unit_of_work = UnitOfWork(client)
+
+    def fresh_services():
+        # Each case starts from empty collections, so neither pays for the other's documents
+        client.drop_database(args.db_name)
+        db = client[args.db_name]
+        order_service = OrderService(db)
+        order_service.repository.ensure_indexes()
+        truck_service = TruckService(db, TTLCache())
+        truck_service.ensure_indexes()
+        truck_service.trucks.insert_one({
+            "truck_id": "TRUCK-BENCH", "status": "collecting", "current_weight": 0.0, "max_weight": float("inf")
+        })
+        return order_service, truck_service
+
+    # Every run, including the warmup, joins fresh orders
+    templates = generate_order_models(args.joins, args.seed)
+    serial = itertools.count()
+
+    def next_orders():
+        orders = []
+        for template in templates:
+            order = template.model_copy()
+            order.order_id = f"ORD-BENCH-{next(serial)}"
+            order.truck_id = "TRUCK-BENCH"
+            order.shipping_location = {"type": "Point", "coordinates": [0.0, 0.0]}
+            orders.append(order)
+        return orders
+
+    def two_writes(order_service, truck_service):
+        def join(order):
+            lines = [{"name": item.name, "quantity": item.quantity, "weight": item.weight_kg * item.quantity}
+                     for item in order.items]
+            truck_service.reserve_capacity(order.truck_id, lines, order.total_weight_kg, order.order_id)
+            order_service.create_order(order)
+        return join
+
+    def with_unit_of_work(order_service, truck_service):
+        return SharedShippingService(order_service, truck_service, unit_of_work).join_truck
+
+    def run(join):
+        orders = next_orders()
+        if args.concurrency == 1:
+            for order in orders:
+                join(order)
+        else:
+            with ThreadPoolExecutor(args.concurrency) as pool:
+                list(pool.map(join, orders))
+
+    results = []
+    for name, make_join in [("two_writes", two_writes), ("unit_of_work", with_unit_of_work)]:
+        join = make_join(*fresh_services())
+        unit_of_work.retries = 0
+        timing = time_call(lambda: run(join), repeat=args.repeat)
+        results.append({
+            "name": name, "joins": args.joins, "concurrency": args.concurrency,
+            "transactional": name == "unit_of_work" and unit_of_work.transactional,
+            "retries": unit_of_work.retries if name == "unit_of_work" else 0,
+            "throughput": args.joins / timing["best"], **timing
+        })
+    client.drop_database(args.db_name)
+
+    print_results(results)
+    overhead = results[1]["median"] / results[0]["median"] - 1
+    mode = "transactions" if unit_of_work.transactional else "no transactions (compensating writes)"
+    print(f"unit of work with {mode}: {overhead:+.1%} median time per run, {results[1]['retries']} retries")
+    print(f"results written to {write_results('transactions', results, args.output)}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+"""A TCP proxy that delays every chunk it forwards, to put network latency in front of a local mongod."""
+import asyncio
+import threading
+from typing import Optional, Tuple
+
+class LatencyProxy:
+    """Forwards 127.0.0.1:<port> to a server, adding `latency_ms` per round trip (half each way)."""
+
+    def __init__(self, target_host: str, target_port: int, latency_ms: float):
+        self.target = (target_host, target_port)
+        self.delay = latency_ms / 2000
+        self.port: Optional[int] = None
+        self._loop = asyncio.new_event_loop()
+        self._server = None
+
+    async def _pipe(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                chunk = await reader.read(65536)
+                if not chunk:
+                    break
+                await asyncio.sleep(self.delay)
+                writer.write(chunk)
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def _handle(self, client_reader: asyncio.StreamReader, client_writer: asyncio.StreamWriter) -> None:
+        server_reader, server_writer = await asyncio.open_connection(*self.target)
+        await asyncio.gather(
+            self._pipe(client_reader, server_writer), self._pipe(server_reader, client_writer)
+        )
+
+    def start(self) -> "LatencyProxy":
+        """Listen on a free local port in a background thread."""
+        self._server = self._loop.run_until_complete(asyncio.start_server(self._handle, "127.0.0.1", 0))
+        self.port = self._server.sockets[0].getsockname()[1]
+        threading.Thread(target=self._loop.run_forever, name="latency-proxy", daemon=True).start()
+        return self
+
+    def stop(self) -> None:
+        self._loop.call_soon_threadsafe(self._server.close)
+        self._loop.call_soon_threadsafe(self._loop.stop)
+
+def parse_host(uri: str) -> Tuple[str, int]:
+    """Return the first host and port of a mongodb:// URI."""
+    hosts = uri.split("://", 1)[1].split("/", 1)[0].split("@")[-1].split(",")[0]
+    host, _, port = hosts.partition(":")
+    return host, int(port or 27017)
@@ -0,0 +1,240 @@
+"""Simulate concurrent shoppers against app.py with Streamlit's AppTest.
+
+Each session logs in, adds products on Place Order, opens My Cart, joins a
+truck on Share Shipping, pays on Checkout and looks the order up on Track
+Orders. Queued emails are delivered to a local SMTP sink after the
+sessions, as the background worker would.
+
+AppTest is not safe to drive from several threads, so concurrency comes from
+worker processes that each run their share of the sessions back to back.
+With the default mongomock stand-in every worker has a private in-memory
+database; pass --mongo-uri to have all workers contend on a real mongod.
+Run from the repository root:
+
+    python -m benchmarks.load_test --sessions 50 --concurrency 10
+"""
+import argparse
+import multiprocessing
+import os
+import statistics
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, List
+
+from benchmarks._harness import write_results
+from benchmarks.smtp_sink import SMTPSink
+
+APP_PATH = str(Path(__file__).resolve().parent.parent / "app.py")
+PASSWORD = "LoadTest#2024"
+PRODUCTS = ["P001", "P002", "P003", "P007"]
+TRUCKS = ["TRUCK-001", "TRUCK-002", "TRUCK-003", "TRUCK-004", "TRUCK-005"]
+
+class MongomockOpCounter:
+    """Counts every mongomock collection call made by any session."""
+    METHODS = [
+        "find", "find_one", "insert_one", "insert_many", "update_one", "update_many", "replace_one",
+        "delete_one", "delete_many", "count_documents", "aggregate", "find_one_and_update"
+    ]
+
+    def __init__(self):
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def install(self) -> None:
+        from mongomock.collection import Collection
+        for name in self.METHODS:
+            original = getattr(Collection, name)
+
+            def counted(*args, __original=original, **kwargs):
+                with self._lock:
+                    self.count += 1
+                return __original(*args, **kwargs)
+            setattr(Collection, name, counted)
+
+    def total(self) -> int:
+        return self.count
+
+class CommandOpCounter:
+    """Counts MongoDB commands seen by the instrumentation listener on a real server."""
+
+    def install(self) -> None:
+        pass
+
+    def total(self) -> int:
+        from src.utils.instrumentation import command_metrics
+        return sum(row["count"] for row in command_metrics.summary())
+
+def configure_environment(mongo_uri: str, smtp_port: int) -> None:
+    """Point the app at the test database and SMTP sink; must run before src is imported."""
+    os.environ["MONGO_URI"] = mongo_uri
+    os.environ["MONGO_DB_NAME"] = os.environ.get("MONGO_DB_NAME", "crowdcargo_loadtest")
+    os.environ["SMTP_SERVER"] = "127.0.0.1"
+    os.environ["SMTP_PORT"] = str(smtp_port)
+    os.environ["SMTP_USE_TLS"] = "false"
+    os.environ.pop("SMTP_USERNAME", None)
+    os.environ.pop("SMTP_PASSWORD", None)
+
+def seed_users(indexes: List[int]) -> List[str]:
+    """Create one shopper account per session."""
+    import bcrypt
+    from src.database import get_database
+    users = get_database().users
+    hashed = bcrypt.hashpw(PASSWORD.encode("utf-8"), bcrypt.gensalt(rounds=4))
+    emails = [f"shopper{i}@loadtest.crowdcargo.app" for i in indexes]
+    users.delete_many({"email": {"$in": emails}})
+    users.insert_many([
+        {"name": f"Shopper {i}", "email": email, "password": hashed, "role": "user",
+         "created_at": datetime.now(), "email_verified": True}
+        for i, email in zip(indexes, emails)
+    ])
+    return emails
+
+def run_session(index: int, email: str, timeout: float) -> Dict:
+    """Drive one shopper through the app, timing every rerun."""
+    from streamlit.testing.v1 import AppTest
+
+    at = AppTest.from_file(APP_PATH, default_timeout=timeout)
+    timings: Dict[str, float] = {}
+    state = {}
+
+    def step(name: str, action: Callable[[], None]) -> None:
+        start = time.perf_counter()
+        action()
+        timings[name] = time.perf_counter() - start
+        if at.exception:
+            raise RuntimeError(f"{name}: {at.exception[0].message}")
+
+    def navigate(page: str) -> None:
+        # The nav buttons call st.rerun() while still rendered, which AppTest
+        # replays with the button held down forever; set the page directly instead.
+        at.session_state.page = page
+        at.run()
+
+    def login():
+        at.run()
+        at.text_input(key="login_email").input(email)
+        at.text_input(key="login_password").input(PASSWORD)
+        at.button(key="login_button").click().run()
+
+    def place_order():
+        navigate("Place Order")
+        for product_id in PRODUCTS[index % 2::2]:
+            at.number_input(key=f"qty_{product_id}").set_value(1 + index % 3).run()
+            at.button(key=f"add_{product_id}").click().run()
+
+    def share_shipping():
+        navigate("Share Shipping")
+        at.button(key=f"select_{TRUCKS[index % len(TRUCKS)]}").click().run()
+        join = next(b for b in at.button if b.label.startswith("Add Your Items to Truck"))
+        join.click().run()
+
+    def checkout():
+        navigate("Checkout")
+        pay = next(b for b in at.button if (b.key or "").startswith("pay_"))
+        state["order_id"] = pay.key[len("pay_"):]
+        pay.click().run()
+
+    def track_orders():
+        navigate("Track Orders")
+        at.text_input(key="track_search").input(state["order_id"]).run()
+
+    started = time.perf_counter()
+    try:
+        step("login", login)
+        step("place_order", place_order)
+        step("my_cart", lambda: navigate("My Cart"))
+        step("share_shipping", share_shipping)
+        step("checkout", checkout)
+        step("track_orders", track_orders)
+        error = None
+    except Exception as e:
+        error = f"{type(e).__name__}: {e}"
+    return {"session": index, "timings": timings, "elapsed": time.perf_counter() - started, "error": error}
+
+def run_worker(indexes: List[int], mongo_uri: str, smtp_port: int, timeout: float) -> Dict:
+    """Run a share of the sessions in this worker process and count its DB operations."""
+    configure_environment(mongo_uri, smtp_port)
+    counter = MongomockOpCounter() if mongo_uri.startswith("mongomock://") else CommandOpCounter()
+    counter.install()
+    emails = seed_users(indexes)
+    ops_before = counter.total()
+    sessions = [run_session(i, email, timeout) for i, email in zip(indexes, emails)]
+    db_ops = counter.total() - ops_before
+    # Emails are queued by the app; deliver them to the sink as a background worker would
+    from src.worker import build_worker
+    build_worker(1, ["email.send", "email.order_confirmation", "email.status_update"]).drain()
+    return {"sessions": sessions, "db_ops": db_ops}
+
+def percentile(values: List[float], q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * q / 100))] if ordered else 0.0
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=20)
+    parser.add_argument("--concurrency", type=int, default=5)
+    parser.add_argument("--mongo-uri", default="mongomock://localhost")
+    parser.add_argument("--timeout", type=float, default=60.0, help="per-rerun timeout in seconds")
+    parser.add_argument("--output", help="path of the JSON results file")
+    args = parser.parse_args()
+
+    sink = SMTPSink().start()
+    shares = [list(range(worker, args.sessions, args.concurrency)) for worker in range(args.concurrency)]
+    shares = [share for share in shares if share]
+
+    started = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=len(shares), mp_context=multiprocessing.get_context("spawn")) as pool:
+        workers = list(pool.map(
+            run_worker, shares, [args.mongo_uri] * len(shares), [sink.port] * len(shares), [args.timeout] * len(shares)
+        ))
+    wall = time.perf_counter() - started
+    sink.stop()
+    sessions = [session for worker in workers for session in worker["sessions"]]
+    db_ops = sum(worker["db_ops"] for worker in workers)
+
+    completed = [s for s in sessions if not s["error"]]
+    by_step = defaultdict(list)
+    for session in sessions:
+        for name, seconds in session["timings"].items():
+            by_step[name].append(seconds * 1000)
+
+    results = [
+        {
+            "name": f"step:{name}",
+            "samples": len(values),
+            "p50_ms": statistics.median(values),
+            "p95_ms": percentile(values, 95),
+            "p99_ms": percentile(values, 99),
+            "max_ms": max(values)
+        }
+        for name, values in by_step.items()
+    ]
+    summary = {
+        "name": "summary",
+        "sessions": args.sessions,
+        "concurrency": args.concurrency,
+        "completed": len(completed),
+        "errors": sorted({s["error"] for s in sessions if s["error"]}),
+        "wall_seconds": wall,
+        "sessions_per_second": len(completed) / wall if wall else 0.0,
+        "db_ops_per_session": db_ops / max(len(sessions), 1),
+        "emails_sent": sink.messages
+    }
+    results.append(summary)
+
+    print(f"{'step':<20}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+    for row in results[:-1]:
+        print(f"{row['name'][5:]:<20}{row['p50_ms']:>10.1f}{row['p95_ms']:>10.1f}{row['p99_ms']:>10.1f}{row['max_ms']:>10.1f}")
+    print(f"\n{summary['completed']}/{summary['sessions']} sessions completed in {wall:.1f}s "
+          f"({summary['sessions_per_second']:.2f} sessions/s at concurrency {args.concurrency})")
+    print(f"{summary['db_ops_per_session']:.1f} DB operations per session, {summary['emails_sent']} emails sent")
+    for error in summary["errors"]:
+        print(f"error: {error}")
+    print(f"results written to {write_results('load_test', results, args.output)}")
+
+if __name__ == "__main__":
+    main()
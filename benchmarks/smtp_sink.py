@@ -0,0 +1,62 @@
+"""Minimal SMTP server that accepts and counts every message, for load tests."""
+import socketserver
+import threading
+from typing import Optional
+
+class _SMTPHandler(socketserver.StreamRequestHandler):
+    def _reply(self, line: str) -> None:
+        self.wfile.write(f"{line}\r\n".encode())
+
+    def handle(self) -> None:
+        self._reply("220 crowdcargo-sink ESMTP")
+        in_data = False
+        while True:
+            raw = self.rfile.readline()
+            if not raw:
+                return
+            line = raw.decode(errors="replace").rstrip("\r\n")
+            if in_data:
+                if line == ".":
+                    in_data = False
+                    self.server.record_message()
+                    self._reply("250 OK: queued")
+                continue
+            verb = line[:4].upper()
+            if verb in ("HELO", "EHLO"):
+                self._reply("250 crowdcargo-sink")
+            elif verb == "DATA":
+                in_data = True
+                self._reply("354 End data with <CR><LF>.<CR><LF>")
+            elif verb == "QUIT":
+                self._reply("221 Bye")
+                return
+            else:
+                self._reply("250 OK")
+
+class SMTPSink(socketserver.ThreadingTCPServer):
+    """Threaded SMTP sink listening on localhost; port 0 picks a free port."""
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, port: int = 0):
+        super().__init__(("127.0.0.1", port), _SMTPHandler)
+        self._lock = threading.Lock()
+        self.messages = 0
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def port(self) -> int:
+        return self.server_address[1]
+
+    def record_message(self) -> None:
+        with self._lock:
+            self.messages += 1
+
+    def start(self) -> "SMTPSink":
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.shutdown()
+        self.server_close()
@@ -0,0 +1,128 @@
+"""Deterministic synthetic order generator for benchmarks.
+
+Orders follow Order.to_dict(): a Zipf-like spread of customers, 1-6 line
+items per order drawn from a catalog with skewed product popularity, mostly
+small quantities, a share of shared-shipping orders on trucks, and creation
+times over the last 180 days with a weekly and daily rhythm. The same seed always yields the same orders, so runs are
+comparable across commits. Orders are generated in chunks and can be
+streamed, which keeps 10M-order runs within memory.
+"""
+from datetime import datetime, timedelta
+from typing import Iterator, List
+
+import numpy as np
+
+from src.models.order import Order
+
+CATALOG = [
+    ("P001", "Haldiram's Bhujia", 1.0, 5.99),
+    ("P002", "Maggi Noodles", 0.5, 3.99),
+    ("P003", "Tata Tea Premium", 0.25, 4.99),
+    ("P004", "MTR Sambar Powder", 0.2, 6.99),
+    ("P005", "Amul Ghee", 1.0, 12.99),
+    ("P006", "Britannia Good Day", 0.3, 2.99),
+    ("P007", "MDH Garam Masala", 0.1, 3.99),
+    ("P008", "Lijjat Papad", 0.2, 4.99),
+    ("P009", "Parle-G Biscuits", 0.8, 1.99),
+    ("P010", "Basmati Rice 5kg", 5.0, 14.99),
+    ("P011", "Toor Dal 1kg", 1.0, 4.49),
+    ("P012", "Kurkure Masala Munch", 0.1, 1.49)
+]
+STATUSES = ["pending", "paid", "processing", "shipped", "delivered"]
+STATUS_WEIGHTS = [0.15, 0.15, 0.10, 0.15, 0.45]
+CITIES = [
+    ("Dublin", "Ireland"), ("Cork", "Ireland"), ("London", "United Kingdom"),
+    ("Berlin", "Germany"), ("New York", "United States"), ("Toronto", "Canada")
+]
+# (lon, lat) city centres for CITIES; order locations are scattered around them
+CITY_CENTROIDS = [(-6.2603, 53.3498), (-8.4756, 51.8985), (-0.1276, 51.5072),
+                  (13.4050, 52.5200), (-73.9857, 40.7484), (-79.3832, 43.6532)]
+LOCATION_JITTER_DEG = 0.08
+PAYMENT_METHODS = ["Credit Card", "Debit Card", "PayPal", "shared_shipping"]
+PAYMENT_WEIGHTS = [0.35, 0.2, 0.15, 0.3]
+TRUCK_IDS = [f"TRUCK-{i:03d}" for i in range(1, 6)]
+HISTORY_DAYS = 180
+CHUNK_SIZE = 10_000
+
+def _product_weights() -> np.ndarray:
+    ranks = np.arange(1, len(CATALOG) + 1)
+    weights = 1.0 / ranks ** 1.1
+    return weights / weights.sum()
+
+def generate_orders(count: int, seed: int = 42, users: int = 0, now: datetime = datetime(2024, 6, 30)) -> Iterator[dict]:
+    """Yield `count` order documents deterministically."""
+    rng = np.random.default_rng(seed)
+    users = users or max(count // 8, 1)
+    product_p = _product_weights()
+    hour_p = np.array([1, 1, 1, 1, 1, 2, 3, 5, 6, 6, 6, 7, 8, 7, 6, 6, 7, 8, 9, 9, 7, 5, 3, 2], dtype=float)
+    hour_p /= hour_p.sum()
+    weekend_boost = np.array([1.0, 0.9, 0.9, 1.0, 1.1, 1.4, 1.5])
+    start = now - timedelta(days=HISTORY_DAYS)
+
+    produced = 0
+    while produced < count:
+        n = min(CHUNK_SIZE, count - produced)
+        user_ids = np.minimum(rng.zipf(1.3, size=n), users) - 1
+        n_items = np.clip(rng.poisson(1.5, size=n) + 1, 1, 6)
+        statuses = rng.choice(len(STATUSES), size=n, p=STATUS_WEIGHTS)
+        cities = rng.integers(0, len(CITIES), size=n)
+        payments = rng.choice(len(PAYMENT_METHODS), size=n, p=PAYMENT_WEIGHTS)
+        trucks = rng.integers(0, len(TRUCK_IDS), size=n)
+
+        # Days weighted towards recent weeks and weekends
+        day_offsets = rng.integers(0, HISTORY_DAYS, size=n * 2)
+        day_weights = (1 + day_offsets / HISTORY_DAYS) * weekend_boost[(start.weekday() + day_offsets) % 7]
+        keep = rng.random(n * 2) < day_weights / day_weights.max()
+        day_offsets = np.resize(day_offsets[keep], n)
+        hours = rng.choice(24, size=n, p=hour_p)
+        seconds = rng.integers(0, 3600, size=n)
+
+        total_items = int(n_items.sum())
+        products = rng.choice(len(CATALOG), size=total_items, p=product_p)
+        quantities = np.minimum(rng.geometric(0.55, size=total_items), 10)
+        jitter = rng.normal(0, LOCATION_JITTER_DEG, size=(n, 2))
+
+        cursor = 0
+        for i in range(n):
+            items = []
+            for j in range(cursor, cursor + n_items[i]):
+                product_id, name, weight_kg, price = CATALOG[products[j]]
+                items.append({
+                    "product_id": product_id,
+                    "name": name,
+                    "quantity": int(quantities[j]),
+                    "weight_kg": weight_kg,
+                    "price": price,
+                    "currency": "EUR"
+                })
+            cursor += n_items[i]
+            created_at = start + timedelta(days=int(day_offsets[i]), hours=int(hours[i]), seconds=int(seconds[i]))
+            city, country = CITIES[cities[i]]
+            lon, lat = CITY_CENTROIDS[cities[i]]
+            user = f"user-{user_ids[i]:07d}"
+            payment_method = PAYMENT_METHODS[payments[i]]
+            yield {
+                "order_id": f"ORD-{seed}-{produced + i:09d}",
+                "user_id": user,
+                "items": items,
+                "total_weight_kg": round(sum(it["weight_kg"] * it["quantity"] for it in items), 3),
+                "total_price": round(sum(it["price"] * it["quantity"] for it in items), 2),
+                "currency": "EUR",
+                "status": STATUSES[statuses[i]],
+                "shipping_plan": None,
+                "payment_method": payment_method,
+                "truck_id": TRUCK_IDS[trucks[i]] if payment_method == "shared_shipping" else None,
+                "created_at": created_at,
+                "updated_at": created_at,
+                "shipping_address": {"street": f"{user_ids[i] % 200 + 1} Main St", "city": city,
+                                     "postal_code": f"{10000 + user_ids[i] % 90000}", "country": country},
+                "shipping_location": {"type": "Point", "coordinates": [round(lon + jitter[i, 0], 5),
+                                                                       round(lat + jitter[i, 1], 5)]},
+                "contact_info": {"name": f"Customer {user_ids[i]}", "email": f"{user}@example.com",
+                                 "phone": f"+353{user_ids[i]:09d}"}
+            }
+        produced += n
+
+def generate_order_models(count: int, seed: int = 42) -> List[Order]:
+    """Return `count` Order models built from the synthetic documents."""
+    return [Order.from_dict(doc) for doc in generate_orders(count, seed)]
@@ -6,12 +6,27 @@ load_dotenv()
 
 # MongoDB Configuration
 MONGO_URI = os.getenv("MONGO_URI")
-DB_NAME = "crowdcargo"
+DB_NAME = os.getenv("MONGO_DB_NAME", "crowdcargo")
+
+# Connection Pool Settings (per worker process)
+MONGO_MAX_POOL_SIZE = int(os.getenv("MONGO_MAX_POOL_SIZE", "50"))
+MONGO_MIN_POOL_SIZE = int(os.getenv("MONGO_MIN_POOL_SIZE", "0"))
+MONGO_MAX_IDLE_TIME_MS = int(os.getenv("MONGO_MAX_IDLE_TIME_MS", "300000"))
+MONGO_SERVER_SELECTION_TIMEOUT_MS = int(os.getenv("MONGO_SERVER_SELECTION_TIMEOUT_MS", "5000"))
+MONGO_WAIT_QUEUE_TIMEOUT_MS = int(os.getenv("MONGO_WAIT_QUEUE_TIMEOUT_MS", "10000"))
 
 # Collection Names
 ORDERS_COLLECTION = "orders"
 SHIPPING_PLANS_COLLECTION = "shipping_plans"
 USERS_COLLECTION = "users"
+TRUCKS_COLLECTION = "trucks"
+TRUCK_CONTRIBUTIONS_COLLECTION = "truck_contributions"
+PRODUCTS_COLLECTION = "products"
+INVENTORY_COLLECTION = "inventory"
+INVENTORY_HOLDS_COLLECTION = "inventory_holds"
+JOBS_COLLECTION = "jobs"
+MIGRATIONS_COLLECTION = "migrations"
+COUNTERS_COLLECTION = "counters"
 
 # Shipping Plans Configuration
 DEFAULT_SHIPPING_PLANS = [
@@ -56,6 +71,112 @@ DEFAULT_CURRENCY = "EUR"
 MIN_ORDER_WEIGHT = 0.1  # Minimum weight for a single item in kg
 MAX_ORDER_WEIGHT = 70   # Maximum weight for a single order in kg
 
+# Query Instrumentation Settings
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "100"))
+METRICS_FILE = os.getenv("METRICS_FILE")  # Prometheus text file, e.g. for node_exporter's textfile collector
+METRICS_EXPORT_INTERVAL_SECONDS = float(os.getenv("METRICS_EXPORT_INTERVAL_SECONDS", "15"))
+# Share of replies re-encoded to estimate reply bytes (scaled up from the sample; 0 stops counting bytes)
+METRICS_BYTES_SAMPLE_RATE = float(os.getenv("METRICS_BYTES_SAMPLE_RATE", "0.01"))
+
+# Rerun Profiling Settings (CROWDCARGO_PROFILE: timer, cprofile or pyinstrument)
+PROFILE_MODE = os.getenv("CROWDCARGO_PROFILE", "").lower()
+PROFILE_DIR = os.getenv("PROFILE_DIR", "logs")
+PROFILE_LOG_MAX_BYTES = int(os.getenv("PROFILE_LOG_MAX_BYTES", str(5 * 1024 * 1024)))
+PROFILE_LOG_BACKUPS = int(os.getenv("PROFILE_LOG_BACKUPS", "3"))
+
+# Reference Data Cache Settings
+CACHE_TTL_SECONDS = float(os.getenv("CACHE_TTL_SECONDS", "30"))
+CACHE_MAX_ENTRIES = int(os.getenv("CACHE_MAX_ENTRIES", "1024"))
+
+# Analytics Mirror Settings (local SQLite copy of orders for the admin dashboard)
+ANALYTICS_DB_PATH = os.getenv("ANALYTICS_DB_PATH", "data/analytics.sqlite3")
+ANALYTICS_SYNC_INTERVAL_SECONDS = float(os.getenv("ANALYTICS_SYNC_INTERVAL_SECONDS", "60"))
+
+# Order Archive Settings (delivered orders moved out of MongoDB into Parquet)
+ARCHIVE_DIR = os.getenv("ARCHIVE_DIR", "data/archive/orders")
+ARCHIVE_AFTER_DAYS = int(os.getenv("ARCHIVE_AFTER_DAYS", "90"))
+
+# Truck Scheduler Settings (trucks opened per origin/destination lane, departures on fill or deadline)
+TRUCK_SCHEDULER_INTERVAL_SECONDS = float(os.getenv("TRUCK_SCHEDULER_INTERVAL_SECONDS", "60"))
+TRUCK_SCHEDULER_IN_APP = os.getenv("TRUCK_SCHEDULER_IN_APP", "false").lower() == "true"
+TRUCK_DEFAULT_ORIGIN = os.getenv("TRUCK_DEFAULT_ORIGIN", "Mumbai, India")
+TRUCK_DEFAULT_DESTINATION = os.getenv("TRUCK_DEFAULT_DESTINATION", "New York, USA")
+TRUCK_CAPACITY_KG = float(os.getenv("TRUCK_CAPACITY_KG", "2000"))
+TRUCK_FILL_THRESHOLD = float(os.getenv("TRUCK_FILL_THRESHOLD", "0.95"))
+TRUCK_OPEN_THRESHOLD = float(os.getenv("TRUCK_OPEN_THRESHOLD", "0.8"))
+TRUCK_COLLECTION_DAYS = int(os.getenv("TRUCK_COLLECTION_DAYS", "7"))
+TRUCK_TRANSIT_DAYS = int(os.getenv("TRUCK_TRANSIT_DAYS", "7"))
+TRUCK_DEMAND_WINDOW_HOURS = float(os.getenv("TRUCK_DEMAND_WINDOW_HOURS", "24"))
+
+# Geocoding Settings (offline postal-code centroids in GeoNames format; empty uses the bundled sample)
+GEOCODER_POSTAL_FILE = os.getenv("GEOCODER_POSTAL_FILE", "")
+LAST_MILE_RADIUS_KM = float(os.getenv("LAST_MILE_RADIUS_KM", "25"))
+
+# Checkout Settings (idempotent order placement and payment)
+PAYMENT_MAX_RETRIES = int(os.getenv("PAYMENT_MAX_RETRIES", "3"))
+PAYMENT_RETRY_BACKOFF_SECONDS = float(os.getenv("PAYMENT_RETRY_BACKOFF_SECONDS", "0.2"))
+PAYMENT_STALE_AFTER_SECONDS = int(os.getenv("PAYMENT_STALE_AFTER_SECONDS", "300"))
+PAYMENT_RECOVERY_INTERVAL_SECONDS = float(os.getenv("PAYMENT_RECOVERY_INTERVAL_SECONDS", "60"))
+# Local fake payment gateway, for demos, tests and load tests
+FAKE_PAYMENT_FAILURE_RATE = float(os.getenv("FAKE_PAYMENT_FAILURE_RATE", "0"))
+FAKE_PAYMENT_DECLINE_RATE = float(os.getenv("FAKE_PAYMENT_DECLINE_RATE", "0"))
+FAKE_PAYMENT_LATENCY_MS = float(os.getenv("FAKE_PAYMENT_LATENCY_MS", "0"))
+
+# Transaction Settings (grouped writes need a replica set or sharded cluster)
+TRANSACTION_MAX_RETRIES = int(os.getenv("TRANSACTION_MAX_RETRIES", "3"))
+TRANSACTION_RETRY_BACKOFF_SECONDS = float(os.getenv("TRANSACTION_RETRY_BACKOFF_SECONDS", "0.05"))
+
+# Inventory Settings
+INVENTORY_HOLD_SECONDS = int(os.getenv("INVENTORY_HOLD_SECONDS", "1800"))
+INVENTORY_HOLD_RETENTION_SECONDS = int(os.getenv("INVENTORY_HOLD_RETENTION_SECONDS", "604800"))
+INVENTORY_DEFAULT_STOCK = int(os.getenv("INVENTORY_DEFAULT_STOCK", "500"))
+INVENTORY_HOT_SKUS = [sku for sku in os.getenv("INVENTORY_HOT_SKUS", "").split(",") if sku]
+INVENTORY_HOT_SKU_SHARDS = int(os.getenv("INVENTORY_HOT_SKU_SHARDS", "8"))
+
+# Job Queue Settings
+JOB_VISIBILITY_TIMEOUT_SECONDS = int(os.getenv("JOB_VISIBILITY_TIMEOUT_SECONDS", "300"))
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "5"))
+JOB_RETRY_BACKOFF_SECONDS = float(os.getenv("JOB_RETRY_BACKOFF_SECONDS", "10"))
+JOB_RETENTION_SECONDS = int(os.getenv("JOB_RETENTION_SECONDS", "604800"))
+JOB_POLL_INTERVAL_SECONDS = float(os.getenv("JOB_POLL_INTERVAL_SECONDS", "1"))
+JOB_WORKER_THREADS = int(os.getenv("JOB_WORKER_THREADS", "4"))
+JOB_WORKER_IN_APP = os.getenv("JOB_WORKER_IN_APP", "false").lower() == "true"
+JOB_METRICS_WINDOW_SECONDS = int(os.getenv("JOB_METRICS_WINDOW_SECONDS", "3600"))
+
+# Order Schema Settings (1 writes the original layout, e.g. while older app versions still run)
+ORDER_SCHEMA_VERSION = int(os.getenv("ORDER_SCHEMA_VERSION", "2"))
+ORDER_MIGRATION_BATCH_SIZE = int(os.getenv("ORDER_MIGRATION_BATCH_SIZE", "1000"))
+
+# Currency Settings (exchange rates per unit of the file's base currency; empty uses the bundled fixture)
+FX_RATES_FILE = os.getenv("FX_RATES_FILE", "")
+FX_REFRESH_SECONDS = float(os.getenv("FX_REFRESH_SECONDS", "3600"))
+CATALOG_CURRENCY = os.getenv("CATALOG_CURRENCY", "EUR")
+REPORTING_CURRENCY = os.getenv("REPORTING_CURRENCY", "EUR")
+
+# Order Search Settings (full-text index in the analytics mirror, synced in the background every SEARCH_REFRESH_SECONDS)
+SEARCH_REFRESH_SECONDS = float(os.getenv("SEARCH_REFRESH_SECONDS", "5"))
+SEARCH_PAGE_SIZE = int(os.getenv("SEARCH_PAGE_SIZE", "20"))
+
+# Rate Limit Settings (expensive admin operations, per operation; bursts refill at the per-minute rate)
+EXPENSIVE_USER_PER_MINUTE = float(os.getenv("EXPENSIVE_USER_PER_MINUTE", "6"))
+EXPENSIVE_USER_BURST = float(os.getenv("EXPENSIVE_USER_BURST", "3"))
+EXPENSIVE_GLOBAL_PER_MINUTE = float(os.getenv("EXPENSIVE_GLOBAL_PER_MINUTE", "30"))
+EXPENSIVE_GLOBAL_BURST = float(os.getenv("EXPENSIVE_GLOBAL_BURST", "10"))
+RATE_LIMIT_MAX_USERS = int(os.getenv("RATE_LIMIT_MAX_USERS", "10000"))
+EXPENSIVE_RESULT_TTL_SECONDS = float(os.getenv("EXPENSIVE_RESULT_TTL_SECONDS", "60"))
+EXPENSIVE_MAX_RESULTS = int(os.getenv("EXPENSIVE_MAX_RESULTS", "1000"))
+
+# Demo Mode (CROWDCARGO_DEMO): in-process database and order store, no MongoDB server needed
+DEMO_MODE = os.getenv("CROWDCARGO_DEMO", "false").lower() == "true"
+
+# Email Settings
+SMTP_SERVER = os.getenv("SMTP_SERVER", "smtp.gmail.com")
+SMTP_PORT = int(os.getenv("SMTP_PORT", "587"))
+SMTP_USERNAME = os.getenv("SMTP_USERNAME")
+SMTP_PASSWORD = os.getenv("SMTP_PASSWORD")
+SMTP_USE_TLS = os.getenv("SMTP_USE_TLS", "true").lower() == "true"
+EMAIL_SENDER = os.getenv("EMAIL_SENDER", SMTP_USERNAME or "noreply@crowdcargo.app")
+
 # Notification Settings
 ENABLE_NOTIFICATIONS = False
 TWILIO_ACCOUNT_SID = os.getenv("TWILIO_ACCOUNT_SID")
@@ -0,0 +1,239 @@
+import os
+import threading
+from typing import Dict, List, Optional
+
+from pymongo import MongoClient, ReadPreference, WriteConcern, monitoring
+
+from .config import (
+    DB_NAME,
+    DEMO_MODE,
+    MONGO_MAX_IDLE_TIME_MS,
+    MONGO_MAX_POOL_SIZE,
+    MONGO_MIN_POOL_SIZE,
+    MONGO_SERVER_SELECTION_TIMEOUT_MS,
+    MONGO_URI,
+    MONGO_WAIT_QUEUE_TIMEOUT_MS
+)
+from .utils.aio import ThreadedDatabase, get_loop
+from .utils.instrumentation import command_metrics
+
+# Read preference and write concern per kind of operation
+OPERATION_PROFILES = {
+    "default": {
+        "read_preference": ReadPreference.PRIMARY,
+        "write_concern": WriteConcern()
+    },
+    "analytics": {
+        "read_preference": ReadPreference.SECONDARY_PREFERRED,
+        "write_concern": WriteConcern()
+    },
+    "checkout": {
+        "read_preference": ReadPreference.PRIMARY,
+        "write_concern": WriteConcern(w="majority", wtimeout=5000)
+    }
+}
+
+class PoolMetricsListener(monitoring.ConnectionPoolListener):
+    """Counts connection pool (CMAP) events for the process-wide client."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        """Zero every counter."""
+        with self._lock:
+            self.counters = {
+                "pools_created": 0,
+                "pools_cleared": 0,
+                "connections_created": 0,
+                "connections_closed": 0,
+                "connections_open": 0,
+                "checkouts": 0,
+                "checkout_failures": 0,
+                "checked_out": 0,
+                "max_checked_out": 0
+            }
+            self.checkout_wait_ms: List[float] = []
+
+    def _inc(self, name: str, amount: int = 1) -> None:
+        with self._lock:
+            self.counters[name] += amount
+
+    def pool_created(self, event):
+        self._inc("pools_created")
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        self._inc("pools_cleared")
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_created(self, event):
+        with self._lock:
+            self.counters["connections_created"] += 1
+            self.counters["connections_open"] += 1
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        with self._lock:
+            self.counters["connections_closed"] += 1
+            self.counters["connections_open"] -= 1
+
+    def connection_check_out_started(self, event):
+        pass
+
+    def connection_check_out_failed(self, event):
+        self._inc("checkout_failures")
+
+    def connection_checked_out(self, event):
+        with self._lock:
+            self.counters["checkouts"] += 1
+            self.counters["checked_out"] += 1
+            self.counters["max_checked_out"] = max(self.counters["max_checked_out"], self.counters["checked_out"])
+            # pymongo >= 4.7 reports how long the checkout waited
+            duration = getattr(event, "duration", None)
+            if duration is not None:
+                self.checkout_wait_ms.append(duration * 1000)
+                del self.checkout_wait_ms[:-1000]
+
+    def connection_checked_in(self, event):
+        self._inc("checked_out", -1)
+
+    def snapshot(self) -> Dict[str, float]:
+        """Return a copy of the counters plus average checkout wait."""
+        with self._lock:
+            snapshot = dict(self.counters)
+            waits = self.checkout_wait_ms
+            snapshot["avg_checkout_wait_ms"] = sum(waits) / len(waits) if waits else 0.0
+            return snapshot
+
+pool_metrics = PoolMetricsListener()
+
+_client: Optional[MongoClient] = None
+_client_pid: Optional[int] = None
+_client_lock = threading.Lock()
+_async_client = None
+_event_listeners: List[object] = [pool_metrics, command_metrics]
+
+def register_event_listener(listener) -> None:
+    """Add a pymongo event listener to clients created from now on."""
+    if listener not in _event_listeners:
+        _event_listeners.append(listener)
+
+def _resolve_uri(uri: Optional[str] = None) -> str:
+    return uri or ("mongomock://localhost" if DEMO_MODE else MONGO_URI)
+
+def create_client(uri: Optional[str] = None, **overrides) -> MongoClient:
+    """Create a MongoClient with the configured pool settings and event listeners.
+
+    A ``mongomock://`` URI returns an in-process stand-in (no pool or event
+    listeners) for load tests and local demos without a running mongod.
+    """
+    uri = _resolve_uri(uri)
+    if uri and uri.startswith("mongomock://"):
+        import mongomock
+        return mongomock.MongoClient()
+    options = {
+        "maxPoolSize": MONGO_MAX_POOL_SIZE,
+        "minPoolSize": MONGO_MIN_POOL_SIZE,
+        "maxIdleTimeMS": MONGO_MAX_IDLE_TIME_MS,
+        "waitQueueTimeoutMS": MONGO_WAIT_QUEUE_TIMEOUT_MS,
+        "serverSelectionTimeoutMS": MONGO_SERVER_SELECTION_TIMEOUT_MS,
+        "event_listeners": list(_event_listeners),
+        "connect": False
+    }
+    options.update(overrides)
+    return MongoClient(uri, **options)
+
+def create_async_client(uri: Optional[str] = None, **overrides):
+    """Create a Motor client with the same pool settings and event listeners, on the background loop."""
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    options = {
+        "maxPoolSize": MONGO_MAX_POOL_SIZE,
+        "minPoolSize": MONGO_MIN_POOL_SIZE,
+        "maxIdleTimeMS": MONGO_MAX_IDLE_TIME_MS,
+        "waitQueueTimeoutMS": MONGO_WAIT_QUEUE_TIMEOUT_MS,
+        "serverSelectionTimeoutMS": MONGO_SERVER_SELECTION_TIMEOUT_MS,
+        "event_listeners": list(_event_listeners),
+        "io_loop": get_loop()
+    }
+    options.update(overrides)
+    return AsyncIOMotorClient(_resolve_uri(uri), **options)
+
+def get_client() -> MongoClient:
+    """Return this process's client, creating a fresh one after a fork.
+
+    Clients are not fork-safe, so a worker forked from a parent that already
+    connected gets its own client (and pool) on first use.
+    """
+    global _client, _client_pid
+    pid = os.getpid()
+    if _client is not None and _client_pid == pid:
+        return _client
+    with _client_lock:
+        if _client is None or _client_pid != pid:
+            _client = create_client()
+            _client_pid = pid
+            pool_metrics.reset()
+            command_metrics.reset()
+        return _client
+
+def close_client() -> None:
+    """Close this process's clients."""
+    global _client, _client_pid, _async_client
+    with _client_lock:
+        if _client is not None and _client_pid == os.getpid():
+            _client.close()
+            if _async_client is not None:
+                _async_client.close()
+        _client = None
+        _client_pid = None
+        _async_client = None
+
+def _forget_client_after_fork() -> None:
+    global _client, _client_pid, _async_client
+    _client = None
+    _client_pid = None
+    _async_client = None
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_forget_client_after_fork)
+
+def get_database(operation: str = "default", name: str = DB_NAME):
+    """Return the database with the read preference and write concern for an operation type."""
+    profile = OPERATION_PROFILES[operation]
+    return get_client().get_database(
+        name,
+        read_preference=profile["read_preference"],
+        write_concern=profile["write_concern"]
+    )
+
+def get_async_database(operation: str = "default", name: str = DB_NAME):
+    """Return an async (Motor) database with the read preference and write concern for an operation type.
+
+    With mongomock, which Motor cannot drive, the synchronous database is
+    wrapped so its queries run on worker threads instead.
+    """
+    global _async_client
+    if (_resolve_uri() or "").startswith("mongomock://"):
+        return ThreadedDatabase(get_database(operation, name))
+    with _client_lock:
+        if _async_client is None:
+            _async_client = create_async_client()
+    profile = OPERATION_PROFILES[operation]
+    return _async_client.get_database(
+        name,
+        read_preference=profile["read_preference"],
+        write_concern=profile["write_concern"]
+    )
+
+def get_collection(name: str, operation: str = "default"):
+    """Return a collection with the read preference and write concern for an operation type."""
+    return get_database(operation)[name]
@@ -2,6 +2,8 @@ from datetime import datetime
 from typing import List, Dict, Optional
 from pydantic import BaseModel, Field
 
+from ..utils.money import Money, line_total_cents
+
 class OrderItem(BaseModel):
     product_id: str
     name: str
@@ -10,6 +12,10 @@ class OrderItem(BaseModel):
     price: float
     currency: str = "EUR"
 
+    @property
+    def line_total(self) -> Money:
+        return Money(line_total_cents(self.price, self.quantity), self.currency)
+
 class Order(BaseModel):
     order_id: str = Field(default_factory=lambda: str(datetime.now().timestamp()))
     user_id: str
@@ -19,15 +25,23 @@ class Order(BaseModel):
     currency: str = "EUR"
     status: str = "pending"  # pending, processing, shipped, delivered
     shipping_plan: Optional[str] = None
+    payment_method: Optional[str] = None
+    truck_id: Optional[str] = None  # set for shared shipping orders
+    idempotency_key: Optional[str] = None  # one per checkout submission, unique across orders
     created_at: datetime = Field(default_factory=datetime.now)
     updated_at: datetime = Field(default_factory=datetime.now)
     shipping_address: Dict[str, str]
+    shipping_location: Optional[dict] = None  # GeoJSON point geocoded from shipping_address
     contact_info: Dict[str, str]
 
     def calculate_totals(self) -> None:
-        """Calculate total weight and price of the order."""
+        """Calculate total weight and price of the order; the price is summed exactly in cents."""
         self.total_weight_kg = sum(item.weight_kg * item.quantity for item in self.items)
-        self.total_price = sum(item.price * item.quantity for item in self.items)
+        self.total_price = sum((item.line_total for item in self.items), Money(0, self.currency)).amount
+
+    @property
+    def total(self) -> Money:
+        return Money.of(self.total_price, self.currency)
 
     def update_status(self, new_status: str) -> None:
         """Update the order status and timestamp."""
@@ -45,9 +59,13 @@ class Order(BaseModel):
             "currency": self.currency,
             "status": self.status,
             "shipping_plan": self.shipping_plan,
+            "payment_method": self.payment_method,
+            "truck_id": self.truck_id,
+            "idempotency_key": self.idempotency_key,
             "created_at": self.created_at,
             "updated_at": self.updated_at,
             "shipping_address": self.shipping_address,
+            "shipping_location": self.shipping_location,
             "contact_info": self.contact_info
         }
 
@@ -64,8 +82,12 @@ class Order(BaseModel):
             currency=data.get('currency', 'EUR'),
             status=data.get('status', 'pending'),
             shipping_plan=data.get('shipping_plan'),
+            payment_method=data.get('payment_method'),
+            truck_id=data.get('truck_id'),
+            idempotency_key=data.get('idempotency_key'),
             created_at=data.get('created_at', datetime.now()),
             updated_at=data.get('updated_at', datetime.now()),
             shipping_address=data.get('shipping_address', {}),
+            shipping_location=data.get('shipping_location'),
             contact_info=data.get('contact_info', {})
         ) 
\ No newline at end of file
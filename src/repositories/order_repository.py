@@ -0,0 +1,471 @@
+import asyncio
+import copy
+import threading
+from abc import ABC, abstractmethod
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional
+
+import numpy as np
+from bson import ObjectId
+from pymongo import ASCENDING, DESCENDING, GEOSPHERE
+from pymongo.errors import DuplicateKeyError
+from sklearn.metrics.pairwise import haversine_distances
+from sklearn.neighbors import BallTree
+
+from ..config import ORDER_SCHEMA_VERSION
+from ..utils.geo import EARTH_RADIUS_KM
+from . import order_schema
+
+# Writes since the ball tree was built are searched linearly until they reach this many, or a tenth of the tree
+GEO_INDEX_MIN_REBUILD = 1000
+
+def _field(document: dict, path: str):
+    """Read a possibly dotted field path, as MongoDB filters do."""
+    value = document
+    for part in path.split("."):
+        if not isinstance(value, dict):
+            return None
+        value = value.get(part)
+    return value
+
+class OrderRepository(ABC):
+    """Storage for order documents as produced by Order.to_dict()."""
+
+    @abstractmethod
+    def insert(self, document: dict, session=None) -> str:
+        """Store a new order and return its storage id, inside `session`'s transaction if given."""
+
+    @abstractmethod
+    def get(self, order_id: str) -> Optional[dict]:
+        """Return the order with this order_id, or None."""
+
+    @abstractmethod
+    def find(self, user_id: Optional[str] = None, status: Optional[str] = None,
+             newest_first: bool = False, limit: int = 0) -> List[dict]:
+        """Return orders matching every given filter, optionally newest first and limited."""
+
+    @abstractmethod
+    def iter_all(self) -> Iterator[dict]:
+        """Iterate over every order."""
+
+    @abstractmethod
+    def iter_updated_since(self, since: Optional[datetime] = None) -> Iterator[dict]:
+        """Iterate over orders updated at or after `since` (all if None), oldest update first."""
+
+    @abstractmethod
+    def iter_projected(self, filters: dict, fields: Optional[List[str]], created_from: Optional[datetime] = None,
+                       created_to: Optional[datetime] = None, batch_size: int = 1000) -> Iterator[dict]:
+        """Iterate over orders equal to `filters` and created in [created_from, created_to).
+
+        Only `fields` are returned, or whole orders if it is None.
+        """
+
+    @abstractmethod
+    def iter_updated_before(self, status: str, before: datetime) -> Iterator[dict]:
+        """Iterate over orders with this status last updated before `before`, oldest first."""
+
+    @abstractmethod
+    def find_near(self, lon: float, lat: float, radius_km: float, status: Optional[str] = None,
+                  limit: int = 0) -> List[dict]:
+        """Return orders whose shipping_location is within radius_km of a point, nearest first, with distance_km."""
+
+    @abstractmethod
+    def update(self, order_id: str, fields: dict) -> bool:
+        """Set fields on an order; return whether anything changed."""
+
+    @abstractmethod
+    def update_if(self, order_id: str, expected: dict, fields: dict) -> bool:
+        """Set fields on an order only if every `expected` field (dotted paths allowed) still matches."""
+
+    @abstractmethod
+    def delete(self, order_ids: List[str]) -> int:
+        """Delete orders by order_id; return how many were deleted."""
+
+    @abstractmethod
+    def total_weight(self, status: str) -> float:
+        """Sum total_weight_kg over the orders with this status."""
+
+    def ensure_indexes(self) -> None:
+        """Create the indexes the order queries rely on, if the backend has any."""
+
+class MongoOrderRepository(OrderRepository):
+    """Orders stored in a MongoDB collection.
+
+    New orders are written in the compact version 2 layout of order_schema
+    unless schema_version is 1; documents of either version are read back as
+    Order.to_dict() documents.
+    """
+
+    def __init__(self, collection, schema_version: int = ORDER_SCHEMA_VERSION):
+        self.collection = collection
+        self.schema_version = schema_version
+
+    def _encode(self, document: dict) -> dict:
+        return order_schema.encode(document) if self.schema_version >= 2 else document
+
+    def _encode_fields(self, fields: dict) -> dict:
+        return order_schema.encode_fields(fields) if self.schema_version >= 2 else fields
+
+    def insert(self, document: dict, session=None) -> str:
+        stored = self._encode(document)
+        inserted_id = self.collection.insert_one(stored, session=session).inserted_id
+        document.setdefault("_id", inserted_id)
+        return str(inserted_id)
+
+    def get(self, order_id: str) -> Optional[dict]:
+        return order_schema.decode(self.collection.find_one({"order_id": order_id}))
+
+    def find(self, user_id: Optional[str] = None, status: Optional[str] = None,
+             newest_first: bool = False, limit: int = 0) -> List[dict]:
+        query = {}
+        if user_id is not None:
+            query["user_id"] = user_id
+        if status is not None:
+            query["status"] = status
+        cursor = self.collection.find(query)
+        if newest_first:
+            cursor = cursor.sort("created_at", DESCENDING)
+        if limit:
+            cursor = cursor.limit(limit)
+        return [order_schema.decode(document) for document in cursor]
+
+    def iter_all(self) -> Iterator[dict]:
+        return map(order_schema.decode, self.collection.find())
+
+    def iter_updated_since(self, since: Optional[datetime] = None) -> Iterator[dict]:
+        query = {"updated_at": {"$gte": since}} if since is not None else {}
+        return map(order_schema.decode, self.collection.find(query).sort("updated_at", ASCENDING).batch_size(1000))
+
+    def iter_projected(self, filters: dict, fields: Optional[List[str]], created_from: Optional[datetime] = None,
+                       created_to: Optional[datetime] = None, batch_size: int = 1000) -> Iterator[dict]:
+        query = dict(filters)
+        created = {}
+        if created_from is not None:
+            created["$gte"] = created_from
+        if created_to is not None:
+            created["$lt"] = created_to
+        if created:
+            query["created_at"] = created
+        projection = order_schema.storage_projection(fields) if fields is not None else None
+        cursor = self.collection.find(query, projection).batch_size(batch_size)
+        return (order_schema.decode(document, fields) for document in cursor)
+
+    def iter_updated_before(self, status: str, before: datetime) -> Iterator[dict]:
+        query = {"status": status, "updated_at": {"$lt": before}}
+        return map(order_schema.decode, self.collection.find(query).sort("updated_at", ASCENDING).batch_size(1000))
+
+    def find_near(self, lon: float, lat: float, radius_km: float, status: Optional[str] = None,
+                  limit: int = 0) -> List[dict]:
+        geo_near = {
+            "near": {"type": "Point", "coordinates": [lon, lat]},
+            "distanceField": "distance_km",
+            "distanceMultiplier": 0.001,
+            "maxDistance": radius_km * 1000,
+            "spherical": True,
+            "key": "shipping_location"
+        }
+        if status is not None:
+            geo_near["query"] = {"status": status}
+        pipeline = [{"$geoNear": geo_near}]
+        if limit:
+            pipeline.append({"$limit": limit})
+        return [order_schema.decode(document) for document in self.collection.aggregate(pipeline)]
+
+    def ensure_indexes(self) -> None:
+        self.collection.create_index("user_id")
+        # status + updated_at also serves status-only queries and the archive's stale-order scan
+        self.collection.create_index([("status", ASCENDING), ("updated_at", ASCENDING)])
+        self.collection.create_index("updated_at")
+        self.collection.create_index([("shipping_location", GEOSPHERE)])
+        # One order per checkout submission; older orders without a key are not indexed
+        self.collection.create_index(
+            "idempotency_key", unique=True, partialFilterExpression={"idempotency_key": {"$type": "string"}}
+        )
+
+    def update(self, order_id: str, fields: dict) -> bool:
+        update = {"$set": self._encode_fields(fields)}
+        return self.collection.update_one({"order_id": order_id}, update).modified_count > 0
+
+    def update_if(self, order_id: str, expected: dict, fields: dict) -> bool:
+        query = {"order_id": order_id, **expected}
+        return self.collection.update_one(query, {"$set": self._encode_fields(fields)}).modified_count > 0
+
+    def delete(self, order_ids: List[str]) -> int:
+        return self.collection.delete_many({"order_id": {"$in": order_ids}}).deleted_count
+
+    def total_weight(self, status: str) -> float:
+        pipeline = [
+            {"$match": {"status": status}},
+            {"$group": {"_id": None, "total_weight": {"$sum": "$total_weight_kg"}}}
+        ]
+        result = list(self.collection.aggregate(pipeline))
+        return result[0]["total_weight"] if result else 0.0
+
+class InMemoryOrderRepository(OrderRepository):
+    """Orders kept in process memory, indexed by order_id, user_id and status.
+
+    Used by tests, benchmarks and demo mode. Documents are copied on the way in
+    and out so callers cannot mutate stored state, as with a real database.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._orders: Dict[str, dict] = {}
+        # Dicts with None values serve as insertion-ordered sets of order ids
+        self._by_user: Dict[str, Dict[str, None]] = {}
+        self._by_status: Dict[str, Dict[str, None]] = {}
+        self._by_idempotency_key: Dict[str, str] = {}
+        # Ball tree over shipping locations. Orders located since it was built are searched linearly, and tree
+        # entries deleted or moved since are skipped, until enough writes pile up to rebuild it
+        self._geo_index = None
+        self._geo_added: Dict[str, None] = {}
+        self._geo_stale: set = set()
+
+    def insert(self, document: dict, session=None) -> str:
+        # The in-memory store has no transactions, so session is ignored
+        document = copy.deepcopy(document)
+        document.setdefault("_id", ObjectId())
+        order_id = document["order_id"]
+        key = document.get("idempotency_key")
+        with self._lock:
+            if order_id in self._orders:
+                raise DuplicateKeyError(f"duplicate order_id: {order_id}")
+            if key is not None:
+                if key in self._by_idempotency_key:
+                    raise DuplicateKeyError(f"duplicate idempotency_key: {key}")
+                self._by_idempotency_key[key] = order_id
+            self._orders[order_id] = document
+            self._by_user.setdefault(document.get("user_id"), {})[order_id] = None
+            self._by_status.setdefault(document.get("status"), {})[order_id] = None
+            if document.get("shipping_location") and self._geo_index is not None:
+                self._geo_added[order_id] = None
+        return str(document["_id"])
+
+    def get(self, order_id: str) -> Optional[dict]:
+        with self._lock:
+            document = self._orders.get(order_id)
+            return copy.deepcopy(document) if document is not None else None
+
+    def find(self, user_id: Optional[str] = None, status: Optional[str] = None,
+             newest_first: bool = False, limit: int = 0) -> List[dict]:
+        with self._lock:
+            candidates = [
+                index.get(value, {}) for index, value in ((self._by_user, user_id), (self._by_status, status))
+                if value is not None
+            ]
+            if candidates:
+                # Scan the smallest index and check the other filter per document
+                ids = min(candidates, key=len)
+                documents = [self._orders[order_id] for order_id in ids]
+                documents = [
+                    d for d in documents
+                    if (user_id is None or d.get("user_id") == user_id) and (status is None or d.get("status") == status)
+                ]
+            else:
+                documents = list(self._orders.values())
+            if newest_first:
+                documents = sorted(documents, key=lambda d: d["created_at"], reverse=True)
+            if limit:
+                documents = documents[:limit]
+            return copy.deepcopy(documents)
+
+    def iter_all(self) -> Iterator[dict]:
+        with self._lock:
+            documents = list(self._orders.values())
+        return (copy.deepcopy(d) for d in documents)
+
+    def iter_updated_since(self, since: Optional[datetime] = None) -> Iterator[dict]:
+        with self._lock:
+            documents = [
+                d for d in self._orders.values()
+                if since is None or (d.get("updated_at") is not None and d["updated_at"] >= since)
+            ]
+        documents.sort(key=lambda d: d.get("updated_at") or datetime.min)
+        return (copy.deepcopy(d) for d in documents)
+
+    def iter_projected(self, filters: dict, fields: Optional[List[str]], created_from: Optional[datetime] = None,
+                       created_to: Optional[datetime] = None, batch_size: int = 1000) -> Iterator[dict]:
+        with self._lock:
+            documents = [
+                d for d in self.find(user_id=filters.get("user_id"), status=filters.get("status"))
+                if all(_field(d, k) == v for k, v in filters.items())
+                and (created_from is None or d["created_at"] >= created_from)
+                and (created_to is None or d["created_at"] < created_to)
+            ]
+        if fields is None:
+            return (copy.deepcopy(d) for d in documents)
+        return ({field: d[field] for field in fields if field in d} for d in documents)
+
+    def iter_updated_before(self, status: str, before: datetime) -> Iterator[dict]:
+        with self._lock:
+            documents = [
+                self._orders[order_id] for order_id in self._by_status.get(status, {})
+                if self._orders[order_id].get("updated_at") is not None and self._orders[order_id]["updated_at"] < before
+            ]
+        documents.sort(key=lambda d: d["updated_at"])
+        return (copy.deepcopy(d) for d in documents)
+
+    def update(self, order_id: str, fields: dict) -> bool:
+        with self._lock:
+            document = self._orders.get(order_id)
+            if document is None or all(document.get(k) == v for k, v in fields.items()):
+                return False
+            for field, index in (("user_id", self._by_user), ("status", self._by_status)):
+                if field in fields and fields[field] != document.get(field):
+                    index[document.get(field)].pop(order_id, None)
+                    index.setdefault(fields[field], {})[order_id] = None
+            if "shipping_location" in fields and self._geo_index is not None:
+                self._geo_stale.add(order_id)
+                if fields["shipping_location"]:
+                    self._geo_added[order_id] = None
+                else:
+                    self._geo_added.pop(order_id, None)
+            document.update(copy.deepcopy(fields))
+            return True
+
+    def update_if(self, order_id: str, expected: dict, fields: dict) -> bool:
+        with self._lock:
+            document = self._orders.get(order_id)
+            if document is None or any(_field(document, k) != v for k, v in expected.items()):
+                return False
+            return self.update(order_id, fields)
+
+    def delete(self, order_ids: List[str]) -> int:
+        deleted = 0
+        with self._lock:
+            for order_id in order_ids:
+                document = self._orders.pop(order_id, None)
+                if document is None:
+                    continue
+                self._by_idempotency_key.pop(document.get("idempotency_key"), None)
+                self._by_user[document.get("user_id")].pop(order_id, None)
+                self._by_status[document.get("status")].pop(order_id, None)
+                if self._geo_index is not None:
+                    self._geo_stale.add(order_id)
+                    self._geo_added.pop(order_id, None)
+                deleted += 1
+        return deleted
+
+    def total_weight(self, status: str) -> float:
+        with self._lock:
+            return sum(self._orders[order_id]["total_weight_kg"] for order_id in self._by_status.get(status, {}))
+
+    def _build_geo_index(self):
+        order_ids = [order_id for order_id, d in self._orders.items() if d.get("shipping_location")]
+        if not order_ids:
+            return None, order_ids
+        lon_lat = np.array([self._orders[order_id]["shipping_location"]["coordinates"] for order_id in order_ids])
+        # The haversine metric takes (lat, lon) in radians
+        return BallTree(np.radians(lon_lat[:, ::-1]), metric="haversine"), order_ids
+
+    def find_near(self, lon: float, lat: float, radius_km: float, status: Optional[str] = None,
+                  limit: int = 0) -> List[dict]:
+        with self._lock:
+            if self._geo_index is None or len(self._geo_added) + len(self._geo_stale) > max(
+                GEO_INDEX_MIN_REBUILD, len(self._geo_index[1]) // 10
+            ):
+                self._geo_index = self._build_geo_index()
+                self._geo_added.clear()
+                self._geo_stale.clear()
+            tree, order_ids = self._geo_index
+            center = np.radians([[lat, lon]])
+            radius = radius_km / EARTH_RADIUS_KM
+            matches = []
+            if tree is not None:
+                indices, distances = tree.query_radius(center, r=radius, return_distance=True)
+                matches = [
+                    (distance, order_ids[index]) for index, distance in zip(indices[0], distances[0])
+                    if order_ids[index] not in self._geo_stale
+                ]
+            if self._geo_added:
+                added = list(self._geo_added)
+                lon_lat = np.array([self._orders[order_id]["shipping_location"]["coordinates"] for order_id in added])
+                distances = haversine_distances(center, np.radians(lon_lat[:, ::-1]))[0]
+                matches += [(distance, order_id) for distance, order_id in zip(distances, added) if distance <= radius]
+            matches.sort(key=lambda match: match[0])
+            documents = []
+            for distance, order_id in matches:
+                document = self._orders[order_id]
+                if status is not None and document.get("status") != status:
+                    continue
+                documents.append(dict(copy.deepcopy(document), distance_km=float(distance * EARTH_RADIUS_KM)))
+                if limit and len(documents) >= limit:
+                    break
+            return documents
+
+    def __len__(self) -> int:
+        return len(self._orders)
+
+class AsyncOrderRepository(ABC):
+    """The read side of OrderRepository as coroutines, for pages that load several queries at once."""
+
+    @abstractmethod
+    async def get(self, order_id: str) -> Optional[dict]:
+        """Return the order with this order_id, or None."""
+
+    @abstractmethod
+    async def find(self, user_id: Optional[str] = None, status: Optional[str] = None,
+                   newest_first: bool = False, limit: int = 0) -> List[dict]:
+        """Return orders matching every given filter, optionally newest first and limited."""
+
+    @abstractmethod
+    async def list_projected(self, filters: dict, fields: List[str]) -> List[dict]:
+        """Return every order equal to `filters`, with only `fields`."""
+
+    @abstractmethod
+    async def total_weight(self, status: str) -> float:
+        """Sum total_weight_kg over the orders with this status."""
+
+class AsyncMongoOrderRepository(AsyncOrderRepository):
+    """Orders in a Motor collection (or a ThreadedCollection over mongomock)."""
+
+    def __init__(self, collection):
+        self.collection = collection
+
+    async def get(self, order_id: str) -> Optional[dict]:
+        return order_schema.decode(await self.collection.find_one({"order_id": order_id}))
+
+    async def find(self, user_id: Optional[str] = None, status: Optional[str] = None,
+                   newest_first: bool = False, limit: int = 0) -> List[dict]:
+        query = {}
+        if user_id is not None:
+            query["user_id"] = user_id
+        if status is not None:
+            query["status"] = status
+        cursor = self.collection.find(query)
+        if newest_first:
+            cursor = cursor.sort("created_at", DESCENDING)
+        if limit:
+            cursor = cursor.limit(limit)
+        return [order_schema.decode(document) for document in await cursor.to_list(None)]
+
+    async def list_projected(self, filters: dict, fields: List[str]) -> List[dict]:
+        cursor = self.collection.find(dict(filters), order_schema.storage_projection(fields))
+        return [order_schema.decode(document, fields) for document in await cursor.to_list(None)]
+
+    async def total_weight(self, status: str) -> float:
+        pipeline = [
+            {"$match": {"status": status}},
+            {"$group": {"_id": None, "total_weight": {"$sum": "$total_weight_kg"}}}
+        ]
+        result = await self.collection.aggregate(pipeline).to_list(None)
+        return result[0]["total_weight"] if result else 0.0
+
+class ThreadedOrderRepository(AsyncOrderRepository):
+    """Any OrderRepository run on worker threads, e.g. the in-memory store in demo mode."""
+
+    def __init__(self, repository: OrderRepository):
+        self.repository = repository
+
+    async def get(self, order_id: str) -> Optional[dict]:
+        return await asyncio.to_thread(self.repository.get, order_id)
+
+    async def find(self, user_id: Optional[str] = None, status: Optional[str] = None,
+                   newest_first: bool = False, limit: int = 0) -> List[dict]:
+        return await asyncio.to_thread(self.repository.find, user_id, status, newest_first, limit)
+
+    async def list_projected(self, filters: dict, fields: List[str]) -> List[dict]:
+        return await asyncio.to_thread(lambda: list(self.repository.iter_projected(filters, fields)))
+
+    async def total_weight(self, status: str) -> float:
+        return await asyncio.to_thread(self.repository.total_weight, status)
@@ -0,0 +1,117 @@
+from decimal import Decimal
+from functools import lru_cache
+from typing import Dict, List, Optional
+
+from bson.decimal128 import Decimal128
+
+from ..utils.money import to_cents
+
+# Version 2 keeps the names of every field that is queried, indexed or updated
+# (order_id, user_id, status, truck_id, created_at, payment, ...), so old and
+# new documents answer the same queries while a migration is under way. Only
+# the bulky nested parts get short keys, money becomes Decimal128 and empty
+# optional fields are left out.
+SCHEMA_VERSION = 2
+
+# Logical field -> version 2 field, for the fields stored under a new name
+RENAMED_FIELDS = {"items": "li", "shipping_address": "ad", "contact_info": "ct"}
+ITEM_KEYS = {"product_id": "p", "name": "n", "quantity": "q", "weight_kg": "w", "price": "pr", "currency": "c"}
+ADDRESS_KEYS = {"street": "st", "city": "ci", "state": "sa", "postal_code": "pc", "country": "co"}
+CONTACT_KEYS = {"name": "n", "email": "e", "phone": "ph"}
+# Optional Order fields that version 2 omits when None and restores on read
+OPTIONAL_FIELDS = ["shipping_plan", "payment_method", "truck_id", "idempotency_key", "shipping_location"]
+
+def to_decimal128(value) -> Decimal128:
+    """Store an amount as Decimal128, rounded to cents."""
+    return Decimal128(Decimal(to_cents(value)).scaleb(-2))
+
+@lru_cache(maxsize=65536)
+def _decimal_bits_to_float(bid: bytes) -> float:
+    # Decimal128 -> Decimal -> float is slow and prices repeat across orders, so conversions are memoized
+    return float(Decimal128.from_bid(bid).to_decimal())
+
+def from_decimal128(value) -> float:
+    """Read an amount stored as Decimal128 or as a plain number."""
+    return _decimal_bits_to_float(value.bid) if isinstance(value, Decimal128) else value
+
+def _shorten(values: dict, keys: Dict[str, str]) -> dict:
+    return {keys.get(key, key): value for key, value in values.items() if value not in (None, "")}
+
+def _lengthen(values: dict, keys: Dict[str, str]) -> dict:
+    long_keys = {short: key for key, short in keys.items()}
+    return {long_keys.get(key, key): value for key, value in values.items()}
+
+def _encode_item(item: dict, currency: Optional[str]) -> dict:
+    item = dict(item)
+    if "currency" in item and item["currency"] == currency:
+        # Lines almost always share the order's currency, so it is only stored when it differs
+        del item["currency"]
+    if item.get("price") is not None:
+        item["price"] = to_decimal128(item["price"])
+    return _shorten(item, ITEM_KEYS)
+
+def _decode_item(item: dict, currency: Optional[str]) -> dict:
+    item = _lengthen(item, ITEM_KEYS)
+    if "price" in item:
+        item["price"] = from_decimal128(item["price"])
+    if currency is not None:
+        item.setdefault("currency", currency)
+    return item
+
+def encode_fields(fields: dict, currency: Optional[str] = None) -> dict:
+    """Convert logical order fields to their version 2 names and types, for inserts and $set updates."""
+    encoded = {}
+    for field, value in fields.items():
+        if field == "items":
+            value = [_encode_item(item, currency) for item in value]
+        elif field == "shipping_address":
+            value = _shorten(value, ADDRESS_KEYS)
+        elif field == "contact_info":
+            value = _shorten(value, CONTACT_KEYS)
+        elif field == "total_price" and value is not None:
+            value = to_decimal128(value)
+        encoded[RENAMED_FIELDS.get(field, field)] = value
+    return encoded
+
+def encode(document: dict) -> dict:
+    """Convert an order document as produced by Order.to_dict() to version 2."""
+    encoded = encode_fields(
+        {field: value for field, value in document.items() if not (field in OPTIONAL_FIELDS and value is None)},
+        document.get("currency")
+    )
+    encoded["v"] = SCHEMA_VERSION
+    return encoded
+
+def decode(document: Optional[dict], fields: Optional[List[str]] = None) -> Optional[dict]:
+    """Convert a stored order document of any version to the Order.to_dict() shape.
+
+    Works field by field, so projections and documents written before the
+    migration decode too. `fields` names the projected fields, if any.
+    """
+    if document is None or "v" not in document:
+        return document
+    decoded = dict(document)
+    del decoded["v"]
+    currency = decoded.get("currency")
+    if "li" in decoded:
+        decoded["items"] = [_decode_item(item, currency) for item in decoded.pop("li")]
+    if "ad" in decoded:
+        decoded["shipping_address"] = _lengthen(decoded.pop("ad"), ADDRESS_KEYS)
+    if "ct" in decoded:
+        decoded["contact_info"] = _lengthen(decoded.pop("ct"), CONTACT_KEYS)
+    if "total_price" in decoded:
+        decoded["total_price"] = from_decimal128(decoded["total_price"])
+    for field in OPTIONAL_FIELDS:
+        if fields is None or field in fields:
+            decoded.setdefault(field, None)
+    return decoded
+
+def storage_projection(fields: List[str]) -> Dict[str, int]:
+    """Project logical fields from documents of either version, plus the version marker."""
+    projection = {"_id": 0, "v": 1}
+    for field in fields:
+        projection[field] = 1
+        top = field.split(".", 1)[0]
+        if top in RENAMED_FIELDS:
+            projection[RENAMED_FIELDS[top]] = 1
+    return projection
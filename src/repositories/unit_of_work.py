@@ -0,0 +1,84 @@
+import time
+from typing import Callable, Optional, TypeVar
+
+from pymongo import ReadPreference, WriteConcern
+from pymongo.errors import ConnectionFailure, OperationFailure, PyMongoError
+from pymongo.read_concern import ReadConcern
+
+from ..config import TRANSACTION_MAX_RETRIES, TRANSACTION_RETRY_BACKOFF_SECONDS
+
+T = TypeVar("T")
+
+def supports_transactions(client) -> bool:
+    """Return whether a client talks to a replica set or sharded cluster, where transactions exist."""
+    if client is None or type(client).__module__.startswith("mongomock"):
+        return False
+    try:
+        hello = client.admin.command("hello")
+    except PyMongoError:
+        return False
+    return "setName" in hello or hello.get("msg") == "isdbgrid"
+
+def _is_transient(error: PyMongoError) -> bool:
+    return error.has_error_label("TransientTransactionError") or isinstance(error, ConnectionFailure)
+
+class UnitOfWork:
+    """Runs a group of writes as one MongoDB transaction, retried whole on transient errors.
+
+    The work is a callable taking the session to pass to every write. Without
+    transaction support (a standalone mongod, mongomock or the in-memory
+    order store) it is called once with ``session=None`` and the writes are
+    applied one by one, so the work must undo its own partial writes then.
+    """
+
+    def __init__(self, client=None, max_retries: int = TRANSACTION_MAX_RETRIES,
+                 backoff_seconds: float = TRANSACTION_RETRY_BACKOFF_SECONDS, transactional: Optional[bool] = None):
+        self.client = client
+        self.max_retries = max_retries
+        self.backoff_seconds = backoff_seconds
+        self._transactional = transactional
+        self.retries = 0
+
+    @property
+    def transactional(self) -> bool:
+        """Whether writes are grouped in a transaction; detected on first use."""
+        if self._transactional is None:
+            self._transactional = supports_transactions(self.client)
+        return self._transactional
+
+    def run(self, work: Callable[[Optional[object]], T]) -> T:
+        """Run work(session) and commit; any exception from the work aborts and propagates."""
+        if not self.transactional:
+            return work(None)
+        for attempt in range(self.max_retries + 1):
+            with self.client.start_session() as session:
+                try:
+                    session.start_transaction(
+                        read_concern=ReadConcern("snapshot"),
+                        write_concern=WriteConcern(w="majority"),
+                        read_preference=ReadPreference.PRIMARY
+                    )
+                    result = work(session)
+                    self._commit(session)
+                    return result
+                except PyMongoError as error:
+                    if session.in_transaction:
+                        session.abort_transaction()
+                    if not _is_transient(error) or attempt == self.max_retries:
+                        raise
+                except BaseException:
+                    if session.in_transaction:
+                        session.abort_transaction()
+                    raise
+            self.retries += 1
+            time.sleep(self.backoff_seconds * 2 ** attempt)
+
+    def _commit(self, session) -> None:
+        # An unknown commit result is safe to retry: the server applies a transaction's commit at most once
+        for attempt in range(self.max_retries + 1):
+            try:
+                session.commit_transaction()
+                return
+            except (ConnectionFailure, OperationFailure) as error:
+                if not error.has_error_label("UnknownTransactionCommitResult") or attempt == self.max_retries:
+                    raise
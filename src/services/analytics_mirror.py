@@ -0,0 +1,390 @@
+import argparse
+import itertools
+import re
+import sqlite3
+import threading
+import time
+from contextlib import closing
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+import pandas as pd
+
+from ..config import ANALYTICS_DB_PATH, ANALYTICS_SYNC_INTERVAL_SECONDS, REPORTING_CURRENCY
+from ..repositories.order_repository import OrderRepository
+from .order_archive import OrderArchive
+from .pricing_service import PricingEngine, default_pricing_engine
+from ..utils.money import to_cents
+from ..utils.profiling import profiled
+
+SYNC_BATCH_SIZE = 1000
+# Re-read a few seconds before the watermark so writes from app servers with slightly skewed clocks are not missed
+SYNC_OVERLAP = timedelta(seconds=5)
+WATERMARK_KEY = "orders_updated_at"
+# Stored in PRAGMA user_version; a mirror from an older version is dropped and rebuilt on the next sync
+MIRROR_SCHEMA_VERSION = 4
+# Columns of order_search that free text is matched against; user_id and status are only used as filters
+SEARCH_TEXT_COLUMNS = "order_id customer email city products"
+# A last search word that prefixes at most this many indexed words is matched as those words
+SEARCH_PREFIX_EXPANSION = 8
+# Words as the full-text tokenizer splits them: letters and digits, lowercased
+WORD_PATTERN = re.compile(r"[^\W_]+")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS orders (
+    order_id TEXT PRIMARY KEY,
+    user_id TEXT,
+    status TEXT,
+    total_cents INTEGER,
+    total_weight_kg REAL,
+    currency TEXT,
+    shipping_plan TEXT,
+    created_at TEXT,
+    updated_at TEXT,
+    created_date TEXT,
+    created_hour INTEGER,
+    created_weekday INTEGER
+);
+CREATE INDEX IF NOT EXISTS orders_created_date ON orders (created_date);
+CREATE INDEX IF NOT EXISTS orders_created_at ON orders (created_at);
+CREATE INDEX IF NOT EXISTS orders_user_created ON orders (user_id, created_at);
+CREATE INDEX IF NOT EXISTS orders_status_created ON orders (status, created_at);
+CREATE TABLE IF NOT EXISTS order_items (
+    order_id TEXT NOT NULL,
+    line INTEGER NOT NULL,
+    product_id TEXT,
+    name TEXT,
+    quantity INTEGER,
+    weight_kg REAL,
+    price_cents INTEGER,
+    currency TEXT,
+    PRIMARY KEY (order_id, line)
+);
+-- Full-text index over each order, sharing its rowid; prefix indexes keep 1-3 character prefixes fast
+CREATE VIRTUAL TABLE IF NOT EXISTS order_search USING fts5(
+    order_id, customer, email, city, products, user_id, status,
+    tokenize = 'unicode61 remove_diacritics 0', prefix = '1 2 3'
+);
+-- Every word in the index, for expanding a search prefix into the few words it stands for
+CREATE TABLE IF NOT EXISTS search_terms (
+    term TEXT PRIMARY KEY
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS sync_state (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+# SQLite's strftime('%w') numbering, Sunday first
+WEEKDAY_NAMES = ["Sunday", "Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday"]
+
+def _timestamp(value) -> Optional[datetime]:
+    if value is None:
+        return None
+    return value if isinstance(value, datetime) else pd.Timestamp(value).to_pydatetime()
+
+class AnalyticsMirror:
+    """Local SQLite copy of the orders collection for admin analytics.
+
+    Orders (with their line items flattened into ``order_items``) are synced
+    incrementally by ``updated_at``, so analytics queries run here instead of
+    scanning the operational database on every dashboard rerun. Amounts are
+    kept as integer cents in each order's currency; queries sum them per
+    currency and convert the sums to the reporting currency. A full-text
+    index over each order's words backs order search.
+    """
+
+    def __init__(self, path: str = ANALYTICS_DB_PATH, pricing: Optional[PricingEngine] = None,
+                 reporting_currency: str = REPORTING_CURRENCY):
+        self.path = path
+        self.pricing = pricing if pricing is not None else default_pricing_engine
+        self.reporting_currency = reporting_currency
+        self._sync_lock = threading.Lock()
+        self._last_sync = 0.0
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        with closing(self._connect()) as conn:
+            # WAL lets dashboard reads proceed while a sync is writing
+            conn.execute("PRAGMA journal_mode=WAL")
+            if conn.execute("PRAGMA user_version").fetchone()[0] < MIRROR_SCHEMA_VERSION:
+                conn.executescript("""
+                    DROP TABLE IF EXISTS orders;
+                    DROP TABLE IF EXISTS order_items;
+                    DROP TABLE IF EXISTS order_search;
+                    DROP TABLE IF EXISTS search_terms;
+                    DROP TABLE IF EXISTS sync_state;
+                """)
+                conn.execute(f"PRAGMA user_version = {MIRROR_SCHEMA_VERSION}")
+            conn.executescript(SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        # One short-lived connection per call, since Streamlit sessions run on separate threads
+        return sqlite3.connect(self.path, timeout=30)
+
+    def _query(self, sql: str, params: tuple = ()) -> pd.DataFrame:
+        with closing(self._connect()) as conn:
+            return pd.read_sql_query(sql, conn, params=params)
+
+    def watermark(self) -> Optional[datetime]:
+        """Return the newest updated_at mirrored so far."""
+        with closing(self._connect()) as conn:
+            row = conn.execute("SELECT value FROM sync_state WHERE key = ?", (WATERMARK_KEY,)).fetchone()
+        return datetime.fromisoformat(row[0]) if row else None
+
+    def _write_batch(self, conn: sqlite3.Connection, orders: List[dict]) -> None:
+        # An order updated twice within the batch is written once, as its latest version
+        orders = list({order["order_id"]: order for order in orders}.values())
+        order_ids = [(order["order_id"],) for order in orders]
+        conn.executemany("DELETE FROM order_items WHERE order_id = ?", order_ids)
+        # An updated order keeps its rowid, which its search entry shares; the old search entry goes
+        conn.executemany("DELETE FROM order_search WHERE rowid = (SELECT rowid FROM orders WHERE order_id = ?)", order_ids)
+        order_rows = []
+        item_rows = []
+        search_rows = []
+        terms = set()
+        for order in orders:
+            currency = order.get("currency") or self.pricing.catalog_currency
+            created_at = _timestamp(order.get("created_at"))
+            updated_at = _timestamp(order.get("updated_at"))
+            order_rows.append((
+                order["order_id"], order.get("user_id"), order.get("status"),
+                to_cents(order.get("total_price") or 0), order.get("total_weight_kg", 0.0),
+                currency, order.get("shipping_plan"),
+                created_at.isoformat() if created_at else None,
+                updated_at.isoformat() if updated_at else None,
+                created_at.date().isoformat() if created_at else None,
+                created_at.hour if created_at else None,
+                (created_at.weekday() + 1) % 7 if created_at else None
+            ))
+            item_rows.extend(
+                (order["order_id"], line, item.get("product_id"), item.get("name"),
+                 item.get("quantity", 0), item.get("weight_kg", 0.0), to_cents(item.get("price") or 0),
+                 item.get("currency") or currency)
+                for line, item in enumerate(order.get("items") or [])
+            )
+            contact = order.get("contact_info") or {}
+            search_row = (
+                contact.get("name"), contact.get("email"), (order.get("shipping_address") or {}).get("city"),
+                " ".join(item.get("name") or "" for item in order.get("items") or []), order["order_id"]
+            )
+            search_rows.append(search_row)
+            terms.update(WORD_PATTERN.findall(" ".join(value for value in search_row if value).lower()))
+        conn.executemany("""
+            INSERT INTO orders VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT (order_id) DO UPDATE SET
+                user_id = excluded.user_id, status = excluded.status, total_cents = excluded.total_cents,
+                total_weight_kg = excluded.total_weight_kg, currency = excluded.currency,
+                shipping_plan = excluded.shipping_plan, created_at = excluded.created_at,
+                updated_at = excluded.updated_at, created_date = excluded.created_date,
+                created_hour = excluded.created_hour, created_weekday = excluded.created_weekday
+        """, order_rows)
+        conn.executemany("INSERT INTO order_items VALUES (?, ?, ?, ?, ?, ?, ?, ?)", item_rows)
+        conn.executemany("""
+            INSERT INTO order_search (rowid, order_id, customer, email, city, products, user_id, status)
+            SELECT rowid, order_id, ?, ?, ?, ?, user_id, status FROM orders WHERE order_id = ?
+        """, search_rows)
+        conn.executemany("INSERT OR IGNORE INTO search_terms VALUES (?)", ((term,) for term in terms))
+
+    @profiled()
+    def sync(self, repository: OrderRepository, archive: Optional[OrderArchive] = None) -> int:
+        """Copy orders updated since the last sync into the mirror; return how many were copied.
+
+        The first sync also loads the Parquet archive, since archived orders are
+        no longer in the live store. Later syncs keep them, as nothing is deleted here.
+        """
+        with self._sync_lock, closing(self._connect()) as conn:
+            newest = self.watermark()
+            synced = 0
+            batch = []
+            # Re-copying an order is an idempotent upsert, so the overlap only costs a few rows
+            orders = repository.iter_updated_since(newest - SYNC_OVERLAP if newest else None)
+            if newest is None and archive is not None:
+                orders = itertools.chain(archive.iter_orders(), orders)
+            for order in orders:
+                batch.append(order)
+                updated_at = _timestamp(order.get("updated_at"))
+                if updated_at and (newest is None or updated_at > newest):
+                    newest = updated_at
+                if len(batch) >= SYNC_BATCH_SIZE:
+                    with conn:
+                        self._write_batch(conn, batch)
+                    synced += len(batch)
+                    batch = []
+            with conn:
+                if batch:
+                    self._write_batch(conn, batch)
+                    synced += len(batch)
+                if newest is not None:
+                    conn.execute(
+                        "INSERT OR REPLACE INTO sync_state VALUES (?, ?)", (WATERMARK_KEY, newest.isoformat())
+                    )
+            self._last_sync = time.monotonic()
+            return synced
+
+    def maybe_sync(self, repository: OrderRepository, archive: Optional[OrderArchive] = None,
+                   interval: float = ANALYTICS_SYNC_INTERVAL_SECONDS) -> int:
+        """Sync if `interval` seconds have passed since the last sync."""
+        if time.monotonic() - self._last_sync < interval:
+            return 0
+        return self.sync(repository, archive)
+
+    def order_count(self) -> int:
+        """Return the number of mirrored orders."""
+        return int(self._query("SELECT COUNT(*) AS n FROM orders")["n"].iloc[0])
+
+    def _in_reporting_currency(self, sums: pd.DataFrame, by: str, columns: List[str]) -> pd.DataFrame:
+        """Convert per-(group, currency) revenue_cents to the reporting currency and add them up per group."""
+        currencies = sums.pop("currency").fillna(self.pricing.catalog_currency)
+        sums["revenue_cents"] = self.pricing.convert_totals(sums["revenue_cents"], currencies, self.reporting_currency)
+        totals = sums.groupby(by, as_index=False, dropna=False).sum()
+        totals["revenue"] = totals["revenue_cents"] / 100
+        totals["avg_order_value"] = totals["revenue_cents"] / totals["order_count"] / 100
+        return totals[[by] + columns]
+
+    @profiled()
+    def get_advanced_order_analytics(self) -> Optional[dict]:
+        """Compute daily, hourly, weekday and per-product order metrics in SQL, with revenue in the reporting currency."""
+        if not self.order_count():
+            return None
+        daily_metrics = self._in_reporting_currency(self._query("""
+            SELECT created_date AS date, currency, SUM(total_cents) AS revenue_cents,
+                   COUNT(*) AS order_count, SUM(total_weight_kg) AS total_weight
+            FROM orders GROUP BY created_date, currency
+        """), "date", ["revenue", "avg_order_value", "order_count", "total_weight"])
+        daily_metrics["date"] = pd.to_datetime(daily_metrics["date"])
+        hourly_metrics = self._in_reporting_currency(self._query("""
+            SELECT created_hour AS hour, currency, COUNT(*) AS order_count, SUM(total_cents) AS revenue_cents
+            FROM orders GROUP BY created_hour, currency
+        """), "hour", ["order_count", "revenue"])
+        weekday_metrics = self._in_reporting_currency(self._query("""
+            SELECT created_weekday AS weekday, currency, COUNT(*) AS order_count, SUM(total_cents) AS revenue_cents
+            FROM orders GROUP BY created_weekday, currency
+        """), "weekday", ["order_count", "revenue"])
+        weekday_metrics["day_of_week"] = weekday_metrics["weekday"].map(lambda day: WEEKDAY_NAMES[int(day)])
+        # Average unit price: price sums per currency, converted, over the line count
+        products = self._in_reporting_currency(self._query("""
+            SELECT name, currency, SUM(quantity) AS quantity, SUM(price_cents) AS revenue_cents, COUNT(*) AS order_count
+            FROM order_items GROUP BY name, currency
+        """), "name", ["quantity", "avg_order_value"])
+        product_popularity = products.rename(columns={"avg_order_value": "price"}).sort_values(
+            "quantity", ascending=False, kind="stable"
+        ).reset_index(drop=True)
+        return {
+            'daily_metrics': daily_metrics,
+            'hourly_metrics': hourly_metrics,
+            'weekday_metrics': weekday_metrics,
+            'product_popularity': product_popularity
+        }
+
+    @profiled()
+    def daily_order_counts(self) -> pd.Series:
+        """Count orders per calendar day, filling days without orders with zero."""
+        daily = self._query("SELECT created_date AS date, COUNT(*) AS orders FROM orders GROUP BY created_date")
+        series = pd.Series(daily["orders"].values, index=pd.DatetimeIndex(daily["date"]), name="orders")
+        return series.sort_index().asfreq('D', fill_value=0)
+
+    @profiled()
+    def customer_features(self) -> pd.DataFrame:
+        """Per-customer spend, order value, order count and weight for segmentation."""
+        features = self._in_reporting_currency(self._query("""
+            SELECT user_id, currency, SUM(total_cents) AS revenue_cents, COUNT(*) AS order_count,
+                   SUM(total_weight_kg) AS total_weight
+            FROM orders GROUP BY user_id, currency
+        """), "user_id", ["revenue", "avg_order_value", "order_count", "total_weight"])
+        return features.rename(columns={"revenue": "total_spent"})
+
+    def _match_terms(self, conn: sqlite3.Connection, text: str) -> List[str]:
+        """Turn search text into FTS5 terms: all words but the last exactly, the last as a prefix.
+
+        A prefix standing for a few words is matched as those words, which
+        FTS5 reads lazily; as a `prefix*` term it would merge their whole
+        document lists first, however few results are wanted.
+        """
+        words = WORD_PATTERN.findall(text.lower())
+        if not words:
+            return []
+        terms = [f'"{word}"' for word in words[:-1]]
+        last = words[-1]
+        expanded = [row[0] for row in conn.execute(
+            "SELECT term FROM search_terms WHERE term >= ? AND term < ? LIMIT ?",
+            (last, last + "\U0010ffff", SEARCH_PREFIX_EXPANSION + 1)
+        )]
+        if not expanded:
+            # No indexed word starts with it, so nothing can match
+            return terms + [f'"{last}"']
+        if len(expanded) > SEARCH_PREFIX_EXPANSION:
+            return terms + [f'"{last}"*']
+        return terms + ["(" + " OR ".join(f'"{term}"' for term in expanded) + ")"]
+
+    @profiled()
+    def search_orders(self, text: str = "", status: Optional[str] = None, user_id: Optional[str] = None,
+                      start: Optional[datetime] = None, end: Optional[datetime] = None,
+                      limit: int = 20, offset: int = 0) -> pd.DataFrame:
+        """Find orders by their id, customer, email, city or product words; the last word of `text` may be a prefix.
+
+        Both text matches and filter-only listings come newest created first.
+        Filter-only listings follow the created_at indexes, so SQLite stops
+        after `limit` + `offset` rows; text matches are sorted, which stays
+        cheap because the prefix expansion keeps match sets small.
+        """
+        filters: List[Tuple[str, Optional[str]]] = [("status", status), ("user_id", user_id)]
+        dates = ""
+        date_params: list = []
+        if start is not None:
+            dates += " AND o.created_at >= ?"
+            date_params.append(start.isoformat())
+        if end is not None:
+            dates += " AND o.created_at < ?"
+            date_params.append(end.isoformat())
+        columns = """
+            SELECT o.order_id, o.user_id, s.customer, s.email, s.city, s.products, o.status,
+                   o.total_cents / 100.0 AS total_price, o.currency, o.created_at, o.updated_at
+        """
+        with closing(self._connect()) as conn:
+            terms = self._match_terms(conn, text)
+            if terms:
+                # Filters are matched in the index too, so document lists are intersected instead of rows checked
+                match = " AND ".join(
+                    [f"{{{SEARCH_TEXT_COLUMNS}}} : ({' AND '.join(terms)})"]
+                    + [f'{column} : "{value.replace(chr(34), chr(34) * 2)}"' for column, value in filters if value]
+                )
+                sql = f"""{columns}
+                    FROM order_search s CROSS JOIN orders o ON o.rowid = s.rowid
+                    WHERE order_search MATCH ?{dates}
+                    ORDER BY o.created_at DESC, o.rowid DESC LIMIT ? OFFSET ?
+                """
+                params = [match] + date_params
+            else:
+                # CROSS JOIN keeps SQLite from scanning the full-text table first
+                where = "".join(f" AND o.{column} = ?" for column, value in filters if value)
+                sql = f"""{columns}
+                    FROM orders o CROSS JOIN order_search s ON s.rowid = o.rowid
+                    WHERE 1{where}{dates}
+                    ORDER BY o.created_at DESC, o.rowid DESC LIMIT ? OFFSET ?
+                """
+                params = [value for _, value in filters if value] + date_params
+            return pd.read_sql_query(sql, conn, params=tuple(params + [limit, offset]))
+
+def main():
+    """Sync the mirror once, or every --interval seconds."""
+    from ..database import get_database
+    from .order_service import OrderService
+
+    parser = argparse.ArgumentParser(description="Mirror MongoDB orders into the local analytics database.")
+    parser.add_argument("--path", default=ANALYTICS_DB_PATH)
+    parser.add_argument("--interval", type=float, default=0, help="keep syncing every N seconds")
+    args = parser.parse_args()
+
+    mirror = AnalyticsMirror(args.path)
+    repository = OrderService(get_database("analytics")).repository
+    repository.ensure_indexes()
+    archive = OrderArchive()
+    while True:
+        synced = mirror.sync(repository, archive)
+        print(f"{datetime.now().isoformat()} synced {synced} orders ({mirror.order_count()} mirrored)")
+        if not args.interval:
+            break
+        time.sleep(args.interval)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,225 @@
+from typing import Iterable, Optional
+
+import numpy as np
+import pandas as pd
+from scipy import stats
+from sklearn.cluster import KMeans
+from sklearn.preprocessing import StandardScaler
+from statsmodels.tsa.arima.model import ARIMA
+from statsmodels.tsa.holtwinters import ExponentialSmoothing
+from statsmodels.tsa.statespace.sarimax import SARIMAX
+
+from ..utils.instrumentation import tagged
+from .pricing_service import default_pricing_engine
+from ..utils.profiling import profiled
+
+SEGMENT_NAMES = {
+    0: 'High-Value Frequent Buyers',
+    1: 'Medium-Value Regular Buyers',
+    2: 'Low-Value Occasional Buyers',
+    3: 'New/Inactive Customers'
+}
+
+def daily_order_counts(orders_df: pd.DataFrame) -> pd.Series:
+    """Count orders per calendar day, filling days without orders with zero."""
+    daily_orders = orders_df.groupby('date')['order_id'].count()
+    daily_orders.index = pd.DatetimeIndex(daily_orders.index)
+    return daily_orders.asfreq('D', fill_value=0)
+
+def _revenue_stats(cents: pd.core.groupby.SeriesGroupBy) -> pd.DataFrame:
+    """Sum, mean and count of order totals per group, summed exactly as int64 cents."""
+    totals = cents.agg(['sum', 'count'])
+    return pd.DataFrame({
+        'sum': totals['sum'] / 100,
+        'mean': totals['sum'] / totals['count'] / 100,
+        'count': totals['count']
+    })
+
+# The order fields get_order_analytics reads, so callers can load only these
+ORDER_ANALYTICS_FIELDS = ["order_id", "status", "total_price", "currency", "total_weight_kg", "created_at", "user_id"]
+
+@profiled()
+@tagged()
+def get_order_analytics(orders: Iterable[dict]) -> Optional[dict]:
+    """Summarize order count, revenue (in REPORTING_CURRENCY), weight, status mix and daily trends."""
+    orders_df = pd.DataFrame([
+        {
+            'order_id': order['order_id'],
+            'status': order['status'],
+            'total_price': order['total_price'],
+            'currency': order.get('currency'),
+            'total_weight': order['total_weight_kg'],
+            'created_at': order['created_at'],
+            'user_id': order['user_id']
+        }
+        for order in orders
+    ])
+    if orders_df.empty:
+        return None
+
+    # Time-based analysis
+    orders_df['date'] = pd.to_datetime(orders_df['created_at']).dt.date
+    orders_df['total_cents'] = default_pricing_engine.reporting_cents(orders_df)
+    total_cents = int(orders_df['total_cents'].sum())
+
+    return {
+        'total_orders': len(orders_df),
+        'total_revenue': total_cents / 100,
+        'avg_order_value': total_cents / len(orders_df) / 100,
+        'total_weight': orders_df['total_weight'].sum(),
+        'status_counts': orders_df['status'].value_counts(),
+        'daily_orders': orders_df.groupby('date').size(),
+        'daily_revenue': orders_df.groupby('date')['total_cents'].sum() / 100
+    }
+
+@profiled()
+@tagged()
+def get_user_analytics(users: Iterable[dict]) -> Optional[dict]:
+    """Summarize user totals, verification, admins and daily signups."""
+    users_df = pd.DataFrame([
+        {
+            'user_id': str(user['_id']),
+            'role': user['role'],
+            'created_at': user['created_at'],
+            'email_verified': user.get('email_verified', False)
+        }
+        for user in users
+    ])
+    if users_df.empty:
+        return None
+
+    users_df['date'] = pd.to_datetime(users_df['created_at']).dt.date
+    return {
+        'total_users': len(users_df),
+        'verified_users': users_df['email_verified'].sum(),
+        'admin_users': (users_df['role'] == 'admin').sum(),
+        'daily_signups': users_df.groupby('date').size()
+    }
+
+@profiled()
+@tagged()
+def get_advanced_order_analytics(orders: Iterable[dict]) -> Optional[dict]:
+    """Compute daily, hourly, weekday and per-product order metrics, with revenue in REPORTING_CURRENCY."""
+    orders_df = pd.DataFrame([
+        {
+            'order_id': order['order_id'],
+            'status': order['status'],
+            'total_price': order['total_price'],
+            'currency': order.get('currency'),
+            'total_weight': order['total_weight_kg'],
+            'created_at': order['created_at'],
+            'user_id': order['user_id'],
+            'items': order['items']
+        }
+        for order in orders
+    ])
+    if orders_df.empty:
+        return None
+
+    # Time-based analysis
+    created_at = pd.to_datetime(orders_df['created_at'])
+    orders_df['date'] = created_at.dt.date
+    orders_df['hour'] = created_at.dt.hour
+    orders_df['day_of_week'] = created_at.dt.day_name()
+    orders_df['total_cents'] = default_pricing_engine.reporting_cents(orders_df)
+
+    # Product analysis
+    items_df = pd.DataFrame([
+        {'name': item['name'], 'quantity': item['quantity'], 'price': item['price'], 'currency': item.get('currency')}
+        for items in orders_df['items']
+        for item in items
+    ])
+    items_df['price'] = default_pricing_engine.reporting_cents(items_df, 'price') / 100
+
+    by_date = orders_df.groupby('date')
+    daily_metrics = pd.concat({
+        'total_price': _revenue_stats(by_date['total_cents']),
+        'total_weight': by_date[['total_weight']].sum().set_axis(['sum'], axis=1)
+    }, axis=1).reset_index()
+
+    hourly_metrics = _revenue_stats(orders_df.groupby('hour')['total_cents']).rename(
+        columns={'count': 'order_id', 'sum': 'total_price'}
+    )[['order_id', 'total_price']].reset_index()
+
+    weekday_metrics = _revenue_stats(orders_df.groupby('day_of_week')['total_cents']).rename(
+        columns={'count': 'order_id', 'sum': 'total_price'}
+    )[['order_id', 'total_price']].reset_index()
+
+    product_popularity = items_df.groupby('name').agg({
+        'quantity': 'sum',
+        'price': 'mean'
+    }).reset_index()
+
+    return {
+        'daily_metrics': daily_metrics,
+        'hourly_metrics': hourly_metrics,
+        'weekday_metrics': weekday_metrics,
+        'product_popularity': product_popularity,
+        'orders_df': orders_df
+    }
+
+def customer_features(orders_df: pd.DataFrame) -> pd.DataFrame:
+    """Per-customer spend, order value, order count and weight for segmentation."""
+    by_user = orders_df.assign(total_cents=default_pricing_engine.reporting_cents(orders_df)).groupby('user_id')
+    features = _revenue_stats(by_user['total_cents'])
+    features['total_weight'] = by_user['total_weight'].sum()
+    features = features.reset_index()
+    features.columns = ['user_id', 'total_spent', 'avg_order_value', 'order_count', 'total_weight']
+    return features
+
+@profiled()
+def forecast_orders(daily_orders: pd.Series, days_to_forecast: int = 30) -> dict:
+    """Forecast daily order counts with Holt-Winters and a residual-based 95% interval."""
+    model = ExponentialSmoothing(
+        daily_orders,
+        seasonal_periods=7,
+        trend='add',
+        seasonal='add'
+    ).fit()
+    forecast = model.forecast(days_to_forecast)
+
+    std_resid = np.std(model.resid)
+    z_score = stats.norm.ppf(0.975)  # 95% confidence interval
+
+    return {
+        'forecast': forecast,
+        'lower_bound': forecast - z_score * std_resid,
+        'upper_bound': forecast + z_score * std_resid,
+        'last_date': daily_orders.index[-1]
+    }
+
+@profiled()
+def forecast_with_arima(daily_orders: pd.Series, days_to_forecast: int = 30) -> dict:
+    """Forecast daily order counts with ARIMA(1, 1, 1)."""
+    model_fit = ARIMA(daily_orders, order=(1, 1, 1)).fit()
+    conf_int = model_fit.get_forecast(days_to_forecast).conf_int()
+    return {
+        'forecast': model_fit.forecast(days_to_forecast),
+        'lower_bound': conf_int.iloc[:, 0],
+        'upper_bound': conf_int.iloc[:, 1],
+        'last_date': daily_orders.index[-1]
+    }
+
+@profiled()
+def forecast_with_sarima(daily_orders: pd.Series, days_to_forecast: int = 30) -> dict:
+    """Forecast daily order counts with a weekly seasonal SARIMA model."""
+    model_fit = SARIMAX(daily_orders, order=(1, 1, 1), seasonal_order=(1, 1, 1, 7)).fit(disp=False)
+    conf_int = model_fit.get_forecast(days_to_forecast).conf_int()
+    return {
+        'forecast': model_fit.forecast(days_to_forecast),
+        'lower_bound': conf_int.iloc[:, 0],
+        'upper_bound': conf_int.iloc[:, 1],
+        'last_date': daily_orders.index[-1]
+    }
+
+@profiled()
+def segment_customers(customer_features: pd.DataFrame) -> pd.DataFrame:
+    """Cluster customers into four segments by spend, order value and frequency."""
+    customer_features = customer_features.copy()
+    scaler = StandardScaler()
+    features_scaled = scaler.fit_transform(customer_features[['total_spent', 'avg_order_value', 'order_count']])
+
+    kmeans = KMeans(n_clusters=4, random_state=42, n_init=10)
+    customer_features['segment'] = kmeans.fit_predict(features_scaled)
+    customer_features['segment_name'] = customer_features['segment'].map(SEGMENT_NAMES)
+    return customer_features
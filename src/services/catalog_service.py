@@ -0,0 +1,27 @@
+from typing import List, Optional
+from ..config import PRODUCTS_COLLECTION
+from ..utils.cache import TTLCache, reference_cache
+
+class CatalogService:
+    """Product catalog reads served through the process-wide reference cache."""
+
+    def __init__(self, db, default_products: Optional[List[dict]] = None, cache: Optional[TTLCache] = None):
+        self.products = db[PRODUCTS_COLLECTION]
+        self.default_products = default_products or []
+        self.cache = cache if cache is not None else reference_cache
+
+    def list_products(self) -> List[dict]:
+        """Retrieve all products, falling back to the bundled catalog when none are stored."""
+        def load():
+            products = list(self.products.find({}, {"_id": 0}))
+            return products or list(self.default_products)
+        return self.cache.get_or_load(("catalog", "all"), load)
+
+    def get_product(self, product_id: str) -> Optional[dict]:
+        """Retrieve a product by its ID."""
+        return next((p for p in self.list_products() if p['id'] == product_id), None)
+
+    def upsert_product(self, product: dict) -> None:
+        """Create or replace a product and invalidate the cached catalog."""
+        self.products.replace_one({"id": product['id']}, product, upsert=True)
+        self.cache.invalidate_namespace("catalog")
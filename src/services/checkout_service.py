@@ -0,0 +1,183 @@
+import logging
+import secrets
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Optional
+
+from pymongo.errors import DuplicateKeyError
+
+from ..config import (
+    PAYMENT_MAX_RETRIES, PAYMENT_RECOVERY_INTERVAL_SECONDS, PAYMENT_RETRY_BACKOFF_SECONDS, PAYMENT_STALE_AFTER_SECONDS
+)
+from ..models.order import Order
+from .order_service import OrderService
+from .payment_gateway import Charge, PaymentError, PaymentGateway
+from ..utils.profiling import profiled
+
+logger = logging.getLogger(__name__)
+
+def new_idempotency_key() -> str:
+    """Return a fresh key for one checkout submission, e.g. 20240630142501-9F2C61AB."""
+    return f"{datetime.now():%Y%m%d%H%M%S}-{secrets.token_hex(4).upper()}"
+
+@dataclass
+class CheckoutResult:
+    """Outcome of placing or paying for an order."""
+    order_id: str
+    status: str
+    created: bool = False  # this call inserted the order
+    paid_now: bool = False  # this call moved the order from pending to paid
+    error: Optional[str] = None
+
+    @property
+    def paid(self) -> bool:
+        return self.status == "paid"
+
+class CheckoutService:
+    """Idempotent order placement and payment.
+
+    Each cart submission carries an idempotency key, which fixes the order id
+    and is unique across orders, so repeats find the existing order. Payment
+    is write-ahead: the attempt and its gateway key are recorded on the order
+    before the gateway is called, and the order only moves pending -> paid
+    through a conditional update. A double click, a rerun or a retry after a
+    crash therefore charges once, writes once and reports paid_now once.
+    """
+
+    def __init__(self, order_service: OrderService, gateway: PaymentGateway,
+                 max_retries: int = PAYMENT_MAX_RETRIES, backoff_seconds: float = PAYMENT_RETRY_BACKOFF_SECONDS):
+        self.orders = order_service
+        self.repository = order_service.repository
+        self.gateway = gateway
+        self.max_retries = max_retries
+        self.backoff_seconds = backoff_seconds
+
+    @profiled()
+    def place_order(self, order: Order, idempotency_key: str) -> CheckoutResult:
+        """Store a cart order under its idempotency key, then pay for it."""
+        order.order_id = f"ORD-{idempotency_key}"
+        order.idempotency_key = idempotency_key
+        order.status = "pending"
+        try:
+            self.orders.create_order(order)
+            created = True
+        except DuplicateKeyError:
+            created = False
+        result = self.pay(order.order_id)
+        result.created = created
+        return result
+
+    @profiled()
+    def pay(self, order_id: str) -> CheckoutResult:
+        """Pay for a pending order; paying an order that is already paid is a no-op."""
+        document = self.repository.get(order_id)
+        if document is None:
+            return CheckoutResult(order_id, "missing", error="Order not found")
+        if document["status"] != "pending":
+            error = None if document["status"] == "paid" else f"Order is {document['status']}"
+            return CheckoutResult(order_id, document["status"], error=error)
+
+        payment = document.get("payment") or {}
+        attempt = payment.get("attempt", 0)
+        if payment.get("state") == "failed":
+            # A declined key stays declined at the gateway, so a new attempt needs a new key
+            attempt += 1
+        key = f"{order_id}:{attempt}"
+        amount = document["total_price"]
+        currency = document.get("currency", "EUR")
+        if payment.get("key") != key:
+            started = self.repository.update_if(order_id, {"status": "pending"}, {"payment": {
+                "state": "processing", "key": key, "attempt": attempt, "amount": amount,
+                "started_at": datetime.now()
+            }})
+            if not started:
+                return self._current(order_id)
+
+        try:
+            charge = self._charge(key, amount, currency)
+        except PaymentError:
+            # The attempt stays recorded as processing; paying again or recover_stale_payments() finishes it
+            return CheckoutResult(order_id, "pending", error="Payment service unavailable, please try again")
+        return self._settle(order_id, key, payment_attempt=attempt, charge=charge)
+
+    def _charge(self, key: str, amount: float, currency: str) -> Charge:
+        for retry in range(self.max_retries + 1):
+            try:
+                return self.gateway.charge(key, amount, currency)
+            except PaymentError:
+                if retry == self.max_retries:
+                    raise
+                time.sleep(self.backoff_seconds * 2 ** retry)
+
+    def _settle(self, order_id: str, key: str, payment_attempt: int, charge: Charge) -> CheckoutResult:
+        """Record the gateway's answer, only if this attempt is still the order's current one."""
+        expected = {"status": "pending", "payment.key": key}
+        payment = {
+            "key": key, "attempt": payment_attempt, "amount": charge.amount,
+            "charge_id": charge.charge_id, "settled_at": datetime.now()
+        }
+        if charge.status != "captured":
+            self.repository.update_if(order_id, expected, {"payment": dict(payment, state="failed")})
+            result = self._current(order_id)
+            result.error = result.error or "Payment declined"
+            return result
+        paid_now = self.repository.update_if(order_id, expected, {
+            "status": "paid",
+            "updated_at": datetime.now(),
+            "payment": dict(payment, state="captured")
+        })
+        result = self._current(order_id)
+        result.paid_now = paid_now
+        return result
+
+    def _current(self, order_id: str) -> CheckoutResult:
+        document = self.repository.get(order_id)
+        if document is None:
+            return CheckoutResult(order_id, "missing", error="Order not found")
+        return CheckoutResult(order_id, document["status"])
+
+    def recover_stale_payments(self, now: Optional[datetime] = None,
+                               older_than_seconds: int = PAYMENT_STALE_AFTER_SECONDS) -> int:
+        """Settle payments left processing by a crash or an unavailable gateway; return how many were settled.
+
+        The gateway is asked what happened to each key rather than charged again.
+        """
+        cutoff = (now or datetime.now()) - timedelta(seconds=older_than_seconds)
+        stale = self.repository.iter_projected(
+            {"status": "pending", "payment.state": "processing"}, ["order_id", "payment"]
+        )
+        settled = 0
+        for order in [order for order in stale if order["payment"]["started_at"] < cutoff]:
+            payment = order["payment"]
+            charge = self.gateway.retrieve(payment["key"])
+            if charge is None:
+                # The gateway never saw this attempt, so it is safe to fail it and try a new key later
+                settled += self.repository.update_if(
+                    order["order_id"], {"status": "pending", "payment.key": payment["key"]},
+                    {"payment": dict(payment, state="failed", settled_at=datetime.now())}
+                )
+            else:
+                self._settle(order["order_id"], payment["key"], payment["attempt"], charge)
+                settled += 1
+        return settled
+
+    def run_forever(self, interval: float = PAYMENT_RECOVERY_INTERVAL_SECONDS,
+                    stop: Optional[threading.Event] = None) -> None:
+        """Recover stale payments every `interval` seconds until `stop` is set."""
+        stop = stop or threading.Event()
+        while not stop.is_set():
+            try:
+                settled = self.recover_stale_payments()
+                if settled:
+                    logger.info("Settled %s stale payments", settled)
+            except Exception:
+                logger.exception("Stale payment recovery failed")
+            stop.wait(interval)
+
+    def start(self, interval: float = PAYMENT_RECOVERY_INTERVAL_SECONDS) -> threading.Thread:
+        """Recover stale payments on a daemon thread."""
+        thread = threading.Thread(target=self.run_forever, args=(interval,), name="payment-recovery", daemon=True)
+        thread.start()
+        return thread
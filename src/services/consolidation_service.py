@@ -0,0 +1,120 @@
+import argparse
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from sklearn.cluster import DBSCAN
+
+from ..config import LAST_MILE_RADIUS_KM
+from ..repositories.order_repository import OrderRepository
+from ..utils.geo import EARTH_RADIUS_KM, Geocoder, default_geocoder, point
+from ..utils.profiling import profiled
+
+KM_PER_DEGREE = 111.32
+# Points are snapped to cells this fraction of the cluster radius before clustering
+GRID_FRACTION = 0.1
+
+class ConsolidationService:
+    """Pending orders around last-mile hubs, and clusters of nearby destinations to deliver together."""
+
+    def __init__(self, repository: OrderRepository, geocoder: Optional[Geocoder] = None):
+        self.repository = repository
+        self.geocoder = geocoder if geocoder is not None else default_geocoder
+
+    def hub_location(self, city: str, country: str, postal_code: str = "") -> Optional[Tuple[float, float]]:
+        """Return (lon, lat) for a hub given by its address."""
+        return self.geocoder.locate({"city": city, "country": country, "postal_code": postal_code})
+
+    def pending_near(self, lon: float, lat: float, radius_km: float = LAST_MILE_RADIUS_KM,
+                     limit: int = 0) -> List[dict]:
+        """Return pending orders within radius_km of a hub, nearest first."""
+        return self.repository.find_near(lon, lat, radius_km, status="pending", limit=limit)
+
+    @profiled()
+    def cluster_pending(self, radius_km: float = LAST_MILE_RADIUS_KM, min_orders: int = 2) -> List[dict]:
+        """Group pending orders into destination clusters with DBSCAN, heaviest cluster first.
+
+        Orders are first snapped to a grid a tenth of the radius wide, so the
+        clustering cost grows with the area covered rather than the number of
+        orders. Orders in no cluster of at least `min_orders` are left out.
+        """
+        cell_size = radius_km * GRID_FRACTION / KM_PER_DEGREE
+        cells: Dict[Tuple[int, int], list] = {}
+        orders = self.repository.iter_projected(
+            {"status": "pending"}, ["order_id", "shipping_location", "total_weight_kg"]
+        )
+        for order in orders:
+            location = order.get("shipping_location")
+            if not location:
+                continue
+            lon, lat = location["coordinates"]
+            # [lon sum, lat sum, weight, order ids]
+            cell = cells.setdefault((round(lon / cell_size), round(lat / cell_size)), [0.0, 0.0, 0.0, []])
+            cell[0] += lon
+            cell[1] += lat
+            cell[2] += order.get("total_weight_kg", 0.0)
+            cell[3].append(order["order_id"])
+        if not cells:
+            return []
+
+        cells = list(cells.values())
+        counts = np.array([len(cell[3]) for cell in cells])
+        centers = np.array([(cell[0], cell[1]) for cell in cells]) / counts[:, None]
+        labels = DBSCAN(
+            eps=radius_km / EARTH_RADIUS_KM, min_samples=min_orders, metric="haversine", algorithm="ball_tree"
+        ).fit_predict(np.radians(centers[:, ::-1]), sample_weight=counts)
+
+        clusters = []
+        for label in set(labels.tolist()) - {-1}:
+            members = np.flatnonzero(labels == label)
+            lon, lat = np.average(centers[members], axis=0, weights=counts[members])
+            clusters.append({
+                "center": point(float(lon), float(lat)),
+                "order_count": int(counts[members].sum()),
+                "total_weight_kg": round(sum(cells[i][2] for i in members), 3),
+                "order_ids": [order_id for i in members for order_id in cells[i][3]]
+            })
+        clusters.sort(key=lambda cluster: cluster["total_weight_kg"], reverse=True)
+        return clusters
+
+    def backfill_locations(self) -> int:
+        """Geocode orders stored without a shipping_location; return how many were placed."""
+        placed = 0
+        for order in self.repository.iter_projected({"shipping_location": None}, ["order_id", "shipping_address"]):
+            location = self.geocoder.geocode(order.get("shipping_address") or {})
+            if location and self.repository.update(order["order_id"], {"shipping_location": location}):
+                placed += 1
+        return placed
+
+def main():
+    """Backfill order locations, or list pending clusters or orders near a hub."""
+    from ..database import get_database
+    from .order_service import OrderService
+
+    parser = argparse.ArgumentParser(description="Geocode orders and plan last-mile consolidation.")
+    parser.add_argument("command", choices=["backfill", "clusters", "near"])
+    parser.add_argument("--radius-km", type=float, default=LAST_MILE_RADIUS_KM)
+    parser.add_argument("--min-orders", type=int, default=2, help="clusters only")
+    parser.add_argument("--city", help="hub city, near only")
+    parser.add_argument("--country", help="hub country, near only")
+    args = parser.parse_args()
+
+    repository = OrderService(get_database()).repository
+    repository.ensure_indexes()
+    service = ConsolidationService(repository)
+    if args.command == "backfill":
+        print(f"geocoded {service.backfill_locations()} orders")
+    elif args.command == "clusters":
+        for cluster in service.cluster_pending(args.radius_km, args.min_orders):
+            lon, lat = cluster["center"]["coordinates"]
+            print(f"{lat:.4f},{lon:.4f}\t{cluster['order_count']} orders\t{cluster['total_weight_kg']} kg")
+    else:
+        hub = service.hub_location(args.city or "", args.country or "")
+        if hub is None:
+            parser.error(f"cannot locate hub {args.city}, {args.country}")
+        orders = service.pending_near(*hub, radius_km=args.radius_km)
+        for order in orders:
+            print(f"{order['order_id']}\t{order['distance_km']:.1f} km\t{order.get('total_weight_kg', 0)} kg")
+        print(f"{len(orders)} pending orders within {args.radius_km} km")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+import argparse
+import csv
+import io
+import itertools
+from datetime import datetime
+from pathlib import Path
+from typing import BinaryIO, Iterable, Iterator, List, Optional
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from ..repositories.order_repository import OrderRepository
+from ..utils.money import from_cents, line_total_cents
+from ..utils.profiling import profiled
+
+EXPORT_BATCH_SIZE = 1000
+EXPORT_FORMATS = {"csv": "text/csv", "parquet": "application/vnd.apache.parquet"}
+
+ORDER_EXPORT_FIELDS = [
+    "order_id", "created_at", "status", "user_id", "truck_id", "payment_method",
+    "contact_info", "shipping_address", "items"
+]
+ORDER_LINE_SCHEMA = pa.schema([
+    ("order_id", pa.string()),
+    ("created_at", pa.timestamp("us")),
+    ("status", pa.string()),
+    ("user_id", pa.string()),
+    ("truck_id", pa.string()),
+    ("payment_method", pa.string()),
+    ("customer_name", pa.string()),
+    ("customer_email", pa.string()),
+    ("city", pa.string()),
+    ("country", pa.string()),
+    ("product_id", pa.string()),
+    ("product_name", pa.string()),
+    ("quantity", pa.int64()),
+    ("weight_kg", pa.float64()),
+    ("price", pa.float64()),
+    ("line_total", pa.float64())
+])
+MANIFEST_SCHEMA = pa.schema([
+    ("truck_id", pa.string()),
+    ("name", pa.string()),
+    ("quantity", pa.int64()),
+    ("weight_kg", pa.float64())
+])
+
+def iter_order_lines(repository: OrderRepository, truck_id: Optional[str] = None, status: Optional[str] = None,
+                     created_from: Optional[datetime] = None, created_to: Optional[datetime] = None) -> Iterator[dict]:
+    """Stream one row per order line from a projected, batched cursor."""
+    filters = {}
+    if truck_id:
+        filters["truck_id"] = truck_id
+    if status:
+        filters["status"] = status
+    orders = repository.iter_projected(
+        filters, ORDER_EXPORT_FIELDS, created_from, created_to, batch_size=EXPORT_BATCH_SIZE
+    )
+    for order in orders:
+        contact = order.get("contact_info") or {}
+        address = order.get("shipping_address") or {}
+        for item in order.get("items") or []:
+            yield {
+                "order_id": order.get("order_id"),
+                "created_at": order.get("created_at"),
+                "status": order.get("status"),
+                "user_id": order.get("user_id"),
+                "truck_id": order.get("truck_id"),
+                "payment_method": order.get("payment_method"),
+                "customer_name": contact.get("name"),
+                "customer_email": contact.get("email"),
+                "city": address.get("city"),
+                "country": address.get("country"),
+                "product_id": item.get("product_id"),
+                "product_name": item.get("name"),
+                "quantity": item.get("quantity"),
+                "weight_kg": item.get("weight_kg"),
+                "price": item.get("price"),
+                "line_total": from_cents(line_total_cents(item.get("price") or 0, item.get("quantity") or 0))
+            }
+
+def _batches(rows: Iterable[dict], size: int = EXPORT_BATCH_SIZE) -> Iterator[List[dict]]:
+    rows = iter(rows)
+    while True:
+        batch = list(itertools.islice(rows, size))
+        if not batch:
+            return
+        yield batch
+
+@profiled()
+def write_export(rows: Iterable[dict], schema: pa.Schema, out: BinaryIO, fmt: str = "csv") -> int:
+    """Write rows to a binary stream as CSV or Parquet one batch at a time; return the row count.
+
+    Only one batch is held in memory, whatever the size of the export.
+    """
+    count = 0
+    if fmt == "parquet":
+        with pq.ParquetWriter(out, schema, compression="zstd") as writer:
+            for batch in _batches(rows):
+                writer.write_table(pa.Table.from_pylist(batch, schema=schema))
+                count += len(batch)
+        return count
+
+    text = io.TextIOWrapper(out, encoding="utf-8", newline="", write_through=True)
+    try:
+        writer = csv.DictWriter(text, fieldnames=schema.names, extrasaction="ignore")
+        writer.writeheader()
+        for batch in _batches(rows):
+            writer.writerows(batch)
+            count += len(batch)
+    finally:
+        # Leave the caller's stream open
+        text.detach()
+    return count
+
+def export_to_file(rows: Iterable[dict], schema: pa.Schema, path: str, fmt: str = "csv") -> int:
+    """Write an export to a file; return the row count."""
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "wb") as out:
+        return write_export(rows, schema, out, fmt)
+
+def main():
+    """Export orders or truck manifests from the command line."""
+    from ..database import get_database
+    from .order_service import OrderService
+    from .truck_service import TruckService
+
+    parser = argparse.ArgumentParser(description="Stream orders or truck manifests to CSV or Parquet.")
+    parser.add_argument("kind", choices=["orders", "manifest"])
+    parser.add_argument("output")
+    parser.add_argument("--format", choices=sorted(EXPORT_FORMATS), default="csv")
+    parser.add_argument("--truck-id")
+    parser.add_argument("--status", help="orders only")
+    parser.add_argument("--from", dest="created_from", type=datetime.fromisoformat, help="orders only, inclusive")
+    parser.add_argument("--to", dest="created_to", type=datetime.fromisoformat, help="orders only, exclusive")
+    args = parser.parse_args()
+
+    db = get_database("analytics")
+    if args.kind == "orders":
+        rows = iter_order_lines(OrderService(db).repository, args.truck_id, args.status, args.created_from, args.created_to)
+        schema = ORDER_LINE_SCHEMA
+    else:
+        rows = TruckService(db).iter_manifest(args.truck_id, batch_size=EXPORT_BATCH_SIZE)
+        schema = MANIFEST_SCHEMA
+    count = export_to_file(rows, schema, args.output, args.format)
+    print(f"wrote {count} rows to {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,261 @@
+import argparse
+import random
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+from bson import ObjectId
+from pymongo import ASCENDING, ReturnDocument
+
+from ..config import (
+    INVENTORY_COLLECTION,
+    INVENTORY_DEFAULT_STOCK,
+    INVENTORY_HOLD_RETENTION_SECONDS,
+    INVENTORY_HOLD_SECONDS,
+    INVENTORY_HOLDS_COLLECTION,
+    INVENTORY_HOT_SKU_SHARDS,
+    INVENTORY_HOT_SKUS
+)
+from ..utils.cache import TTLCache, reference_cache
+from ..utils.profiling import profiled
+
+class OutOfStockError(Exception):
+    """Held stock that could not be sold because the hold expired and the stock is gone."""
+
+    def __init__(self, hold_ids: List[str]):
+        super().__init__(f"out of stock for holds {', '.join(hold_ids)}")
+        self.hold_ids = hold_ids
+
+class InventoryService:
+    """Per-SKU stock counters and the cart holds that reserve from them.
+
+    A SKU's stock is split over one or more counter documents (shards), so
+    reservations on a hot SKU spread their writes instead of queueing on one
+    document. A reservation takes stock with a conditional ``$inc`` and
+    records a hold that expires after INVENTORY_HOLD_SECONDS. Expired holds
+    give their stock back when swept, which happens whenever a reservation
+    runs short. Settled holds are removed by a TTL index on ``settled_at``,
+    so a hold still holding stock is never deleted before it is swept.
+    Products without counters are not tracked and always reserve.
+    """
+
+    def __init__(self, db, cache: Optional[TTLCache] = None, hold_seconds: int = INVENTORY_HOLD_SECONDS):
+        self.stock = db[INVENTORY_COLLECTION]
+        self.holds = db[INVENTORY_HOLDS_COLLECTION]
+        self.cache = cache if cache is not None else reference_cache
+        self.hold_seconds = hold_seconds
+
+    def ensure_indexes(self) -> None:
+        """Create the stock and hold indexes, including the TTL index on settled holds."""
+        self.stock.create_index("product_id")
+        self.holds.create_index([("product_id", ASCENDING), ("state", ASCENDING), ("expires_at", ASCENDING)])
+        self.holds.create_index("owner")
+        self.holds.create_index("settled_at", expireAfterSeconds=INVENTORY_HOLD_RETENTION_SECONDS)
+
+    def set_stock(self, product_id: str, quantity: int, shards: int = 1) -> None:
+        """Replace a SKU's stock with `quantity` units spread evenly over `shards` counters.
+
+        Run this while the SKU is quiet; reservations in flight may land on the old counters.
+        """
+        self.stock.delete_many({"product_id": product_id})
+        self.stock.insert_many([
+            {
+                "_id": f"{product_id}:{shard}",
+                "product_id": product_id,
+                "shard": shard,
+                "available": quantity // shards + (1 if shard < quantity % shards else 0)
+            }
+            for shard in range(shards)
+        ])
+        self.cache.invalidate_namespace("inventory")
+
+    def seed_stock(self, products: List[dict], quantity: int = INVENTORY_DEFAULT_STOCK) -> int:
+        """Give untracked products `quantity` units, sharding the configured hot SKUs; return how many were seeded."""
+        tracked = set(self.stock.distinct("product_id"))
+        seeded = 0
+        for product in products:
+            if product['id'] not in tracked:
+                shards = INVENTORY_HOT_SKU_SHARDS if product['id'] in INVENTORY_HOT_SKUS else 1
+                self.set_stock(product['id'], quantity, shards)
+                seeded += 1
+        return seeded
+
+    def _shard_count(self, product_id: str) -> int:
+        return self.cache.get_or_load(
+            ("inventory", product_id), lambda: self.stock.count_documents({"product_id": product_id})
+        )
+
+    def stock_levels(self, product_ids: List[str]) -> Dict[str, int]:
+        """Return the units available per tracked product; untracked products are left out."""
+        levels = self.stock.aggregate([
+            {"$match": {"product_id": {"$in": product_ids}}},
+            {"$group": {"_id": "$product_id", "available": {"$sum": "$available"}}}
+        ])
+        return {level["_id"]: level["available"] for level in levels}
+
+    @profiled()
+    def reserve(self, product_id: str, quantity: int, owner: str, session=None) -> Optional[dict]:
+        """Hold `quantity` units for an owner's cart; return the hold, or None if there is not enough stock."""
+        shards = self._shard_count(product_id)
+        takes: List[dict] = []
+        if shards:
+            takes = self._take(product_id, quantity, shards, session)
+            if takes is None and self.release_expired(product_id):
+                takes = self._take(product_id, quantity, shards, session)
+            if takes is None:
+                return None
+        now = datetime.now()
+        hold = {
+            "_id": ObjectId(),
+            "product_id": product_id,
+            "owner": owner,
+            "quantity": quantity,
+            "takes": takes,
+            "state": "held",
+            "created_at": now,
+            "expires_at": now + timedelta(seconds=self.hold_seconds)
+        }
+        self.holds.insert_one(hold, session=session)
+        return hold
+
+    def _take(self, product_id: str, quantity: int, shards: int, session) -> Optional[List[dict]]:
+        """Take `quantity` units from the counters, or nothing; return the units taken per shard."""
+        # Fast path: one counter with enough stock, starting at a random one so concurrent carts spread out
+        start = random.randrange(shards)
+        for offset in range(shards):
+            shard = (start + offset) % shards
+            result = self.stock.update_one(
+                {"_id": f"{product_id}:{shard}", "available": {"$gte": quantity}},
+                {"$inc": {"available": -quantity}},
+                session=session
+            )
+            if result.modified_count:
+                return [{"shard": shard, "quantity": quantity}]
+        if shards == 1:
+            return None
+
+        # Slow path: the stock left is spread thin, so gather it from several counters
+        takes = []
+        remaining = quantity
+        for counter in self.stock.find({"product_id": product_id, "available": {"$gt": 0}}, session=session):
+            take = min(counter["available"], remaining)
+            counter = self.stock.find_one_and_update(
+                {"_id": counter["_id"], "available": {"$gte": take}},
+                {"$inc": {"available": -take}},
+                session=session
+            )
+            if counter is not None:
+                takes.append({"shard": counter["shard"], "quantity": take})
+                remaining -= take
+            if remaining == 0:
+                return takes
+        self._give_back(product_id, takes, session)
+        return None
+
+    def _give_back(self, product_id: str, takes: List[dict], session=None) -> None:
+        shards = self._shard_count(product_id)
+        for take in takes:
+            # A SKU resharded since the hold was taken returns its units to the shard that now covers it
+            self.stock.update_one(
+                {"_id": f"{product_id}:{take['shard'] % max(shards, 1)}"},
+                {"$inc": {"available": take["quantity"]}},
+                session=session
+            )
+
+    def _settle(self, hold_id, state: str, extra_filter: Optional[dict] = None, session=None) -> Optional[dict]:
+        """Move a held hold to `state`; return it, or None if it was already settled."""
+        return self.holds.find_one_and_update(
+            {"_id": ObjectId(hold_id), "state": "held", **(extra_filter or {})},
+            {"$set": {"state": state, "settled_at": datetime.now()}},
+            return_document=ReturnDocument.AFTER,
+            session=session
+        )
+
+    def release(self, hold_id, session=None) -> bool:
+        """Give a hold's stock back, e.g. when the item leaves the cart."""
+        hold = self._settle(hold_id, "released", session=session)
+        if hold is None:
+            return False
+        self._give_back(hold["product_id"], hold["takes"], session)
+        return True
+
+    def commit(self, hold_ids: List[str], session=None) -> List[str]:
+        """Turn holds into sales; return the ids of holds whose stock is gone.
+
+        Committing a committed hold is a no-op, so a repeated checkout is safe.
+        A hold that expired and was swept takes its stock again if it is still there.
+        """
+        failed = []
+        for hold_id in hold_ids:
+            if self._settle(hold_id, "committed", session=session) is not None:
+                continue
+            hold = self.holds.find_one_and_update(
+                {"_id": ObjectId(hold_id), "state": "expired"}, {"$set": {"state": "renewing"}},
+                return_document=ReturnDocument.AFTER, session=session
+            )
+            if hold is None:
+                hold = self.holds.find_one({"_id": ObjectId(hold_id)}, {"state": 1}, session=session)
+                if hold is None or hold["state"] != "committed":
+                    failed.append(hold_id)
+                continue
+            shards = self._shard_count(hold["product_id"])
+            takes = self._take(hold["product_id"], hold["quantity"], shards, session) if shards else []
+            if takes is None:
+                self.holds.update_one({"_id": hold["_id"]}, {"$set": {"state": "expired"}}, session=session)
+                failed.append(hold_id)
+                continue
+            self.holds.update_one(
+                {"_id": hold["_id"]},
+                {"$set": {"state": "committed", "takes": takes, "settled_at": datetime.now()}},
+                session=session
+            )
+        return failed
+
+    def reopen(self, hold_ids: List[str], session=None) -> int:
+        """Put committed holds back on hold, undoing commit() when the sale did not go through."""
+        result = self.holds.update_many(
+            {"_id": {"$in": [ObjectId(hold_id) for hold_id in hold_ids]}, "state": "committed"},
+            {"$set": {"state": "held"}, "$unset": {"settled_at": ""}},
+            session=session
+        )
+        return result.modified_count
+
+    def release_expired(self, product_id: Optional[str] = None, now: Optional[datetime] = None) -> int:
+        """Give the stock of expired holds back; return how many holds were released."""
+        query = {"state": "held", "expires_at": {"$lt": now or datetime.now()}}
+        if product_id is not None:
+            query["product_id"] = product_id
+        released = 0
+        for hold in self.holds.find(query, {"_id": 1}):
+            # The state check claims the hold, so a concurrent sweep or checkout cannot return it twice
+            hold = self._settle(hold["_id"], "expired", {"expires_at": query["expires_at"]})
+            if hold is not None:
+                self._give_back(hold["product_id"], hold["takes"])
+                released += 1
+        return released
+
+def main():
+    """Sweep expired holds, show stock levels or set a SKU's stock."""
+    from ..database import get_database
+
+    parser = argparse.ArgumentParser(description="Manage per-SKU stock and cart holds.")
+    parser.add_argument("command", choices=["sweep", "levels", "set"])
+    parser.add_argument("--product-id", help="set only")
+    parser.add_argument("--quantity", type=int, help="set only")
+    parser.add_argument("--shards", type=int, default=1, help="set only; more shards for hot SKUs")
+    args = parser.parse_args()
+
+    service = InventoryService(get_database())
+    service.ensure_indexes()
+    if args.command == "sweep":
+        print(f"released {service.release_expired()} expired holds")
+    elif args.command == "levels":
+        for product_id, available in sorted(service.stock_levels(service.stock.distinct("product_id")).items()):
+            print(f"{product_id}\t{available}")
+    else:
+        if not args.product_id or args.quantity is None:
+            parser.error("set needs --product-id and --quantity")
+        service.set_stock(args.product_id, args.quantity, args.shards)
+        print(f"{args.product_id}: {args.quantity} units over {args.shards} shards")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,241 @@
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+from bson import ObjectId
+from pymongo import ASCENDING, DESCENDING, ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+from ..config import (
+    JOB_MAX_ATTEMPTS,
+    JOB_METRICS_WINDOW_SECONDS,
+    JOB_RETENTION_SECONDS,
+    JOB_RETRY_BACKOFF_SECONDS,
+    JOB_VISIBILITY_TIMEOUT_SECONDS,
+    JOBS_COLLECTION
+)
+
+JOB_STATES = ["queued", "running", "succeeded", "dead"]
+
+# Job name -> handler(payload, context) returning a BSON-serializable result or None
+HANDLERS: Dict[str, Callable[[dict, Any], Any]] = {}
+
+def job_handler(name: str):
+    """Register a function as the handler for jobs with this name."""
+    def register(fn):
+        HANDLERS[name] = fn
+        return fn
+    return register
+
+class JobQueue:
+    """A durable job queue in a MongoDB collection.
+
+    Jobs become available at their run_at time and are leased highest
+    priority first with one atomic find_one_and_update. A lease hides the
+    job until its visibility timeout; a worker that dies without finishing
+    lets the job reappear, and the next lease counts as another attempt.
+    Failed attempts are retried with exponential backoff until max_attempts,
+    then the job is dead. Finished jobs are removed by a TTL index.
+    """
+
+    def __init__(self, db, visibility_timeout: int = JOB_VISIBILITY_TIMEOUT_SECONDS,
+                 backoff_seconds: float = JOB_RETRY_BACKOFF_SECONDS):
+        self.jobs = db[JOBS_COLLECTION]
+        self.visibility_timeout = visibility_timeout
+        self.backoff_seconds = backoff_seconds
+
+    def ensure_indexes(self) -> None:
+        """Create the lease, dedupe, lookup and retention indexes."""
+        self.jobs.create_index([("state", ASCENDING), ("priority", DESCENDING), ("available_at", ASCENDING)])
+        self.jobs.create_index([("name", ASCENDING), ("state", ASCENDING), ("finished_at", DESCENDING)])
+        # Only unfinished jobs carry an active_key, so a key can be reused once its job is done
+        self.jobs.create_index(
+            "active_key", unique=True, partialFilterExpression={"active_key": {"$type": "string"}}
+        )
+        self.jobs.create_index("finished_at", expireAfterSeconds=JOB_RETENTION_SECONDS)
+
+    def enqueue(self, name: str, payload: Optional[dict] = None, priority: int = 0,
+                run_at: Optional[datetime] = None, max_attempts: int = JOB_MAX_ATTEMPTS,
+                dedupe_key: Optional[str] = None) -> ObjectId:
+        """Queue a job and return its id.
+
+        With a dedupe_key, a job with the same key that is still queued or
+        running is returned instead of queueing another.
+        """
+        now = datetime.now()
+        job = {
+            "_id": ObjectId(),
+            "name": name,
+            "payload": payload or {},
+            "priority": priority,
+            "state": "queued",
+            "attempts": 0,
+            "max_attempts": max_attempts,
+            "enqueued_at": now,
+            "available_at": run_at or now
+        }
+        if dedupe_key is not None:
+            job["active_key"] = dedupe_key
+        try:
+            self.jobs.insert_one(job)
+        except DuplicateKeyError:
+            existing = self.jobs.find_one({"active_key": dedupe_key}, {"_id": 1})
+            if existing is not None:
+                return existing["_id"]
+            return self.enqueue(name, payload, priority, run_at, max_attempts, dedupe_key)
+        return job["_id"]
+
+    def lease(self, worker_id: str, names: Optional[List[str]] = None,
+              now: Optional[datetime] = None) -> Optional[dict]:
+        """Lease the most urgent available job for a worker, or return None if there is none.
+
+        The leased job carries ``ready_at``, the time it became available for
+        this attempt; it is stored when the attempt finishes, for queue wait metrics.
+        """
+        while True:
+            now = now or datetime.now()
+            query = {"state": {"$in": ["queued", "running"]}, "available_at": {"$lte": now}}
+            if names:
+                query["name"] = {"$in": names}
+            leased = {
+                "state": "running",
+                "leased_by": worker_id,
+                "started_at": now,
+                "available_at": now + timedelta(seconds=self.visibility_timeout)
+            }
+            # The document before the update still holds when this attempt became available
+            job = self.jobs.find_one_and_update(
+                query,
+                {"$set": leased, "$inc": {"attempts": 1}},
+                sort=[("priority", DESCENDING), ("available_at", ASCENDING)],
+                return_document=ReturnDocument.BEFORE
+            )
+            if job is None:
+                return None
+            job = dict(job, ready_at=job["available_at"], attempts=job["attempts"] + 1, **leased)
+            if job["attempts"] <= job["max_attempts"]:
+                return job
+            # Its last lease ran out without the job finishing, so it has used up its attempts
+            self._update_leased(job, "dead", {
+                "last_error": "visibility timeout expired on the last attempt", "finished_at": now
+            })
+
+    def _update_leased(self, job: dict, state: str, fields: dict) -> bool:
+        """Update a job only while the worker still holds its lease; return False if the lease was lost."""
+        update = {"$set": dict(fields, state=state, ready_at=job["ready_at"])}
+        if state in ("succeeded", "dead"):
+            update["$unset"] = {"active_key": ""}
+        # leased_by and attempts fence off a worker whose lease expired and was taken over
+        result = self.jobs.update_one(
+            {"_id": job["_id"], "state": "running", "leased_by": job["leased_by"], "attempts": job["attempts"]},
+            update
+        )
+        return result.modified_count > 0
+
+    def complete(self, job: dict, result: Any = None) -> bool:
+        """Record a leased job's result."""
+        return self._update_leased(job, "succeeded", {"result": result, "finished_at": datetime.now()})
+
+    def fail(self, job: dict, error: str) -> bool:
+        """Record a failed attempt, scheduling a retry with backoff or giving up after max_attempts."""
+        now = datetime.now()
+        if job["attempts"] >= job["max_attempts"]:
+            return self._update_leased(job, "dead", {"last_error": error, "finished_at": now})
+        delay = self.backoff_seconds * 2 ** (job["attempts"] - 1)
+        return self._update_leased(job, "queued", {"last_error": error, "available_at": now + timedelta(seconds=delay)})
+
+    def extend(self, job: dict, seconds: Optional[int] = None) -> bool:
+        """Push back a leased job's visibility timeout, for handlers that run long."""
+        deadline = datetime.now() + timedelta(seconds=seconds or self.visibility_timeout)
+        return self._update_leased(job, "running", {"available_at": deadline})
+
+    def get(self, job_id) -> Optional[dict]:
+        """Return a job by id."""
+        return self.jobs.find_one({"_id": ObjectId(job_id)})
+
+    def latest_result(self, name: str, payload: Optional[dict] = None) -> Optional[dict]:
+        """Return the most recently finished successful job with this name (and payload, if given)."""
+        query = {"name": name, "state": "succeeded"}
+        if payload is not None:
+            query.update({f"payload.{key}": value for key, value in payload.items()})
+        return self.jobs.find_one(query, sort=[("finished_at", DESCENDING)])
+
+    def is_pending(self, name: str, payload: Optional[dict] = None) -> bool:
+        """Return whether a job with this name (and payload, if given) is queued or running."""
+        query = {"name": name, "state": {"$in": ["queued", "running"]}}
+        if payload is not None:
+            query.update({f"payload.{key}": value for key, value in payload.items()})
+        return self.jobs.count_documents(query, limit=1) > 0
+
+    def metrics(self, now: Optional[datetime] = None, window_seconds: int = JOB_METRICS_WINDOW_SECONDS) -> dict:
+        """Return queue depth by state, the ready backlog and per-job-name latency over a recent window.
+
+        Wait is from when a job's last attempt became available (its run_at,
+        retry backoff or expired lease) to when that attempt started; run time
+        is from that start to when it finished.
+        """
+        now = now or datetime.now()
+        depth = {state: 0 for state in JOB_STATES}
+        for row in self.jobs.aggregate([{"$group": {"_id": "$state", "count": {"$sum": 1}}}]):
+            depth[row["_id"]] = row["count"]
+        ready_query = {"state": {"$in": ["queued", "running"]}, "available_at": {"$lte": now}}
+        oldest = self.jobs.find_one(ready_query, {"available_at": 1}, sort=[("available_at", ASCENDING)])
+
+        timings: Dict[str, Dict[str, list]] = {}
+        finished = self.jobs.find(
+            {"state": {"$in": ["succeeded", "dead"]}, "finished_at": {"$gte": now - timedelta(seconds=window_seconds)}},
+            {"name": 1, "state": 1, "enqueued_at": 1, "ready_at": 1, "started_at": 1, "finished_at": 1, "attempts": 1}
+        )
+        for job in finished:
+            row = timings.setdefault(job["name"], {"wait": [], "run": [], "dead": [], "attempts": []})
+            ready_at = job.get("ready_at") or job["enqueued_at"]
+            row["wait"].append((job["started_at"] - ready_at).total_seconds() * 1000)
+            row["run"].append((job["finished_at"] - job["started_at"]).total_seconds() * 1000)
+            row["dead"].append(job["state"] == "dead")
+            row["attempts"].append(job["attempts"])
+        latency = []
+        for name, row in sorted(timings.items()):
+            wait, run = np.array(row["wait"]), np.array(row["run"])
+            latency.append({
+                "name": name,
+                "finished": len(wait),
+                "dead": int(sum(row["dead"])),
+                "avg_attempts": float(np.mean(row["attempts"])),
+                "wait_p50_ms": float(np.percentile(wait, 50)),
+                "wait_p95_ms": float(np.percentile(wait, 95)),
+                "run_p50_ms": float(np.percentile(run, 50)),
+                "run_p95_ms": float(np.percentile(run, 95))
+            })
+        return {
+            "depth": depth,
+            "ready": self.jobs.count_documents(ready_query),
+            "oldest_ready_seconds": (now - oldest["available_at"]).total_seconds() if oldest else 0.0,
+            "latency": latency
+        }
+
+    def render_prometheus(self, now: Optional[datetime] = None) -> str:
+        """Render metrics() in the Prometheus text exposition format."""
+        metrics = self.metrics(now)
+        lines = [
+            "# HELP crowdcargo_jobs Jobs in the queue by state.",
+            "# TYPE crowdcargo_jobs gauge"
+        ]
+        lines.extend(f'crowdcargo_jobs{{state="{state}"}} {count}' for state, count in metrics["depth"].items())
+        lines += [
+            "# HELP crowdcargo_jobs_ready Jobs available to lease now.",
+            "# TYPE crowdcargo_jobs_ready gauge",
+            f"crowdcargo_jobs_ready {metrics['ready']}",
+            "# HELP crowdcargo_jobs_oldest_ready_seconds Age of the longest-waiting available job.",
+            "# TYPE crowdcargo_jobs_oldest_ready_seconds gauge",
+            f"crowdcargo_jobs_oldest_ready_seconds {metrics['oldest_ready_seconds']}"
+        ]
+        for metric, help_text in [("wait", "Queue wait since becoming available"), ("run", "Run time")]:
+            lines.append(f"# HELP crowdcargo_job_{metric}_ms {help_text} of recently finished jobs in milliseconds.")
+            lines.append(f"# TYPE crowdcargo_job_{metric}_ms summary")
+            for row in metrics["latency"]:
+                for quantile in ("50", "95"):
+                    lines.append(
+                        f'crowdcargo_job_{metric}_ms{{name="{row["name"]}",quantile="0.{quantile}"}} '
+                        f'{row[f"{metric}_p{quantile}_ms"]}'
+                    )
+        return "\n".join(lines) + "\n"
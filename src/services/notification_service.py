@@ -0,0 +1,64 @@
+import logging
+import smtplib
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
+from ..models.order import Order
+from ..config import EMAIL_SENDER, SMTP_PASSWORD, SMTP_PORT, SMTP_SERVER, SMTP_USE_TLS, SMTP_USERNAME
+from ..utils.helpers import format_currency, format_weight
+
+logger = logging.getLogger(__name__)
+
+def send_email(to_email: str, subject: str, html_body: str) -> bool:
+    """Send an HTML email, returning False instead of raising if delivery fails."""
+    message = MIMEMultipart("alternative")
+    message["Subject"] = subject
+    message["From"] = EMAIL_SENDER
+    message["To"] = to_email
+    message.attach(MIMEText(html_body, "html"))
+    try:
+        with smtplib.SMTP(SMTP_SERVER, SMTP_PORT, timeout=10) as server:
+            if SMTP_USE_TLS:
+                server.starttls()
+            if SMTP_USERNAME and SMTP_PASSWORD:
+                server.login(SMTP_USERNAME, SMTP_PASSWORD)
+            server.sendmail(EMAIL_SENDER, [to_email], message.as_string())
+        return True
+    except (smtplib.SMTPException, OSError) as e:
+        logger.warning("Failed to send email to %s: %s", to_email, e)
+        return False
+
+def send_order_confirmation(order: Order, email: str) -> bool:
+    """Email the customer a summary of a newly placed order."""
+    items = "".join(
+        f"<li>{item.name} x{item.quantity} ({format_weight(item.weight_kg * item.quantity)})</li>"
+        for item in order.items
+    )
+    return send_email(
+        email,
+        f"CrowdCargo order {order.order_id} confirmed",
+        f"""
+        <html>
+            <body>
+                <h2>Thank you for your order!</h2>
+                <p>Order ID: {order.order_id}</p>
+                <ul>{items}</ul>
+                <p>Total: {format_currency(order.total_price, order.currency)}</p>
+            </body>
+        </html>
+        """
+    )
+
+def send_status_update(order: Order, email: str) -> bool:
+    """Email the customer when an order changes status."""
+    return send_email(
+        email,
+        f"CrowdCargo order {order.order_id} is now {order.status}",
+        f"""
+        <html>
+            <body>
+                <h2>Your order status has changed</h2>
+                <p>Order {order.order_id} is now <strong>{order.status.title()}</strong>.</p>
+            </body>
+        </html>
+        """
+    )
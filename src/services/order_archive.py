@@ -0,0 +1,213 @@
+import argparse
+import os
+import shutil
+import uuid
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Iterable, Iterator, List, Optional
+
+import pyarrow as pa
+import pyarrow.dataset as ds
+from bson import json_util
+
+from ..config import ARCHIVE_AFTER_DAYS, ARCHIVE_DIR
+from ..repositories.order_repository import OrderRepository
+from ..utils.profiling import profiled
+
+ARCHIVE_BATCH_SIZE = 10_000
+ARCHIVE_STATUS = "delivered"
+
+ITEM_TYPE = pa.struct([
+    ("product_id", pa.string()),
+    ("name", pa.string()),
+    ("quantity", pa.int64()),
+    ("weight_kg", pa.float64()),
+    ("price", pa.float64()),
+    ("currency", pa.string())
+])
+ORDER_SCHEMA = pa.schema([
+    ("order_id", pa.string()),
+    ("user_id", pa.string()),
+    ("items", pa.list_(ITEM_TYPE)),
+    ("total_weight_kg", pa.float64()),
+    ("total_price", pa.float64()),
+    ("currency", pa.string()),
+    ("status", pa.string()),
+    ("shipping_plan", pa.string()),
+    ("payment_method", pa.string()),
+    ("truck_id", pa.string()),
+    ("created_at", pa.timestamp("us")),
+    ("updated_at", pa.timestamp("us")),
+    ("shipping_address", pa.map_(pa.string(), pa.string())),
+    ("contact_info", pa.map_(pa.string(), pa.string())),
+    # Any other document fields as MongoDB extended JSON, so datetimes, ObjectIds and Decimal128s come back typed
+    ("extra", pa.string()),
+    ("created_month", pa.string())
+])
+# Naive datetimes, like the rest of the app; archives written as plain JSON still read back
+EXTRA_JSON_OPTIONS = json_util.JSONOptions(json_mode=json_util.JSONMode.RELAXED, tz_aware=False)
+PARTITIONING = ds.partitioning(pa.schema([("created_month", pa.string())]), flavor="hive")
+MAP_FIELDS = ("shipping_address", "contact_info")
+
+def _to_row(order: dict) -> dict:
+    row = {name: order.get(name) for name in ORDER_SCHEMA.names if name not in ("extra", "created_month")}
+    row["items"] = [{field.name: item.get(field.name) for field in ITEM_TYPE} for item in order.get("items") or []]
+    for name in MAP_FIELDS:
+        row[name] = [(key, str(value)) for key, value in (order.get(name) or {}).items()]
+    extra = {key: value for key, value in order.items() if key not in ORDER_SCHEMA.names and key != "_id"}
+    row["extra"] = json_util.dumps(extra, json_options=EXTRA_JSON_OPTIONS) if extra else None
+    row["created_month"] = order["created_at"].strftime("%Y-%m")
+    return row
+
+def _from_row(row: dict) -> dict:
+    order = {name: value for name, value in row.items() if name not in ("extra", "created_month")}
+    for name in MAP_FIELDS:
+        order[name] = dict(order[name] or [])
+    if row.get("extra"):
+        order.update(json_util.loads(row["extra"], json_options=EXTRA_JSON_OPTIONS))
+    return order
+
+class OrderArchive:
+    """Delivered orders moved out of the live collection into month-partitioned Parquet.
+
+    Files live under ``created_month=YYYY-MM/`` (hive layout) and are zstd
+    compressed, so date-range reads only open the months they need.
+    """
+
+    def __init__(self, root: str = ARCHIVE_DIR):
+        self.root = Path(root)
+
+    def _dataset(self) -> Optional[ds.Dataset]:
+        if not self.root.exists():
+            return None
+        # Staging directories start with "." and are skipped by the dataset discovery
+        return ds.dataset(self.root, schema=ORDER_SCHEMA, format="parquet", partitioning=PARTITIONING)
+
+    def _write(self, orders: List[dict], run_id: str, batch_number: int) -> None:
+        """Write one batch into a staging directory, then move the finished files into place."""
+        table = pa.Table.from_pylist([_to_row(order) for order in orders], schema=ORDER_SCHEMA)
+        staging = self.root / f".staging-{run_id}-{batch_number}"
+        ds.write_dataset(
+            table, staging, format="parquet", partitioning=PARTITIONING,
+            basename_template=f"part-{run_id}-{batch_number}-{{i}}.parquet",
+            file_options=ds.ParquetFileFormat().make_write_options(compression="zstd")
+        )
+        for path in staging.rglob("*.parquet"):
+            target = self.root / path.relative_to(staging)
+            target.parent.mkdir(parents=True, exist_ok=True)
+            os.replace(path, target)
+        shutil.rmtree(staging, ignore_errors=True)
+
+    @profiled()
+    def archive(self, repository: OrderRepository, older_than_days: int = ARCHIVE_AFTER_DAYS,
+                now: Optional[datetime] = None, dry_run: bool = False) -> int:
+        """Move delivered orders not updated for `older_than_days` into the archive; return how many moved.
+
+        Each batch is deleted from the live store only after its files are in
+        place. If a run dies in between, the orders exist in both places and
+        readers prefer the live copy.
+        """
+        cutoff = (now or datetime.now()) - timedelta(days=older_than_days)
+        self.root.mkdir(parents=True, exist_ok=True)
+        run_id = f"{datetime.now():%Y%m%d%H%M%S}-{uuid.uuid4().hex[:8]}"
+        moved = 0
+        batch = []
+        batch_number = 0
+        for order in repository.iter_updated_before(ARCHIVE_STATUS, cutoff):
+            batch.append(order)
+            if len(batch) >= ARCHIVE_BATCH_SIZE:
+                moved += self._move(repository, batch, run_id, batch_number, dry_run)
+                batch_number += 1
+                batch = []
+        if batch:
+            moved += self._move(repository, batch, run_id, batch_number, dry_run)
+        return moved
+
+    def _move(self, repository: OrderRepository, batch: List[dict], run_id: str, batch_number: int, dry_run: bool) -> int:
+        if dry_run:
+            return len(batch)
+        self._write(batch, run_id, batch_number)
+        repository.delete([order["order_id"] for order in batch])
+        return len(batch)
+
+    def _filter(self, start: Optional[datetime], end: Optional[datetime]):
+        # The created_month comparisons prune whole partitions before any file is opened
+        expression = None
+        if start is not None:
+            expression = (ds.field("created_month") >= start.strftime("%Y-%m")) & (ds.field("created_at") >= start)
+        if end is not None:
+            upper = (ds.field("created_month") <= end.strftime("%Y-%m")) & (ds.field("created_at") < end)
+            expression = upper if expression is None else expression & upper
+        return expression
+
+    def read_table(self, start: Optional[datetime] = None, end: Optional[datetime] = None,
+                   columns: Optional[List[str]] = None) -> pa.Table:
+        """Read archived orders created in [start, end) as an Arrow table."""
+        dataset = self._dataset()
+        if dataset is None:
+            return ORDER_SCHEMA.empty_table().select(columns) if columns else ORDER_SCHEMA.empty_table()
+        return dataset.to_table(columns=columns, filter=self._filter(start, end))
+
+    def iter_orders(self, start: Optional[datetime] = None, end: Optional[datetime] = None) -> Iterator[dict]:
+        """Iterate over archived orders created in [start, end) as order documents."""
+        dataset = self._dataset()
+        if dataset is None:
+            return
+        for batch in dataset.to_batches(filter=self._filter(start, end)):
+            for row in batch.to_pylist():
+                yield _from_row(row)
+
+    def get_order(self, order_id: str) -> Optional[dict]:
+        """Look up one archived order by order_id."""
+        dataset = self._dataset()
+        if dataset is None:
+            return None
+        rows = dataset.to_table(filter=ds.field("order_id") == order_id).to_pylist()
+        return _from_row(rows[0]) if rows else None
+
+    def partitions(self) -> List[str]:
+        """Return the archived months, oldest first."""
+        if not self.root.exists():
+            return []
+        return sorted(path.name.split("=", 1)[1] for path in self.root.glob("created_month=*"))
+
+def iter_order_history(repository: OrderRepository, archive: OrderArchive,
+                       start: Optional[datetime] = None, end: Optional[datetime] = None) -> Iterator[dict]:
+    """Iterate over live and archived orders created in [start, end), live copies first."""
+    # The date range is pushed down to the live store rather than filtered after a full scan
+    return merge_archived(repository.iter_projected({}, None, start, end), archive, start, end)
+
+def merge_archived(live_orders: Iterable[dict], archive: OrderArchive,
+                   start: Optional[datetime] = None, end: Optional[datetime] = None) -> Iterator[dict]:
+    """Iterate over already loaded live orders, then the archived orders not among them, created in [start, end)."""
+    live_ids = set()
+    for order in live_orders:
+        created_at = order.get("created_at")
+        if (start is not None and created_at < start) or (end is not None and created_at >= end):
+            continue
+        live_ids.add(order["order_id"])
+        yield order
+    for order in archive.iter_orders(start, end):
+        if order["order_id"] not in live_ids:
+            yield order
+
+def main():
+    """Archive delivered orders from the command line."""
+    from ..database import get_database
+    from .order_service import OrderService
+
+    parser = argparse.ArgumentParser(description="Move old delivered orders from MongoDB into the Parquet archive.")
+    parser.add_argument("--older-than-days", type=int, default=ARCHIVE_AFTER_DAYS)
+    parser.add_argument("--root", default=ARCHIVE_DIR)
+    parser.add_argument("--dry-run", action="store_true", help="only count the orders that would move")
+    args = parser.parse_args()
+
+    archive = OrderArchive(args.root)
+    moved = archive.archive(
+        OrderService(get_database()).repository, older_than_days=args.older_than_days, dry_run=args.dry_run
+    )
+    print(f"{'would archive' if args.dry_run else 'archived'} {moved} delivered orders older than "
+          f"{args.older_than_days} days into {args.root}")
+
+if __name__ == "__main__":
+    main()
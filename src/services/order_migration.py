@@ -0,0 +1,155 @@
+import argparse
+import time
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+from bson import BSON
+from pymongo import ASCENDING, UpdateOne
+
+from ..config import MIGRATIONS_COLLECTION, ORDER_MIGRATION_BATCH_SIZE, ORDERS_COLLECTION
+from ..repositories import order_schema
+
+MIGRATION_NAME = "orders_v2"
+# A document that changed between being read and rewritten is read again, this many times at most
+MAX_CONFLICT_RETRIES = 3
+
+def bson_size(document: dict) -> int:
+    return len(BSON.encode(document))
+
+class OrderMigration:
+    """Rewrite stored orders in the version 2 layout, in _id order and in batches.
+
+    Progress is checkpointed after every batch in the migrations collection,
+    so an interrupted run resumes where it stopped. Only the fields whose
+    layout changes are written, and only while the fields being dropped are
+    still empty, so status updates made by the running app are never lost.
+    """
+
+    def __init__(self, db, batch_size: int = ORDER_MIGRATION_BATCH_SIZE, name: str = MIGRATION_NAME):
+        self.orders = db[ORDERS_COLLECTION]
+        self.checkpoints = db[MIGRATIONS_COLLECTION]
+        self.batch_size = batch_size
+        self.name = name
+
+    def checkpoint(self) -> Optional[dict]:
+        return self.checkpoints.find_one({"_id": self.name})
+
+    def pending(self) -> int:
+        """Count the orders still in the original layout."""
+        return self.orders.count_documents({"v": {"$exists": False}})
+
+    def _plan(self, document: dict) -> UpdateOne:
+        """Return the update that converts one original-layout order."""
+        encoded = order_schema.encode(document)
+        changed = {field: value for field, value in encoded.items() if document.get(field, object()) != value}
+        dropped = [field for field in document if field not in encoded]
+        query = {"_id": document["_id"], "v": {"$exists": False}}
+        # Optional fields are dropped because they are empty; skip the order if the app has just set one
+        query.update({field: None for field in dropped if field in order_schema.OPTIONAL_FIELDS})
+        update = {"$set": changed}
+        if dropped:
+            update["$unset"] = {field: "" for field in dropped}
+        return UpdateOne(query, update)
+
+    def _migrate_batch(self, documents: List[dict], dry_run: bool) -> int:
+        migrated = 0
+        for _ in range(MAX_CONFLICT_RETRIES):
+            documents = [document for document in documents if "v" not in document]
+            if not documents:
+                break
+            if dry_run:
+                return len(documents)
+            result = self.orders.bulk_write([self._plan(document) for document in documents], ordered=False)
+            migrated += result.matched_count
+            if result.matched_count == len(documents):
+                break
+            documents = list(self.orders.find({"_id": {"$in": [document["_id"] for document in documents]}}))
+        return migrated
+
+    def run(self, dry_run: bool = False, restart: bool = False, limit: int = 0,
+            progress: Optional[Callable[[dict], None]] = None) -> dict:
+        """Migrate orders after the last checkpoint (from the start with `restart`) and return run stats."""
+        checkpoint = None if restart else self.checkpoint()
+        last_id = checkpoint.get("last_id") if checkpoint else None
+        stats = {
+            "scanned": 0, "migrated": 0, "remaining": self.pending(), "started_at": time.perf_counter(),
+            "total_migrated": checkpoint.get("migrated", 0) if checkpoint else 0
+        }
+        while not limit or stats["scanned"] < limit:
+            query = {"_id": {"$gt": last_id}} if last_id is not None else {}
+            batch = list(self.orders.find(query).sort("_id", ASCENDING).limit(self.batch_size))
+            if not batch:
+                break
+            migrated = self._migrate_batch(batch, dry_run)
+            last_id = batch[-1]["_id"]
+            stats["scanned"] += len(batch)
+            stats["migrated"] += migrated
+            stats["remaining"] = max(stats["remaining"] - migrated, 0)
+            if not dry_run:
+                stats["total_migrated"] += migrated
+                self.checkpoints.update_one({"_id": self.name}, {"$set": {
+                    "last_id": last_id, "migrated": stats["total_migrated"], "updated_at": datetime.now()
+                }}, upsert=True)
+            if progress is not None:
+                progress(stats)
+        if not dry_run and (not limit or stats["scanned"] < limit):
+            self.checkpoints.update_one(
+                {"_id": self.name}, {"$set": {"finished_at": datetime.now()}}, upsert=True
+            )
+        stats["seconds"] = time.perf_counter() - stats.pop("started_at")
+        return stats
+
+def size_report(collection, sample: int = 1000) -> Dict[str, float]:
+    """Compare the BSON size of sampled orders in the original and version 2 layouts."""
+    original, compact = [], []
+    for document in collection.find().limit(sample):
+        document = order_schema.decode(document)
+        original.append(bson_size(document))
+        compact.append(bson_size(order_schema.encode(document)))
+    if not original:
+        return {"orders": 0}
+    return {
+        "orders": len(original),
+        "avg_v1_bytes": sum(original) / len(original),
+        "avg_v2_bytes": sum(compact) / len(compact),
+        "saved_percent": 100 * (1 - sum(compact) / sum(original))
+    }
+
+def print_progress(stats: dict) -> None:
+    rate = stats["migrated"] / max(time.perf_counter() - stats["started_at"], 1e-9)
+    eta = stats["remaining"] / rate if rate else float("inf")
+    print(f"scanned {stats['scanned']}, migrated {stats['migrated']} ({rate:,.0f}/s), "
+          f"{stats['remaining']} remaining, ETA {eta:,.0f}s", flush=True)
+
+def main():
+    """Migrate orders or report the storage saving from the command line."""
+    from ..database import get_database
+
+    parser = argparse.ArgumentParser(description="Rewrite stored orders in the compact version 2 layout.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    migrate = commands.add_parser("migrate", help="convert orders, resuming from the last checkpoint")
+    migrate.add_argument("--batch-size", type=int, default=ORDER_MIGRATION_BATCH_SIZE)
+    migrate.add_argument("--limit", type=int, default=0, help="stop after scanning this many orders")
+    migrate.add_argument("--restart", action="store_true", help="ignore the checkpoint and scan from the start")
+    migrate.add_argument("--dry-run", action="store_true", help="only count the orders that would change")
+    report = commands.add_parser("report", help="compare order sizes in both layouts")
+    report.add_argument("--sample", type=int, default=1000)
+    args = parser.parse_args()
+
+    db = get_database()
+    if args.command == "report":
+        sizes = size_report(db[ORDERS_COLLECTION], args.sample)
+        migration = OrderMigration(db)
+        print(f"{migration.pending()} orders in the original layout")
+        if sizes["orders"]:
+            print(f"sampled {sizes['orders']} orders: {sizes['avg_v1_bytes']:,.0f} bytes in v1, "
+                  f"{sizes['avg_v2_bytes']:,.0f} bytes in v2 ({sizes['saved_percent']:.1f}% smaller)")
+        return
+    stats = OrderMigration(db, args.batch_size).run(
+        dry_run=args.dry_run, restart=args.restart, limit=args.limit, progress=print_progress
+    )
+    print(f"{'would migrate' if args.dry_run else 'migrated'} {stats['migrated']} of {stats['scanned']} "
+          f"orders scanned in {stats['seconds']:.1f}s")
+
+if __name__ == "__main__":
+    main()
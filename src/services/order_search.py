@@ -0,0 +1,73 @@
+import logging
+import threading
+from datetime import date, datetime, time, timedelta
+from typing import Optional
+
+from ..config import SEARCH_PAGE_SIZE, SEARCH_REFRESH_SECONDS
+from ..repositories.order_repository import OrderRepository
+from .analytics_mirror import AnalyticsMirror
+from .order_archive import OrderArchive
+
+logger = logging.getLogger(__name__)
+
+def _day_start(value, next_day: bool = False) -> Optional[datetime]:
+    """Return a datetime as is; a date becomes the start of that day, or of the day after it."""
+    if value is None or isinstance(value, datetime):
+        return value
+    return datetime.combine(value + timedelta(days=1) if next_day else value, time.min)
+
+class OrderSearch:
+    """Finds orders by words of their id, customer name, email, city or product names, as they are typed.
+
+    Searches only query the full-text index in the analytics mirror. The
+    index is brought up to date incrementally (orders updated since its last
+    sync) by refresh(), which start() runs every `refresh_seconds` on a
+    background thread, so new orders appear within that delay.
+    """
+
+    def __init__(self, mirror: AnalyticsMirror, repository: OrderRepository, archive: Optional[OrderArchive] = None,
+                 refresh_seconds: float = SEARCH_REFRESH_SECONDS):
+        self.mirror = mirror
+        self.repository = repository
+        self.archive = archive
+        self.refresh_seconds = refresh_seconds
+
+    def refresh(self) -> int:
+        """Sync orders changed since the last sync, if the refresh interval has passed."""
+        return self.mirror.maybe_sync(self.repository, self.archive, interval=self.refresh_seconds)
+
+    def run_forever(self, stop: Optional[threading.Event] = None) -> None:
+        """Refresh every `refresh_seconds` until `stop` is set."""
+        stop = stop or threading.Event()
+        while not stop.is_set():
+            try:
+                self.refresh()
+            except Exception:
+                logger.exception("Order search refresh failed")
+            stop.wait(self.refresh_seconds)
+
+    def start(self) -> threading.Thread:
+        """Refresh the index on a daemon thread, so searches never wait for a sync."""
+        thread = threading.Thread(target=self.run_forever, name="order-search-refresh", daemon=True)
+        thread.start()
+        return thread
+
+    def search(self, text: str = "", status: Optional[str] = None, user_id: Optional[str] = None,
+               start: Optional[date] = None, end: Optional[date] = None,
+               page: int = 1, page_size: int = SEARCH_PAGE_SIZE) -> dict:
+        """Return one page of matching orders, newest first.
+
+        Every word of `text` must match a word of the order, the last one as a
+        prefix; dates filter on created_at, with `end` inclusive when given as a date.
+        """
+        # One extra row tells whether there is a next page without counting every match
+        rows = self.mirror.search_orders(
+            text, status=status, user_id=user_id, start=_day_start(start), end=_day_start(end, next_day=True),
+            limit=page_size + 1, offset=(page - 1) * page_size
+        )
+        return {
+            "orders": rows.head(page_size).to_dict("records"),
+            "page": page,
+            "page_size": page_size,
+            "has_more": len(rows) > page_size
+        }
@@ -1,80 +1,142 @@
-from typing import List, Optional
+from typing import Iterator, List, Optional
 from datetime import datetime
-from pymongo import MongoClient
 from ..models.order import Order, OrderItem
 from ..config import ORDERS_COLLECTION, SHIPPING_PLANS_COLLECTION
+from ..repositories.order_repository import (
+    AsyncMongoOrderRepository, AsyncOrderRepository, MongoOrderRepository, OrderRepository, ThreadedOrderRepository
+)
+from ..utils.cache import TTLCache, reference_cache
+from ..utils.geo import Geocoder, default_geocoder
+from .quote_engine import ShippingQuoteEngine
+
+ACTIVE_PLAN_STATUSES = ["pending", "processing", "in_transit"]
 
 class OrderService:
-    def __init__(self, db):
-        self.orders = db[ORDERS_COLLECTION]
+    def __init__(self, db, cache: Optional[TTLCache] = None, repository: Optional[OrderRepository] = None,
+                 geocoder: Optional[Geocoder] = None):
+        self.repository = repository if repository is not None else MongoOrderRepository(db[ORDERS_COLLECTION])
         self.shipping_plans = db[SHIPPING_PLANS_COLLECTION]
+        self.cache = cache if cache is not None else reference_cache
+        self.geocoder = geocoder if geocoder is not None else default_geocoder
 
-    def create_order(self, order: Order) -> str:
-        """Create a new order in the database."""
-        order_dict = order.to_dict()
-        result = self.orders.insert_one(order_dict)
-        return str(result.inserted_id)
+    def create_order(self, order: Order, session=None) -> str:
+        """Create a new order in the database, geocoding its shipping address."""
+        if order.shipping_location is None:
+            order.shipping_location = self.geocoder.geocode(order.shipping_address)
+        return self.repository.insert(order.to_dict(), session=session)
 
     def get_order(self, order_id: str) -> Optional[Order]:
         """Retrieve an order by its ID."""
-        order_data = self.orders.find_one({"order_id": order_id})
+        order_data = self.get_order_document(order_id)
         if order_data:
             return Order.from_dict(order_data)
         return None
 
+    def get_order_document(self, order_id: str) -> Optional[dict]:
+        """Retrieve the raw order document by its ID."""
+        return self.repository.get(order_id)
+
     def get_user_orders(self, user_id: str) -> List[Order]:
         """Retrieve all orders for a specific user."""
-        orders_data = self.orders.find({"user_id": user_id})
-        return [Order.from_dict(order) for order in orders_data]
+        return [Order.from_dict(order) for order in self.repository.find(user_id=user_id)]
+
+    def find_orders(self, user_id: Optional[str] = None, status: Optional[str] = None,
+                    newest_first: bool = False, limit: int = 0) -> List[dict]:
+        """Retrieve raw order documents matching the given filters."""
+        return self.repository.find(user_id=user_id, status=status, newest_first=newest_first, limit=limit)
+
+    def iter_orders(self) -> Iterator[dict]:
+        """Iterate over every raw order document, e.g. for analytics."""
+        return self.repository.iter_all()
 
     def update_order_status(self, order_id: str, new_status: str) -> bool:
         """Update the status of an order."""
-        result = self.orders.update_one(
-            {"order_id": order_id},
-            {
-                "$set": {
-                    "status": new_status,
-                    "updated_at": datetime.now()
-                }
-            }
-        )
-        return result.modified_count > 0
+        return self.repository.update(order_id, {
+            "status": new_status,
+            "updated_at": datetime.now()
+        })
 
     def get_pending_orders(self) -> List[Order]:
         """Retrieve all pending orders."""
-        orders_data = self.orders.find({"status": "pending"})
-        return [Order.from_dict(order) for order in orders_data]
+        return self.get_orders_by_status("pending")
 
     def get_total_pending_weight(self) -> float:
         """Calculate the total weight of all pending orders."""
-        pipeline = [
-            {"$match": {"status": "pending"}},
-            {"$group": {"_id": None, "total_weight": {"$sum": "$total_weight_kg"}}}
-        ]
-        result = list(self.orders.aggregate(pipeline))
-        return result[0]["total_weight"] if result else 0.0
+        return self.repository.total_weight("pending")
+
+    def get_quote_engine(self) -> ShippingQuoteEngine:
+        """Get the quote engine for the stored shipping plans, built once per cache TTL."""
+        return self.cache.get_or_load(
+            ("shipping_plans", "quote_engine"),
+            lambda: ShippingQuoteEngine.from_collection(self.shipping_plans)
+        )
 
     def get_eligible_shipping_plans(self, total_weight: float) -> List[dict]:
         """Get shipping plans that can accommodate the given weight."""
-        return list(self.shipping_plans.find({
-            "min_weight": {"$lte": total_weight},
-            "max_weight": {"$gte": total_weight}
-        }))
+        return self.get_quote_engine().eligible_plans(total_weight)
 
-    def assign_shipping_plan(self, order_id: str, shipping_plan: str) -> bool:
-        """Assign a shipping plan to an order."""
-        result = self.orders.update_one(
-            {"order_id": order_id},
-            {
-                "$set": {
-                    "shipping_plan": shipping_plan,
-                    "updated_at": datetime.now()
-                }
-            }
+    def get_active_shipping_plans(self) -> List[dict]:
+        """Get shipping plans that are pending, processing or in transit, by departure date."""
+        return self.cache.get_or_load(
+            ("shipping_plans", "active"),
+            lambda: list(self.shipping_plans.find({
+                "status": {"$in": ACTIVE_PLAN_STATUSES}
+            }).sort("departure_date", 1))
         )
+
+    def update_shipping_plan(self, plan_id: str, updates: dict) -> bool:
+        """Update fields of a shipping plan and invalidate cached plans."""
+        result = self.shipping_plans.update_one({"plan_id": plan_id}, {"$set": updates})
+        self.cache.invalidate_namespace("shipping_plans")
         return result.modified_count > 0
 
+    def assign_shipping_plan(self, order_id: str, shipping_plan: str) -> bool:
+        """Assign a shipping plan to an order."""
+        return self.repository.update(order_id, {
+            "shipping_plan": shipping_plan,
+            "updated_at": datetime.now()
+        })
+
     def get_orders_by_status(self, status: str) -> List[Order]:
         """Retrieve all orders with a specific status."""
-        orders_data = self.orders.find({"status": status})
-        return [Order.from_dict(order) for order in orders_data] 
\ No newline at end of file
+        return [Order.from_dict(order) for order in self.repository.find(status=status)]
+
+
+class AsyncOrderService:
+    """The order reads of OrderService as coroutines, for loading a page's queries concurrently.
+
+    `db` is a database from get_async_database(). A synchronous repository
+    (e.g. the in-memory store in demo mode) is run on worker threads.
+    """
+
+    def __init__(self, db, repository: Optional[OrderRepository] = None):
+        self.repository: AsyncOrderRepository = (
+            ThreadedOrderRepository(repository) if repository is not None
+            else AsyncMongoOrderRepository(db[ORDERS_COLLECTION])
+        )
+
+    async def get_order(self, order_id: str) -> Optional[Order]:
+        """Retrieve an order by its ID."""
+        order_data = await self.repository.get(order_id)
+        return Order.from_dict(order_data) if order_data else None
+
+    async def get_order_document(self, order_id: str) -> Optional[dict]:
+        """Retrieve the raw order document by its ID."""
+        return await self.repository.get(order_id)
+
+    async def get_user_orders(self, user_id: str) -> List[Order]:
+        """Retrieve all orders for a specific user."""
+        return [Order.from_dict(order) for order in await self.repository.find(user_id=user_id)]
+
+    async def find_orders(self, user_id: Optional[str] = None, status: Optional[str] = None,
+                          newest_first: bool = False, limit: int = 0) -> List[dict]:
+        """Retrieve raw order documents matching the given filters."""
+        return await self.repository.find(user_id=user_id, status=status, newest_first=newest_first, limit=limit)
+
+    async def list_orders(self, fields: List[str], filters: Optional[dict] = None) -> List[dict]:
+        """Retrieve every order with only `fields`, e.g. for analytics."""
+        return await self.repository.list_projected(filters or {}, fields)
+
+    async def get_total_pending_weight(self) -> float:
+        """Calculate the total weight of all pending orders."""
+        return await self.repository.total_weight("pending")
@@ -0,0 +1,84 @@
+import random
+import threading
+import time
+import uuid
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, Optional
+
+from ..config import FAKE_PAYMENT_DECLINE_RATE, FAKE_PAYMENT_FAILURE_RATE, FAKE_PAYMENT_LATENCY_MS
+
+class PaymentError(Exception):
+    """A transient gateway failure; the charge may or may not have happened, so retry with the same key."""
+
+@dataclass
+class Charge:
+    """The gateway's record of one charge attempt."""
+    charge_id: str
+    key: str
+    amount: float
+    currency: str
+    status: str  # captured or declined
+    created_at: datetime
+
+class PaymentGateway(ABC):
+    """A payment provider that deduplicates charges by idempotency key."""
+
+    @abstractmethod
+    def charge(self, key: str, amount: float, currency: str) -> Charge:
+        """Charge once per key; repeating a key returns the original charge. Raises PaymentError."""
+
+    @abstractmethod
+    def retrieve(self, key: str) -> Optional[Charge]:
+        """Return the charge made with this key, or None if the gateway never saw it."""
+
+class FakePaymentGateway(PaymentGateway):
+    """In-process gateway with configurable latency, transient failures and declines.
+
+    Transient failures happen either before the charge is recorded or after
+    (a lost response), as with a real provider timing out.
+    """
+
+    def __init__(self, failure_rate: float = FAKE_PAYMENT_FAILURE_RATE, decline_rate: float = FAKE_PAYMENT_DECLINE_RATE,
+                 latency_ms: float = FAKE_PAYMENT_LATENCY_MS, seed: Optional[int] = None):
+        self.failure_rate = failure_rate
+        self.decline_rate = decline_rate
+        self.latency_ms = latency_ms
+        self._random = random.Random(seed)
+        self._charges: Dict[str, Charge] = {}
+        self._lock = threading.Lock()
+        self.calls = 0
+
+    def _fails(self) -> bool:
+        with self._lock:
+            return self._random.random() < self.failure_rate
+
+    def charge(self, key: str, amount: float, currency: str) -> Charge:
+        with self._lock:
+            self.calls += 1
+        if self.latency_ms:
+            time.sleep(self.latency_ms / 1000)
+        if self._fails():
+            raise PaymentError("gateway timeout before charge")
+        with self._lock:
+            charge = self._charges.get(key)
+            if charge is None:
+                declined = self._random.random() < self.decline_rate
+                charge = Charge(
+                    charge_id=f"ch_{uuid.uuid4().hex[:16]}", key=key, amount=amount, currency=currency,
+                    status="declined" if declined else "captured", created_at=datetime.now()
+                )
+                self._charges[key] = charge
+        if self._fails():
+            raise PaymentError("gateway timeout after charge")
+        return charge
+
+    def retrieve(self, key: str) -> Optional[Charge]:
+        with self._lock:
+            return self._charges.get(key)
+
+    def charge_count(self, status: str = "captured") -> int:
+        """Return how many distinct charges ended in this status."""
+        with self._lock:
+            return sum(1 for charge in self._charges.values() if charge.status == status)
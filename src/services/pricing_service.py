@@ -0,0 +1,72 @@
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from ..config import CATALOG_CURRENCY, REPORTING_CURRENCY
+from ..utils.money import FxTable, cents_array, from_cents
+
+class PricingEngine:
+    """Prices in the shopper's currency, converted from the currency they were set in.
+
+    Catalog prices are in CATALOG_CURRENCY; cart items and orders carry their
+    own currency. Conversions go through one FxTable, whose rates are loaded
+    once per refresh interval and whose pair rates are memoized, and whole
+    carts, catalogs and analytics columns are converted as int64 cents arrays,
+    one batch per source currency.
+    """
+
+    def __init__(self, fx: Optional[FxTable] = None, catalog_currency: str = CATALOG_CURRENCY):
+        self.fx = fx if fx is not None else FxTable()
+        self.catalog_currency = catalog_currency
+
+    def currencies(self) -> List[str]:
+        """Return the currencies prices can be shown in."""
+        return self.fx.currencies()
+
+    def convert_totals(self, cents, currencies: Sequence[str], to_currency: str) -> np.ndarray:
+        """Convert int64 cents, each in its own currency, to one currency."""
+        cents = np.asarray(cents, dtype=np.int64)
+        currencies = np.asarray(currencies, dtype=object)
+        converted = cents.copy()
+        for currency in pd.unique(currencies):
+            if currency == to_currency:
+                continue
+            mask = currencies == currency
+            converted[mask] = self.fx.convert_array(cents[mask], currency, to_currency)
+        return converted
+
+    def localize_products(self, products: List[dict], currency: str) -> List[dict]:
+        """Return catalog products with price and currency in `currency`."""
+        if currency == self.catalog_currency:
+            return [dict(product, currency=currency) for product in products]
+        prices = self.convert_totals(
+            cents_array([product['price'] for product in products]),
+            [product.get('currency', self.catalog_currency) for product in products], currency
+        )
+        return [dict(product, price=from_cents(int(price)), currency=currency) for product, price in zip(products, prices)]
+
+    def reprice_cart(self, items: List[dict], currency: str) -> Tuple[List[dict], int]:
+        """Return cart or order items priced in `currency`, and their total in cents.
+
+        Unit prices are converted, then multiplied out, so line totals always
+        match the unit price shown.
+        """
+        if not items:
+            return [], 0
+        prices = self.convert_totals(
+            cents_array([item['price'] for item in items]),
+            [item.get('currency', self.catalog_currency) for item in items], currency
+        )
+        quantities = np.array([item['quantity'] for item in items], dtype=np.int64)
+        repriced = [dict(item, price=from_cents(int(price)), currency=currency) for item, price in zip(items, prices)]
+        return repriced, int((prices * quantities).sum())
+
+    def reporting_cents(self, frame: pd.DataFrame, column: str = 'total_price',
+                        to_currency: str = REPORTING_CURRENCY) -> np.ndarray:
+        """Return an amount column in `to_currency` as int64 cents, per row's currency (the catalog's if missing)."""
+        currencies = frame['currency'].fillna(self.catalog_currency) if 'currency' in frame \
+            else np.full(len(frame), self.catalog_currency, dtype=object)
+        return self.convert_totals(cents_array(frame[column]), currencies, to_currency)
+
+default_pricing_engine = PricingEngine()
@@ -0,0 +1,134 @@
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from ..utils.helpers import with_delivery_window
+
+@dataclass
+class QuoteBatch:
+    """Quotes for a batch of carts against every plan, as (n_carts, n_plans) arrays."""
+    plans: List[dict]
+    eligible: np.ndarray
+    cost: np.ndarray
+    chargeable_weight: np.ndarray
+    min_days: np.ndarray
+    max_days: np.ndarray
+
+    def cheapest(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Return the index and cost of the cheapest eligible plan per cart (-1/nan if none)."""
+        masked = np.where(self.eligible, self.cost, np.inf)
+        best = masked.argmin(axis=1)
+        best_cost = masked[np.arange(len(best)), best]
+        none = ~np.isfinite(best_cost)
+        best[none] = -1
+        best_cost[none] = np.nan
+        return best, best_cost
+
+    def quotes_for(self, cart_index: int) -> List[dict]:
+        """Return the eligible plans for one cart with cost and ETA, cheapest first."""
+        quotes = [
+            {
+                "name": plan['name'],
+                "carrier": plan.get('carrier'),
+                "cost": float(self.cost[cart_index, i]),
+                "chargeable_weight": float(self.chargeable_weight[cart_index, i]),
+                "min_days": int(self.min_days[i]),
+                "max_days": int(self.max_days[i])
+            }
+            for i, plan in enumerate(self.plans)
+            if self.eligible[cart_index, i]
+        ]
+        return sorted(quotes, key=lambda q: q['cost'])
+
+class ShippingQuoteEngine:
+    """Vectorized shipping quotes over all plans for batches of carts.
+
+    Plans are the ``DEFAULT_SHIPPING_PLANS`` dicts, optionally extended with:
+
+    - ``destinations``: countries the plan serves (all if absent)
+    - ``tiers``: ``[{"up_to_kg": 10, "rate_per_kg": 2.0}, ...]`` marginal rate bands;
+      weight above the last band is charged at ``rate_per_kg``
+    - ``dim_divisor``: cm³ per kg used to compute volumetric weight
+    """
+
+    def __init__(self, plans: Sequence[dict]):
+        self.plans = [p if 'min_days' in p else with_delivery_window(p) for p in plans]
+        n_plans = len(self.plans)
+        self.min_weight = np.array([p['min_weight'] for p in self.plans], dtype=np.float64)
+        self.max_weight = np.array([p['max_weight'] for p in self.plans], dtype=np.float64)
+        self.dim_divisor = np.array([p.get('dim_divisor') or np.nan for p in self.plans], dtype=np.float64)
+        self.min_days = np.array([p['min_days'] for p in self.plans], dtype=np.int64)
+        self.max_days = np.array([p['max_days'] for p in self.plans], dtype=np.int64)
+
+        # Every plan becomes a padded table of marginal bands [lower, upper) with a rate each
+        bands = []
+        for plan in self.plans:
+            plan_bands, lower = [], 0.0
+            for tier in plan.get('tiers', []):
+                plan_bands.append((lower, tier['up_to_kg'], tier['rate_per_kg']))
+                lower = tier['up_to_kg']
+            plan_bands.append((lower, np.inf, plan['rate_per_kg']))
+            bands.append(plan_bands)
+        n_bands = max((len(b) for b in bands), default=1)
+        self.band_lower = np.zeros((n_plans, n_bands))
+        self.band_width = np.zeros((n_plans, n_bands))
+        self.band_rate = np.zeros((n_plans, n_bands))
+        for i, plan_bands in enumerate(bands):
+            for j, (lower, upper, rate) in enumerate(plan_bands):
+                self.band_lower[i, j] = lower
+                self.band_width[i, j] = upper - lower
+                self.band_rate[i, j] = rate
+
+        self._served: Dict[str, np.ndarray] = {}
+        self._serves_all = np.array(['destinations' not in p for p in self.plans], dtype=bool)
+
+    @classmethod
+    def from_collection(cls, collection) -> 'ShippingQuoteEngine':
+        """Build an engine from the priced plans stored in a shipping plans collection."""
+        return cls(list(collection.find({"rate_per_kg": {"$exists": True}})))
+
+    def _served_mask(self, destination: str) -> np.ndarray:
+        mask = self._served.get(destination)
+        if mask is None:
+            mask = self._serves_all | np.array(
+                [destination in p.get('destinations', ()) for p in self.plans], dtype=bool
+            )
+            self._served[destination] = mask
+        return mask
+
+    def quote(
+        self,
+        weights: Sequence[float],
+        destinations: Optional[Sequence[str]] = None,
+        volumes_cm3: Optional[Sequence[float]] = None
+    ) -> QuoteBatch:
+        """Quote every cart against every plan in one pass."""
+        weights = np.asarray(weights, dtype=np.float64)
+        chargeable = np.broadcast_to(weights[:, None], (len(weights), len(self.plans)))
+        if volumes_cm3 is not None:
+            volumetric = np.asarray(volumes_cm3, dtype=np.float64)[:, None] / self.dim_divisor[None, :]
+            chargeable = np.fmax(chargeable, volumetric)
+
+        eligible = (chargeable >= self.min_weight) & (chargeable <= self.max_weight)
+        if destinations is not None:
+            unique, codes = np.unique(np.asarray(destinations, dtype=object).astype(str), return_inverse=True)
+            served = np.stack([self._served_mask(d) for d in unique])
+            eligible &= served[codes]
+
+        in_band = np.clip(chargeable[:, :, None] - self.band_lower[None, :, :], 0.0, self.band_width[None, :, :])
+        cost = np.einsum('npb,pb->np', in_band, self.band_rate)
+
+        return QuoteBatch(
+            plans=self.plans,
+            eligible=eligible,
+            cost=cost,
+            chargeable_weight=np.ascontiguousarray(chargeable),
+            min_days=self.min_days,
+            max_days=self.max_days
+        )
+
+    def eligible_plans(self, weight: float) -> List[dict]:
+        """Return the plans that can carry a single weight."""
+        eligible = (weight >= self.min_weight) & (weight <= self.max_weight)
+        return [plan for plan, ok in zip(self.plans, eligible) if ok]
@@ -0,0 +1,87 @@
+from typing import List, Optional
+
+from bson import ObjectId
+from pymongo.errors import DuplicateKeyError
+
+from ..models.order import Order
+from ..repositories.unit_of_work import UnitOfWork
+from .inventory_service import InventoryService, OutOfStockError
+from .order_service import OrderService
+from .truck_service import TruckService
+from ..utils.profiling import profiled
+
+class TruckFullError(Exception):
+    """The truck is missing, no longer collecting or has no room left for an order."""
+
+class SharedShippingService:
+    """Joining a truck: the cart's stock holds, the truck's load and the pending order are written together.
+
+    With transactions the writes commit or abort as one. Without them each
+    step is undone by hand when a later one fails, so a failure never
+    leaves weight on a truck or stock sold without an order.
+    """
+
+    def __init__(self, order_service: OrderService, truck_service: TruckService,
+                 unit_of_work: Optional[UnitOfWork] = None, inventory_service: Optional[InventoryService] = None):
+        self.orders = order_service
+        self.trucks = truck_service
+        self.unit_of_work = unit_of_work if unit_of_work is not None else UnitOfWork()
+        self.inventory = inventory_service
+
+    @profiled()
+    def join_truck(self, order: Order, hold_ids: Optional[List[str]] = None) -> bool:
+        """Sell an order's held stock, add its items to its truck_id and store the order.
+
+        Returns False if the truck has no room; raises OutOfStockError if held stock sold out.
+        An order with an idempotency_key gets the order id ORD-<key> and joins
+        once: repeating it, even concurrently, finds the stored order and leaves
+        the truck and stock as they are.
+        """
+        if order.idempotency_key:
+            order.order_id = f"ORD-{order.idempotency_key}"
+            if self.orders.repository.get(order.order_id) is not None:
+                return True
+        # Tags this call's lines, so undoing it cannot remove a concurrent repeat's
+        reservation_id = str(ObjectId())
+        lines = [
+            {"name": item.name, "quantity": item.quantity, "weight": item.weight_kg * item.quantity}
+            for item in order.items
+        ]
+
+        def write(session):
+            committed = []
+            try:
+                if hold_ids and self.inventory is not None:
+                    sold_out = self.inventory.commit(hold_ids, session=session)
+                    committed = [hold_id for hold_id in hold_ids if hold_id not in sold_out]
+                    if sold_out:
+                        raise OutOfStockError(sold_out)
+                if not self.trucks.reserve_capacity(order.truck_id, lines, order.total_weight_kg, order.order_id,
+                                                    session=session, reservation_id=reservation_id):
+                    raise TruckFullError(order.truck_id)
+                try:
+                    self.orders.create_order(order, session=session)
+                except Exception:
+                    if session is None:
+                        # No transaction to abort, so undo the reservation by hand
+                        self.trucks.release_capacity(order.truck_id, order.order_id, reservation_id=reservation_id)
+                    raise
+            except Exception as e:
+                repeated = order.idempotency_key and isinstance(e, DuplicateKeyError)
+                if session is None and committed and not repeated:
+                    # Put the cart's stock back on hold rather than leave it sold without an order
+                    self.inventory.reopen(committed)
+                raise
+
+        try:
+            self.unit_of_work.run(write)
+        except TruckFullError:
+            return False
+        except DuplicateKeyError:
+            if not order.idempotency_key:
+                raise
+            # A concurrent repeat stored the order first, and its holds are that order's now
+        finally:
+            # Readers may have cached the truck between the reservation and the commit
+            self.trucks.cache.invalidate_namespace("trucks")
+        return True
@@ -0,0 +1,213 @@
+import argparse
+import heapq
+import itertools
+import logging
+import threading
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional, Tuple
+
+from ..config import (
+    TRUCK_CAPACITY_KG,
+    TRUCK_COLLECTION_DAYS,
+    TRUCK_DEFAULT_ORIGIN,
+    TRUCK_DEMAND_WINDOW_HOURS,
+    TRUCK_FILL_THRESHOLD,
+    TRUCK_OPEN_THRESHOLD,
+    TRUCK_SCHEDULER_INTERVAL_SECONDS,
+    TRUCK_TRANSIT_DAYS
+)
+from ..repositories.order_repository import OrderRepository
+from .truck_service import TruckService, truck_lane
+from ..utils.profiling import profiled
+
+logger = logging.getLogger(__name__)
+
+Lane = Tuple[str, str]
+DEMAND_FIELDS = ["truck_id", "shipping_address", "total_weight_kg", "created_at"]
+# Re-read a few seconds before the last tick so writes from servers with slightly skewed clocks are not missed
+TICK_OVERLAP = timedelta(seconds=5)
+
+def order_lane(order: dict, origin: str = TRUCK_DEFAULT_ORIGIN) -> Optional[Lane]:
+    """Return the (origin, destination) lane an order ships on, or None without a city and country."""
+    address = order.get("shipping_address") or {}
+    if not address.get("city") or not address.get("country"):
+        return None
+    return origin, f"{address['city']}, {address['country']}"
+
+def _total_weight(orders: List[Tuple[Optional[datetime], float]]) -> float:
+    return sum(weight for _, weight in orders)
+
+class TruckScheduler:
+    """Opens trucks per lane as demand grows and approves departures on fill or deadline.
+
+    Lanes wait in a min-heap keyed by when they next need a look (their
+    earliest departure), so each tick only evaluates lanes that are due or
+    whose trucks or demand changed since the previous tick.
+    """
+
+    def __init__(self, truck_service: TruckService, repository: OrderRepository,
+                 clock: Callable[[], datetime] = datetime.now):
+        self.trucks = truck_service
+        self.repository = repository
+        self.clock = clock
+        self._heap: List[Tuple[datetime, int, Lane]] = []
+        self._due: Dict[Lane, datetime] = {}
+        self._counter = itertools.count()
+        self._demand: Dict[Lane, List[Tuple[Optional[datetime], float]]] = {}
+        self._departed: Dict[Lane, datetime] = {}
+        self._last_tick: Optional[datetime] = None
+        self._lock = threading.Lock()
+
+    def schedule(self, lane: Lane, when: datetime) -> None:
+        """Queue a lane for evaluation at `when`, unless it is already due earlier."""
+        due = self._due.get(lane)
+        if due is not None and due <= when:
+            return
+        self._due[lane] = when
+        heapq.heappush(self._heap, (when, next(self._counter), lane))
+
+    def _pop_due(self, now: datetime) -> List[Lane]:
+        lanes = []
+        while self._heap and self._heap[0][0] <= now:
+            when, _, lane = heapq.heappop(self._heap)
+            # Entries superseded by an earlier schedule() are dropped here rather than searched for
+            if self._due.get(lane) == when:
+                del self._due[lane]
+                lanes.append(lane)
+        return lanes
+
+    def _refresh_demand(self, now: datetime) -> None:
+        """Re-read pending orders not yet on a truck, per lane, and queue lanes that changed."""
+        demand: Dict[Lane, List[Tuple[Optional[datetime], float]]] = {}
+        for order in self.repository.iter_projected({"status": "pending", "truck_id": None}, DEMAND_FIELDS):
+            lane = order_lane(order)
+            if lane is not None:
+                demand.setdefault(lane, []).append((order.get("created_at"), order.get("total_weight_kg", 0.0)))
+        for lane in set(demand) | set(self._demand):
+            if _total_weight(demand.get(lane, [])) != _total_weight(self._demand.get(lane, [])):
+                self.schedule(lane, now)
+        self._demand = demand
+
+    def lane_demand(self, lane: Lane) -> float:
+        """Weight of the lane's unassigned pending orders placed since its last departure.
+
+        Orders placed before a truck left could have ridden on it, so they no longer count towards opening another.
+        """
+        departed = self._departed.get(lane)
+        return sum(
+            weight for created_at, weight in self._demand.get(lane, [])
+            if departed is None or created_at is None or created_at > departed
+        )
+
+    def forecast_load(self, open_trucks: List[dict], demand: float, now: datetime) -> float:
+        """Forecast the weight a lane will have to carry by its first departure.
+
+        Committed weight plus unassigned pending demand plus the recent join
+        rate carried forward to the departure.
+        """
+        if not open_trucks:
+            return demand
+        since = now - timedelta(hours=TRUCK_DEMAND_WINDOW_HOURS)
+        recent = self.trucks.contributed_weight_since([truck['truck_id'] for truck in open_trucks], since)
+        hours_left = max((min(truck['departure_date'] for truck in open_trucks) - now).total_seconds() / 3600, 0)
+        committed = sum(truck['current_weight'] for truck in open_trucks)
+        return committed + demand + recent / TRUCK_DEMAND_WINDOW_HOURS * hours_left
+
+    def evaluate_lane(self, lane: Lane, now: datetime) -> Tuple[List[str], Optional[str]]:
+        """Approve a lane's full or overdue trucks and open one if the forecast needs it.
+
+        Returns the approved truck ids and the opened truck id, if any.
+        """
+        approved = []
+        open_trucks = []
+        for truck in self.trucks.list_collecting(lane=lane):
+            if truck['current_weight'] >= truck['max_weight'] * TRUCK_FILL_THRESHOLD:
+                reason = "fill"
+            elif truck['departure_date'] <= now:
+                reason = "deadline"
+            else:
+                open_trucks.append(truck)
+                continue
+            if self.trucks.approve_truck(truck['truck_id'], reason):
+                approved.append(truck['truck_id'])
+                self._departed[lane] = now
+
+        opened = None
+        demand = self.lane_demand(lane)
+        # With no truck open, compare against the truck that would be opened
+        capacity = sum(truck['max_weight'] for truck in open_trucks) or TRUCK_CAPACITY_KG
+        if demand > 0 and self.forecast_load(open_trucks, demand, now) >= capacity * TRUCK_OPEN_THRESHOLD:
+            departure = now + timedelta(days=TRUCK_COLLECTION_DAYS)
+            truck = self.trucks.open_truck(
+                lane[0], lane[1], TRUCK_CAPACITY_KG, departure, departure + timedelta(days=TRUCK_TRANSIT_DAYS)
+            )
+            open_trucks.append(truck)
+            opened = truck['truck_id']
+
+        if open_trucks:
+            self.schedule(lane, min(truck['departure_date'] for truck in open_trucks))
+        return approved, opened
+
+    @profiled()
+    def tick(self, now: Optional[datetime] = None) -> Dict[str, List[str]]:
+        """Evaluate every lane that is due or changed; return the approved and opened truck ids."""
+        now = now or self.clock()
+        with self._lock:
+            since = self._last_tick - TICK_OVERLAP if self._last_tick else None
+            if since is None:
+                self._departed = self.trucks.last_departures()
+            for truck in self.trucks.list_collecting(updated_since=since):
+                self.schedule(truck_lane(truck), now)
+            if since is None or next(self.repository.iter_updated_since(since), None) is not None:
+                self._refresh_demand(now)
+            self._last_tick = now
+
+            summary = {"approved": [], "opened": []}
+            for lane in self._pop_due(now):
+                approved, opened = self.evaluate_lane(lane, now)
+                summary["approved"].extend(approved)
+                if opened:
+                    summary["opened"].append(opened)
+            return summary
+
+    def run_forever(self, interval: float = TRUCK_SCHEDULER_INTERVAL_SECONDS,
+                    stop: Optional[threading.Event] = None) -> None:
+        """Tick every `interval` seconds until `stop` is set."""
+        stop = stop or threading.Event()
+        while not stop.is_set():
+            try:
+                summary = self.tick()
+                if summary["approved"] or summary["opened"]:
+                    logger.info("Truck scheduler approved %s, opened %s", summary["approved"], summary["opened"])
+            except Exception:
+                logger.exception("Truck scheduler tick failed")
+            stop.wait(interval)
+
+    def start(self, interval: float = TRUCK_SCHEDULER_INTERVAL_SECONDS) -> threading.Thread:
+        """Run the scheduler on a daemon thread."""
+        thread = threading.Thread(target=self.run_forever, args=(interval,), name="truck-scheduler", daemon=True)
+        thread.start()
+        return thread
+
+def main():
+    """Run the scheduler once, or every --interval seconds."""
+    from ..database import get_database
+    from .order_service import OrderService
+
+    parser = argparse.ArgumentParser(description="Open trucks per lane and approve departures on fill or deadline.")
+    parser.add_argument("--interval", type=float, default=0, help="keep ticking every N seconds")
+    args = parser.parse_args()
+
+    db = get_database()
+    truck_service = TruckService(db)
+    truck_service.ensure_indexes()
+    scheduler = TruckScheduler(truck_service, OrderService(db).repository)
+    if args.interval:
+        logging.basicConfig(level=logging.INFO)
+        scheduler.run_forever(args.interval)
+    else:
+        summary = scheduler.tick()
+        print(f"approved {summary['approved'] or 'none'}, opened {summary['opened'] or 'none'}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,337 @@
+import asyncio
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional, Tuple
+from bson import ObjectId
+from pymongo import ASCENDING, ReplaceOne, ReturnDocument
+from pymongo.errors import DuplicateKeyError
+from ..config import COUNTERS_COLLECTION, TRUCK_CONTRIBUTIONS_COLLECTION, TRUCK_DEFAULT_DESTINATION, TRUCKS_COLLECTION
+from ..utils.cache import TTLCache, reference_cache
+
+def truck_lane(truck: dict) -> Tuple[str, str]:
+    """Return a truck's (origin, destination) lane."""
+    return truck['location'], truck.get('destination', TRUCK_DEFAULT_DESTINATION)
+
+class TruckService:
+    """Truck reads served through the process-wide reference cache.
+
+    Cached documents are shared between sessions, so callers must copy before mutating.
+    Each contributed line is its own document in ``truck_contributions``; the
+    truck keeps only running totals, so its size no longer grows with every join.
+    """
+
+    def __init__(self, db, cache: Optional[TTLCache] = None):
+        self.trucks = db[TRUCKS_COLLECTION]
+        self.contributions = db[TRUCK_CONTRIBUTIONS_COLLECTION]
+        self.counters = db[COUNTERS_COLLECTION]
+        self.cache = cache if cache is not None else reference_cache
+
+    def ensure_indexes(self) -> None:
+        """Create the indexes the manifest queries rely on, and the unique index on truck ids."""
+        self.trucks.create_index("truck_id", unique=True)
+        self.contributions.create_index([("truck_id", ASCENDING), ("name", ASCENDING)])
+        self.contributions.create_index("order_id")
+        self.contributions.create_index([("truck_id", ASCENDING), ("created_at", ASCENDING)])
+        self.trucks.create_index([("status", ASCENDING), ("updated_at", ASCENDING)])
+
+    def seed_trucks(self, trucks: List[dict]) -> None:
+        """Insert the default trucks if the collection is empty, then move any embedded items out."""
+        if self.trucks.count_documents({}) == 0:
+            self.trucks.insert_many([dict(truck) for truck in trucks])
+            self.cache.invalidate_namespace("trucks")
+        self.migrate_embedded_items()
+
+    def migrate_embedded_items(self) -> int:
+        """Move legacy ``trucks.items`` arrays into contribution documents; return how many trucks moved.
+
+        Contributions get deterministic ids, so a run interrupted between the
+        two writes is simply repeated.
+        """
+        migrated = 0
+        for truck in self.trucks.find({"items": {"$exists": True}}, {"truck_id": 1, "items": 1}):
+            lines = [
+                ReplaceOne({"_id": f"{truck['truck_id']}:legacy:{line}"}, {
+                    "_id": f"{truck['truck_id']}:legacy:{line}",
+                    "truck_id": truck['truck_id'],
+                    "order_id": None,
+                    "name": item.get('name'),
+                    "quantity": item.get('quantity', 0),
+                    "weight_kg": item.get('weight', 0),
+                    "created_at": None
+                }, upsert=True)
+                for line, item in enumerate(truck['items'])
+            ]
+            if lines:
+                self.contributions.bulk_write(lines, ordered=False)
+            self.trucks.update_one({"_id": truck['_id']}, {
+                "$unset": {"items": ""},
+                "$set": {
+                    "contribution_count": len(lines),
+                    "item_count": sum(item.get('quantity', 0) for item in truck['items'])
+                }
+            })
+            migrated += 1
+        if migrated:
+            self.cache.invalidate_namespace("trucks")
+        return migrated
+
+    def list_trucks(self) -> List[dict]:
+        """Retrieve all trucks."""
+        return self.cache.get_or_load(("trucks", "all"), lambda: list(self.trucks.find()))
+
+    def get_truck(self, truck_id: str) -> Optional[dict]:
+        """Retrieve a truck by its ID."""
+        return self.cache.get_or_load(("trucks", truck_id), lambda: self.trucks.find_one({"truck_id": truck_id}))
+
+    def reserve_capacity(self, truck_id: str, items: List[dict], weight_kg: float, order_id: Optional[str] = None,
+                         session=None, reservation_id: Optional[str] = None) -> bool:
+        """Record cart items as contributions to a collecting truck with room for them, and add their weight.
+
+        Returns False, writing nothing, if the truck is missing, no longer
+        collecting or too full. Pass `session` to make both writes part of a
+        transaction, and `reservation_id` to release this reservation alone later.
+        """
+        now = datetime.now()
+        # The capacity check and $inc are one server-side update, so concurrent joins cannot overfill the truck
+        result = self.trucks.update_one(
+            {
+                "truck_id": truck_id,
+                "status": "collecting",
+                "$expr": {"$lte": [{"$add": ["$current_weight", weight_kg]}, "$max_weight"]}
+            },
+            {
+                "$inc": {
+                    "current_weight": weight_kg,
+                    "item_count": sum(item['quantity'] for item in items),
+                    "contribution_count": len(items)
+                },
+                "$set": {"updated_at": now}
+            },
+            session=session
+        )
+        if result.modified_count == 0:
+            return False
+        lines = [
+            {
+                "_id": ObjectId(),
+                "truck_id": truck_id,
+                "order_id": order_id,
+                "name": item['name'],
+                "quantity": item['quantity'],
+                "weight_kg": item['weight'],
+                "created_at": now,
+                **({"reservation_id": reservation_id} if reservation_id is not None else {})
+            }
+            for item in items
+        ]
+        try:
+            self.contributions.insert_many(lines, session=session)
+        except Exception:
+            if session is None:
+                # No transaction to abort, and release_capacity() would find no lines, so undo both writes here
+                self.contributions.delete_many({"_id": {"$in": [line['_id'] for line in lines]}})
+                self._take_off(truck_id, weight_kg, sum(item['quantity'] for item in items), len(items))
+            raise
+        self.cache.invalidate_namespace("trucks")
+        return True
+
+    def release_capacity(self, truck_id: str, order_id: str, session=None, reservation_id: Optional[str] = None) -> bool:
+        """Remove an order's contributions, or one reservation's, from a truck and take their weight off its load.
+
+        Only lines this call deleted are taken off, so concurrent releases of one order subtract it once.
+        """
+        query = {"truck_id": truck_id, "order_id": order_id}
+        if reservation_id is not None:
+            query["reservation_id"] = reservation_id
+        lines = []
+        while True:
+            line = self.contributions.find_one_and_delete(
+                query, projection={"quantity": 1, "weight_kg": 1}, session=session
+            )
+            if line is None:
+                break
+            lines.append(line)
+        if not lines:
+            return False
+        self._take_off(
+            truck_id, sum(line['weight_kg'] for line in lines), sum(line['quantity'] for line in lines), len(lines),
+            session
+        )
+        return True
+
+    def _take_off(self, truck_id: str, weight_kg: float, item_count: int, contribution_count: int,
+                  session=None) -> None:
+        self.trucks.update_one(
+            {"truck_id": truck_id},
+            {
+                "$inc": {
+                    "current_weight": -weight_kg,
+                    "item_count": -item_count,
+                    "contribution_count": -contribution_count
+                },
+                "$set": {"updated_at": datetime.now()}
+            },
+            session=session
+        )
+        self.cache.invalidate_namespace("trucks")
+
+    def approve_truck(self, truck_id: str, reason: str = "manual") -> bool:
+        """Mark a truck as approved for shipping, recording why."""
+        now = datetime.now()
+        result = self.trucks.update_one(
+            {"truck_id": truck_id, "status": {"$ne": "approved"}},
+            {"$set": {"status": "approved", "approval_reason": reason, "approved_at": now, "updated_at": now}}
+        )
+        self.cache.invalidate_namespace("trucks")
+        return result.modified_count > 0
+
+    def _sync_truck_counter(self) -> None:
+        """Move the truck id counter past the highest TRUCK-<number> id already stored."""
+        numbers = [
+            int(truck_id.split("-")[1])
+            for truck_id in self.trucks.distinct("truck_id", {"truck_id": {"$regex": "^TRUCK-[0-9]+$"}})
+        ]
+        self.counters.update_one({"_id": "truck_id"}, {"$max": {"seq": max(numbers, default=0)}}, upsert=True)
+
+    def _next_truck_number(self) -> int:
+        if self.counters.find_one({"_id": "truck_id"}) is None:
+            self._sync_truck_counter()
+        counter = self.counters.find_one_and_update(
+            {"_id": "truck_id"}, {"$inc": {"seq": 1}}, upsert=True, return_document=ReturnDocument.AFTER
+        )
+        return counter["seq"]
+
+    def open_truck(self, origin: str, destination: str, max_weight: float,
+                   departure_date: datetime, arrival_date: datetime) -> dict:
+        """Open a new collecting truck on a lane and return it.
+
+        Ids come from an atomic counter, so the in-app scheduler and the CLI never mint the same one.
+        """
+        number = self._next_truck_number()
+        now = datetime.now()
+        truck = {
+            "truck_id": f"TRUCK-{number:03d}",
+            "status": "collecting",
+            "current_weight": 0,
+            "max_weight": max_weight,
+            "item_count": 0,
+            "contribution_count": 0,
+            "departure_date": departure_date,
+            "arrival_date": arrival_date,
+            "location": origin,
+            "destination": destination,
+            "progress": 0,
+            "opened_at": now,
+            "updated_at": now
+        }
+        while True:
+            try:
+                self.trucks.insert_one(truck)
+                break
+            except DuplicateKeyError:
+                # A truck was added by hand with a higher number than the counter
+                truck.pop("_id", None)
+                self._sync_truck_counter()
+                truck["truck_id"] = f"TRUCK-{self._next_truck_number():03d}"
+        self.cache.invalidate_namespace("trucks")
+        return truck
+
+    def list_collecting(self, updated_since: Optional[datetime] = None,
+                        lane: Optional[Tuple[str, str]] = None) -> List[dict]:
+        """Read collecting trucks from the database, optionally only one lane's or those updated since a time."""
+        query = {"status": "collecting"}
+        if updated_since is not None:
+            query["updated_at"] = {"$gte": updated_since}
+        if lane is not None:
+            origin, destination = lane
+            query["location"] = origin
+            # Seeded trucks without a destination run to the default one
+            query["destination"] = {"$in": [destination, None]} if destination == TRUCK_DEFAULT_DESTINATION else destination
+        return list(self.trucks.find(query))
+
+    def last_departures(self) -> Dict[Tuple[str, str], datetime]:
+        """Return when each lane last had a truck approved."""
+        departures: Dict[Tuple[str, str], datetime] = {}
+        for truck in self.trucks.find({"status": "approved", "approved_at": {"$ne": None}},
+                                      {"location": 1, "destination": 1, "approved_at": 1}):
+            lane = truck_lane(truck)
+            if lane not in departures or truck["approved_at"] > departures[lane]:
+                departures[lane] = truck["approved_at"]
+        return departures
+
+    def contributed_weight_since(self, truck_ids: List[str], since: datetime) -> float:
+        """Sum the weight contributed to these trucks since a time."""
+        result = list(self.contributions.aggregate([
+            {"$match": {"truck_id": {"$in": truck_ids}, "created_at": {"$gte": since}}},
+            {"$group": {"_id": None, "weight_kg": {"$sum": "$weight_kg"}}}
+        ]))
+        return result[0]["weight_kg"] if result else 0.0
+
+    def get_manifest_page(self, truck_id: str, page: int = 0, page_size: int = 20) -> Tuple[List[dict], int]:
+        """Return one page of a truck's manifest aggregated by product, heaviest first, and the product count."""
+        grouped = [
+            {"$match": {"truck_id": truck_id}},
+            {"$group": {
+                "_id": "$name",
+                "quantity": {"$sum": "$quantity"},
+                "weight_kg": {"$sum": "$weight_kg"},
+                "contributions": {"$sum": 1}
+            }}
+        ]
+        rows = self.contributions.aggregate(grouped + [
+            {"$sort": {"weight_kg": -1, "_id": 1}},
+            {"$skip": page * page_size},
+            {"$limit": page_size},
+            {"$project": {"_id": 0, "name": "$_id", "quantity": 1, "weight_kg": 1, "contributions": 1}}
+        ])
+        total = list(self.contributions.aggregate(grouped + [{"$count": "products"}]))
+        return list(rows), total[0]["products"] if total else 0
+
+    def iter_manifest(self, truck_id: Optional[str] = None, batch_size: int = 1000) -> Iterator[dict]:
+        """Stream manifest lines, one per contributed item."""
+        query = {"truck_id": truck_id} if truck_id else {}
+        projection = {"_id": 0, "truck_id": 1, "name": 1, "quantity": 1, "weight_kg": 1}
+        return iter(self.contributions.find(query, projection).sort("truck_id", ASCENDING).batch_size(batch_size))
+
+
+class AsyncTruckService:
+    """The truck reads of TruckService as coroutines, sharing its cache entries.
+
+    `db` is a database from get_async_database().
+    """
+
+    def __init__(self, db, cache: Optional[TTLCache] = None):
+        self.trucks = db[TRUCKS_COLLECTION]
+        self.contributions = db[TRUCK_CONTRIBUTIONS_COLLECTION]
+        self.cache = cache if cache is not None else reference_cache
+
+    async def list_trucks(self) -> List[dict]:
+        """Retrieve all trucks."""
+        return await self.cache.get_or_load_async(("trucks", "all"), lambda: self.trucks.find().to_list(None))
+
+    async def get_truck(self, truck_id: str) -> Optional[dict]:
+        """Retrieve a truck by its ID."""
+        return await self.cache.get_or_load_async(
+            ("trucks", truck_id), lambda: self.trucks.find_one({"truck_id": truck_id})
+        )
+
+    async def get_manifest_page(self, truck_id: str, page: int = 0, page_size: int = 20) -> Tuple[List[dict], int]:
+        """Return one page of a truck's manifest and the product count, querying both at once."""
+        grouped = [
+            {"$match": {"truck_id": truck_id}},
+            {"$group": {
+                "_id": "$name",
+                "quantity": {"$sum": "$quantity"},
+                "weight_kg": {"$sum": "$weight_kg"},
+                "contributions": {"$sum": 1}
+            }}
+        ]
+        rows, total = await asyncio.gather(
+            self.contributions.aggregate(grouped + [
+                {"$sort": {"weight_kg": -1, "_id": 1}},
+                {"$skip": page * page_size},
+                {"$limit": page_size},
+                {"$project": {"_id": 0, "name": "$_id", "quantity": 1, "weight_kg": 1, "contributions": 1}}
+            ]).to_list(None),
+            self.contributions.aggregate(grouped + [{"$count": "products"}]).to_list(None)
+        )
+        return rows, total[0]["products"] if total else 0
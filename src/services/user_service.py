@@ -0,0 +1,28 @@
+from typing import List, Optional
+
+from ..config import USERS_COLLECTION
+
+class AsyncUserService:
+    """User reads as coroutines, for loading a page's queries concurrently.
+
+    `db` is a database from get_async_database().
+    """
+
+    def __init__(self, db):
+        self.users = db[USERS_COLLECTION]
+
+    async def list_users(self, newest_first: bool = False, fields: Optional[List[str]] = None) -> List[dict]:
+        """Retrieve every user, optionally newest first and with only `fields`."""
+        projection = {field: 1 for field in fields} if fields else None
+        cursor = self.users.find({}, projection)
+        if newest_first:
+            cursor = cursor.sort("created_at", -1)
+        return await cursor.to_list(None)
+
+    async def get_user(self, email: str) -> Optional[dict]:
+        """Retrieve a user by email."""
+        return await self.users.find_one({"email": email})
+
+    async def count_users(self, role: Optional[str] = None) -> int:
+        """Count users, optionally only those with a role."""
+        return await self.users.count_documents({"role": role} if role else {})
@@ -0,0 +1,106 @@
+import asyncio
+import os
+import threading
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_loop_pid: Optional[int] = None
+_loop_lock = threading.Lock()
+
+def get_loop() -> asyncio.AbstractEventLoop:
+    """Return this process's background event loop, starting its thread on first use.
+
+    Streamlit reruns a page on its own thread, so async queries are handed to
+    one long-lived loop instead of a new loop per rerun. Motor clients are
+    bound to the loop they first run on, so they must all use this one.
+    """
+    global _loop, _loop_pid
+    pid = os.getpid()
+    if _loop is not None and _loop_pid == pid:
+        return _loop
+    with _loop_lock:
+        if _loop is None or _loop_pid != pid:
+            loop = asyncio.new_event_loop()
+            threading.Thread(target=loop.run_forever, name="aio-loop", daemon=True).start()
+            _loop, _loop_pid = loop, pid
+        return _loop
+
+def run(coroutine: Awaitable, timeout: Optional[float] = None) -> Any:
+    """Run a coroutine on the background loop and wait for its result."""
+    return asyncio.run_coroutine_threadsafe(coroutine, get_loop()).result(timeout)
+
+async def _gather(queries: Dict[str, Awaitable]) -> Dict[str, Any]:
+    results = await asyncio.gather(*queries.values(), return_exceptions=True)
+    return dict(zip(queries, results))
+
+def load_concurrently(queries: Dict[str, Awaitable], timeout: Optional[float] = None) -> Dict[str, Any]:
+    """Run a page's independent queries at the same time and return their results by name.
+
+    A query that raised has its exception as its result, so one failing
+    section does not blank the rest of the page.
+    """
+    return run(_gather(queries), timeout)
+
+class ThreadedCursor:
+    """The awaitable part of a Motor cursor over a synchronous pymongo or mongomock cursor.
+
+    The cursor is opened, sorted and read on a worker thread, never on the event loop.
+    """
+
+    def __init__(self, open_cursor: Callable[[], Any]):
+        self._open_cursor = open_cursor
+        self._modifiers: List[Tuple[str, tuple]] = []
+
+    def sort(self, *args) -> "ThreadedCursor":
+        self._modifiers.append(("sort", args))
+        return self
+
+    def limit(self, limit: int) -> "ThreadedCursor":
+        self._modifiers.append(("limit", (limit,)))
+        return self
+
+    async def to_list(self, length: Optional[int] = None) -> List[dict]:
+        def fetch():
+            cursor = self._open_cursor()
+            for name, args in self._modifiers:
+                cursor = getattr(cursor, name)(*args)
+            if length is None:
+                return list(cursor)
+            return [document for _, document in zip(range(length), cursor)]
+        return await asyncio.to_thread(fetch)
+
+class ThreadedCollection:
+    """The read methods of a Motor collection, run on worker threads over a synchronous collection.
+
+    Used where Motor cannot connect (mongomock in demo mode and tests), so
+    the async services work unchanged there.
+    """
+
+    def __init__(self, collection):
+        self._collection = collection
+
+    def find(self, *args, **kwargs) -> ThreadedCursor:
+        return ThreadedCursor(lambda: self._collection.find(*args, **kwargs))
+
+    def aggregate(self, pipeline: List[dict], **kwargs) -> ThreadedCursor:
+        return ThreadedCursor(lambda: self._collection.aggregate(pipeline, **kwargs))
+
+    async def find_one(self, *args, **kwargs) -> Optional[dict]:
+        return await asyncio.to_thread(self._collection.find_one, *args, **kwargs)
+
+    async def count_documents(self, *args, **kwargs) -> int:
+        return await asyncio.to_thread(self._collection.count_documents, *args, **kwargs)
+
+class ThreadedDatabase:
+    """A database whose collections are ThreadedCollections."""
+
+    def __init__(self, db):
+        self._db = db
+
+    def __getitem__(self, name: str) -> ThreadedCollection:
+        return ThreadedCollection(self._db[name])
+
+    def __getattr__(self, name: str) -> ThreadedCollection:
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return self[name]
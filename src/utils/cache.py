@@ -0,0 +1,134 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+from ..config import CACHE_MAX_ENTRIES, CACHE_TTL_SECONDS
+
+_MISSING = object()
+
+def _namespace(key: Hashable) -> Hashable:
+    return key[0] if isinstance(key, tuple) and key else key
+
+class TTLCache:
+    """Thread-safe, size-bounded LRU cache whose entries expire after a TTL.
+
+    Keys are tuples whose first element is a namespace (e.g. ``"trucks"``), so a
+    write can drop every entry for that namespace with ``invalidate_namespace``.
+    Each invalidation bumps the namespace's generation, and ``get_or_load``
+    does not store a value loaded while the generation moved, so a read that
+    raced a write cannot put the pre-write value back for a whole TTL.
+    """
+
+    def __init__(self, max_entries: int = CACHE_MAX_ENTRIES, ttl_seconds: float = CACHE_TTL_SECONDS):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.RLock()
+        self._generations: Dict[Hashable, int] = {}
+        self._epoch = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Return the cached value for key, or default if missing or expired."""
+        with self._lock:
+            entry = self._entries.get(key, _MISSING)
+            if entry is _MISSING:
+                self.misses += 1
+                return default
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: Hashable, value: Any, ttl_seconds: Optional[float] = None) -> None:
+        """Store a value, evicting the least recently used entries past the size bound."""
+        ttl = self.ttl_seconds if ttl_seconds is None else ttl_seconds
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def _generation(self, key: Hashable) -> Tuple[int, int]:
+        with self._lock:
+            return self._epoch, self._generations.get(_namespace(key), 0)
+
+    def _set_if_current(self, key: Hashable, value: Any, generation: Tuple[int, int],
+                        ttl_seconds: Optional[float]) -> None:
+        with self._lock:
+            if self._generation(key) == generation:
+                self.set(key, value, ttl_seconds)
+
+    def get_or_load(self, key: Hashable, loader: Callable[[], Any], ttl_seconds: Optional[float] = None) -> Any:
+        """Return the cached value for key, calling loader and caching its result on a miss.
+
+        The result is returned but not cached if the key's namespace was invalidated while loading.
+        """
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            generation = self._generation(key)
+            value = loader()
+            self._set_if_current(key, value, generation, ttl_seconds)
+        return value
+
+    async def get_or_load_async(self, key: Hashable, loader: Callable[[], Awaitable[Any]],
+                                ttl_seconds: Optional[float] = None) -> Any:
+        """get_or_load for a coroutine loader."""
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            generation = self._generation(key)
+            value = await loader()
+            self._set_if_current(key, value, generation, ttl_seconds)
+        return value
+
+    def invalidate(self, key: Hashable) -> None:
+        """Drop a single entry."""
+        with self._lock:
+            self._bump(_namespace(key))
+            if self._entries.pop(key, _MISSING) is not _MISSING:
+                self.invalidations += 1
+
+    def invalidate_namespace(self, namespace: str) -> None:
+        """Drop every entry whose key starts with the given namespace."""
+        with self._lock:
+            self._bump(namespace)
+            stale = [key for key in self._entries if isinstance(key, tuple) and key and key[0] == namespace]
+            for key in stale:
+                del self._entries[key]
+            self.invalidations += len(stale)
+
+    def _bump(self, namespace: Hashable) -> None:
+        self._generations[namespace] = self._generations.get(namespace, 0) + 1
+
+    def clear(self) -> None:
+        """Drop every entry and reset the counters."""
+        with self._lock:
+            self._epoch += 1
+            self._entries.clear()
+            self.hits = self.misses = self.evictions = self.invalidations = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hit/miss counters and current size."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations
+            }
+
+# Shared by every Streamlit session in this worker process
+reference_cache = TTLCache()
@@ -0,0 +1,59 @@
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, List, Sequence, Union
+
+import numpy as np
+
+from .helpers import DEFAULT_DELIVERY_WINDOW, with_delivery_window
+
+_SECONDS_PER_DAY = 86400
+
+@dataclass
+class DeliveryEstimate:
+    """Earliest, latest and expected delivery per order as datetime64[s] arrays."""
+    earliest: np.ndarray
+    latest: np.ndarray
+    expected: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.expected)
+
+    def expected_datetime(self, index: int) -> datetime:
+        """Return one expected delivery as a datetime."""
+        return self.expected[index].astype(datetime)
+
+def _to_datetime64(ship_dates: Union[Sequence[datetime], np.ndarray]) -> np.ndarray:
+    return np.asarray(ship_dates, dtype="datetime64[s]")
+
+def estimate_delivery_dates(
+    ship_dates: Union[Sequence[datetime], np.ndarray],
+    min_days: Union[int, np.ndarray],
+    max_days: Union[int, np.ndarray]
+) -> DeliveryEstimate:
+    """Compute delivery estimates for many ship dates in one vectorized call."""
+    ship = _to_datetime64(ship_dates)
+    min_days = np.asarray(min_days, dtype=np.int64)
+    max_days = np.asarray(max_days, dtype=np.int64)
+    return DeliveryEstimate(
+        earliest=ship + (min_days * _SECONDS_PER_DAY).astype("timedelta64[s]"),
+        latest=ship + (max_days * _SECONDS_PER_DAY).astype("timedelta64[s]"),
+        expected=ship + ((min_days + max_days) * (_SECONDS_PER_DAY // 2)).astype("timedelta64[s]")
+    )
+
+def estimate_for_plan(ship_dates: Union[Sequence[datetime], np.ndarray], plan: Dict) -> DeliveryEstimate:
+    """Compute delivery estimates for every order shipped on the same plan."""
+    if 'min_days' not in plan:
+        plan = with_delivery_window(plan)
+    return estimate_delivery_dates(ship_dates, plan['min_days'], plan['max_days'])
+
+def estimate_for_orders(orders: List[Dict], plans: Sequence[Dict]) -> DeliveryEstimate:
+    """Compute delivery estimates for orders on mixed plans, shipping from their creation date."""
+    windows = {
+        plan['name']: (plan['min_days'], plan['max_days'])
+        for plan in (p if 'min_days' in p else with_delivery_window(p) for p in plans)
+    }
+    days = np.array(
+        [windows.get(order.get('shipping_plan'), DEFAULT_DELIVERY_WINDOW) for order in orders],
+        dtype=np.int64
+    ).reshape(-1, 2)
+    return estimate_delivery_dates([order['created_at'] for order in orders], days[:, 0], days[:, 1])
@@ -0,0 +1,96 @@
+import csv
+import re
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from ..config import GEOCODER_POSTAL_FILE
+
+EARTH_RADIUS_KM = 6371.0088
+BUNDLED_POSTAL_FILE = Path(__file__).resolve().parent.parent / "data" / "postal_centroids.txt"
+
+# Country names and codes seen in addresses, mapped to ISO 3166-1 alpha-2
+COUNTRY_CODES = {
+    "ireland": "IE", "eire": "IE",
+    "united kingdom": "GB", "uk": "GB", "great britain": "GB", "england": "GB", "scotland": "GB", "wales": "GB",
+    "germany": "DE", "deutschland": "DE",
+    "united states": "US", "united states of america": "US", "usa": "US", "u.s.a.": "US", "u.s.": "US",
+    "canada": "CA",
+    "india": "IN", "bharat": "IN"
+}
+
+def _clean(value) -> str:
+    return re.sub(r"\s+", " ", str(value or "")).strip()
+
+def country_code(country: str) -> str:
+    """Return the ISO alpha-2 code for a country name or code, or "" if unknown."""
+    country = _clean(country)
+    if country.lower() in COUNTRY_CODES:
+        return COUNTRY_CODES[country.lower()]
+    return country.upper() if len(country) == 2 and country.isalpha() else ""
+
+def normalize_address(address: Dict[str, str]) -> Dict[str, str]:
+    """Return a copy of an address with whitespace collapsed, canonical case and an ISO country_code."""
+    normalized = {key: _clean(value) for key, value in (address or {}).items()}
+    if normalized.get("city"):
+        normalized["city"] = normalized["city"].title()
+    if normalized.get("postal_code"):
+        normalized["postal_code"] = normalized["postal_code"].upper()
+    normalized["country_code"] = country_code(normalized.get("country", ""))
+    return normalized
+
+def point(lon: float, lat: float) -> dict:
+    """Return a GeoJSON point."""
+    return {"type": "Point", "coordinates": [lon, lat]}
+
+class Geocoder:
+    """Offline geocoding against postal-code centroids in the GeoNames postal code format.
+
+    Addresses resolve by full postal code, then by its outward part (the text
+    before the first space, as in UK, Irish and Canadian codes), then by the
+    average centroid of the city. The file is loaded on first use.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = Path(path or GEOCODER_POSTAL_FILE or BUNDLED_POSTAL_FILE)
+        self._postal: Dict[Tuple[str, str], Tuple[float, float]] = {}
+        self._city: Dict[Tuple[str, str], Tuple[float, float]] = {}
+        self._loaded = False
+        self._lock = threading.Lock()
+
+    def _load(self) -> None:
+        with self._lock:
+            if self._loaded:
+                return
+            city_points: Dict[Tuple[str, str], List[Tuple[float, float]]] = {}
+            with open(self.path, encoding="utf-8", newline="") as f:
+                for row in csv.reader(f, delimiter="\t", quoting=csv.QUOTE_NONE):
+                    code, postal_code, place = row[0], row[1].upper(), row[2].lower()
+                    lon_lat = (float(row[10]), float(row[9]))
+                    self._postal.setdefault((code, postal_code), lon_lat)
+                    city_points.setdefault((code, place), []).append(lon_lat)
+            self._city = {
+                key: (sum(p[0] for p in points) / len(points), sum(p[1] for p in points) / len(points))
+                for key, points in city_points.items()
+            }
+            self._loaded = True
+
+    def locate(self, address: Dict[str, str]) -> Optional[Tuple[float, float]]:
+        """Return (lon, lat) for a shipping address, or None if it cannot be placed."""
+        if not self._loaded:
+            self._load()
+        normalized = normalize_address(address)
+        code = normalized["country_code"]
+        postal_code = normalized.get("postal_code", "")
+        if postal_code:
+            for key in (postal_code, postal_code.split(" ")[0]):
+                if (code, key) in self._postal:
+                    return self._postal[(code, key)]
+        return self._city.get((code, normalized.get("city", "").lower()))
+
+    def geocode(self, address: Dict[str, str]) -> Optional[dict]:
+        """Return a shipping address as a GeoJSON point, or None if it cannot be placed."""
+        lon_lat = self.locate(address)
+        return point(*lon_lat) if lon_lat else None
+
+default_geocoder = Geocoder()
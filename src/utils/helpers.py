@@ -1,17 +1,17 @@
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Tuple
 from datetime import datetime, timedelta
+from functools import lru_cache
 import json
+import re
+
+from .money import format_cents, to_cents
+
+DEFAULT_DELIVERY_WINDOW = (7, 7)
+_DELIVERY_WINDOW_RE = re.compile(r"(\d+)\s*(?:-\s*(\d+))?")
 
 def format_currency(amount: float, currency: str = "EUR") -> str:
-    """Format a number as currency."""
-    currency_symbols = {
-        "EUR": "€",
-        "USD": "$",
-        "GBP": "£",
-        "INR": "₹"
-    }
-    symbol = currency_symbols.get(currency, currency)
-    return f"{symbol}{amount:,.2f}"
+    """Format a number as currency, rounded to cents half up."""
+    return format_cents(to_cents(amount), currency)
 
 def format_weight(weight_kg: float) -> str:
     """Format weight in kilograms."""
@@ -41,18 +41,28 @@ def validate_contact_info(contact: Dict[str, str]) -> bool:
     required_fields = ["name", "email", "phone"]
     return all(field in contact and contact[field].strip() for field in required_fields)
 
+@lru_cache(maxsize=256)
+def parse_delivery_window(delivery_timeframe: str) -> Tuple[int, int]:
+    """Parse a timeframe like "3-5 days" or "7 days" into (min_days, max_days)."""
+    match = _DELIVERY_WINDOW_RE.search(delivery_timeframe or "")
+    if not match:
+        return DEFAULT_DELIVERY_WINDOW
+    min_days = int(match.group(1))
+    max_days = int(match.group(2) or min_days)
+    return min(min_days, max_days), max(min_days, max_days)
+
+def with_delivery_window(plan: Dict[str, Any]) -> Dict[str, Any]:
+    """Return a copy of a shipping plan with its delivery timeframe parsed into min/max days."""
+    min_days, max_days = parse_delivery_window(plan.get("delivery_time", ""))
+    return {**plan, "min_days": min_days, "max_days": max_days}
+
 def calculate_estimated_delivery_date(
     shipping_date: datetime,
     delivery_timeframe: str
 ) -> datetime:
     """Calculate estimated delivery date based on shipping date and timeframe."""
-    # Parse delivery timeframe (e.g., "3-5 days")
-    try:
-        min_days, max_days = map(int, delivery_timeframe.split("-")[0].split())
-        avg_days = (min_days + max_days) / 2
-        return shipping_date + timedelta(days=avg_days)
-    except (ValueError, IndexError):
-        return shipping_date + timedelta(days=7)  # Default to 7 days if parsing fails
+    min_days, max_days = parse_delivery_window(delivery_timeframe)
+    return shipping_date + timedelta(days=(min_days + max_days) / 2)
 
 def format_order_summary(order: Dict[str, Any]) -> str:
     """Format order details into a readable summary."""
@@ -0,0 +1,250 @@
+import bisect
+import contextvars
+import functools
+import logging
+import random
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import bson
+from pymongo import monitoring
+
+from ..config import METRICS_BYTES_SAMPLE_RATE, METRICS_EXPORT_INTERVAL_SECONDS, METRICS_FILE, SLOW_QUERY_MS
+
+logger = logging.getLogger("crowdcargo.slow_queries")
+
+# Upper bounds (ms) of the latency histogram buckets; the last bucket is +Inf
+LATENCY_BUCKETS_MS = [0.5, 1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000]
+
+_query_tag: contextvars.ContextVar[str] = contextvars.ContextVar("query_tag", default="untagged")
+_thread_totals = threading.local()
+
+def mongo_time_ms() -> float:
+    """Return the cumulative MongoDB command time observed on the calling thread."""
+    return getattr(_thread_totals, "ms", 0.0)
+
+def set_query_tag(tag: str) -> contextvars.Token:
+    """Tag every MongoDB command issued from this context until reset."""
+    return _query_tag.set(tag)
+
+@contextmanager
+def query_tag(name: str):
+    """Tag MongoDB commands issued inside the block, nested under the current tag."""
+    parent = _query_tag.get()
+    token = _query_tag.set(name if parent == "untagged" else f"{parent}/{name}")
+    try:
+        yield
+    finally:
+        _query_tag.reset(token)
+
+def tagged(name: Optional[str] = None):
+    """Decorator that tags MongoDB commands issued by a function with its name."""
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with query_tag(name or fn.__name__):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+class LatencyHistogram:
+    """Fixed-bucket latency histogram with approximate percentiles."""
+
+    def __init__(self, buckets_ms: List[float] = LATENCY_BUCKETS_MS):
+        self.buckets_ms = buckets_ms
+        self.counts = [0] * (len(buckets_ms) + 1)
+        self.count = 0
+        self.sum_ms = 0.0
+        self.max_ms = 0.0
+
+    def observe(self, value_ms: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets_ms, value_ms)] += 1
+        self.count += 1
+        self.sum_ms += value_ms
+        self.max_ms = max(self.max_ms, value_ms)
+
+    def percentile(self, q: float) -> float:
+        """Return the q-th percentile (0-100), interpolated within its bucket."""
+        if not self.count:
+            return 0.0
+        rank = q / 100 * self.count
+        cumulative = 0
+        for i, bucket_count in enumerate(self.counts):
+            if cumulative + bucket_count >= rank and bucket_count:
+                lower = self.buckets_ms[i - 1] if i > 0 else 0.0
+                upper = self.buckets_ms[i] if i < len(self.buckets_ms) else self.max_ms
+                fraction = (rank - cumulative) / bucket_count
+                return min(lower + (upper - lower) * fraction, self.max_ms)
+            cumulative += bucket_count
+        return self.max_ms
+
+def query_shape(command_name: str, command: Dict[str, Any]) -> Tuple[str, str]:
+    """Return (collection, shape) for a command, ignoring literal values."""
+    collection = command.get(command_name)
+    if command_name == "getMore":
+        collection = command.get("collection")
+    if not isinstance(collection, str):
+        collection = ""
+
+    if command_name in ("find", "count", "countDocuments", "distinct", "findAndModify"):
+        keys = sorted((command.get("filter") or command.get("query") or {}).keys())
+        shape = f"{{{','.join(keys)}}}"
+        if command.get("sort"):
+            shape += f" sort={','.join(command['sort'].keys())}"
+    elif command_name == "aggregate":
+        shape = "[" + ",".join(next(iter(stage)) for stage in command.get("pipeline", [])) + "]"
+    elif command_name in ("update", "delete"):
+        statements = command.get("updates") or command.get("deletes") or [{}]
+        shape = f"{{{','.join(sorted((statements[0].get('q') or {}).keys()))}}}"
+    else:
+        shape = ""
+    return collection, f"{command_name} {collection} {shape}".strip()
+
+class QueryStats:
+    """Aggregated metrics for one (tag, query shape) pair."""
+
+    def __init__(self, tag: str, collection: str, shape: str):
+        self.tag = tag
+        self.collection = collection
+        self.shape = shape
+        self.latency = LatencyHistogram()
+        self.documents = 0
+        self.bytes = 0
+        self.errors = 0
+
+class CommandMetrics(monitoring.CommandListener):
+    """Records per-command latency, documents and reply bytes, tagged by caller.
+
+    Counting bytes re-encodes the reply, so it is done for a `bytes_sample_rate`
+    share of replies (none by default) and scaled up to estimate the total.
+    """
+
+    def __init__(self, slow_query_ms: float = SLOW_QUERY_MS, bytes_sample_rate: float = METRICS_BYTES_SAMPLE_RATE):
+        self.slow_query_ms = slow_query_ms
+        self.bytes_sample_rate = bytes_sample_rate
+        self._lock = threading.Lock()
+        self._pending: Dict[Tuple[int, Any], Tuple[str, str, str]] = {}
+        self.stats: Dict[Tuple[str, str], QueryStats] = {}
+        self.slow_queries: deque = deque(maxlen=100)
+        self._last_export = 0.0
+
+    def started(self, event):
+        collection, shape = query_shape(event.command_name, event.command)
+        with self._lock:
+            self._pending[(event.request_id, event.connection_id)] = (_query_tag.get(), collection, shape)
+
+    def _finish(self, event, reply: Optional[Dict[str, Any]], failed: bool) -> None:
+        duration_ms = event.duration_micros / 1000
+        _thread_totals.ms = mongo_time_ms() + duration_ms
+        documents = 0
+        size = 0
+        if reply:
+            cursor = reply.get("cursor")
+            if isinstance(cursor, dict):
+                documents = len(cursor.get("firstBatch") or cursor.get("nextBatch") or [])
+            elif isinstance(reply.get("n"), int):
+                documents = reply["n"]
+            if self.bytes_sample_rate > 0 and random.random() < self.bytes_sample_rate:
+                size = round(len(bson.encode(reply)) / self.bytes_sample_rate)
+
+        with self._lock:
+            pending = self._pending.pop((event.request_id, event.connection_id), None)
+            if pending is None:
+                return
+            tag, collection, shape = pending
+            stats = self.stats.get((tag, shape))
+            if stats is None:
+                stats = self.stats[(tag, shape)] = QueryStats(tag, collection, shape)
+            stats.latency.observe(duration_ms)
+            stats.documents += documents
+            stats.bytes += size
+            stats.errors += int(failed)
+
+        if duration_ms >= self.slow_query_ms:
+            entry = {"tag": tag, "shape": shape, "duration_ms": duration_ms, "documents": documents, "at": time.time()}
+            self.slow_queries.append(entry)
+            logger.warning("slow query %.1f ms [%s] %s (%d docs)", duration_ms, tag, shape, documents)
+
+    def succeeded(self, event):
+        self._finish(event, event.reply, failed=False)
+
+    def failed(self, event):
+        self._finish(event, None, failed=True)
+
+    def reset(self) -> None:
+        """Drop every recorded metric."""
+        with self._lock:
+            self.stats.clear()
+            self._pending.clear()
+            self.slow_queries.clear()
+
+    def summary(self) -> List[Dict[str, Any]]:
+        """Return one row per (tag, query shape) with latency percentiles, slowest p95 first."""
+        with self._lock:
+            rows = [
+                {
+                    "tag": s.tag,
+                    "shape": s.shape,
+                    "count": s.latency.count,
+                    "p50_ms": s.latency.percentile(50),
+                    "p95_ms": s.latency.percentile(95),
+                    "p99_ms": s.latency.percentile(99),
+                    "max_ms": s.latency.max_ms,
+                    "documents": s.documents,
+                    "bytes": s.bytes,
+                    "errors": s.errors
+                }
+                for s in self.stats.values()
+            ]
+        return sorted(rows, key=lambda row: row["p95_ms"], reverse=True)
+
+    def render_prometheus(self) -> str:
+        """Render the metrics in the Prometheus text exposition format."""
+        lines = [
+            "# HELP crowdcargo_mongo_command_duration_ms MongoDB command latency in milliseconds.",
+            "# TYPE crowdcargo_mongo_command_duration_ms histogram"
+        ]
+        totals = []
+        with self._lock:
+            for s in self.stats.values():
+                labels = f'tag="{_escape(s.tag)}",shape="{_escape(s.shape)}"'
+                cumulative = 0
+                for bound, count in zip(s.latency.buckets_ms + ["+Inf"], s.latency.counts):
+                    cumulative += count
+                    lines.append(f'crowdcargo_mongo_command_duration_ms_bucket{{{labels},le="{bound}"}} {cumulative}')
+                lines.append(f"crowdcargo_mongo_command_duration_ms_sum{{{labels}}} {s.latency.sum_ms}")
+                lines.append(f"crowdcargo_mongo_command_duration_ms_count{{{labels}}} {s.latency.count}")
+                totals.append((labels, s.documents, s.bytes, s.errors))
+        for name, index, help_text in [
+            ("documents_total", 1, "Documents returned by MongoDB commands."),
+            ("reply_bytes_total", 2, "Reply bytes returned by MongoDB commands, estimated from sampled replies."),
+            ("errors_total", 3, "Failed MongoDB commands.")
+        ]:
+            lines.append(f"# HELP crowdcargo_mongo_command_{name} {help_text}")
+            lines.append(f"# TYPE crowdcargo_mongo_command_{name} counter")
+            lines.extend(f"crowdcargo_mongo_command_{name}{{{row[0]}}} {row[index]}" for row in totals)
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path: str) -> None:
+        """Atomically write the Prometheus text to a file (e.g. for a textfile collector)."""
+        target = Path(path)
+        target.parent.mkdir(parents=True, exist_ok=True)
+        tmp = target.with_suffix(target.suffix + ".tmp")
+        tmp.write_text(self.render_prometheus())
+        tmp.replace(target)
+
+    def maybe_export(self) -> None:
+        """Write METRICS_FILE if configured and the export interval has passed."""
+        now = time.monotonic()
+        if METRICS_FILE and now - self._last_export >= METRICS_EXPORT_INTERVAL_SECONDS:
+            self._last_export = now
+            self.write_prometheus(METRICS_FILE)
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+command_metrics = CommandMetrics()
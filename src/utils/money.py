@@ -0,0 +1,178 @@
+import json
+import threading
+from dataclasses import dataclass
+from decimal import ROUND_HALF_UP, Decimal
+from fractions import Fraction
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from ..config import FX_RATES_FILE, FX_REFRESH_SECONDS
+from .cache import TTLCache
+
+BUNDLED_FX_FILE = Path(__file__).resolve().parent.parent / "data" / "fx_rates.json"
+CURRENCY_SYMBOLS = {
+    "EUR": "€",
+    "USD": "$",
+    "GBP": "£",
+    "INR": "₹"
+}
+
+def to_cents(amount) -> int:
+    """Convert an amount in major units (a float, int, Decimal or numeric string) to integer cents, rounding half up.
+
+    Floats go through their shortest repr, so 2.675 is 268 cents, not the 267
+    its binary value would round to.
+    """
+    if isinstance(amount, float):
+        amount = repr(amount)
+    return int(Decimal(amount).quantize(Decimal(1).scaleb(-2), ROUND_HALF_UP).scaleb(2))
+
+def from_cents(cents: int) -> float:
+    """Return cents as a float amount in major units, e.g. for pydantic fields and charts."""
+    return cents / 100
+
+def cents_array(amounts) -> np.ndarray:
+    """Convert an array of amounts in major units to int64 cents, rounding like to_cents().
+
+    Amounts written with at most three decimals are rounded half up from
+    their exact thousandths, so 0.125 is 13 cents and 1.005 is 101. Any other
+    amount cannot be a tie; the few within float error of a half cent go
+    through to_cents().
+    """
+    amounts = np.asarray(amounts, dtype=np.float64)
+    mills = np.rint(amounts * 1000)
+    short = mills / 1000 == amounts
+    scaled = amounts * 100
+    cents = np.where(short, np.sign(mills) * ((np.abs(mills) + 5) // 10), np.rint(scaled))
+    unsure = ~short & (np.abs(scaled - np.floor(scaled) - 0.5) < 1e-6)
+    if unsure.any():
+        cents[unsure] = [to_cents(float(amount)) for amount in amounts[unsure]]
+    return cents.astype(np.int64)
+
+def sum_cents(amounts) -> int:
+    """Sum amounts in major units exactly, as int64 cents."""
+    return int(cents_array(amounts).sum())
+
+def line_total_cents(price, quantity: int) -> int:
+    return to_cents(price) * int(quantity)
+
+def total_cents(items: Iterable[dict]) -> int:
+    """Sum price * quantity over cart or order items, in cents."""
+    return sum(line_total_cents(item["price"], item["quantity"]) for item in items)
+
+def format_cents(cents: int, currency: str = "EUR") -> str:
+    """Format integer cents as currency, e.g. 123456 EUR as €1,234.56."""
+    symbol = CURRENCY_SYMBOLS.get(currency, currency)
+    sign = "-" if cents < 0 else ""
+    units, remainder = divmod(abs(int(cents)), 100)
+    return f"{sign}{symbol}{units:,}.{remainder:02d}"
+
+@dataclass(frozen=True)
+class Money:
+    """An exact amount: integer cents in a currency."""
+    cents: int
+    currency: str = "EUR"
+
+    @classmethod
+    def of(cls, amount, currency: str = "EUR") -> "Money":
+        return cls(to_cents(amount), currency)
+
+    @property
+    def amount(self) -> float:
+        return from_cents(self.cents)
+
+    def _check_currency(self, other: "Money") -> None:
+        if other.currency != self.currency:
+            raise ValueError(f"cannot combine {self.currency} and {other.currency} amounts; convert first")
+
+    def __add__(self, other: "Money") -> "Money":
+        self._check_currency(other)
+        return Money(self.cents + other.cents, self.currency)
+
+    def __sub__(self, other: "Money") -> "Money":
+        self._check_currency(other)
+        return Money(self.cents - other.cents, self.currency)
+
+    def __mul__(self, quantity: int) -> "Money":
+        return Money(self.cents * int(quantity), self.currency)
+
+    __rmul__ = __mul__
+
+    def __str__(self) -> str:
+        return format_cents(self.cents, self.currency)
+
+def load_fx_file(path: Optional[str] = None) -> Dict[str, Decimal]:
+    """Read rates per one unit of the file's base currency from a JSON file like src/data/fx_rates.json."""
+    with open(path or FX_RATES_FILE or BUNDLED_FX_FILE, encoding="utf-8") as f:
+        data = json.load(f)
+    rates = {code: Decimal(str(rate)) for code, rate in data["rates"].items()}
+    rates[data["base"]] = Decimal(1)
+    return rates
+
+class FxTable:
+    """Exchange rates between the currencies format_currency knows, reloaded every refresh_seconds.
+
+    `source` returns rates against any common base currency; the default reads
+    FX_RATES_FILE, or the bundled fixture when unset. Each currency pair's rate
+    is kept as an exact fraction, memoized until the rates are reloaded, and
+    conversions round half to even once, at the end.
+    """
+
+    def __init__(self, source=load_fx_file, refresh_seconds: float = FX_REFRESH_SECONDS, cache: Optional[TTLCache] = None):
+        self.source = source
+        self.refresh_seconds = refresh_seconds
+        self.cache = cache if cache is not None else TTLCache(max_entries=16, ttl_seconds=refresh_seconds)
+        self._ratios: Dict[Tuple[str, str], Fraction] = {}
+        self._ratios_for: Optional[dict] = None
+        self._lock = threading.Lock()
+
+    def rates(self) -> Dict[str, Decimal]:
+        return self.cache.get_or_load(("fx", "rates"), self.source, self.refresh_seconds)
+
+    def currencies(self) -> List[str]:
+        return sorted(self.rates())
+
+    def _ratio(self, from_currency: str, to_currency: str) -> Fraction:
+        rates = self.rates()
+        with self._lock:
+            if rates is not self._ratios_for:
+                # The rates were reloaded: drop the pair rates worked out from the old ones
+                self._ratios, self._ratios_for = {}, rates
+            ratio = self._ratios.get((from_currency, to_currency))
+            if ratio is None:
+                for code in (from_currency, to_currency):
+                    if code not in rates:
+                        raise KeyError(f"no exchange rate for {code}")
+                ratio = Fraction(rates[to_currency]) / Fraction(rates[from_currency])
+                self._ratios[(from_currency, to_currency)] = ratio
+            return ratio
+
+    def rate(self, from_currency: str, to_currency: str) -> Decimal:
+        """Return how many units of to_currency one unit of from_currency buys."""
+        ratio = self._ratio(from_currency, to_currency)
+        return Decimal(ratio.numerator) / Decimal(ratio.denominator)
+
+    def convert_cents(self, cents: int, from_currency: str, to_currency: str) -> int:
+        if from_currency == to_currency:
+            return int(cents)
+        # round() on a Fraction rounds half to even
+        return round(int(cents) * self._ratio(from_currency, to_currency))
+
+    def convert(self, money: Money, to_currency: str) -> Money:
+        return Money(self.convert_cents(money.cents, money.currency, to_currency), to_currency)
+
+    def convert_array(self, cents, from_currency: str, to_currency: str) -> np.ndarray:
+        """Convert int64 cents in bulk, rounding exactly as convert_cents does."""
+        cents = np.asarray(cents, dtype=np.int64)
+        if from_currency == to_currency or not len(cents):
+            return cents
+        ratio = self._ratio(from_currency, to_currency)
+        if int(np.abs(cents).max()) * ratio.numerator >= 2 ** 62:
+            # Would overflow int64; rare enough to do one by one
+            return np.array([round(int(c) * ratio) for c in cents], dtype=np.int64)
+        quotient, remainder = np.divmod(cents * ratio.numerator, ratio.denominator)
+        twice = 2 * remainder
+        round_up = (twice > ratio.denominator) | ((twice == ratio.denominator) & (quotient % 2 == 1))
+        return quotient + round_up
@@ -0,0 +1,174 @@
+import cProfile
+import functools
+import json
+import logging
+import pstats
+import statistics
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime
+from logging.handlers import RotatingFileHandler
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from ..config import PROFILE_DIR, PROFILE_LOG_BACKUPS, PROFILE_LOG_MAX_BYTES, PROFILE_MODE
+from .instrumentation import mongo_time_ms
+
+PROFILE_LOG = Path(PROFILE_DIR) / "profile.jsonl"
+MAX_PROFILE_DUMPS = 50
+
+_local = threading.local()
+_logger: Optional[logging.Logger] = None
+_logger_lock = threading.Lock()
+
+def profiling_enabled() -> bool:
+    """Return whether CROWDCARGO_PROFILE is set."""
+    return PROFILE_MODE in ("timer", "cprofile", "pyinstrument")
+
+def _get_logger() -> logging.Logger:
+    global _logger
+    with _logger_lock:
+        if _logger is None:
+            PROFILE_LOG.parent.mkdir(parents=True, exist_ok=True)
+            handler = RotatingFileHandler(PROFILE_LOG, maxBytes=PROFILE_LOG_MAX_BYTES, backupCount=PROFILE_LOG_BACKUPS)
+            handler.setFormatter(logging.Formatter("%(message)s"))
+            logger = logging.getLogger("crowdcargo.profile")
+            logger.setLevel(logging.INFO)
+            logger.propagate = False
+            logger.handlers = [handler]
+            _logger = logger
+        return _logger
+
+def _prune_dumps(directory: Path) -> None:
+    dumps = sorted([*directory.glob("*.prof"), *directory.glob("*.html")], key=lambda p: p.stat().st_mtime)
+    for stale in dumps[:-MAX_PROFILE_DUMPS]:
+        stale.unlink(missing_ok=True)
+
+class ProfileSection:
+    """Times one named section of a rerun; only the outermost section captures a profile.
+
+    A root section resets the nesting depth, since Streamlit's ``st.rerun``/``st.stop``
+    can abandon sections of the previous run without stopping them.
+    """
+
+    def __init__(self, name: str, root: bool = False):
+        self.name = name
+        self._stopped = False
+        self._depth = 0 if root else getattr(_local, "depth", 0)
+        _local.depth = self._depth + 1
+        self._profiler = None
+        if self._depth == 0 and PROFILE_MODE == "cprofile":
+            self._profiler = cProfile.Profile()
+            self._profiler.enable()
+        elif self._depth == 0 and PROFILE_MODE == "pyinstrument":
+            try:
+                from pyinstrument import Profiler
+                self._profiler = Profiler()
+                self._profiler.start()
+            except ImportError:
+                self._profiler = None
+        self._mongo_start = mongo_time_ms()
+        self._start = time.perf_counter()
+
+    def stop(self) -> None:
+        """Stop timing and append the record to the profile log."""
+        if self._stopped:
+            return
+        self._stopped = True
+        elapsed_ms = (time.perf_counter() - self._start) * 1000
+        _local.depth = self._depth
+        record = {
+            "section": self.name,
+            "at": datetime.now().isoformat(),
+            "elapsed_ms": round(elapsed_ms, 3),
+            "mongo_ms": round(mongo_time_ms() - self._mongo_start, 3),
+            "depth": self._depth
+        }
+        if self._profiler is not None:
+            record["profile"] = self._dump_profile()
+        _get_logger().info(json.dumps(record))
+
+    def _dump_profile(self) -> str:
+        directory = PROFILE_LOG.parent / "profiles"
+        directory.mkdir(parents=True, exist_ok=True)
+        stem = f"{self.name.replace(':', '_').replace(' ', '_')}-{time.time_ns()}"
+        if isinstance(self._profiler, cProfile.Profile):
+            self._profiler.disable()
+            path = directory / f"{stem}.prof"
+            pstats.Stats(self._profiler).dump_stats(path)
+        else:
+            self._profiler.stop()
+            path = directory / f"{stem}.html"
+            path.write_text(self._profiler.output_html())
+        _prune_dumps(directory)
+        return str(path)
+
+    def __enter__(self) -> "ProfileSection":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
+
+class _NullSection:
+    def stop(self) -> None:
+        pass
+
+    def __enter__(self) -> "_NullSection":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        pass
+
+_NULL_SECTION = _NullSection()
+
+def start_section(name: str, root: bool = False):
+    """Start timing a section; call .stop() on the result (or use it as a context manager)."""
+    return ProfileSection(name, root) if profiling_enabled() else _NULL_SECTION
+
+def profiled(name: Optional[str] = None):
+    """Decorator that times every call of a function when profiling is enabled."""
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not profiling_enabled():
+                return fn(*args, **kwargs)
+            with ProfileSection(name or fn.__name__):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def read_records(path: Path = PROFILE_LOG) -> List[Dict[str, Any]]:
+    """Read profile records from the current log and its rotated backups."""
+    records = []
+    for candidate in [path] + [Path(f"{path}.{i}") for i in range(1, PROFILE_LOG_BACKUPS + 1)]:
+        if not candidate.exists():
+            continue
+        with open(candidate) as f:
+            for line in f:
+                try:
+                    records.append(json.loads(line))
+                except json.JSONDecodeError:
+                    continue
+    return records
+
+def summarize(records: Optional[List[Dict[str, Any]]] = None) -> List[Dict[str, Any]]:
+    """Summarize elapsed and MongoDB time per section, slowest p95 first."""
+    if records is None:
+        records = read_records()
+    by_section = defaultdict(list)
+    for record in records:
+        by_section[record["section"]].append(record)
+    rows = []
+    for section, entries in by_section.items():
+        elapsed = sorted(e["elapsed_ms"] for e in entries)
+        rows.append({
+            "section": section,
+            "count": len(entries),
+            "p50_ms": statistics.median(elapsed),
+            "p95_ms": elapsed[min(len(elapsed) - 1, int(len(elapsed) * 0.95))],
+            "max_ms": elapsed[-1],
+            "avg_mongo_ms": statistics.mean(e.get("mongo_ms", 0.0) for e in entries),
+            "last_profile": next((e["profile"] for e in reversed(entries) if "profile" in e), None)
+        })
+    return sorted(rows, key=lambda row: row["p95_ms"], reverse=True)
@@ -0,0 +1,267 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+from ..config import (
+    EXPENSIVE_GLOBAL_BURST, EXPENSIVE_GLOBAL_PER_MINUTE, EXPENSIVE_MAX_RESULTS, EXPENSIVE_RESULT_TTL_SECONDS,
+    EXPENSIVE_USER_BURST, EXPENSIVE_USER_PER_MINUTE, RATE_LIMIT_MAX_USERS
+)
+
+class RateLimited(Exception):
+    """Raised when an expensive operation is refused by a rate limit."""
+
+    def __init__(self, operation: str, scope: str, retry_after: float):
+        super().__init__(f"too many {operation} requests ({scope} limit); retry in {retry_after:.0f}s")
+        self.operation = operation
+        self.scope = scope
+        self.retry_after = retry_after
+
+class TokenBucket:
+    """Allows bursts of `capacity` calls, refilled at `rate_per_second`. Not thread-safe on its own."""
+
+    def __init__(self, rate_per_second: float, capacity: float, clock: Callable[[], float] = time.monotonic):
+        self.rate_per_second = rate_per_second
+        self.capacity = capacity
+        self.clock = clock
+        self.tokens = float(capacity)
+        self.updated_at = clock()
+
+    def _refill(self) -> None:
+        now = self.clock()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate_per_second)
+        self.updated_at = now
+
+    def try_take(self, tokens: float = 1) -> bool:
+        self._refill()
+        if self.tokens < tokens:
+            return False
+        self.tokens -= tokens
+        return True
+
+    def give_back(self, tokens: float = 1) -> None:
+        self.tokens = min(self.capacity, self.tokens + tokens)
+
+    def retry_after(self, tokens: float = 1) -> float:
+        """Seconds until `tokens` will be available."""
+        self._refill()
+        return max(0.0, (tokens - self.tokens) / self.rate_per_second) if self.rate_per_second else float("inf")
+
+class RateLimiter:
+    """Per-user and global token buckets for each named operation.
+
+    A call must get a token from its user's bucket and from the operation's
+    global bucket. User buckets are kept for the `max_users` most recently
+    seen users; a forgotten user starts again with a full bucket.
+    """
+
+    def __init__(self, user_per_minute: float = EXPENSIVE_USER_PER_MINUTE, user_burst: float = EXPENSIVE_USER_BURST,
+                 global_per_minute: float = EXPENSIVE_GLOBAL_PER_MINUTE, global_burst: float = EXPENSIVE_GLOBAL_BURST,
+                 max_users: int = RATE_LIMIT_MAX_USERS, clock: Callable[[], float] = time.monotonic):
+        self.user_per_minute = user_per_minute
+        self.user_burst = user_burst
+        self.global_per_minute = global_per_minute
+        self.global_burst = global_burst
+        self.max_users = max_users
+        self.clock = clock
+        self._users: "OrderedDict[Tuple[str, Hashable], TokenBucket]" = OrderedDict()
+        self._global: Dict[str, TokenBucket] = {}
+        self._lock = threading.Lock()
+        self.allowed: Dict[str, int] = {}
+        self.rejected: Dict[Tuple[str, str], int] = {}
+
+    def _user_bucket(self, operation: str, user_id: Hashable) -> TokenBucket:
+        key = (operation, user_id)
+        bucket = self._users.get(key)
+        if bucket is None:
+            bucket = self._users[key] = TokenBucket(self.user_per_minute / 60, self.user_burst, self.clock)
+            while len(self._users) > self.max_users:
+                self._users.popitem(last=False)
+        self._users.move_to_end(key)
+        return bucket
+
+    def acquire(self, operation: str, user_id: Optional[Hashable] = None) -> None:
+        """Take a token for one call, or raise RateLimited. Anonymous calls only count against the global limit."""
+        with self._lock:
+            user_bucket = self._user_bucket(operation, user_id) if user_id is not None else None
+            if user_bucket is not None and not user_bucket.try_take():
+                self._reject(operation, "user")
+                raise RateLimited(operation, "user", user_bucket.retry_after())
+            global_bucket = self._global.get(operation)
+            if global_bucket is None:
+                global_bucket = self._global[operation] = TokenBucket(
+                    self.global_per_minute / 60, self.global_burst, self.clock
+                )
+            if not global_bucket.try_take():
+                # The user's token was not spent on anything
+                if user_bucket is not None:
+                    user_bucket.give_back()
+                self._reject(operation, "global")
+                raise RateLimited(operation, "global", global_bucket.retry_after())
+            self.allowed[operation] = self.allowed.get(operation, 0) + 1
+
+    def _reject(self, operation: str, scope: str) -> None:
+        self.rejected[(operation, scope)] = self.rejected.get((operation, scope), 0) + 1
+
+    def counts(self) -> Tuple[Dict[str, int], Dict[Tuple[str, str], int]]:
+        """Return copies of the allowed counts per operation and rejected counts per (operation, scope)."""
+        with self._lock:
+            return dict(self.allowed), dict(self.rejected)
+
+_MISSING = object()
+
+class _Flight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = _MISSING
+        self.error: Optional[Exception] = None
+
+class SingleFlight:
+    """Runs one call per key at a time; concurrent callers with the same key wait for it and share its result."""
+
+    def __init__(self):
+        self._flights: Dict[Hashable, _Flight] = {}
+        self._lock = threading.Lock()
+        self.executed = 0
+        self.coalesced = 0
+
+    def in_flight(self, key: Hashable) -> bool:
+        with self._lock:
+            return key in self._flights
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Any:
+        """Return fn(), or the result of the call already running for key. Exceptions are shared too."""
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+                self.executed += 1
+            else:
+                self.coalesced += 1
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            if flight.result is _MISSING:
+                # The leader was interrupted (e.g. its Streamlit session reran), so nothing to share
+                return self.do(key, fn)
+            return flight.result
+        try:
+            flight.result = fn()
+            return flight.result
+        except Exception as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+            flight.done.set()
+
+class ExpensiveCalls:
+    """Rate limits expensive operations and coalesces concurrent calls for the same key.
+
+    Joining a computation that is already running costs nothing, so only the
+    caller that starts one takes a token. The last result per key is kept:
+    within `result_ttl_seconds` it is reused without a token, and after that
+    it is served stale when a limit refuses to recompute it. Counters cover
+    every Streamlit session in this process; each server process limits on its own.
+    """
+
+    def __init__(self, limiter: Optional[RateLimiter] = None, flights: Optional[SingleFlight] = None,
+                 result_ttl_seconds: float = EXPENSIVE_RESULT_TTL_SECONDS, max_results: int = EXPENSIVE_MAX_RESULTS):
+        self.limiter = limiter if limiter is not None else RateLimiter()
+        self.flights = flights if flights is not None else SingleFlight()
+        self.result_ttl_seconds = result_ttl_seconds
+        self.max_results = max_results
+        self._results: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.reused = 0
+        self.stale = 0
+
+    def _last(self, flight_key: Hashable) -> Optional[Tuple[float, Any]]:
+        with self._lock:
+            entry = self._results.get(flight_key)
+            if entry is not None:
+                self._results.move_to_end(flight_key)
+            return entry
+
+    def _remember(self, flight_key: Hashable, value: Any) -> None:
+        with self._lock:
+            self._results[flight_key] = (self.limiter.clock(), value)
+            self._results.move_to_end(flight_key)
+            while len(self._results) > self.max_results:
+                self._results.popitem(last=False)
+
+    def run(self, operation: str, fn: Callable[[], Any], key: Hashable = (), user_id: Optional[Hashable] = None) -> Any:
+        """Return fn() for (operation, key), a recent or stale result, or raise RateLimited if there is none."""
+        flight_key = (operation, key)
+        last = self._last(flight_key)
+        if last is not None and self.limiter.clock() - last[0] < self.result_ttl_seconds:
+            with self._lock:
+                self.reused += 1
+            return last[1]
+        if not self.flights.in_flight(flight_key):
+            try:
+                self.limiter.acquire(operation, user_id)
+            except RateLimited:
+                if last is None:
+                    raise
+                with self._lock:
+                    self.stale += 1
+                return last[1]
+
+        def compute():
+            value = fn()
+            self._remember(flight_key, value)
+            return value
+        return self.flights.do(flight_key, compute)
+
+    def result_age(self, operation: str, key: Hashable = ()) -> Optional[float]:
+        """Seconds since the kept result for (operation, key) was computed, or None if there is none."""
+        last = self._last((operation, key))
+        return None if last is None else self.limiter.clock() - last[0]
+
+    def stats(self) -> Dict[str, Any]:
+        """Return allowed, rejected, coalesced, reused and stale call counts."""
+        allowed, rejected = self.limiter.counts()
+        return {
+            "allowed": allowed,
+            "rejected": {f"{operation}/{scope}": count for (operation, scope), count in rejected.items()},
+            "executed": self.flights.executed,
+            "coalesced": self.flights.coalesced,
+            "reused": self.reused,
+            "stale": self.stale
+        }
+
+    def render_prometheus(self) -> str:
+        """Render stats() in the Prometheus text exposition format."""
+        allowed, rejected = self.limiter.counts()
+        lines = [
+            "# HELP crowdcargo_expensive_calls_allowed_total Expensive operations that passed the rate limits.",
+            "# TYPE crowdcargo_expensive_calls_allowed_total counter"
+        ]
+        lines.extend(f'crowdcargo_expensive_calls_allowed_total{{operation="{operation}"}} {count}' for operation, count in allowed.items())
+        lines += [
+            "# HELP crowdcargo_expensive_calls_rejected_total Expensive operations refused by a rate limit.",
+            "# TYPE crowdcargo_expensive_calls_rejected_total counter"
+        ]
+        lines.extend(
+            f'crowdcargo_expensive_calls_rejected_total{{operation="{operation}",scope="{scope}"}} {count}'
+            for (operation, scope), count in rejected.items()
+        )
+        lines += [
+            "# HELP crowdcargo_expensive_calls_coalesced_total Calls that waited on an identical call already running.",
+            "# TYPE crowdcargo_expensive_calls_coalesced_total counter",
+            f"crowdcargo_expensive_calls_coalesced_total {self.flights.coalesced}",
+            "# HELP crowdcargo_expensive_calls_reused_total Calls answered by a result computed within the result TTL.",
+            "# TYPE crowdcargo_expensive_calls_reused_total counter",
+            f"crowdcargo_expensive_calls_reused_total {self.reused}",
+            "# HELP crowdcargo_expensive_calls_stale_total Calls refused by a rate limit and answered by an older result.",
+            "# TYPE crowdcargo_expensive_calls_stale_total counter",
+            f"crowdcargo_expensive_calls_stale_total {self.stale}"
+        ]
+        return "\n".join(lines) + "\n"
+
+# Shared by every Streamlit session in this worker process
+expensive_calls = ExpensiveCalls()
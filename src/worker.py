@@ -0,0 +1,228 @@
+"""CrowdCargo worker: runs background jobs from the jobs collection.
+
+Emails and the admin analytics (rollups, forecasts, segmentation) are
+queued by the app and run here, off the Streamlit request path. Each
+process leases jobs on a pool of threads; --processes starts several.
+Run from the repository root:
+
+    python -m src.worker
+    python -m src.worker --threads 8 --processes 2
+    python -m src.worker --names email.send email.order_confirmation
+    python -m src.worker --once    # drain the queue, then exit
+    python -m src.worker --stats   # print queue depth and latency
+"""
+import argparse
+import json
+import logging
+import multiprocessing
+import os
+import socket
+import threading
+from dataclasses import dataclass
+from datetime import timedelta
+from typing import List, Optional
+
+import pandas as pd
+
+from .config import JOB_POLL_INTERVAL_SECONDS, JOB_WORKER_THREADS
+from .models.order import Order
+from .repositories.order_repository import OrderRepository
+from .services.analytics_mirror import AnalyticsMirror
+from .services.analytics_service import (
+    SEGMENT_NAMES, forecast_orders, forecast_with_arima, forecast_with_sarima, segment_customers
+)
+from .services.job_queue import HANDLERS, JobQueue, job_handler
+from .services.notification_service import send_email, send_order_confirmation, send_status_update
+from .services.order_archive import OrderArchive
+
+logger = logging.getLogger(__name__)
+
+# Emails are leased ahead of analytics jobs
+EMAIL_JOB_PRIORITY = 10
+
+FORECAST_MODELS = {"Holt-Winters": forecast_orders, "ARIMA": forecast_with_arima, "SARIMA": forecast_with_sarima}
+
+@dataclass
+class JobContext:
+    """What the job handlers read from: the live orders and the analytics mirror."""
+    order_repository: OrderRepository
+    mirror: AnalyticsMirror
+    archive: Optional[OrderArchive] = None
+
+    def sync_mirror(self) -> None:
+        self.mirror.maybe_sync(self.order_repository, self.archive)
+
+def _records(frame: pd.DataFrame) -> List[dict]:
+    """Convert a DataFrame to plain records that can be stored on a job."""
+    return json.loads(frame.to_json(orient="records", date_format="iso"))
+
+def _delivered(sent: bool, to_email: str) -> None:
+    # send_email reports failure instead of raising; raising here makes the queue retry
+    if not sent:
+        raise RuntimeError(f"email to {to_email} was not delivered")
+
+@job_handler("email.send")
+def send_email_job(payload: dict, context: JobContext) -> None:
+    _delivered(send_email(payload["to"], payload["subject"], payload["html"]), payload["to"])
+
+@job_handler("email.order_confirmation")
+def order_confirmation_job(payload: dict, context: JobContext) -> None:
+    _delivered(send_order_confirmation(Order.from_dict(payload["order"]), payload["email"]), payload["email"])
+
+@job_handler("email.status_update")
+def status_update_job(payload: dict, context: JobContext) -> None:
+    _delivered(send_status_update(Order.from_dict(payload["order"]), payload["email"]), payload["email"])
+
+@job_handler("analytics.rollup")
+def rollup_job(payload: dict, context: JobContext) -> Optional[dict]:
+    """Daily, hourly, weekday and product metrics from the mirror."""
+    context.sync_mirror()
+    analytics = context.mirror.get_advanced_order_analytics()
+    return {key: _records(frame) for key, frame in analytics.items()} if analytics else None
+
+@job_handler("analytics.forecast")
+def forecast_job(payload: dict, context: JobContext) -> Optional[dict]:
+    """A 30-day order forecast with one of FORECAST_MODELS."""
+    context.sync_mirror()
+    daily_orders = context.mirror.daily_order_counts()
+    if not len(daily_orders):
+        return None
+    forecast = FORECAST_MODELS[payload["model"]](daily_orders)
+    dates = pd.date_range(forecast['last_date'] + timedelta(days=1), periods=len(forecast['forecast']), freq='D')
+    return {
+        "history_dates": [date.isoformat() for date in daily_orders.index],
+        "history": [int(count) for count in daily_orders.values],
+        "dates": [date.isoformat() for date in dates],
+        "forecast": [float(value) for value in forecast['forecast']],
+        "lower_bound": [float(value) for value in forecast['lower_bound']],
+        "upper_bound": [float(value) for value in forecast['upper_bound']]
+    }
+
+@job_handler("analytics.segments")
+def segments_job(payload: dict, context: JobContext) -> Optional[List[dict]]:
+    """Customer segments, once there are enough customers with orders."""
+    context.sync_mirror()
+    customer_features = context.mirror.customer_features()
+    if len(customer_features) < len(SEGMENT_NAMES):
+        return None
+    return _records(segment_customers(customer_features))
+
+class Worker:
+    """Leases jobs from a queue and runs their handlers on a pool of threads."""
+
+    def __init__(self, queue: JobQueue, context: JobContext, threads: int = JOB_WORKER_THREADS,
+                 names: Optional[List[str]] = None, poll_interval: float = JOB_POLL_INTERVAL_SECONDS):
+        self.queue = queue
+        self.context = context
+        self.threads = threads
+        self.names = names
+        self.poll_interval = poll_interval
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}"
+        self._stop = threading.Event()
+
+    def run_once(self) -> bool:
+        """Lease and run one job; return False if none was available."""
+        job = self.queue.lease(f"{self.worker_id}:{threading.current_thread().name}", self.names)
+        if job is None:
+            return False
+        handler = HANDLERS.get(job["name"])
+        try:
+            if handler is None:
+                raise LookupError(f"no handler for job {job['name']}")
+            result = handler(job["payload"], self.context)
+        except Exception as e:
+            logger.warning("Job %s %s failed on attempt %s: %s", job["name"], job["_id"], job["attempts"], e)
+            self.queue.fail(job, f"{type(e).__name__}: {e}")
+        else:
+            if not self.queue.complete(job, result):
+                logger.warning("Job %s %s finished after its lease was taken over", job["name"], job["_id"])
+        return True
+
+    def drain(self) -> int:
+        """Run jobs on this thread until none is available; return how many ran."""
+        ran = 0
+        while self.run_once():
+            ran += 1
+        return ran
+
+    def _loop(self) -> None:
+        while not self._stop.is_set():
+            try:
+                if not self.run_once():
+                    self._stop.wait(self.poll_interval)
+            except Exception:
+                logger.exception("Worker loop failed")
+                self._stop.wait(self.poll_interval)
+
+    def start(self) -> List[threading.Thread]:
+        """Run the pool on daemon threads."""
+        threads = [
+            threading.Thread(target=self._loop, name=f"job-worker-{i}", daemon=True) for i in range(self.threads)
+        ]
+        for thread in threads:
+            thread.start()
+        return threads
+
+    def stop(self) -> None:
+        """Ask the pool to stop after the jobs it is running."""
+        self._stop.set()
+
+    def run_forever(self) -> None:
+        """Run the pool until interrupted."""
+        threads = self.start()
+        try:
+            while not self._stop.wait(1):
+                pass
+        except KeyboardInterrupt:
+            self.stop()
+        for thread in threads:
+            thread.join()
+
+def build_worker(threads: int, names: Optional[List[str]] = None) -> Worker:
+    """Create a worker on the configured database, with its own analytics mirror and archive."""
+    from .database import get_database
+    from .services.order_service import OrderService
+
+    db = get_database()
+    queue = JobQueue(db)
+    queue.ensure_indexes()
+    repository = OrderService(get_database("analytics")).repository
+    return Worker(queue, JobContext(repository, AnalyticsMirror(), OrderArchive()), threads, names)
+
+def _run_process(threads: int, names: Optional[List[str]]) -> None:
+    logging.basicConfig(level=logging.INFO)
+    build_worker(threads, names).run_forever()
+
+def main():
+    """Run the worker pool, drain the queue once, or print queue metrics."""
+    parser = argparse.ArgumentParser(description="Run CrowdCargo background jobs.")
+    parser.add_argument("--threads", type=int, default=JOB_WORKER_THREADS, help="job threads per process")
+    parser.add_argument("--processes", type=int, default=1)
+    parser.add_argument("--names", nargs="+", help="only run jobs with these names")
+    parser.add_argument("--once", action="store_true", help="run available jobs, then exit")
+    parser.add_argument("--stats", action="store_true", help="print queue depth and latency, then exit")
+    args = parser.parse_args()
+
+    if args.stats:
+        print(json.dumps(build_worker(0, None).queue.metrics(), indent=2))
+    elif args.once:
+        print(f"ran {build_worker(1, args.names).drain()} jobs")
+    elif args.processes > 1:
+        # Each process builds its own MongoDB client after the fork
+        processes = [
+            multiprocessing.Process(target=_run_process, args=(args.threads, args.names), name=f"worker-{i}")
+            for i in range(args.processes)
+        ]
+        for process in processes:
+            process.start()
+        try:
+            for process in processes:
+                process.join()
+        except KeyboardInterrupt:
+            for process in processes:
+                process.join()
+    else:
+        _run_process(args.threads, args.names)
+
+if __name__ == "__main__":
+    main()
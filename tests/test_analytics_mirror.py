@@ -0,0 +1,53 @@
+import pytest
+from datetime import timedelta
+from benchmarks.synthetic import generate_orders
+from src.repositories.order_repository import InMemoryOrderRepository
+from src.services.analytics_mirror import AnalyticsMirror
+from src.services.analytics_service import (
+    customer_features, daily_order_counts, get_advanced_order_analytics
+)
+
+@pytest.fixture
+def repository():
+    """Create an in-memory order repository with synthetic orders."""
+    repository = InMemoryOrderRepository()
+    for order in generate_orders(300, seed=3):
+        repository.insert(order)
+    return repository
+
+@pytest.fixture
+def mirror(tmp_path):
+    """Create an empty analytics mirror in a temporary file."""
+    return AnalyticsMirror(str(tmp_path / "analytics.sqlite3"))
+
+def test_sync_is_incremental(repository, mirror):
+    """Test that only orders updated since the last sync are copied again."""
+    assert mirror.get_advanced_order_analytics() is None
+    assert mirror.sync(repository) == 300
+    assert mirror.order_count() == 300
+
+    newest = mirror.watermark()
+    order_id = next(repository.iter_all())["order_id"]
+    repository.update(order_id, {"status": "delivered", "updated_at": newest + timedelta(hours=1)})
+    assert mirror.sync(repository) < 300
+    assert mirror.order_count() == 300
+    assert mirror.watermark() == newest + timedelta(hours=1)
+
+def test_sql_analytics_match_pandas(repository, mirror):
+    """Test that the SQL aggregates agree with the in-process pandas analytics."""
+    mirror.sync(repository)
+    orders = list(repository.iter_all())
+    expected = get_advanced_order_analytics(orders)
+    analytics = mirror.get_advanced_order_analytics()
+
+    assert analytics["daily_metrics"]["order_count"].sum() == len(orders)
+    assert analytics["daily_metrics"]["revenue"].sum() == pytest.approx(sum(o["total_price"] for o in orders))
+    assert analytics["hourly_metrics"]["order_count"].tolist() == expected["hourly_metrics"]["order_id"].tolist()
+    by_product = dict(zip(analytics["product_popularity"]["name"], analytics["product_popularity"]["quantity"]))
+    assert by_product == dict(zip(expected["product_popularity"]["name"], expected["product_popularity"]["quantity"]))
+
+    orders_df = expected["orders_df"]
+    assert mirror.daily_order_counts().tolist() == daily_order_counts(orders_df).tolist()
+    features = mirror.customer_features()
+    assert features["order_count"].tolist() == customer_features(orders_df)["order_count"].tolist()
+    assert features["total_spent"].tolist() == pytest.approx(customer_features(orders_df)["total_spent"].tolist())
@@ -0,0 +1,35 @@
+import pytest
+from benchmarks.synthetic import generate_orders
+from src.services.analytics_service import (
+    customer_features, daily_order_counts, forecast_orders, get_advanced_order_analytics,
+    get_order_analytics, segment_customers
+)
+
+@pytest.fixture(scope="module")
+def orders():
+    """Deterministic synthetic orders."""
+    return list(generate_orders(500, seed=7))
+
+def test_synthetic_orders_are_deterministic(orders):
+    """Test that the same seed yields the same orders."""
+    assert list(generate_orders(500, seed=7)) == orders
+    assert len({order["order_id"] for order in orders}) == 500
+
+def test_order_analytics(orders):
+    """Test order totals and empty input."""
+    analytics = get_order_analytics(orders)
+    assert analytics["total_orders"] == 500
+    assert analytics["total_weight"] == pytest.approx(sum(o["total_weight_kg"] for o in orders))
+    assert analytics["status_counts"].sum() == 500
+    assert get_order_analytics([]) is None
+
+def test_forecast_and_segments(orders):
+    """Test forecasting and customer segmentation on the advanced analytics frame."""
+    orders_df = get_advanced_order_analytics(orders)["orders_df"]
+    forecast = forecast_orders(daily_order_counts(orders_df), days_to_forecast=14)
+    assert len(forecast["forecast"]) == 14
+    assert (forecast["upper_bound"] >= forecast["lower_bound"]).all()
+
+    segments = segment_customers(customer_features(orders_df))
+    assert set(segments["segment"]) <= {0, 1, 2, 3}
+    assert segments["order_count"].sum() == 500
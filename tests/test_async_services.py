@@ -0,0 +1,78 @@
+import asyncio
+import mongomock
+import pytest
+import time
+from datetime import datetime, timedelta
+from src.repositories.order_repository import InMemoryOrderRepository
+from src.services.order_service import AsyncOrderService, OrderService
+from src.services.truck_service import AsyncTruckService, TruckService
+from src.services.user_service import AsyncUserService
+from src.utils.aio import ThreadedDatabase, load_concurrently, run
+from src.utils.cache import TTLCache
+
+@pytest.fixture
+def db():
+    """Create an in-memory MongoDB database with three orders, two users and a truck with contributions."""
+    database = mongomock.MongoClient().db
+    now = datetime.now()
+    database.orders.insert_many([
+        {"order_id": f"O{i}", "user_id": "U1" if i < 2 else "U2", "status": "pending", "total_price": 10.0 * i,
+         "total_weight_kg": 1.5, "created_at": now - timedelta(days=3 - i), "items": []}
+        for i in range(3)
+    ])
+    database.users.insert_many([
+        {"name": "Ann", "email": "ann@example.com", "role": "admin", "created_at": now - timedelta(days=2)},
+        {"name": "Bob", "email": "bob@example.com", "role": "user", "created_at": now}
+    ])
+    database.trucks.insert_one({"truck_id": "TRUCK-001", "status": "collecting"})
+    database.truck_contributions.insert_many([
+        {"truck_id": "TRUCK-001", "name": f"P{i % 5}", "quantity": 1, "weight_kg": float(i)} for i in range(20)
+    ])
+    return database
+
+def test_async_order_service_matches_sync(db):
+    """Test that the async order reads return what OrderService returns."""
+    service = AsyncOrderService(ThreadedDatabase(db))
+    sync_service = OrderService(db)
+    assert run(service.find_orders(user_id="U1", newest_first=True)) == sync_service.find_orders(user_id="U1", newest_first=True)
+    assert run(service.get_order_document("O2")) == sync_service.get_order_document("O2")
+    assert run(service.get_order("missing")) is None
+    assert run(service.get_total_pending_weight()) == pytest.approx(4.5)
+    assert run(service.list_orders(["order_id", "status"])) == [
+        {"order_id": f"O{i}", "status": "pending"} for i in range(3)
+    ]
+
+def test_async_order_service_runs_sync_repository_on_threads(db):
+    """Test that the in-memory repository used in demo mode works through the async service."""
+    repository = InMemoryOrderRepository()
+    for order in db.orders.find():
+        repository.insert(order)
+    service = AsyncOrderService(None, repository=repository)
+    assert [order["order_id"] for order in run(service.find_orders(newest_first=True, limit=2))] == ["O2", "O1"]
+    assert [order.order_id for order in run(service.get_user_orders("U2"))] == ["O2"]
+
+def test_async_truck_and_user_services(db):
+    """Test that the async manifest page matches the sync one and users sort newest first."""
+    trucks = AsyncTruckService(ThreadedDatabase(db), TTLCache())
+    assert run(trucks.get_manifest_page("TRUCK-001", 1, 2)) == TruckService(db, TTLCache()).get_manifest_page("TRUCK-001", 1, 2)
+    assert run(trucks.get_truck("TRUCK-001"))["status"] == "collecting"
+
+    users = AsyncUserService(ThreadedDatabase(db))
+    assert [user["name"] for user in run(users.list_users(newest_first=True))] == ["Bob", "Ann"]
+    assert run(users.count_users("admin")) == 1
+    assert run(users.get_user("bob@example.com"))["role"] == "user"
+
+def test_load_concurrently_overlaps_queries_and_keeps_errors():
+    """Test that independent queries run at the same time and a failing one does not hide the others."""
+    async def slow(value):
+        await asyncio.sleep(0.2)
+        return value
+
+    async def broken():
+        raise ValueError("boom")
+
+    started = time.perf_counter()
+    results = load_concurrently({"a": slow(1), "b": slow(2), "c": slow(3), "d": broken()})
+    assert time.perf_counter() - started < 0.5
+    assert (results["a"], results["b"], results["c"]) == (1, 2, 3)
+    assert isinstance(results["d"], ValueError)
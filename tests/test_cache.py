@@ -0,0 +1,78 @@
+import threading
+import mongomock
+import pytest
+from src.utils.cache import TTLCache
+from src.services.truck_service import TruckService
+
+@pytest.fixture
+def cache():
+    """Create an empty cache with a small size bound."""
+    return TTLCache(max_entries=2, ttl_seconds=60)
+
+@pytest.fixture
+def truck_service(cache):
+    """Create a TruckService over an in-process MongoDB stand-in."""
+    db = mongomock.MongoClient().test_crowdcargo
+    service = TruckService(db, cache=cache)
+    service.seed_trucks([
+        {"truck_id": "TRUCK-001", "status": "collecting", "current_weight": 10, "max_weight": 100, "items": []}
+    ])
+    return service
+
+def test_get_or_load_counts_hits_and_misses(cache):
+    """Test that a second lookup is served from memory."""
+    calls = []
+    loader = lambda: calls.append(1) or "value"
+    assert cache.get_or_load(("trucks", "all"), loader) == "value"
+    assert cache.get_or_load(("trucks", "all"), loader) == "value"
+    assert len(calls) == 1
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+
+def test_expired_entries_are_reloaded(cache):
+    """Test that entries past their TTL count as misses."""
+    cache.set(("catalog", "all"), "stale", ttl_seconds=-1)
+    assert cache.get(("catalog", "all")) is None
+
+def test_size_bound_evicts_least_recently_used(cache):
+    """Test that the cache never grows past max_entries."""
+    cache.set(("trucks", "a"), 1)
+    cache.set(("trucks", "b"), 2)
+    cache.get(("trucks", "a"))
+    cache.set(("trucks", "c"), 3)
+    assert cache.get(("trucks", "b")) is None
+    assert cache.get(("trucks", "a")) == 1
+    assert cache.stats()["evictions"] == 1
+
+def test_load_racing_an_invalidation_is_not_cached(cache):
+    """Test that a value loaded while its namespace was invalidated is returned but not stored."""
+    loading, written = threading.Event(), threading.Event()
+    store = {"weight": 10}
+
+    def slow_loader():
+        value = dict(store)
+        loading.set()
+        written.wait(5)
+        return value
+
+    results = []
+    reader = threading.Thread(target=lambda: results.append(cache.get_or_load(("trucks", "TRUCK-001"), slow_loader)))
+    reader.start()
+    loading.wait(5)
+    store["weight"] = 11
+    cache.invalidate_namespace("trucks")
+    written.set()
+    reader.join(5)
+
+    assert results == [{"weight": 10}]
+    assert cache.get_or_load(("trucks", "TRUCK-001"), lambda: dict(store)) == {"weight": 11}
+    assert cache.get_or_load(("catalog", "all"), lambda: "catalog") == "catalog"
+    assert cache.get(("catalog", "all")) == "catalog"
+
+def test_reservation_invalidates_cached_truck(truck_service):
+    """Test that writes to a truck are visible on the next read."""
+    assert truck_service.get_truck("TRUCK-001")["current_weight"] == 10
+    truck_service.reserve_capacity("TRUCK-001", [{"name": "Maggi Noodles", "quantity": 2, "weight": 1.0}], 1.0)
+    truck = truck_service.get_truck("TRUCK-001")
+    assert truck["current_weight"] == 11
+    assert truck["contribution_count"] == 1
@@ -0,0 +1,109 @@
+import mongomock
+import pytest
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from src.models.order import Order, OrderItem
+from src.repositories.order_repository import InMemoryOrderRepository, MongoOrderRepository
+from src.services.checkout_service import CheckoutService, new_idempotency_key
+from src.services.order_service import OrderService
+from src.services.payment_gateway import FakePaymentGateway, PaymentError
+
+@pytest.fixture(params=["mongo", "memory"])
+def order_service(request):
+    """Create an OrderService over each backend, with the order indexes in place."""
+    db = mongomock.MongoClient().test_crowdcargo
+    if request.param == "memory":
+        repository = InMemoryOrderRepository()
+    else:
+        repository = MongoOrderRepository(db.orders)
+        repository.collection.create_index(
+            "idempotency_key", unique=True, partialFilterExpression={"idempotency_key": {"$type": "string"}}
+        )
+    return OrderService(db, repository=repository)
+
+def make_order():
+    """Create an unsaved cart order."""
+    return Order(
+        user_id="u1", items=[OrderItem(product_id="1", name="Tea", quantity=2, weight_kg=0.5, price=4.5)],
+        total_price=9.0, total_weight_kg=1.0,
+        shipping_address={"city": "Dublin", "country": "Ireland"}, contact_info={"email": "u1@example.com"}
+    )
+
+def test_repeated_submission_places_and_charges_once(order_service):
+    """Test that resubmitting a cart with the same key finds the existing paid order."""
+    gateway = FakePaymentGateway()
+    checkout = CheckoutService(order_service, gateway)
+    key = new_idempotency_key()
+
+    first = checkout.place_order(make_order(), key)
+    second = checkout.place_order(make_order(), key)
+
+    assert (first.created, first.paid_now, first.status) == (True, True, "paid")
+    assert (second.created, second.paid_now, second.status) == (False, False, "paid")
+    assert len(order_service.find_orders(user_id="u1")) == 1
+    assert gateway.charge_count() == 1
+    assert checkout.place_order(make_order(), new_idempotency_key()).order_id != first.order_id
+
+def test_concurrent_payments_charge_once(order_service):
+    """Test that simultaneous clicks on Pay produce one charge and one pending -> paid transition."""
+    gateway = FakePaymentGateway(latency_ms=20)
+    checkout = CheckoutService(order_service, gateway)
+    order = make_order()
+    order.order_id = "ORD-SHARED"
+    order_service.create_order(order)
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        results = list(pool.map(lambda _: checkout.pay("ORD-SHARED"), range(8)))
+
+    assert all(result.status == "paid" for result in results)
+    assert sum(result.paid_now for result in results) == 1
+    assert gateway.charge_count() == 1
+    assert order_service.get_order_document("ORD-SHARED")["payment"]["state"] == "captured"
+
+def test_transient_failures_are_retried_with_the_same_key(order_service):
+    """Test that gateway timeouts, including lost responses, are retried without double charging."""
+    gateway = FakePaymentGateway(failure_rate=0.5, seed=3)
+    checkout = CheckoutService(order_service, gateway, max_retries=10, backoff_seconds=0)
+
+    results = [checkout.place_order(make_order(), new_idempotency_key()) for _ in range(20)]
+
+    assert all(result.paid for result in results)
+    assert gateway.calls > 20
+    assert gateway.charge_count() == 20
+
+def test_declined_payment_can_be_retried(order_service):
+    """Test that a declined attempt leaves the order pending and the next attempt uses a new key."""
+    gateway = FakePaymentGateway(decline_rate=1.0)
+    checkout = CheckoutService(order_service, gateway)
+
+    result = checkout.place_order(make_order(), "K1")
+    assert (result.status, result.error) == ("pending", "Payment declined")
+
+    gateway.decline_rate = 0.0
+    result = checkout.pay("ORD-K1")
+    assert result.paid_now
+    assert order_service.get_order_document("ORD-K1")["payment"]["key"] == "ORD-K1:1"
+
+def test_recover_stale_payments(order_service):
+    """Test that attempts left processing are settled from the gateway's record, not charged again."""
+    gateway = FakePaymentGateway()
+    checkout = CheckoutService(order_service, gateway, max_retries=0)
+    gateway.failure_rate = 1.0
+    assert checkout.place_order(make_order(), "K1").error
+    assert checkout.place_order(make_order(), "K2").error
+    # The gateway captured K2 but the response was lost
+    gateway.failure_rate = 0.0
+    gateway.charge("ORD-K2:0", 9.0, "EUR")
+
+    assert checkout.recover_stale_payments(now=datetime.now() + timedelta(hours=1)) == 2
+    assert order_service.get_order_document("ORD-K1")["payment"]["state"] == "failed"
+    assert order_service.get_order_document("ORD-K2")["status"] == "paid"
+    assert gateway.charge_count() == 1
+
+def test_fake_gateway_is_idempotent():
+    """Test that the fake gateway returns the original charge for a repeated key."""
+    gateway = FakePaymentGateway()
+    assert gateway.charge("k", 1.0, "EUR") == gateway.charge("k", 2.0, "EUR")
+    assert gateway.retrieve("other") is None
+    with pytest.raises(PaymentError):
+        FakePaymentGateway(failure_rate=1.0).charge("k", 1.0, "EUR")
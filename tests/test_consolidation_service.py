@@ -0,0 +1,78 @@
+import math
+import pytest
+from benchmarks.synthetic import generate_orders
+from src.repositories.order_repository import InMemoryOrderRepository
+from src.services.consolidation_service import ConsolidationService
+from src.utils.geo import Geocoder, normalize_address
+
+DUBLIN = (-6.2603, 53.3498)
+
+def haversine_km(a, b):
+    """Great-circle distance between two (lon, lat) points."""
+    lon1, lat1, lon2, lat2 = map(math.radians, (*a, *b))
+    h = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    return 2 * 6371.0088 * math.asin(math.sqrt(h))
+
+@pytest.fixture
+def orders():
+    """Create synthetic orders scattered around six cities."""
+    return list(generate_orders(3000, seed=21))
+
+@pytest.fixture
+def service(orders):
+    """Create a consolidation service over an in-memory repository of the synthetic orders."""
+    repository = InMemoryOrderRepository()
+    for order in orders:
+        repository.insert(order)
+    return ConsolidationService(repository)
+
+def test_normalize_and_geocode():
+    """Test that messy addresses resolve by postal code, outward code or city."""
+    geocoder = Geocoder()
+    assert normalize_address({"city": "  new   york ", "country": "USA"}) == {
+        "city": "New York", "country": "USA", "country_code": "US"
+    }
+    assert geocoder.locate({"city": "New York", "country": "United States", "postal_code": "10001"}) == (-73.9972, 40.7506)
+    assert geocoder.locate({"city": "London", "country": "UK", "postal_code": "ec1a 1bb"}) == (-0.0979, 51.5202)
+    assert geocoder.locate({"city": "dublin", "country": "Ireland", "postal_code": "A00 0000"}) == pytest.approx((-6.2597, 53.344))
+    assert geocoder.geocode({"city": "Atlantis", "country": "Ireland"}) is None
+
+def test_pending_near_hub(service, orders):
+    """Test that the radius query returns exactly the pending orders in range, nearest first."""
+    near = service.pending_near(*DUBLIN, radius_km=10)
+    distances = [order["distance_km"] for order in near]
+
+    expected = {
+        o["order_id"] for o in orders
+        if o["status"] == "pending" and haversine_km(DUBLIN, o["shipping_location"]["coordinates"]) <= 10
+    }
+    assert near and {order["order_id"] for order in near} == expected
+    assert distances == sorted(distances)
+    assert len(service.pending_near(*DUBLIN, radius_km=10, limit=5)) == 5
+    # Cork is about 220 km from Dublin
+    assert {o["order_id"] for o in service.pending_near(*DUBLIN, radius_km=250)} >= {
+        o["order_id"] for o in orders if o["status"] == "pending" and o["shipping_address"]["city"] == "Cork"
+    }
+
+def test_cluster_pending_groups_cities(service, orders):
+    """Test that pending destinations cluster by city and every clustered order is pending."""
+    clusters = service.cluster_pending(radius_km=50, min_orders=5)
+    pending = {o["order_id"]: o for o in orders if o["status"] == "pending"}
+
+    assert len(clusters) == 6
+    assert [c["total_weight_kg"] for c in clusters] == sorted((c["total_weight_kg"] for c in clusters), reverse=True)
+    for cluster in clusters:
+        cities = {pending[order_id]["shipping_address"]["city"] for order_id in cluster["order_ids"]}
+        assert len(cities) == 1
+        assert cluster["order_count"] == len(cluster["order_ids"])
+
+def test_backfill_locations():
+    """Test that orders stored without a location are geocoded in place."""
+    repository = InMemoryOrderRepository()
+    repository.insert({"order_id": "A", "status": "pending", "shipping_address": {"city": "Berlin", "country": "Germany", "postal_code": "10115"}})
+    repository.insert({"order_id": "B", "status": "pending", "shipping_address": {"city": "Atlantis", "country": "Ireland"}})
+    service = ConsolidationService(repository)
+
+    assert service.backfill_locations() == 1
+    assert repository.get("A")["shipping_location"] == {"type": "Point", "coordinates": [13.3846, 52.5323]}
+    assert [o["order_id"] for o in service.pending_near(13.4, 52.5, radius_km=5)] == ["A"]
@@ -0,0 +1,49 @@
+from pymongo import ReadPreference
+from src import database
+
+def test_get_client_is_shared_per_process():
+    """Test that every caller in a process gets the same client."""
+    assert database.get_client() is database.get_client()
+
+def test_get_client_recreated_after_fork(monkeypatch):
+    """Test that a forked worker does not reuse its parent's client."""
+    parent_client = database.get_client()
+    monkeypatch.setattr(database.os, "getpid", lambda: -1)
+    child_client = database.get_client()
+    assert child_client is not parent_client
+    assert database.get_client() is child_client
+
+def test_pool_settings_from_config():
+    """Test that the client uses the configured pool options."""
+    options = database.create_client().options.pool_options
+    assert options.max_pool_size == database.MONGO_MAX_POOL_SIZE
+    assert options.min_pool_size == database.MONGO_MIN_POOL_SIZE
+    assert options.max_idle_time_seconds == database.MONGO_MAX_IDLE_TIME_MS / 1000
+
+def test_operation_profiles():
+    """Test read preference and write concern per operation type."""
+    analytics = database.get_collection("orders", "analytics")
+    checkout = database.get_collection("orders", "checkout")
+    assert analytics.read_preference == ReadPreference.SECONDARY_PREFERRED
+    assert checkout.read_preference == ReadPreference.PRIMARY
+    assert checkout.write_concern.document["w"] == "majority"
+
+def test_pool_metrics_snapshot():
+    """Test that pool events update the counters."""
+    metrics = database.PoolMetricsListener()
+    metrics.connection_created(None)
+    metrics.connection_checked_out(None)
+    metrics.connection_checked_out(None)
+    metrics.connection_checked_in(None)
+    snapshot = metrics.snapshot()
+    assert snapshot["connections_open"] == 1
+    assert snapshot["checkouts"] == 2
+    assert snapshot["checked_out"] == 1
+    assert snapshot["max_checked_out"] == 2
+
+def test_async_database_uses_operation_profile():
+    """Test that the Motor database shares one client and gets the operation's read preference."""
+    analytics = database.get_async_database("analytics")
+    assert analytics.read_preference == ReadPreference.SECONDARY_PREFERRED
+    assert analytics.client is database.get_async_database().client
+    assert analytics.client.options.pool_options.max_pool_size == database.MONGO_MAX_POOL_SIZE
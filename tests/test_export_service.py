@@ -0,0 +1,70 @@
+import csv
+import io
+import mongomock
+import pyarrow.parquet as pq
+import pytest
+from benchmarks.synthetic import generate_orders
+from src.repositories.order_repository import InMemoryOrderRepository
+from src.services.export_service import (
+    MANIFEST_SCHEMA, ORDER_LINE_SCHEMA, export_to_file, iter_order_lines, write_export
+)
+from src.services.truck_service import TruckService
+
+@pytest.fixture
+def orders():
+    """Create synthetic orders, some of them on shared-shipping trucks."""
+    return list(generate_orders(2500, seed=5))
+
+@pytest.fixture
+def repository(orders):
+    """Create an in-memory order repository holding the synthetic orders."""
+    repository = InMemoryOrderRepository()
+    for order in orders:
+        repository.insert(order)
+    return repository
+
+def test_order_lines_filter_by_truck(repository, orders):
+    """Test that a truck export has one row per line of that truck's orders."""
+    truck_orders = [o for o in orders if o.get("truck_id") == "TRUCK-002"]
+    rows = list(iter_order_lines(repository, truck_id="TRUCK-002"))
+
+    assert truck_orders
+    assert len(rows) == sum(len(o["items"]) for o in truck_orders)
+    assert {r["order_id"] for r in rows} == {o["order_id"] for o in truck_orders}
+    assert all(r["payment_method"] == "shared_shipping" for r in rows)
+
+def test_csv_export_round_trips(repository, orders):
+    """Test that the CSV export streams every line across several batches."""
+    out = io.BytesIO()
+    count = write_export(iter_order_lines(repository), ORDER_LINE_SCHEMA, out, "csv")
+
+    assert count == sum(len(o["items"]) for o in orders)
+    assert count > 1000
+    rows = list(csv.DictReader(io.StringIO(out.getvalue().decode("utf-8"))))
+    assert len(rows) == count
+    assert list(rows[0]) == ORDER_LINE_SCHEMA.names
+
+def test_parquet_export_writes_row_groups(tmp_path, repository):
+    """Test that the Parquet export writes one row group per batch."""
+    path = tmp_path / "orders.parquet"
+    count = export_to_file(iter_order_lines(repository, status="delivered"), ORDER_LINE_SCHEMA, str(path), "parquet")
+
+    parquet = pq.ParquetFile(path)
+    assert parquet.metadata.num_rows == count
+    assert parquet.metadata.num_row_groups == -(-count // 1000)
+    assert set(parquet.read(columns=["status"]).column("status").to_pylist()) == {"delivered"}
+
+def test_manifest_export():
+    """Test that a truck manifest has one row per item loaded on the truck."""
+    trucks = TruckService(mongomock.MongoClient().db)
+    trucks.seed_trucks([
+        {"truck_id": "TRUCK-001", "items": [{"name": "Tea", "quantity": 2, "weight": 1.0},
+                                            {"name": "Rice", "quantity": 1, "weight": 5.0}]},
+        {"truck_id": "TRUCK-002", "items": [{"name": "Ghee", "quantity": 3, "weight": 0.5}]}
+    ])
+    out = io.BytesIO()
+
+    assert write_export(trucks.iter_manifest("TRUCK-001"), MANIFEST_SCHEMA, out, "csv") == 2
+    rows = list(csv.DictReader(io.StringIO(out.getvalue().decode("utf-8"))))
+    assert rows[1] == {"truck_id": "TRUCK-001", "name": "Rice", "quantity": "1", "weight_kg": "5.0"}
+    assert len(list(trucks.iter_manifest())) == 3
@@ -0,0 +1,39 @@
+from datetime import datetime
+import numpy as np
+import pytest
+from src.utils.helpers import calculate_estimated_delivery_date, parse_delivery_window
+from src.utils.eta import estimate_delivery_dates, estimate_for_orders, estimate_for_plan
+
+@pytest.mark.parametrize("timeframe, window", [
+    ("15-20 days", (15, 20)),
+    ("3 - 5 days", (3, 5)),
+    ("7 days", (7, 7)),
+    ("", (7, 7)),
+    ("soon", (7, 7))
+])
+def test_parse_delivery_window(timeframe, window):
+    """Test parsing delivery timeframes into (min_days, max_days)."""
+    assert parse_delivery_window(timeframe) == window
+
+def test_calculate_estimated_delivery_date_uses_midpoint():
+    """Test that the estimate is the midpoint of the window, not the 7-day default."""
+    assert calculate_estimated_delivery_date(datetime(2024, 1, 1), "15-20 days") == datetime(2024, 1, 18, 12)
+    assert calculate_estimated_delivery_date(datetime(2024, 1, 1), "3-5 days") == datetime(2024, 1, 5)
+
+def test_estimate_delivery_dates_batch():
+    """Test the vectorized ETA computation for many orders on one plan."""
+    ship_dates = np.array(["2024-01-01", "2024-02-01"], dtype="datetime64[s]")
+    estimate = estimate_for_plan(ship_dates, {"delivery_time": "7-10 days"})
+    assert estimate.earliest.tolist() == [datetime(2024, 1, 8), datetime(2024, 2, 8)]
+    assert estimate.latest.tolist() == [datetime(2024, 1, 11), datetime(2024, 2, 11)]
+    assert estimate.expected_datetime(0) == datetime(2024, 1, 9, 12)
+    assert len(estimate_delivery_dates(ship_dates, 1, 2)) == 2
+
+def test_estimate_for_orders_falls_back_to_default_window():
+    """Test that orders without a known plan get the default window."""
+    orders = [
+        {"created_at": datetime(2024, 1, 1), "shipping_plan": "DHL Express"},
+        {"created_at": datetime(2024, 1, 1), "shipping_plan": None}
+    ]
+    estimate = estimate_for_orders(orders, [{"name": "DHL Express", "delivery_time": "3-5 days"}])
+    assert estimate.expected.tolist() == [datetime(2024, 1, 5), datetime(2024, 1, 8)]
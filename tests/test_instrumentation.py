@@ -0,0 +1,64 @@
+from types import SimpleNamespace
+from src.utils.instrumentation import CommandMetrics, LatencyHistogram, query_shape, query_tag, tagged
+
+def run_command(metrics, request_id, duration_ms, command=None, reply=None):
+    """Feed a started/succeeded event pair to the listener."""
+    event = SimpleNamespace(
+        command_name="find",
+        command=command or {"find": "orders", "filter": {"user_id": "u1", "status": "pending"}},
+        request_id=request_id,
+        connection_id=("localhost", 27017),
+        duration_micros=int(duration_ms * 1000),
+        reply=reply or {"cursor": {"firstBatch": [{"order_id": "1"}, {"order_id": "2"}]}, "ok": 1}
+    )
+    metrics.started(event)
+    metrics.succeeded(event)
+
+def test_query_shape_ignores_values():
+    """Test that commands differing only in values share a shape."""
+    a = query_shape("find", {"find": "orders", "filter": {"user_id": "a", "status": "pending"}})
+    b = query_shape("find", {"find": "orders", "filter": {"status": "paid", "user_id": "b"}})
+    assert a == b == ("orders", "find orders {status,user_id}")
+
+def test_commands_are_tagged_by_caller():
+    """Test that nested tags and the decorator label recorded commands."""
+    metrics = CommandMetrics(slow_query_ms=1000, bytes_sample_rate=1)
+
+    @tagged()
+    def load_orders():
+        run_command(metrics, 1, 2.0)
+
+    with query_tag("page:Checkout"):
+        load_orders()
+    [row] = metrics.summary()
+    assert row["tag"] == "page:Checkout/load_orders"
+    assert row["count"] == 1
+    assert row["documents"] == 2
+    assert row["bytes"] > 0
+
+def test_slow_queries_are_logged():
+    """Test the slow query threshold."""
+    metrics = CommandMetrics(slow_query_ms=50)
+    run_command(metrics, 1, 10.0)
+    run_command(metrics, 2, 75.0)
+    assert [q["duration_ms"] for q in metrics.slow_queries] == [75.0]
+
+def test_histogram_percentiles():
+    """Test that percentiles land in the right buckets."""
+    histogram = LatencyHistogram()
+    for value in [1.0] * 90 + [150.0] * 9 + [900.0]:
+        histogram.observe(value)
+    assert histogram.percentile(50) <= 1.0
+    assert 100 < histogram.percentile(95) <= 200
+    assert 500 < histogram.percentile(99.5) <= 900
+
+def test_render_prometheus():
+    """Test the Prometheus exposition output."""
+    metrics = CommandMetrics()
+    run_command(metrics, 1, 3.0)
+    text = metrics.render_prometheus()
+    assert '# TYPE crowdcargo_mongo_command_duration_ms histogram' in text
+    assert 'le="+Inf"} 1' in text
+    assert 'crowdcargo_mongo_command_documents_total{tag="untagged",shape="find orders {status,user_id}"} 2' in text
+    # Reply bytes are not counted unless sampling is turned on
+    assert 'crowdcargo_mongo_command_reply_bytes_total{tag="untagged",shape="find orders {status,user_id}"} 0' in text
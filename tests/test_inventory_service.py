@@ -0,0 +1,86 @@
+import mongomock
+import pytest
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from src.services.inventory_service import InventoryService
+from src.utils.cache import TTLCache
+
+@pytest.fixture
+def inventory():
+    """Create an inventory service with 10 units of P1 on one counter and 10 of P2 over four."""
+    service = InventoryService(mongomock.MongoClient().db, TTLCache(), hold_seconds=60)
+    service.ensure_indexes()
+    service.set_stock("P1", 10)
+    service.set_stock("P2", 10, shards=4)
+    return service
+
+def test_reserve_takes_stock_until_none_is_left(inventory):
+    """Test that holds take stock and a reservation larger than what is left is refused."""
+    assert inventory.reserve("P1", 6, "u1") is not None
+    assert inventory.reserve("P1", 5, "u2") is None
+    assert inventory.reserve("P1", 4, "u2") is not None
+    assert inventory.stock_levels(["P1", "P2"]) == {"P1": 0, "P2": 10}
+
+def test_sharded_sku_gathers_stock_across_counters(inventory):
+    """Test that a reservation no single counter can cover is taken from several, and fully or not at all."""
+    holds = [inventory.reserve("P2", 3, "u1") for _ in range(3)]
+    assert all(hold is not None for hold in holds)
+    assert sum(take["quantity"] for hold in holds for take in hold["takes"]) == 9
+    assert inventory.reserve("P2", 2, "u1") is None
+    assert inventory.stock_levels(["P2"]) == {"P2": 1}
+
+def test_untracked_products_always_reserve(inventory):
+    """Test that products without counters get an empty hold."""
+    hold = inventory.reserve("P9", 100, "u1")
+    assert hold["takes"] == []
+    assert inventory.stock_levels(["P9"]) == {}
+
+def test_release_returns_stock_once(inventory):
+    """Test that releasing a hold gives its stock back and releasing again does nothing."""
+    hold = inventory.reserve("P1", 4, "u1")
+    assert inventory.release(hold["_id"])
+    assert not inventory.release(hold["_id"])
+    assert inventory.stock_levels(["P1"]) == {"P1": 10}
+
+def test_expired_holds_are_swept_when_stock_runs_short(inventory):
+    """Test that an abandoned cart's stock comes back for the next shopper."""
+    inventory.hold_seconds = -1
+    inventory.reserve("P1", 8, "abandoned")
+    inventory.reserve("P1", 2, "abandoned")
+    inventory.hold_seconds = 60
+
+    hold = inventory.reserve("P1", 9, "u2")
+    assert hold is not None
+    assert inventory.holds.count_documents({"state": "expired"}) == 2
+    assert inventory.stock_levels(["P1"]) == {"P1": 1}
+
+def test_commit_is_idempotent_and_renews_swept_holds(inventory):
+    """Test that committing twice sells once and a swept hold is sold again only if stock remains."""
+    kept = inventory.reserve("P1", 3, "u1")
+    swept = inventory.reserve("P1", 5, "u1")
+    assert inventory.release_expired(now=datetime.now() + timedelta(minutes=5)) == 2
+
+    assert inventory.commit([str(kept["_id"]), str(swept["_id"])]) == []
+    assert inventory.commit([str(kept["_id"]), str(swept["_id"])]) == []
+    assert inventory.stock_levels(["P1"]) == {"P1": 2}
+
+    late = inventory.reserve("P1", 2, "u2")
+    inventory.release_expired(now=datetime.now() + timedelta(minutes=5))
+    inventory.reserve("P1", 1, "u3")
+    assert inventory.commit([str(late["_id"])]) == [str(late["_id"])]
+
+def test_reopen_puts_committed_holds_back_on_hold(inventory):
+    """Test that reopening a committed hold keeps its stock taken and lets it be released."""
+    hold = inventory.reserve("P1", 4, "u1")
+    inventory.commit([str(hold["_id"])])
+    assert inventory.reopen([str(hold["_id"])]) == 1
+    assert inventory.release(hold["_id"])
+    assert inventory.stock_levels(["P1"]) == {"P1": 10}
+
+def test_concurrent_reservations_never_oversell(inventory):
+    """Test that many carts racing for a hot SKU get exactly the stock there is."""
+    with ThreadPoolExecutor(8) as pool:
+        holds = list(pool.map(lambda i: inventory.reserve("P2", 1, f"u{i}"), range(40)))
+
+    assert sum(hold is not None for hold in holds) == 10
+    assert inventory.stock_levels(["P2"]) == {"P2": 0}
@@ -0,0 +1,131 @@
+import mongomock
+import pytest
+from datetime import datetime, timedelta
+from benchmarks.synthetic import generate_orders
+from src.repositories.order_repository import InMemoryOrderRepository
+from src.services.analytics_mirror import AnalyticsMirror
+from src.services.job_queue import HANDLERS, JobQueue
+from src.worker import JobContext, Worker
+
+@pytest.fixture
+def queue():
+    """Create a job queue with a 60 second visibility timeout and a 1 second retry backoff."""
+    job_queue = JobQueue(mongomock.MongoClient().db, visibility_timeout=60, backoff_seconds=1)
+    job_queue.ensure_indexes()
+    return job_queue
+
+def test_lease_takes_highest_priority_then_oldest(queue):
+    """Test that jobs are leased by priority, then in the order they became available."""
+    first = queue.enqueue("analytics.rollup")
+    second = queue.enqueue("analytics.rollup")
+    urgent = queue.enqueue("email.send", priority=10)
+    leased = [queue.lease("w1")["_id"] for _ in range(3)]
+    assert leased == [urgent, first, second]
+    assert queue.lease("w1") is None
+
+def test_lease_filters_by_name_and_respects_run_at(queue):
+    """Test that a worker only leases the job names it runs and scheduled jobs wait for their time."""
+    queue.enqueue("analytics.rollup")
+    later = queue.enqueue("email.send", run_at=datetime.now() + timedelta(minutes=5))
+    assert queue.lease("w1", ["email.send"]) is None
+    assert queue.lease("w1", ["email.send"], now=datetime.now() + timedelta(minutes=6))["_id"] == later
+
+def test_expired_lease_reappears_and_fences_the_old_worker(queue):
+    """Test that a job whose worker went quiet is leased again and the old worker can no longer finish it."""
+    job_id = queue.enqueue("analytics.rollup")
+    stale = queue.lease("w1")
+    assert queue.lease("w2") is None
+
+    retaken = queue.lease("w2", now=datetime.now() + timedelta(seconds=61))
+    assert retaken["_id"] == job_id and retaken["attempts"] == 2
+    assert not queue.complete(stale, "stale")
+    assert queue.complete(retaken, "fresh")
+    assert queue.get(job_id)["result"] == "fresh"
+
+def test_failures_back_off_then_die(queue):
+    """Test that failed attempts are retried with growing delays until max_attempts, then the job is dead."""
+    job_id = queue.enqueue("email.send", max_attempts=2)
+    queue.fail(queue.lease("w1"), "smtp down")
+    job = queue.get(job_id)
+    assert job["state"] == "queued" and job["last_error"] == "smtp down"
+    assert queue.lease("w1") is None
+
+    queue.fail(queue.lease("w1", now=datetime.now() + timedelta(seconds=2)), "smtp still down")
+    job = queue.get(job_id)
+    assert job["state"] == "dead" and job["attempts"] == 2 and "finished_at" in job
+
+def test_dedupe_key_reuses_unfinished_job(queue):
+    """Test that a dedupe key returns the job still pending and is free again once it finishes."""
+    first = queue.enqueue("analytics.rollup", dedupe_key="rollup")
+    assert queue.enqueue("analytics.rollup", dedupe_key="rollup") == first
+    assert queue.is_pending("analytics.rollup")
+
+    queue.complete(queue.lease("w1"), {"rows": 1})
+    assert not queue.is_pending("analytics.rollup")
+    assert queue.enqueue("analytics.rollup", dedupe_key="rollup") != first
+    assert queue.latest_result("analytics.rollup")["result"] == {"rows": 1}
+
+def test_worker_runs_handlers_and_records_failures(queue, monkeypatch):
+    """Test that a worker stores handler results, retries handler errors and fails unknown job names."""
+    def double(payload, context):
+        if payload["n"] < 0:
+            raise ValueError("negative")
+        return payload["n"] * 2
+    monkeypatch.setitem(HANDLERS, "test.double", double)
+
+    worker = Worker(queue, context=None, threads=1)
+    done = queue.enqueue("test.double", {"n": 21})
+    failed = queue.enqueue("test.double", {"n": -1})
+    unknown = queue.enqueue("test.missing", max_attempts=1)
+    assert worker.drain() == 3
+
+    assert queue.get(done)["result"] == 42
+    assert queue.get(failed)["state"] == "queued" and "ValueError" in queue.get(failed)["last_error"]
+    assert queue.get(unknown)["state"] == "dead" and "LookupError" in queue.get(unknown)["last_error"]
+    assert queue.latest_result("test.double", {"n": 21})["result"] == 42
+
+def test_metrics_report_depth_and_latency(queue):
+    """Test that metrics count jobs by state and summarize latency per job name."""
+    queue.enqueue("email.send")
+    queue.enqueue("email.send")
+    queue.complete(queue.lease("w1"))
+    metrics = queue.metrics()
+    assert metrics["depth"]["queued"] == 1 and metrics["depth"]["succeeded"] == 1
+    assert metrics["ready"] == 1
+    assert metrics["latency"][0]["name"] == "email.send" and metrics["latency"][0]["finished"] == 1
+    assert 'crowdcargo_jobs{state="queued"} 1' in queue.render_prometheus()
+
+def test_wait_counts_from_when_the_last_attempt_became_available(queue):
+    """Test that a run_at delay and earlier attempts are not counted as queue wait."""
+    # Whole seconds, since BSON keeps only milliseconds
+    run_at = datetime.now().replace(microsecond=0) + timedelta(minutes=10)
+    scheduled = queue.enqueue("email.send", run_at=run_at)
+    queue.complete(queue.lease("w1", now=run_at + timedelta(seconds=1)))
+    assert queue.get(scheduled)["ready_at"] == run_at
+
+    retried = queue.enqueue("email.send")
+    queue.fail(queue.lease("w1"), "smtp down")
+    backoff_until = queue.get(retried)["available_at"]
+    queue.complete(queue.lease("w1", now=backoff_until + timedelta(seconds=1)))
+    assert queue.get(retried)["ready_at"] == backoff_until
+
+    row = queue.metrics()["latency"][0]
+    assert row["finished"] == 2 and row["wait_p95_ms"] == pytest.approx(1000)
+
+def test_analytics_jobs_store_results_from_the_mirror(queue, tmp_path):
+    """Test that the analytics handlers sync the mirror and store plain results the dashboard can read."""
+    repository = InMemoryOrderRepository()
+    for order in generate_orders(200, seed=5):
+        repository.insert(order)
+    worker = Worker(queue, JobContext(repository, AnalyticsMirror(str(tmp_path / "analytics.sqlite3"))))
+    queue.enqueue("analytics.rollup")
+    queue.enqueue("analytics.forecast", {"model": "Holt-Winters"})
+    queue.enqueue("analytics.segments")
+    assert worker.drain() == 3
+
+    rollup = queue.latest_result("analytics.rollup")["result"]
+    assert sum(row["order_count"] for row in rollup["hourly_metrics"]) == 200
+    forecast = queue.latest_result("analytics.forecast", {"model": "Holt-Winters"})["result"]
+    assert len(forecast["dates"]) == len(forecast["forecast"]) == 30
+    segments = queue.latest_result("analytics.segments")["result"]
+    assert {"user_id", "segment_name"} <= set(segments[0])
@@ -0,0 +1,65 @@
+import json
+import time
+import numpy as np
+import pytest
+from src.models.order import Order, OrderItem
+from src.utils.helpers import format_currency
+from src.utils.money import FxTable, Money, cents_array, format_cents, load_fx_file, sum_cents, to_cents, total_cents
+
+@pytest.mark.parametrize("amount, cents", [
+    (0.1, 10), (2.675, 268), (1.005, 101), (-2.675, -268), (19, 1900), ("4.99", 499), (np.float64(12.99), 1299)
+])
+def test_to_cents_rounds_half_up_from_the_written_value(amount, cents):
+    """Test that amounts round to cents as written, not as their binary float value."""
+    assert to_cents(amount) == cents
+
+def test_totals_are_exact():
+    """Test that cart, order and bulk totals come out exact where float sums drift."""
+    items = [{"price": 0.1, "quantity": 1}] * 3
+    assert sum(item["price"] * item["quantity"] for item in items) != 0.3
+    assert total_cents(items) == 30
+
+    order = Order(user_id="u1", items=[OrderItem(product_id="P1", name="Tea", quantity=3, weight_kg=0.25, price=0.1)],
+                  total_weight_kg=0, total_price=0, shipping_address={}, contact_info={})
+    order.calculate_totals()
+    assert order.total_price == 0.3 and order.total == Money(30)
+
+    prices = np.full(1_000_000, 0.1)
+    assert sum_cents(prices) == 10_000_000
+    assert cents_array([5.99, 12.99]).dtype == np.int64
+
+def test_cents_array_rounds_like_to_cents():
+    """Test that bulk and single conversions agree on half cents and arbitrary floats."""
+    rng = np.random.default_rng(3)
+    half_cents = (rng.integers(-10_000_000, 10_000_000, 20_000) * 10 + 5) / 1000
+    amounts = np.concatenate([[0.125, 1.005, 2.675, -0.125, 0.0], half_cents, rng.uniform(-1e6, 1e6, 20_000)])
+    assert cents_array([0.125, 1.005, 2.675, -0.125]).tolist() == [13, 101, 268, -13]
+    assert cents_array(amounts).tolist() == [to_cents(float(amount)) for amount in amounts]
+
+def test_money_refuses_mixed_currencies_and_formats():
+    """Test that Money adds within one currency only and formats like format_currency."""
+    assert Money.of(5.99) * 3 + Money.of(0.03) == Money(1800)
+    with pytest.raises(ValueError):
+        Money(100, "EUR") + Money(100, "USD")
+    assert str(Money(-123456, "GBP")) == "-£1,234.56"
+    assert format_cents(5, "INR") == "₹0.05"
+    assert format_currency(1234.5) == "€1,234.50"
+    assert format_currency(2.675, "XYZ") == "XYZ2.68"
+
+def test_fx_table_converts_and_refreshes(tmp_path, monkeypatch):
+    """Test that conversions go through the base currency and new rates are read once the cache expires."""
+    path = tmp_path / "rates.json"
+    path.write_text(json.dumps({"base": "EUR", "rates": {"USD": "1.25", "INR": "90"}}))
+    table = FxTable(source=lambda: load_fx_file(str(path)), refresh_seconds=60)
+    assert table.convert(Money(1000, "EUR"), "USD") == Money(1250, "USD")
+    assert table.convert_cents(1250, "USD", "INR") == 90000
+    assert table.convert_array(np.array([1000, 2000]), "EUR", "USD").tolist() == [1250, 2500]
+    with pytest.raises(KeyError):
+        table.rate("EUR", "GBP")
+
+    path.write_text(json.dumps({"base": "EUR", "rates": {"USD": "2"}}))
+    assert table.convert_cents(1000, "EUR", "USD") == 1250
+    later = time.monotonic() + 61
+    monkeypatch.setattr("src.utils.cache.time.monotonic", lambda: later)
+    assert table.convert_cents(1000, "EUR", "USD") == 2000
+    assert set(FxTable().rates()) == {"EUR", "USD", "GBP", "INR"}
@@ -0,0 +1,77 @@
+import pytest
+from datetime import datetime, timedelta
+from bson import Decimal128, ObjectId
+from benchmarks.synthetic import generate_orders
+from src.repositories.order_repository import InMemoryOrderRepository
+from src.services.analytics_mirror import AnalyticsMirror
+from src.services.order_archive import OrderArchive, iter_order_history
+
+NOW = datetime(2024, 6, 30)
+
+@pytest.fixture
+def orders():
+    """Synthetic orders, one old delivered order with typed fields outside the archive schema."""
+    orders = list(generate_orders(1000, seed=11))
+    orders[0].update(status="delivered", truck_id="TRUCK-001", gift_note="Happy Diwali",
+                     created_at=datetime(2024, 2, 1), updated_at=datetime(2024, 2, 3),
+                     payment={"state": "captured", "started_at": datetime(2024, 2, 1, 9, 30, 0, 250000),
+                              "amount": Decimal128("12.50"), "charge_id": ObjectId()})
+    return orders
+
+@pytest.fixture
+def repository(orders):
+    """Create an in-memory order repository holding the synthetic orders."""
+    repository = InMemoryOrderRepository()
+    for order in orders:
+        repository.insert(order)
+    return repository
+
+@pytest.fixture
+def archive(tmp_path):
+    """Create an empty archive in a temporary directory."""
+    return OrderArchive(str(tmp_path / "archive"))
+
+def test_archive_moves_old_delivered_orders(orders, repository, archive):
+    """Test that only old delivered orders move, losslessly, into month partitions."""
+    expected = [o for o in orders if o["status"] == "delivered" and o["updated_at"] < NOW - timedelta(days=30)]
+    assert archive.archive(repository, older_than_days=30, now=NOW, dry_run=True) == len(expected)
+    assert archive.partitions() == []
+
+    assert archive.archive(repository, older_than_days=30, now=NOW) == len(expected)
+    assert len(repository) == len(orders) - len(expected)
+    assert archive.partitions() == sorted({o["created_at"].strftime("%Y-%m") for o in expected})
+
+    restored = archive.get_order(orders[0]["order_id"])
+    assert restored == {k: v for k, v in orders[0].items() if k != "_id"}
+    assert archive.archive(repository, older_than_days=30, now=NOW) == 0
+
+def test_date_range_reads_prune_partitions(repository, archive):
+    """Test that a date-range read only touches the months it covers."""
+    archive.archive(repository, older_than_days=30, now=NOW)
+    start, end = datetime(2024, 3, 10), datetime(2024, 4, 5)
+    table = archive.read_table(start, end, columns=["order_id", "created_at"])
+    assert all(start <= created_at < end for created_at in table.column("created_at").to_pylist())
+
+    fragments = list(archive._dataset().get_fragments(filter=archive._filter(start, end)))
+    assert {f.path.split("created_month=")[1][:7] for f in fragments} == {"2024-03", "2024-04"}
+
+def test_history_unions_archive_and_live(orders, repository, archive):
+    """Test that history yields every order once, preferring the live copy."""
+    archive.archive(repository, older_than_days=30, now=NOW)
+    # Simulate a run that wrote its files but died before deleting from the live store
+    leftover = next(o for o in orders if o["order_id"] == orders[0]["order_id"])
+    repository.insert(dict(leftover, status="returned"))
+
+    history = list(iter_order_history(repository, archive))
+    assert sorted(o["order_id"] for o in history) == sorted(o["order_id"] for o in orders)
+    assert next(o for o in history if o["order_id"] == leftover["order_id"])["status"] == "returned"
+
+    march = list(iter_order_history(repository, archive, datetime(2024, 3, 1), datetime(2024, 4, 1)))
+    assert len(march) == sum(1 for o in orders if o["created_at"].month == 3)
+
+def test_first_mirror_sync_includes_archive(orders, repository, archive, tmp_path):
+    """Test that a fresh analytics mirror also loads archived orders."""
+    archive.archive(repository, older_than_days=30, now=NOW)
+    mirror = AnalyticsMirror(str(tmp_path / "analytics.sqlite3"))
+    mirror.sync(repository, archive)
+    assert mirror.order_count() == len(orders)
@@ -0,0 +1,92 @@
+import mongomock
+import pytest
+from bson.decimal128 import Decimal128
+from benchmarks.synthetic import generate_orders
+from src.repositories import order_schema
+from src.repositories.order_repository import AsyncMongoOrderRepository, MongoOrderRepository
+from src.services.order_migration import OrderMigration, size_report
+from src.utils.aio import ThreadedCollection, run
+
+@pytest.fixture
+def db():
+    """Create an in-memory MongoDB database holding 50 orders in the original layout."""
+    database = mongomock.MongoClient().db
+    database.orders.insert_many(generate_orders(50, seed=3))
+    return database
+
+def logical(document):
+    """Return an order without its storage id and with every optional field present, as Order.to_dict() has."""
+    document = {k: v for k, v in document.items() if k != "_id"}
+    for field in order_schema.OPTIONAL_FIELDS:
+        document.setdefault(field, None)
+    return document
+
+def original_orders(db):
+    """Return the stored orders, which are still in the original layout."""
+    return {d["order_id"]: logical(d) for d in db.orders.find()}
+
+def test_encode_round_trips_and_stores_money_as_decimal(db):
+    """Test that a full order survives encode/decode and the stored form uses short keys and Decimal128."""
+    for document in original_orders(db).values():
+        encoded = order_schema.encode(document)
+        assert encoded["v"] == 2 and "items" not in encoded and "shipping_address" not in encoded
+        assert isinstance(encoded["total_price"], Decimal128)
+        assert all(isinstance(item["pr"], Decimal128) for item in encoded["li"])
+        assert order_schema.decode(encoded) == document
+
+def test_repository_reads_both_layouts(db):
+    """Test that the repository answers queries the same way over a mix of original and version 2 orders."""
+    expected = original_orders(db)
+    repository = MongoOrderRepository(db.orders)
+    order = next(generate_orders(1, seed=9))
+    order["order_id"] = "NEW"
+    repository.insert(dict(order))
+    expected["NEW"] = logical(order)
+    assert db.orders.find_one({"order_id": "NEW"})["v"] == 2
+
+    assert {d["order_id"]: logical(d) for d in repository.iter_all()} == expected
+    assert repository.get("NEW")["shipping_address"] == order["shipping_address"]
+    projected = list(repository.iter_projected({"truck_id": None}, ["order_id", "shipping_address", "truck_id"]))
+    assert {d["order_id"] for d in projected} == {k for k, d in expected.items() if d["truck_id"] is None}
+    assert all(set(d) == {"order_id", "shipping_address", "truck_id"} for d in projected)
+    assert run(AsyncMongoOrderRepository(ThreadedCollection(db.orders)).get("NEW")) == repository.get("NEW")
+
+def test_schema_version_1_writes_the_original_layout(db):
+    """Test that schema_version=1 keeps writing documents older app versions can read."""
+    repository = MongoOrderRepository(db.orders, schema_version=1)
+    order = dict(next(generate_orders(1, seed=9)), order_id="OLD")
+    repository.insert(order)
+    stored = db.orders.find_one({"order_id": "OLD"})
+    assert "v" not in stored and "items" in stored and isinstance(stored["total_price"], float)
+
+def test_migration_resumes_from_checkpoint(db):
+    """Test that an interrupted migration picks up after its last batch and converts every order once."""
+    expected = original_orders(db)
+    migration = OrderMigration(db, batch_size=20)
+    assert migration.run(dry_run=True)["migrated"] == 50
+    assert migration.pending() == 50
+
+    first = migration.run(limit=20)
+    assert first["migrated"] == 20 and migration.pending() == 30
+    assert "finished_at" not in migration.checkpoint()
+
+    second = migration.run()
+    assert second["scanned"] == 30 and second["migrated"] == 30
+    assert migration.pending() == 0 and migration.checkpoint()["migrated"] == 50
+    assert migration.run(restart=True)["migrated"] == 0
+
+    repository = MongoOrderRepository(db.orders)
+    assert {d["order_id"]: logical(d) for d in repository.iter_all()} == expected
+
+def test_migration_keeps_concurrent_updates(db):
+    """Test that the migration never overwrites fields the app changed after the batch was read."""
+    migration = OrderMigration(db)
+    document = db.orders.find_one({"truck_id": None})
+    db.orders.update_one({"_id": document["_id"]}, {"$set": {"status": "delivered", "truck_id": "TRUCK-9"}})
+    update = migration._plan(document)
+    assert db.orders.bulk_write([update]).matched_count == 0
+
+    migration.run()
+    migrated = MongoOrderRepository(db.orders).get(document["order_id"])
+    assert migrated["status"] == "delivered" and migrated["truck_id"] == "TRUCK-9"
+    assert size_report(db.orders)["saved_percent"] > 0
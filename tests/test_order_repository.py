@@ -0,0 +1,112 @@
+import mongomock
+import pytest
+from datetime import datetime, timedelta
+from pymongo.errors import DuplicateKeyError
+from src.repositories.order_repository import InMemoryOrderRepository, MongoOrderRepository
+
+@pytest.fixture(params=["mongo", "memory"])
+def repository(request):
+    """Create an empty order repository for each backend."""
+    if request.param == "memory":
+        return InMemoryOrderRepository()
+    return MongoOrderRepository(mongomock.MongoClient().db.orders)
+
+def make_order(order_id, user_id="u1", status="pending", weight=1.0, minutes=0):
+    """Create a minimal order document."""
+    created_at = datetime(2024, 1, 1) + timedelta(minutes=minutes)
+    return {"order_id": order_id, "user_id": user_id, "status": status, "total_weight_kg": weight,
+            "created_at": created_at, "items": [{"name": "Tea", "quantity": 1}]}
+
+def test_find_filters_sorts_and_limits(repository):
+    """Test that both backends answer the same queries the same way."""
+    repository.insert(make_order("A", "u1", "pending", minutes=1))
+    repository.insert(make_order("B", "u1", "paid", minutes=3))
+    repository.insert(make_order("C", "u2", "pending", minutes=2))
+
+    assert [o["order_id"] for o in repository.find(user_id="u1", newest_first=True)] == ["B", "A"]
+    assert {o["order_id"] for o in repository.find(status="pending")} == {"A", "C"}
+    assert [o["order_id"] for o in repository.find(user_id="u2", status="pending")] == ["C"]
+    assert [o["order_id"] for o in repository.find(newest_first=True, limit=2)] == ["B", "C"]
+    assert repository.find(user_id="u3") == []
+    assert len(list(repository.iter_all())) == 3
+
+def test_update_reindexes_status_and_totals(repository):
+    """Test that status updates move orders between status queries and weight totals."""
+    repository.insert(make_order("A", weight=2.5))
+    repository.insert(make_order("B", weight=1.5))
+    assert repository.total_weight("pending") == 4.0
+
+    assert repository.update("A", {"status": "paid"})
+    assert not repository.update("A", {"status": "paid"})
+    assert not repository.update("missing", {"status": "paid"})
+    assert [o["order_id"] for o in repository.find(status="paid")] == ["A"]
+    assert repository.total_weight("pending") == 1.5
+    assert repository.total_weight("shipped") == 0.0
+
+def test_in_memory_copies_documents():
+    """Test that callers cannot mutate stored orders through returned documents."""
+    repository = InMemoryOrderRepository()
+    document = make_order("A")
+    repository.insert(document)
+    document["items"][0]["quantity"] = 99
+    repository.get("A")["items"][0]["quantity"] = 42
+    assert repository.get("A")["items"][0]["quantity"] == 1
+    assert "_id" in repository.get("A")
+
+    with pytest.raises(DuplicateKeyError):
+        repository.insert(make_order("A"))
+
+def test_iter_updated_since(repository):
+    """Test that incremental reads return orders updated at or after a time, oldest first."""
+    for order_id, minutes in [("A", 5), ("B", 1), ("C", 3)]:
+        order = make_order(order_id, minutes=minutes)
+        order["updated_at"] = order["created_at"]
+        repository.insert(order)
+
+    assert [o["order_id"] for o in repository.iter_updated_since()] == ["B", "C", "A"]
+    assert [o["order_id"] for o in repository.iter_updated_since(datetime(2024, 1, 1, 0, 3))] == ["C", "A"]
+
+def test_archive_queries_and_delete(repository):
+    """Test selecting stale orders by status and deleting them."""
+    for order_id, status, minutes in [("A", "delivered", 1), ("B", "delivered", 10), ("C", "pending", 1)]:
+        order = make_order(order_id, status=status, minutes=minutes)
+        order["updated_at"] = order["created_at"]
+        repository.insert(order)
+
+    stale = list(repository.iter_updated_before("delivered", datetime(2024, 1, 1, 0, 5)))
+    assert [o["order_id"] for o in stale] == ["A"]
+    assert repository.delete(["A", "missing"]) == 1
+    assert repository.get("A") is None
+    assert [o["order_id"] for o in repository.find(status="delivered")] == ["B"]
+    assert repository.find(user_id="u1", status="pending")[0]["order_id"] == "C"
+
+def test_iter_projected_filters_and_projects(repository):
+    """Test that projected iteration applies equality filters, the created_at range and the field list."""
+    repository.insert(make_order("A", "u1", "pending", minutes=1))
+    repository.insert(dict(make_order("B", "u1", "pending", minutes=2), truck_id="TRUCK-001"))
+    repository.insert(dict(make_order("C", "u2", "paid", minutes=3), truck_id="TRUCK-001"))
+    start = datetime(2024, 1, 1)
+
+    rows = list(repository.iter_projected({"truck_id": "TRUCK-001"}, ["order_id", "status"]))
+    assert sorted(rows, key=lambda r: r["order_id"]) == [
+        {"order_id": "B", "status": "pending"}, {"order_id": "C", "status": "paid"}
+    ]
+    rows = repository.iter_projected({"status": "pending"}, ["order_id"], start + timedelta(minutes=2), start + timedelta(minutes=3))
+    assert [r["order_id"] for r in rows] == ["B"]
+
+def test_radius_queries_see_writes_without_rebuilding():
+    """Test that located orders written after the ball tree was built are found, moved or dropped without a rebuild."""
+    repository = InMemoryOrderRepository()
+    located = lambda order_id, lon, lat: dict(make_order(order_id), shipping_location={"type": "Point", "coordinates": [lon, lat]})
+    repository.insert(located("A", -6.26, 53.35))
+    repository.insert(located("B", -8.47, 51.90))
+    assert [o["order_id"] for o in repository.find_near(-6.26, 53.35, radius_km=10)] == ["A"]
+    tree = repository._geo_index
+
+    repository.insert(located("C", -6.29, 53.35))
+    repository.update("B", {"shipping_location": {"type": "Point", "coordinates": [-6.25, 53.35]}})
+    repository.delete(["A"])
+    near = repository.find_near(-6.26, 53.35, radius_km=10)
+    assert [o["order_id"] for o in near] == ["B", "C"]
+    assert repository.find_near(-8.47, 51.90, radius_km=10) == []
+    assert repository._geo_index is tree
@@ -0,0 +1,98 @@
+import pytest
+from datetime import date, datetime, timedelta
+from benchmarks.synthetic import generate_orders
+from src.repositories.order_repository import InMemoryOrderRepository
+from src.services.analytics_mirror import AnalyticsMirror
+from src.services.order_search import OrderSearch
+
+@pytest.fixture
+def orders():
+    """Create synthetic orders."""
+    return list(generate_orders(400, seed=9))
+
+@pytest.fixture
+def search(tmp_path, orders):
+    """Create an order search over an in-memory repository and a mirror synced from it."""
+    repository = InMemoryOrderRepository()
+    for order in orders:
+        repository.insert(order)
+    search = OrderSearch(AnalyticsMirror(str(tmp_path / "analytics.sqlite3")), repository, refresh_seconds=0)
+    search.refresh()
+    return search
+
+def matching(orders, predicate):
+    return {order["order_id"] for order in orders if predicate(order)}
+
+def all_pages(search, **kwargs):
+    found, page = [], 1
+    while True:
+        results = search.search(page=page, page_size=50, **kwargs)
+        found += [order["order_id"] for order in results["orders"]]
+        if not results["has_more"]:
+            return found
+        page += 1
+
+def test_prefix_words_match_across_fields(search, orders):
+    """Test that words match the order's id, customer, email, city or products, the last one as a prefix."""
+    expected = matching(orders, lambda o: o["shipping_address"]["city"] == "Dublin"
+                        and any(item["name"].startswith("Tata") for item in o["items"]))
+    found = all_pages(search, text="tata DUB")
+    assert set(found) == expected and len(found) == len(expected)
+
+    order = orders[123]
+    assert search.search(order["order_id"])["orders"][0]["order_id"] == order["order_id"]
+    # The email's words are prefixes, so orders whose ids start with its digits match too
+    assert matching(orders, lambda o: o["contact_info"]["email"] == order["contact_info"]["email"]) <= \
+        set(all_pages(search, text=order["contact_info"]["email"]))
+    assert set(all_pages(search, text="dublin t")) == expected | matching(
+        orders, lambda o: o["shipping_address"]["city"] == "Dublin" and any(item["name"].startswith(("Tata", "Toor")) for item in o["items"])
+    )
+    assert search.search("tat dublin")["orders"] == []
+    assert search.search('zz "unbalanced')["orders"] == []
+
+def test_filters_and_pagination(search, orders):
+    """Test that status, customer and date filters narrow matches, with or without text, and pages do not overlap."""
+    june = (date(2024, 6, 1), date(2024, 6, 10))
+    expected = matching(orders, lambda o: o["status"] == "delivered"
+                        and datetime(2024, 6, 1) <= o["created_at"] < datetime(2024, 6, 11))
+    assert set(all_pages(search, status="delivered", start=june[0], end=june[1])) == expected
+
+    user_id = orders[0]["user_id"]
+    assert set(all_pages(search, user_id=user_id)) == matching(orders, lambda o: o["user_id"] == user_id)
+    assert set(all_pages(search, text="customer", user_id=user_id, status="paid")) == \
+        matching(orders, lambda o: o["user_id"] == user_id and o["status"] == "paid")
+
+    first, second = search.search("customer", page_size=10), search.search("customer", page=2, page_size=10)
+    assert first["has_more"] and len(first["orders"]) == 10
+    assert not {o["order_id"] for o in first["orders"]} & {o["order_id"] for o in second["orders"]}
+
+def test_updates_are_reindexed(search, orders):
+    """Test that searches do not sync, and a re-synced order is found by its new values only, mirrored once."""
+    order = orders[7]
+    search.repository.update(order["order_id"], {
+        "status": "shipped", "contact_info": {**order["contact_info"], "name": "Zelda Quartermaine"},
+        "updated_at": max(o["updated_at"] for o in orders) + timedelta(hours=1)
+    })
+    assert search.search("zelda quarter")["orders"] == []
+    search.refresh()
+    results = search.search("zelda quarter", status="shipped")["orders"]
+    assert [o["order_id"] for o in results] == [order["order_id"]]
+    assert order["order_id"] in all_pages(search, status="shipped")
+    assert order["order_id"] not in all_pages(search, text=order["contact_info"]["name"], user_id=order["user_id"])
+    assert search.mirror.order_count() == len(orders)
+
+def test_text_matches_come_newest_created_first(tmp_path, orders):
+    """Test that text matches follow creation date even when the mirror first saw the orders in update order."""
+    now = datetime(2024, 7, 1)
+    repository = InMemoryOrderRepository()
+    old, recent = (dict(order) for order in orders[:2])
+    old.update(created_at=now - timedelta(days=30), updated_at=now)
+    recent.update(created_at=now - timedelta(days=1), updated_at=now - timedelta(days=1))
+    repository.insert(old)
+    repository.insert(recent)
+    search = OrderSearch(AnalyticsMirror(str(tmp_path / "analytics.sqlite3")), repository, refresh_seconds=0)
+    search.refresh()
+
+    expected = [recent["order_id"], old["order_id"]]
+    assert [o["order_id"] for o in search.search("ord")["orders"]] == expected
+    assert [o["order_id"] for o in search.search()["orders"]] == expected
@@ -1,23 +1,25 @@
+import os
 import pytest
 from datetime import datetime
 from src.models.order import Order, OrderItem
+from src.repositories.order_repository import InMemoryOrderRepository
 from src.services.order_service import OrderService
-from pymongo import MongoClient
-from src.config import MONGO_URI
+from src.database import create_client
 
 @pytest.fixture
 def test_db():
-    """Create a test database connection."""
-    client = MongoClient(MONGO_URI)
-    db = client.test_crowdcargo
+    """Create a test database connection (mongomock unless TEST_MONGO_URI is set)."""
+    client = create_client(os.getenv("TEST_MONGO_URI", "mongomock://localhost"))
+    db = client['test_crowdcargo']
     yield db
     # Cleanup after tests
     client.drop_database('test_crowdcargo')
 
-@pytest.fixture
-def order_service(test_db):
-    """Create an OrderService instance with test database."""
-    return OrderService(test_db)
+@pytest.fixture(params=["mongo", "memory"])
+def order_service(request, test_db):
+    """Create an OrderService instance with each order repository backend."""
+    repository = InMemoryOrderRepository() if request.param == "memory" else None
+    return OrderService(test_db, repository=repository)
 
 @pytest.fixture
 def sample_order():
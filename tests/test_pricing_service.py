@@ -0,0 +1,56 @@
+import json
+import numpy as np
+import pytest
+from benchmarks.synthetic import generate_orders
+from src.repositories.order_repository import InMemoryOrderRepository
+from src.services.analytics_mirror import AnalyticsMirror
+from src.services.analytics_service import get_advanced_order_analytics
+from src.services.pricing_service import PricingEngine
+from src.utils.money import FxTable, load_fx_file
+
+@pytest.fixture
+def engine(tmp_path):
+    """Create a pricing engine over a local rates file."""
+    path = tmp_path / "rates.json"
+    path.write_text(json.dumps({"base": "EUR", "rates": {"USD": "1.25", "GBP": "0.8"}}))
+    return PricingEngine(FxTable(source=lambda: load_fx_file(str(path))), catalog_currency="EUR")
+
+def test_products_and_carts_are_repriced_exactly(engine):
+    """Test that converted unit prices multiply out to the cart total shown."""
+    products = [{"product_id": "P1", "price": 0.1}, {"product_id": "P2", "price": 12.99}]
+    assert [p["price"] for p in engine.localize_products(products, "USD")] == [0.12, 16.24]
+    assert engine.localize_products(products, "EUR")[0] == {"product_id": "P1", "price": 0.1, "currency": "EUR"}
+
+    cart = [{"price": 0.1, "quantity": 3, "currency": "EUR"}, {"price": 10.0, "quantity": 1, "currency": "GBP"}]
+    items, cents = engine.reprice_cart(cart, "USD")
+    assert [(item["price"], item["currency"]) for item in items] == [(0.12, "USD"), (15.62, "USD")]  # 1562.5 rounds half to even
+    assert cents == 3 * 12 + 1562
+    assert engine.reprice_cart([], "USD") == ([], 0)
+
+def test_convert_totals_batches_mixed_currencies(engine):
+    """Test that each amount converts from its own currency, matching one-by-one conversion."""
+    rng = np.random.default_rng(7)
+    cents = rng.integers(-10**9, 10**9, 5000)
+    currencies = rng.choice(["EUR", "USD", "GBP"], 5000)
+    converted = engine.convert_totals(cents, currencies, "GBP")
+    assert converted.tolist() == [engine.fx.convert_cents(c, cur, "GBP") for c, cur in zip(cents, currencies)]
+    with pytest.raises(KeyError):
+        engine.convert_totals([100], ["JPY"], "EUR")
+
+def test_analytics_report_revenue_in_one_currency(engine, tmp_path):
+    """Test that pandas and SQL analytics convert each order's total before summing."""
+    repository = InMemoryOrderRepository()
+    orders = []
+    for i, order in enumerate(generate_orders(60, seed=5)):
+        order["currency"] = "USD" if i % 2 else "EUR"
+        order["total_price"] = 12.5 if i % 2 else 10.0
+        repository.insert(order)
+        orders.append(order)
+
+    mirror = AnalyticsMirror(str(tmp_path / "analytics.sqlite3"), pricing=engine, reporting_currency="EUR")
+    mirror.sync(repository)
+    assert mirror.get_advanced_order_analytics()["daily_metrics"]["revenue"].sum() == pytest.approx(600.0)
+    assert mirror.customer_features()["total_spent"].sum() == pytest.approx(600.0)
+
+    analytics = get_advanced_order_analytics(orders)
+    assert set(analytics["orders_df"]["currency"]) == {"EUR", "USD"}
@@ -0,0 +1,52 @@
+import pytest
+from src.utils import profiling
+
+@pytest.fixture
+def profile_log(tmp_path, monkeypatch):
+    """Point the profiler at a temporary log in timer mode."""
+    monkeypatch.setattr(profiling, "PROFILE_MODE", "timer")
+    monkeypatch.setattr(profiling, "PROFILE_LOG", tmp_path / "profile.jsonl")
+    monkeypatch.setattr(profiling, "_logger", None)
+    yield tmp_path / "profile.jsonl"
+    monkeypatch.setattr(profiling, "_logger", None)
+
+def test_disabled_profiler_records_nothing(monkeypatch, tmp_path):
+    """Test that sections are no-ops unless CROWDCARGO_PROFILE is set."""
+    monkeypatch.setattr(profiling, "PROFILE_MODE", "")
+    monkeypatch.setattr(profiling, "PROFILE_LOG", tmp_path / "profile.jsonl")
+    with profiling.start_section("page:Home"):
+        pass
+    assert not (tmp_path / "profile.jsonl").exists()
+
+def test_sections_and_decorated_functions_are_logged(profile_log):
+    """Test that nested sections and decorated functions write records."""
+    @profiling.profiled()
+    def segment_customers():
+        return 42
+
+    rerun = profiling.start_section("rerun", root=True)
+    with profiling.start_section("page:Admin Dashboard"):
+        assert segment_customers() == 42
+    rerun.stop()
+    rerun.stop()
+
+    records = profiling.read_records(profile_log)
+    assert [r["section"] for r in records] == ["segment_customers", "page:Admin Dashboard", "rerun"]
+    assert [r["depth"] for r in records] == [2, 1, 0]
+
+def test_root_section_resets_abandoned_depth(profile_log):
+    """Test that a section abandoned by st.rerun does not nest the next rerun."""
+    profiling.start_section("rerun", root=True)
+    profiling.start_section("page:Checkout")
+    with profiling.start_section("rerun", root=True):
+        pass
+    assert profiling.read_records(profile_log)[-1]["depth"] == 0
+
+def test_cprofile_mode_dumps_profile(profile_log, monkeypatch):
+    """Test that the outermost section captures a cProfile dump."""
+    monkeypatch.setattr(profiling, "PROFILE_MODE", "cprofile")
+    with profiling.start_section("rerun", root=True):
+        sum(range(1000))
+    [summary] = profiling.summarize(profiling.read_records(profile_log))
+    assert summary["section"] == "rerun"
+    assert summary["last_profile"].endswith(".prof")
@@ -0,0 +1,51 @@
+import pytest
+from src.config import DEFAULT_SHIPPING_PLANS
+from src.services.quote_engine import ShippingQuoteEngine
+
+@pytest.fixture
+def engine():
+    """Create a quote engine over the default plans plus a tiered, dim-weight plan."""
+    return ShippingQuoteEngine(DEFAULT_SHIPPING_PLANS + [{
+        "name": "Tiered",
+        "min_weight": 0,
+        "max_weight": 50,
+        "rate_per_kg": 1.0,
+        "tiers": [{"up_to_kg": 10, "rate_per_kg": 3.0}],
+        "dim_divisor": 5000,
+        "destinations": ["Ireland"],
+        "delivery_time": "4-6 days",
+        "carrier": "Test"
+    }])
+
+def test_quote_matches_scalar_pricing(engine):
+    """Test that flat-rate costs equal weight times rate for eligible plans."""
+    batch = engine.quote([5.0, 25.0])
+    for i, weight in enumerate([5.0, 25.0]):
+        for j, plan in enumerate(DEFAULT_SHIPPING_PLANS):
+            eligible = plan['min_weight'] <= weight <= plan['max_weight']
+            assert batch.eligible[i, j] == eligible
+            assert batch.cost[i, j] == pytest.approx(weight * plan['rate_per_kg'])
+
+def test_tiered_and_dim_weight_pricing(engine):
+    """Test marginal tier bands and volumetric chargeable weight."""
+    batch = engine.quote([15.0, 2.0], ["Ireland", "Ireland"], [0.0, 100000.0])
+    assert batch.cost[0, -1] == pytest.approx(10 * 3.0 + 5 * 1.0)
+    assert batch.chargeable_weight[1, -1] == pytest.approx(20.0)
+    assert batch.cost[1, -1] == pytest.approx(10 * 3.0 + 10 * 1.0)
+
+def test_destination_restriction_and_cheapest(engine):
+    """Test that restricted plans are excluded and cheapest picks the lowest eligible cost."""
+    batch = engine.quote([25.0, 25.0], ["Ireland", "Canada"])
+    assert batch.eligible[0, -1]
+    assert not batch.eligible[1, -1]
+    best, cost = batch.cheapest()
+    assert DEFAULT_SHIPPING_PLANS[best[1]]['name'] == "India Post SAL"
+    assert cost[1] == pytest.approx(25.0 * 0.30)
+    assert engine.quote([500.0]).cheapest()[0][0] == -1
+
+def test_delivery_days_are_parsed_once(engine):
+    """Test that plan delivery windows are available as integer arrays."""
+    assert engine.min_days.tolist()[:2] == [15, 7]
+    assert engine.max_days.tolist()[:2] == [20, 10]
+    quotes = engine.quote([5.0]).quotes_for(0)
+    assert quotes == sorted(quotes, key=lambda q: q['cost'])
@@ -0,0 +1,188 @@
+import mongomock
+import pytest
+from pymongo.errors import AutoReconnect, OperationFailure
+from src.models.order import Order, OrderItem
+from src.repositories.order_repository import InMemoryOrderRepository
+from src.repositories.unit_of_work import UnitOfWork
+from src.services.inventory_service import InventoryService, OutOfStockError
+from src.services.order_service import OrderService
+from src.services.shared_shipping_service import SharedShippingService
+from src.services.truck_service import TruckService
+from src.utils.cache import TTLCache
+
+class FakeSession:
+    """Records transaction calls, standing in for a pymongo ClientSession."""
+
+    def __init__(self, log):
+        self.log = log
+        self.in_transaction = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def start_transaction(self, **options):
+        self.in_transaction = True
+        self.log.append("start")
+
+    def commit_transaction(self):
+        self.in_transaction = False
+        self.log.append("commit")
+
+    def abort_transaction(self):
+        self.in_transaction = False
+        self.log.append("abort")
+
+class FakeClient:
+    """Hands out FakeSessions that share one call log."""
+
+    def __init__(self):
+        self.log = []
+
+    def start_session(self):
+        return FakeSession(self.log)
+
+def transient_error():
+    """Create the error a write conflict raises inside a transaction."""
+    return OperationFailure("WriteConflict", 112, {"errorLabels": ["TransientTransactionError"]})
+
+@pytest.fixture
+def services():
+    """Create order and truck services with one collecting truck that has 10 kg of room."""
+    db = mongomock.MongoClient().db
+    truck_service = TruckService(db, TTLCache())
+    truck_service.seed_trucks([
+        {"truck_id": "TRUCK-001", "status": "collecting", "current_weight": 90, "max_weight": 100}
+    ])
+    return OrderService(db, repository=InMemoryOrderRepository()), truck_service
+
+def make_order(order_id, quantity):
+    """Create an unsaved shared shipping order for 1 kg packs."""
+    return Order(
+        order_id=order_id, user_id="u1", truck_id="TRUCK-001", payment_method="shared_shipping",
+        items=[OrderItem(product_id="1", name="Maggi Noodles", quantity=quantity, weight_kg=1.0, price=2.0)],
+        total_price=2.0 * quantity, total_weight_kg=1.0 * quantity,
+        shipping_address={"city": "Dublin", "country": "Ireland"}, contact_info={"email": "u1@example.com"}
+    )
+
+def test_join_truck_writes_truck_and_order(services):
+    """Test that joining stores the order and adds its weight and contributions to the truck."""
+    order_service, truck_service = services
+    assert SharedShippingService(order_service, truck_service).join_truck(make_order("ORD-1", 4))
+
+    truck = truck_service.get_truck("TRUCK-001")
+    assert (truck["current_weight"], truck["item_count"]) == (94, 4)
+    assert order_service.get_order_document("ORD-1")["truck_id"] == "TRUCK-001"
+
+def test_join_truck_rejects_order_without_room(services):
+    """Test that an order heavier than the remaining capacity writes nothing."""
+    order_service, truck_service = services
+    assert not SharedShippingService(order_service, truck_service).join_truck(make_order("ORD-1", 11))
+
+    assert truck_service.get_truck("TRUCK-001")["current_weight"] == 90
+    assert order_service.get_order_document("ORD-1") is None
+
+def test_failed_order_write_releases_truck_capacity(services, monkeypatch):
+    """Test that without transactions a failed order insert takes the reservation back off the truck."""
+    order_service, truck_service = services
+    shipping = SharedShippingService(order_service, truck_service)
+    shipping.join_truck(make_order("ORD-1", 2))
+
+    def fail(document, session=None):
+        raise AutoReconnect("connection reset")
+    monkeypatch.setattr(order_service.repository, "insert", fail)
+    with pytest.raises(AutoReconnect):
+        shipping.join_truck(make_order("ORD-2", 3))
+
+    truck = truck_service.get_truck("TRUCK-001")
+    assert (truck["current_weight"], truck["item_count"], truck["contribution_count"]) == (92, 2, 1)
+
+def test_unit_of_work_retries_transient_errors():
+    """Test that the whole work is rerun in a new transaction after a transient error."""
+    client = FakeClient()
+    attempts = []
+
+    def work(session):
+        attempts.append(session)
+        if len(attempts) < 3:
+            raise transient_error()
+        return "done"
+
+    unit_of_work = UnitOfWork(client, max_retries=3, backoff_seconds=0, transactional=True)
+    assert unit_of_work.run(work) == "done"
+    assert client.log == ["start", "abort", "start", "abort", "start", "commit"]
+    assert unit_of_work.retries == 2
+
+def test_unit_of_work_aborts_on_other_errors():
+    """Test that a non-transient error aborts the transaction once and propagates."""
+    client = FakeClient()
+
+    def work(session):
+        raise ValueError("no room")
+
+    with pytest.raises(ValueError):
+        UnitOfWork(client, backoff_seconds=0, transactional=True).run(work)
+    assert client.log == ["start", "abort"]
+
+def test_unit_of_work_gives_up_after_max_retries():
+    """Test that a transient error that keeps happening is raised after the last retry."""
+    client = FakeClient()
+
+    def work(session):
+        raise transient_error()
+
+    with pytest.raises(OperationFailure):
+        UnitOfWork(client, max_retries=2, backoff_seconds=0, transactional=True).run(work)
+    assert client.log.count("start") == 3
+
+def test_unit_of_work_detects_mongomock_as_non_transactional():
+    """Test that mongomock runs the work directly with no session."""
+    unit_of_work = UnitOfWork(mongomock.MongoClient())
+    assert not unit_of_work.transactional
+    assert unit_of_work.run(lambda session: session) is None
+
+def test_sold_out_hold_leaves_truck_and_stock_untouched(services):
+    """Test that a join whose held stock sold out writes no order and keeps the other holds on hold."""
+    order_service, truck_service = services
+    inventory = InventoryService(truck_service.trucks.database, TTLCache())
+    inventory.set_stock("1", 4)
+    kept = inventory.reserve("1", 1, "u1")
+    inventory.hold_seconds = -1
+    swept = inventory.reserve("1", 3, "u1")
+    inventory.release_expired()
+    inventory.reserve("1", 3, "u2")
+
+    shipping = SharedShippingService(order_service, truck_service, inventory_service=inventory)
+    with pytest.raises(OutOfStockError) as error:
+        shipping.join_truck(make_order("ORD-1", 4), [str(kept["_id"]), str(swept["_id"])])
+
+    assert error.value.hold_ids == [str(swept["_id"])]
+    assert inventory.holds.find_one({"_id": kept["_id"]})["state"] == "held"
+    assert truck_service.get_truck("TRUCK-001")["current_weight"] == 90
+    assert order_service.get_order_document("ORD-1") is None
+
+def test_repeated_join_with_one_key_joins_once(services, monkeypatch):
+    """Test that repeating a keyed join, sequentially or racing past the lookup, stores one order and one load."""
+    order_service, truck_service = services
+    inventory = InventoryService(truck_service.trucks.database, TTLCache())
+    inventory.set_stock("1", 10)
+    hold = inventory.reserve("1", 2, "u1")
+    shipping = SharedShippingService(order_service, truck_service, inventory_service=inventory)
+
+    def keyed_order():
+        order = make_order("ORD-ignored", 2)
+        order.idempotency_key = "K1"
+        return order
+    assert shipping.join_truck(keyed_order(), [str(hold["_id"])])
+    assert shipping.join_truck(keyed_order(), [str(hold["_id"])])
+
+    # A concurrent repeat misses the stored order, reserves, then loses the insert race
+    monkeypatch.setattr(order_service.repository, "get", lambda order_id: None)
+    assert shipping.join_truck(keyed_order(), [str(hold["_id"])])
+
+    truck = truck_service.get_truck("TRUCK-001")
+    assert (truck["current_weight"], truck["contribution_count"]) == (92, 1)
+    assert truck_service.contributions.count_documents({"order_id": "ORD-K1"}) == 1
+    assert inventory.holds.find_one({"_id": hold["_id"]})["state"] == "committed"
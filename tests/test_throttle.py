@@ -0,0 +1,127 @@
+import threading
+import time
+import pytest
+from src.utils.throttle import ExpensiveCalls, RateLimited, RateLimiter, SingleFlight
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+def wait_until(predicate, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not predicate() and time.monotonic() < deadline:
+        time.sleep(0.001)
+
+@pytest.fixture
+def clock():
+    """Create a clock the tests move by hand."""
+    return FakeClock()
+
+@pytest.fixture
+def limiter(clock):
+    """Create a limiter allowing bursts of 2 per user and 3 overall, refilled at one token a second."""
+    return RateLimiter(user_per_minute=60, user_burst=2, global_per_minute=60, global_burst=3, clock=clock)
+
+def test_user_and_global_buckets(limiter, clock):
+    """Test that a user is limited to their burst, and all users together to the global burst."""
+    limiter.acquire("forecast", "alice")
+    limiter.acquire("forecast", "alice")
+    with pytest.raises(RateLimited) as error:
+        limiter.acquire("forecast", "alice")
+    assert error.value.scope == "user" and error.value.retry_after == pytest.approx(1.0)
+
+    limiter.acquire("forecast", "bob")
+    with pytest.raises(RateLimited) as error:
+        limiter.acquire("forecast", "carol")
+    assert error.value.scope == "global"
+    limiter.acquire("rollup", "alice")
+
+    clock.now += 1
+    limiter.acquire("forecast", "carol")
+    allowed, rejected = limiter.counts()
+    assert allowed == {"forecast": 4, "rollup": 1}
+    assert rejected == {("forecast", "user"): 1, ("forecast", "global"): 1}
+
+def test_single_flight_shares_one_computation():
+    """Test that concurrent calls for one key wait for the first and get its result or error."""
+    flights = SingleFlight()
+    started, release = threading.Event(), threading.Event()
+    calls = []
+
+    def compute():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return "report"
+
+    results = []
+    leader = threading.Thread(target=lambda: results.append(flights.do("k", compute)))
+    leader.start()
+    started.wait(5)
+    followers = [threading.Thread(target=lambda: results.append(flights.do("k", compute))) for _ in range(4)]
+    for thread in followers:
+        thread.start()
+    wait_until(lambda: flights.coalesced == 4)
+    release.set()
+    for thread in [leader] + followers:
+        thread.join(5)
+    assert results == ["report"] * 5 and len(calls) == 1
+    assert flights.executed == 1 and not flights.in_flight("k")
+
+    with pytest.raises(ZeroDivisionError):
+        flights.do("k", lambda: 1 / 0)
+    assert flights.do("k", lambda: "fresh") == "fresh"
+
+def test_expensive_calls_only_charge_the_caller_that_starts_a_run(limiter):
+    """Test that joining a running computation takes no token and is counted as coalesced."""
+    calls = ExpensiveCalls(limiter=limiter)
+    started, release = threading.Event(), threading.Event()
+
+    def slow():
+        started.set()
+        release.wait(5)
+        return 42
+
+    leader = threading.Thread(target=lambda: calls.run("overview", slow, user_id="alice"))
+    leader.start()
+    started.wait(5)
+    follower_results = []
+    followers = [
+        threading.Thread(target=lambda: follower_results.append(calls.run("overview", slow, user_id="bob")))
+        for _ in range(5)
+    ]
+    for thread in followers:
+        thread.start()
+    wait_until(lambda: calls.flights.coalesced == 5)
+    release.set()
+    for thread in [leader] + followers:
+        thread.join(5)
+
+    assert follower_results == [42] * 5
+    stats = calls.stats()
+    assert stats["allowed"] == {"overview": 1} and stats["coalesced"] == 5
+    assert calls.run("overview", lambda: 7, key="june", user_id="alice") == 7
+    with pytest.raises(RateLimited):
+        calls.run("overview", lambda: 7, key="july", user_id="alice")
+    assert calls.stats()["rejected"] == {"overview/user": 1}
+    assert 'crowdcargo_expensive_calls_rejected_total{operation="overview",scope="user"} 1' in calls.render_prometheus()
+
+def test_kept_results_are_reused_and_served_when_limited(limiter, clock):
+    """Test that a recent result costs no token, and an older one is served instead of a refusal."""
+    calls = ExpensiveCalls(limiter=limiter, result_ttl_seconds=10)
+    assert calls.run("overview", lambda: 1, user_id="alice") == 1
+    assert calls.run("overview", lambda: 2, user_id="alice") == 1
+    assert calls.stats()["allowed"] == {"overview": 1} and calls.stats()["reused"] == 1
+
+    clock.now += 10
+    assert calls.run("overview", lambda: 2, user_id="alice") == 2
+    clock.now += 10
+    calls.limiter.acquire("overview", "alice")
+    calls.limiter.acquire("overview", "alice")
+    assert calls.run("overview", lambda: 3, user_id="alice") == 2
+    assert calls.stats()["stale"] == 1 and calls.result_age("overview") == 10
+    with pytest.raises(RateLimited):
+        calls.run("overview", lambda: 3, key="unseen", user_id="alice")
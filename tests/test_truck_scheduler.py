@@ -0,0 +1,83 @@
+import mongomock
+import pytest
+from datetime import datetime, timedelta
+from src.repositories.order_repository import InMemoryOrderRepository
+from src.services.truck_scheduler import TruckScheduler, order_lane
+from src.services.truck_service import TruckService
+from src.utils.cache import TTLCache
+
+NOW = datetime(2024, 6, 1)
+LONDON = ("Mumbai, India", "London, UK")
+
+@pytest.fixture
+def truck_service():
+    """Create a truck service with a nearly full truck and an empty one on different lanes."""
+    service = TruckService(mongomock.MongoClient().db, TTLCache())
+    service.seed_trucks([
+        {"truck_id": "TRUCK-001", "status": "collecting", "current_weight": 1950, "max_weight": 2000,
+         "location": "Mumbai, India", "departure_date": NOW + timedelta(days=3)},
+        {"truck_id": "TRUCK-002", "status": "collecting", "current_weight": 100, "max_weight": 2000,
+         "location": "Delhi, India", "departure_date": NOW + timedelta(days=1)}
+    ])
+    return service
+
+@pytest.fixture
+def repository():
+    """Create an empty in-memory order repository."""
+    return InMemoryOrderRepository()
+
+def add_pending(repository, order_id, weight, at=NOW, truck_id=None):
+    """Insert a pending order shipping to London."""
+    repository.insert({"order_id": order_id, "user_id": "u1", "status": "pending", "truck_id": truck_id,
+                       "total_weight_kg": weight, "created_at": at, "updated_at": at,
+                       "shipping_address": {"city": "London", "country": "UK"}})
+
+def test_fill_and_deadline_approvals(truck_service, repository):
+    """Test that full trucks depart at once and others on their departure date."""
+    scheduler = TruckScheduler(truck_service, repository)
+
+    assert scheduler.tick(NOW) == {"approved": ["TRUCK-001"], "opened": []}
+    assert truck_service.get_truck("TRUCK-001")["approval_reason"] == "fill"
+    assert scheduler.tick(NOW + timedelta(hours=12)) == {"approved": [], "opened": []}
+    assert scheduler.tick(NOW + timedelta(days=1)) == {"approved": ["TRUCK-002"], "opened": []}
+    assert truck_service.get_truck("TRUCK-002")["approval_reason"] == "deadline"
+
+def test_opens_truck_when_forecast_crosses_threshold(truck_service, repository):
+    """Test that trucks open while the forecast is past the threshold of the capacity that would be open."""
+    add_pending(repository, "A", 40.0)
+    add_pending(repository, "B", 25.0, truck_id="TRUCK-002")
+    scheduler = TruckScheduler(truck_service, repository)
+    assert scheduler.tick(NOW)["opened"] == []
+
+    add_pending(repository, "C", 1600.0, at=NOW + timedelta(minutes=1))
+    assert scheduler.tick(NOW + timedelta(minutes=1))["opened"] == ["TRUCK-003"]
+    truck = truck_service.get_truck("TRUCK-003")
+    assert (truck["location"], truck["destination"]) == LONDON
+    assert truck["departure_date"] == NOW + timedelta(days=7, minutes=1)
+    # 1640 kg is also past the threshold of the one open truck, so a second opens, then the lane is covered
+    assert scheduler.tick(NOW + timedelta(minutes=2))["opened"] == ["TRUCK-004"]
+    assert scheduler.tick(NOW + timedelta(minutes=3))["opened"] == []
+
+def test_departed_lane_does_not_reopen_for_old_demand(truck_service, repository):
+    """Test that orders placed before a lane's truck left do not open empty trucks after it."""
+    truck_service.trucks.insert_one({
+        "truck_id": "TRUCK-010", "status": "collecting", "current_weight": 40, "max_weight": 2000,
+        "location": LONDON[0], "destination": LONDON[1], "departure_date": NOW
+    })
+    add_pending(repository, "A", 1700.0, at=NOW - timedelta(days=1))
+    scheduler = TruckScheduler(truck_service, repository)
+
+    summary = scheduler.tick(NOW)
+    assert "TRUCK-010" in summary["approved"] and summary["opened"] == []
+    for day in range(1, 31):
+        assert scheduler.tick(NOW + timedelta(days=day))["opened"] == []
+    assert TruckScheduler(truck_service, repository).tick(NOW + timedelta(days=30))["opened"] == []
+
+    add_pending(repository, "B", 1600.0, at=NOW + timedelta(days=31))
+    assert scheduler.tick(NOW + timedelta(days=31))["opened"] == ["TRUCK-011"]
+
+def test_order_lane():
+    """Test that orders without a city or country have no lane."""
+    assert order_lane({"shipping_address": {"city": "London", "country": "UK"}}) == LONDON
+    assert order_lane({"shipping_address": {"city": "London"}}) is None
+    assert order_lane({}) is None
@@ -0,0 +1,82 @@
+import mongomock
+import pytest
+from pymongo.errors import AutoReconnect
+from src.services.truck_service import TruckService
+from src.utils.cache import TTLCache
+
+@pytest.fixture
+def db():
+    """Create an in-memory MongoDB database."""
+    return mongomock.MongoClient().db
+
+@pytest.fixture
+def truck_service(db):
+    """Create a truck service with one legacy truck that still embeds its items."""
+    service = TruckService(db, TTLCache())
+    service.seed_trucks([
+        {"truck_id": "TRUCK-001", "status": "collecting", "current_weight": 60, "max_weight": 100, "items": [
+            {"name": "Kurkure", "quantity": 80, "weight": 40},
+            {"name": "Bournvita", "quantity": 50, "weight": 20}
+        ]}
+    ])
+    return service
+
+def test_seed_moves_embedded_items_out(db, truck_service):
+    """Test that embedded items become contributions and the truck keeps only counters."""
+    truck = truck_service.get_truck("TRUCK-001")
+
+    assert "items" not in truck
+    assert (truck["contribution_count"], truck["item_count"]) == (2, 130)
+    assert db.truck_contributions.count_documents({"truck_id": "TRUCK-001"}) == 2
+    assert truck_service.migrate_embedded_items() == 0
+
+def test_reserve_capacity_adds_contributions(db, truck_service):
+    """Test that joining a truck inserts contribution documents and increments the counters."""
+    items = [{"name": "Kurkure", "quantity": 2, "weight": 1.0}, {"name": "Maggi Noodles", "quantity": 3, "weight": 1.5}]
+    assert truck_service.reserve_capacity("TRUCK-001", items, 2.5, "ORD-1")
+    assert not truck_service.reserve_capacity("TRUCK-404", items, 2.5, "ORD-2")
+
+    truck = truck_service.get_truck("TRUCK-001")
+    assert (truck["current_weight"], truck["contribution_count"], truck["item_count"]) == (62.5, 4, 135)
+    assert db.truck_contributions.count_documents({"order_id": "ORD-1"}) == 2
+
+def test_release_capacity_takes_off_only_what_it_deleted(truck_service, monkeypatch):
+    """Test that releasing an order twice subtracts it once, and a failed line insert undoes the reservation."""
+    items = [{"name": "Kurkure", "quantity": 2, "weight": 1.0}, {"name": "Maggi Noodles", "quantity": 3, "weight": 1.5}]
+    truck_service.reserve_capacity("TRUCK-001", items, 2.5, "ORD-1")
+    assert truck_service.release_capacity("TRUCK-001", "ORD-1")
+    assert not truck_service.release_capacity("TRUCK-001", "ORD-1")
+
+    def fail(documents, session=None):
+        raise AutoReconnect("connection reset")
+    monkeypatch.setattr(truck_service.contributions, "insert_many", fail)
+    with pytest.raises(AutoReconnect):
+        truck_service.reserve_capacity("TRUCK-001", items, 2.5, "ORD-2")
+
+    truck = truck_service.get_truck("TRUCK-001")
+    assert (truck["current_weight"], truck["contribution_count"], truck["item_count"]) == (60, 2, 130)
+
+def test_manifest_page_aggregates_by_product(truck_service):
+    """Test that the manifest groups contributions by product, heaviest first, one page at a time."""
+    truck_service.reserve_capacity("TRUCK-001", [{"name": "Kurkure", "quantity": 2, "weight": 1.0}], 1.0, "ORD-1")
+    truck_service.reserve_capacity("TRUCK-001", [{"name": "Maggi Noodles", "quantity": 3, "weight": 1.5}], 1.5, "ORD-2")
+
+    first, total = truck_service.get_manifest_page("TRUCK-001", page=0, page_size=2)
+    last, _ = truck_service.get_manifest_page("TRUCK-001", page=1, page_size=2)
+    assert total == 3
+    assert first == [
+        {"name": "Kurkure", "quantity": 82, "weight_kg": 41.0, "contributions": 2},
+        {"name": "Bournvita", "quantity": 50, "weight_kg": 20, "contributions": 1}
+    ]
+    assert [row["name"] for row in last] == ["Maggi Noodles"]
+    assert truck_service.get_manifest_page("TRUCK-404") == ([], 0)
+
+def test_open_truck_numbers_past_999_and_skips_taken_ids(db, truck_service):
+    """Test that truck ids come from a counter seeded from the highest number, not a string sort."""
+    truck_service.ensure_indexes()
+    db.trucks.insert_one({"truck_id": "TRUCK-999", "status": "approved"})
+    opened = [truck_service.open_truck("Mumbai, India", "London, UK", 2000, None, None)["truck_id"] for _ in range(2)]
+    assert opened == ["TRUCK-1000", "TRUCK-1001"]
+
+    db.trucks.insert_one({"truck_id": "TRUCK-1002", "status": "collecting"})
+    assert truck_service.open_truck("Mumbai, India", "London, UK", 2000, None, None)["truck_id"] == "TRUCK-1003"